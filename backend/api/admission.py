@@ -0,0 +1,136 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+from django.conf import settings
+from .telemetry import telemetry
+
+# Used for Retry-After until a gate has seen some requests finish
+DEFAULT_HOLD_SECONDS = 2.0
+
+
+class Overloaded(Exception):
+    """A gate is at its limit and its queue is full (or the wait timed out); callers answer 429 with Retry-After"""
+
+    def __init__(self, gate: str, retry_after: int):
+        super().__init__(f'Server is busy with other {gate} requests. Please retry in {retry_after}s.')
+        self.gate = gate
+        self.retry_after = retry_after
+
+
+class AdmissionGate:
+    """Caps how many requests of one expensive kind run at once in this worker.
+
+    Up to `limit` callers run; up to `queue` more wait at most `timeout` seconds
+    for a slot, and anyone beyond that is shed straight away with Overloaded,
+    so slow work can never occupy every thread and cheap endpoints keep
+    answering. A limit of 0 disables the gate.
+    """
+
+    def __init__(self, name: str, limit: int, queue: int = 0, timeout: float = 0.0):
+        self.name = name
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        # Moving average of how long a slot is held, for Retry-After
+        self._hold_seconds = DEFAULT_HOLD_SECONDS
+        self._reset_locks()
+
+    def _reset_locks(self):
+        self._slots = threading.BoundedSemaphore(max(self.limit, 1))
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.limit > 0
+
+    def retry_after(self) -> int:
+        backlog = (self.waiting + 1) / max(self.limit, 1)
+        return max(math.ceil(self._hold_seconds * backlog), 1)
+
+    def _reject(self):
+        telemetry.inc('admission_requests_total', gate=self.name, result='rejected')
+        raise Overloaded(self.name, self.retry_after())
+
+    def acquire(self, blocking: bool = True):
+        """Take a slot, waiting in the queue if allowed; raises Overloaded otherwise"""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if not blocking or self.waiting >= self.queue:
+                    self._reject()
+                self.waiting += 1
+            try:
+                admitted = self._slots.acquire(timeout=self.timeout)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            if not admitted:
+                self._reject()
+            telemetry.inc('admission_requests_total', gate=self.name, result='queued')
+        else:
+            telemetry.inc('admission_requests_total', gate=self.name, result='admitted')
+
+        with self._lock:
+            self.active += 1
+            telemetry.set_gauge('admission_in_flight', self.active, gate=self.name)
+        return time.monotonic()
+
+    def release(self, acquired_at: float):
+        with self._lock:
+            self.active -= 1
+            self._hold_seconds = 0.8 * self._hold_seconds + 0.2 * (time.monotonic() - acquired_at)
+            telemetry.set_gauge('admission_in_flight', self.active, gate=self.name)
+        self._slots.release()
+
+    @contextmanager
+    def admit(self, blocking: bool = True):
+        if not self.enabled:
+            yield
+            return
+        acquired_at = self.acquire(blocking)
+        try:
+            yield
+        finally:
+            self.release(acquired_at)
+
+    def state(self) -> Dict:
+        return {'limit': self.limit, 'active': self.active, 'waiting': self.waiting}
+
+
+class AdmissionControl:
+    """The worker's gates, built from ADMISSION_GATES, and which endpoints go through which gate"""
+
+    def __init__(self, gates: Dict[str, Dict], endpoints: Dict[str, str]):
+        self.gates = {name: AdmissionGate(name, **options) for name, options in gates.items()}
+        self.endpoints = dict(endpoints)
+
+    def gate(self, name: str) -> AdmissionGate:
+        """The named gate; an unconfigured name gets a disabled gate that admits everyone"""
+        gate = self.gates.get(name)
+        return gate if gate is not None else AdmissionGate(name, 0)
+
+    def for_endpoint(self, url_name: Optional[str]) -> Optional[AdmissionGate]:
+        gate = self.gates.get(self.endpoints.get(url_name))
+        return gate if gate is not None and gate.enabled else None
+
+    def state(self) -> Dict:
+        return {name: gate.state() for name, gate in self.gates.items()}
+
+    def _after_fork_in_child(self):
+        # Slots held by the parent's threads do not exist in the child
+        for gate in self.gates.values():
+            gate.active = gate.waiting = 0
+            gate._reset_locks()
+
+
+admission = AdmissionControl(
+    getattr(settings, 'ADMISSION_GATES', {}),
+    getattr(settings, 'ADMISSION_ENDPOINTS', {}),
+)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=admission._after_fork_in_child)
@@ -0,0 +1,68 @@
+import io
+import json
+from typing import Dict, Iterator, Optional
+import pandas as pd
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:  # optional: Arrow requests get a 406
+    pa = None
+
+# Buffer compression codecs of the Arrow IPC format
+COMPRESSIONS = ('lz4', 'zstd')
+
+
+def arrow_compression(request) -> Optional[str]:
+    """Codec from ?compression=lz4|zstd|none, defaulting to ARROW_COMPRESSION"""
+    codec = (request.GET.get('compression') or getattr(settings, 'ARROW_COMPRESSION', '') or 'none').lower()
+    if codec == 'none':
+        return None
+    if codec not in COMPRESSIONS:
+        raise ValueError(f"compression must be one of: {', '.join(COMPRESSIONS)}, none")
+    if pa is not None and not pa.Codec.is_available(codec):
+        raise ValueError(f"{codec} compression is not available on this server")
+    return codec
+
+
+def schema_metadata(metadata: Dict) -> Dict[str, str]:
+    """Schema metadata values: strings as they are, anything else as JSON"""
+    return {key: value if isinstance(value, str) else json.dumps(value, cls=JSONEncoder)
+            for key, value in metadata.items()}
+
+
+def stream_frame(df: pd.DataFrame, metadata: Optional[Dict] = None, compression: Optional[str] = None,
+                 batch_rows: Optional[int] = None) -> Iterator[bytes]:
+    """Write a frame as an Arrow IPC stream, one record batch per `batch_rows` rows, yielding each as it is written.
+
+    Columns go from the frame's arrays into Arrow buffers without passing
+    through text. The schema carries `metadata` next to pandas' own (dtypes,
+    so `read_stream().read_pandas()` restores the frame); the schema is built
+    before the first chunk, so a frame Arrow cannot hold fails here rather than
+    mid-response.
+    """
+    batch_rows = max(int(batch_rows or getattr(settings, 'ARROW_BATCH_ROWS', 65536)), 1)
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    schema = schema.with_metadata({**(schema.metadata or {}), **schema_metadata(metadata or {})})
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+
+    def chunks():
+        sink = io.BytesIO()
+
+        def drain() -> bytes:
+            data = sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+            return data
+
+        with pa.ipc.new_stream(sink, schema, options=options) as writer:
+            for start in range(0, len(df), batch_rows):
+                writer.write_batch(pa.RecordBatch.from_pandas(df.iloc[start:start + batch_rows], schema=schema,
+                                                              preserve_index=False))
+                yield drain()
+        # Schema only for an empty frame, then the end-of-stream marker
+        yield drain()
+
+    return chunks()
@@ -0,0 +1,59 @@
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+from typing import Callable, Iterable, Optional
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from .lazy import data_processor
+
+
+def make_etag(*parts) -> str:
+    return hashlib.blake2b('\0'.join(map(str, parts)).encode(), digest_size=12).hexdigest()
+
+
+def dataset_condition(vary_on: Iterable[str] = (), extra: Optional[Callable] = None, skip: Optional[Callable] = None):
+    """Conditional GET for views whose body depends only on the dataset and a few query parameters.
+
+    The ETag combines the active snapshot's fingerprint with the named query
+    parameters, URL kwargs and `extra(request)`; Last-Modified is when the snapshot
+    was published. Matching requests get a 304 without running the view. Responses
+    carry `Cache-Control: no-cache`, so clients revalidate instead of guessing a
+    freshness lifetime and keep working across uploads. `skip(request)` opts a
+    request out (e.g. profiled queries).
+    """
+    vary_on = tuple(vary_on)
+
+    def applies(request) -> bool:
+        return request.method in ('GET', 'HEAD') and not (skip and skip(request))
+
+    def etag(request, *args, **kwargs):
+        if not applies(request):
+            return None
+        parts = [data_processor.snapshot.fingerprint, request.resolver_match.url_name]
+        parts += [f'{name}={request.GET.get(name, "")}' for name in vary_on]
+        parts += [f'{key}={value}' for key, value in sorted(kwargs.items())]
+        if extra is not None:
+            parts.append(extra(request))
+        return make_etag(*parts)
+
+    def last_modified(request, *args, **kwargs):
+        if not applies(request):
+            return None
+        return datetime.fromtimestamp(data_processor.snapshot.created_at, tz=timezone.utc)
+
+    return revalidate(condition(etag_func=etag, last_modified_func=last_modified))
+
+
+def revalidate(decorator):
+    """Wrap a conditional decorator so successful GETs tell clients to revalidate every time"""
+    def wrap(view):
+        conditional_view = decorator(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD') and response.status_code in (200, 304):
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return wrap
@@ -1,23 +1,389 @@
+import numpy as np
 import pandas as pd
 import re
 import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import wraps
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
 import requests
 from django.conf import settings
+from django.db import DatabaseError
 import json
+from .ranking import AREA_METRIC_COLUMNS, compute_area_metrics, select_top
+from .scoring import InvestmentScorer, compute_investment_features
+from .forecasting import DEFAULT_HORIZON, fit_models, forecast, forecast_records
+from .metric_registry import CORE_METRICS, growth_table, metric_names, partial_sums, registry as metric_registry
+from .admission import Overloaded, admission
+from .offload import OffloadBusy, offloader
+from .querylog import cache_warmer, canonical_query, normalize_text
+from .results import ResultExpired, result_cache
+from .rollups import MONTHS, TimeRollups, extract_dates, period_labels, period_spans
+from .sketches import GROUPINGS, QuantileSketches, box_plot_chart
+from .snapshot import DatasetSnapshot, frame_fingerprint
+from .spatial import build_geo_index, build_similarity_index, clean_area_attributes
+from .storage import DatabaseStore, FrameSelection, ParquetStore
+from .telemetry import telemetry
+
+# Options accepted by structured_query
+STRUCTURED_METRICS = ['price', 'demand', 'both']
+STRUCTURED_AGGREGATIONS = ['mean', 'median', 'sum', 'min', 'max', 'count', 'std']
+
+# Derived values an append extends with just the new rows instead of rebuilding
+APPENDABLE = ('sketches', 'rollups')
+
+
+def with_snapshot(method):
+    """Run a public entry point against one dataset snapshot, even if an upload lands midway"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.pin():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 class DataProcessor:
     def __init__(self):
-        self.df = None
+        # Readers never lock: they grab self._snapshot (an atomic reference read) and keep it.
+        # Writers build a new snapshot and swap the reference under _publish_lock.
+        self._snapshot = DatasetSnapshot(None, 0)
+        self._publish_lock = threading.Lock()
+        self._local = threading.local()
+        self._next_sync = 0.0
+        self._summary_lock = threading.Lock()
+        self.investment_scorer = InvestmentScorer(getattr(settings, 'INVESTMENT_WEIGHTS', None))
         self.load_default_data()
     
+    @property
+    def snapshot(self) -> DatasetSnapshot:
+        """The snapshot pinned by the running request, otherwise the latest published one"""
+        pinned = getattr(self._local, 'snapshot', None)
+        return pinned if pinned is not None else self._snapshot
+    
+    @contextmanager
+    def pin(self):
+        """Make every read on this thread inside the block see the same snapshot"""
+        pinned = getattr(self._local, 'snapshot', None)
+        if pinned is not None:
+            yield pinned
+            return
+        
+        self._sync_stored_dataset()
+        snapshot = self._snapshot
+        self._local.snapshot = snapshot
+        try:
+            yield snapshot
+        finally:
+            self._local.snapshot = None
+    
+    def _publish(self, snapshot_builder):
+        """Build the next snapshot from the latest one and swap it in atomically"""
+        with self._publish_lock:
+            snapshot = snapshot_builder(self._snapshot)
+            self._snapshot = snapshot
+        
+        telemetry.set_gauge('dataset_rows', snapshot.row_count)
+        telemetry.set_gauge('dataset_areas', snapshot.area_count)
+        telemetry.set_gauge('dataset_version', snapshot.version)
+        return snapshot
+    
+    @property
+    def df(self) -> Optional[pd.DataFrame]:
+        return self.snapshot.df
+    
+    @df.setter
+    def df(self, value: Optional[pd.DataFrame]):
+        """Publish a new dataset; requests already running keep the snapshot they started with"""
+        self._publish(lambda current: current.with_data(value))
+    
+    def _publish_dataset(self, df: pd.DataFrame):
+        """Publish a freshly cleaned dataset into the configured storage backend"""
+        backend = getattr(settings, 'DATA_BACKEND', 'memory')
+        if backend not in ('parquet', 'database') or df.empty:
+            self.df = df
+            return
+        
+        with telemetry.span(f'load.write_{backend}'):
+            if backend == 'parquet':
+                store = ParquetStore.write(
+                    df,
+                    root=settings.PARQUET_DIR,
+                    fingerprint=frame_fingerprint(df),
+                    buckets=getattr(settings, 'PARQUET_AREA_BUCKETS', 64),
+                    keep=getattr(settings, 'PARQUET_KEEP', 3)
+                )
+            else:
+                try:
+                    store = DatabaseStore.write(
+                        df,
+                        fingerprint=frame_fingerprint(df),
+                        batch_size=getattr(settings, 'DATABASE_BATCH_SIZE', 5000),
+                        keep=getattr(settings, 'DATABASE_KEEP', 2)
+                    )
+                except DatabaseError as e:
+                    print(f"⚠️ Could not store the dataset in the database ({e}); keeping it in memory. "
+                          f"Did you run python manage.py migrate?")
+                    self.df = df
+                    return
+        # The rows live in the store from here on; only this request's copy stays in memory until it returns
+        self._publish(lambda snapshot: snapshot.with_data(None, store=store))
+    
+    def _append_dataset(self, df: pd.DataFrame):
+        """Publish the current rows plus `df`, folding only the new rows into the sketches and rollups"""
+        with self.pin() as current:
+            existing = self._select().to_frame()
+            incremental = {key: value for key, value in current.derived.items()
+                           if (key[0] if isinstance(key, tuple) else key) in APPENDABLE and value is not None}
+        
+        combined = pd.concat([existing, df], ignore_index=True)
+        self._publish_dataset(combined)
+        with self.pin() as snapshot:
+            for key, value in incremental.items():
+                snapshot.derived.setdefault(key, value.append(df))
+        print(f"➕ Appended {len(df)} records, {len(combined)} in total")
+    
+    def _restore_from_database(self) -> bool:
+        """Adopt the active dataset stored by the database backend, if there is one"""
+        try:
+            store = DatabaseStore.active()
+        except DatabaseError as e:
+            print(f"⚠️ Could not read the stored dataset ({e}). Did you run python manage.py migrate?")
+            return False
+        if store is None:
+            return False
+        
+        print(f"🗄️ Using the stored dataset: {store.rows} records, {len(store.areas)} areas")
+        self._publish(lambda snapshot: snapshot.with_data(None, store=store))
+        self._warm_derived()
+        cache_warmer.warm(self)
+        return True
+    
+    def _sync_stored_dataset(self):
+        """Pick up a dataset another worker stored; checked at most every DATABASE_SYNC_SECONDS"""
+        if getattr(settings, 'DATA_BACKEND', 'memory') != 'database' or getattr(settings, 'SHARD_URLS', None):
+            return
+        now = time.monotonic()
+        if now < self._next_sync:
+            return
+        self._next_sync = now + getattr(settings, 'DATABASE_SYNC_SECONDS', 2.0)
+        
+        try:
+            fingerprint = DatabaseStore.active_fingerprint()
+        except DatabaseError:
+            return
+        store = self._snapshot.store
+        if fingerprint and (store is None or store.fingerprint != fingerprint):
+            self._restore_from_database()
+    
+    @property
+    def dataset_version(self) -> int:
+        return self.snapshot.version
+    
+    @property
+    def area_attributes(self) -> Optional[pd.DataFrame]:
+        return self.snapshot.area_attributes
+    
+    @area_attributes.setter
+    def area_attributes(self, value: Optional[pd.DataFrame]):
+        self._publish(lambda current: current.with_area_attributes(value))
+    
+    def _get_derived(self, key, builder):
+        """Return a value derived from the current snapshot, building it once per snapshot"""
+        # Pin so the builder reads the same snapshot whose cache it fills
+        with self.pin() as snapshot:
+            cache = snapshot.derived
+            name = key[0] if isinstance(key, tuple) else key
+            value = cache.get(key)
+            if value is None and key not in cache:
+                telemetry.inc('cache_requests_total', cache=name, result='miss')
+                # Concurrent misses may build the same value twice; the results are identical
+                value = cache[key] = builder()
+            else:
+                telemetry.inc('cache_requests_total', cache=name, result='hit')
+            return value
+    
+    def _get_yearly_frame(self) -> pd.DataFrame:
+        """Per-(area, year) means shared by the catalogue-wide engines"""
+        # The full-dataset groupby goes to the offload pool on large datasets
+        if self.snapshot.store is not None:
+            return self._get_derived('yearly', lambda: self.snapshot.store.select().yearly_means())
+        return self._get_derived('yearly', lambda: offloader.yearly_means(self.df))
+    
+    def _get_area_metrics(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> pd.DataFrame:
+        """Per-area ranking metrics for a year window, cached per dataset version"""
+        return self._get_derived(
+            ('area_metrics', start_year, end_year),
+            lambda: compute_area_metrics(self._get_yearly_frame(), start_year, end_year)
+        )
+    
+    def _get_investment_features(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> pd.DataFrame:
+        """Per-area investment feature vectors for a year window, cached per dataset version"""
+        def build():
+            yearly = self._get_yearly_frame()
+            if start_year is not None:
+                yearly = yearly[yearly['year'] >= start_year]
+            if end_year is not None:
+                yearly = yearly[yearly['year'] <= end_year]
+            return compute_investment_features(yearly)
+        
+        return self._get_derived(('investment_features', start_year, end_year), build)
+    
+    @with_snapshot
+    def score_areas(self, start_year: Optional[int] = None, end_year: Optional[int] = None) -> pd.DataFrame:
+        """Score every area with the current investment weights"""
+        return self.investment_scorer.score(self._get_investment_features(start_year, end_year))
+    
+    def _get_forecast_models(self, metric: str) -> pd.DataFrame:
+        """Fitted trend models for every area, fitted once per dataset version"""
+        return self._get_derived(('forecast_models', metric),
+                                 lambda: fit_models(self._get_yearly_frame(), metric))
+    
+    @with_snapshot
+    def forecast_areas(self, areas: List[str], horizon: int = DEFAULT_HORIZON,
+                       metrics: Tuple[str, ...] = ('price', 'demand')) -> Dict:
+        """Project each area's yearly series forward from the cached fitted models"""
+        if not self.snapshot.has_data:
+            return {}
+        
+        frames = {metric: forecast(self._get_forecast_models(metric), horizon) for metric in metrics}
+        return forecast_records(frames, areas)
+    
+    def _get_sketches(self, metric: str) -> QuantileSketches:
+        """Per-(area, year) quantile sketches of a metric, built once per dataset version (or carried over by an append)"""
+        return self._get_derived(
+            ('sketches', metric),
+            lambda: QuantileSketches.build(self._select().values(['area', 'year', metric]), metric,
+                                           getattr(settings, 'SKETCH_COMPRESSION', 100))
+        )
+    
+    def _get_rollups(self) -> Optional[TimeRollups]:
+        """Month/quarter/year aggregates of the dated rows, or None when the dataset only has years"""
+        store = self.snapshot.store
+        columns = store.columns if store is not None else self.df.columns
+        if 'date' not in columns:
+            return None
+        return self._get_derived('rollups', lambda: TimeRollups.build(self._select().values(['area', 'date'] + list(CORE_METRICS))))
+    
+    @with_snapshot
+    def distribution(self, areas: Optional[List[str]] = None, start_year: Optional[int] = None,
+                     end_year: Optional[int] = None, metric: str = 'price', group_by: str = 'area_year') -> Dict:
+        """Count, p10/p25/median/p75/p90 and box-plot chart data, merged from the sketches of the selected groups"""
+        if group_by not in GROUPINGS:
+            raise ValueError(f"group_by must be one of: {', '.join(GROUPINGS)}")
+        result = {'metric': metric, 'group_by': group_by, 'year_from': start_year, 'year_to': end_year}
+        if not self.snapshot.has_data:
+            return {**result, 'groups': [], 'chart': {}}
+        if metric not in self.available_metrics():
+            raise ValueError(f"metric must be one of: {', '.join(self.available_metrics())}")
+        
+        table = self._get_sketches(metric).summarize(areas, start_year, end_year, group_by).round(2)
+        return {**result, 'groups': table.to_dict('records'), 'chart': box_plot_chart(table, group_by)}
+    
+    def load_area_attributes(self, file_path: str) -> bool:
+        """Load an area-attributes sheet (area, lat, lon) for geo lookups"""
+        try:
+            attributes = clean_area_attributes(pd.read_excel(file_path))
+            if attributes.empty:
+                raise ValueError("No rows with a valid area, lat and lon")
+            
+            print(f"📍 Loaded coordinates for {len(attributes)} areas")
+            self.area_attributes = attributes
+            return True
+        
+        except Exception as e:
+            print(f"Error loading area attributes: {e}")
+            return False
+    
+    @with_snapshot
+    def find_neighbours(self, area: str, mode: str = 'nearby', k: int = 5) -> Dict:
+        """Find areas near `area` (by coordinates) or similar to it (by market features)"""
+        if not self.snapshot.has_data:
+            return {'area': area, 'mode': mode, 'neighbours': []}
+        
+        note = None
+        geo_index = self._get_derived('geo_index', lambda: build_geo_index(self.area_attributes))
+        if mode == 'nearby' and (geo_index is None or area not in geo_index):
+            # Without coordinates the best proxy for "near" is "similar"
+            note = f"No coordinates available for {area}; showing areas with a similar market profile instead."
+            mode = 'similar'
+        
+        if mode == 'nearby':
+            # Only suggest areas we actually have market data for
+            known = set(self.get_areas())
+            candidates = geo_index.nearest(area, k=min(len(geo_index.areas), k * 4))
+            neighbours = [n for n in candidates if n['area'] in known][:k]
+        else:
+            similarity_index = self._get_derived('similarity_index',
+                                                 lambda: build_similarity_index(self._get_area_metrics()))
+            neighbours = similarity_index.nearest(area, k=k) if similarity_index else []
+        
+        result = {'area': area, 'mode': mode, 'neighbours': neighbours}
+        if note:
+            result['note'] = note
+        return result
+    
+    def compact_for_sharing(self):
+        """Rewrite the dataset so forked workers can share its memory pages.
+        
+        Object columns hold one Python string per row and every read touches
+        their refcounts, copying pages into each worker. Categoricals keep only
+        integer codes per row, and numeric columns become plain contiguous arrays.
+        """
+        df = self.df
+        if df is None or df.empty:
+            return
+        
+        columns = {}
+        for col in df.columns:
+            series = df[col]
+            if series.dtype == object or pd.api.types.is_string_dtype(series.dtype):
+                columns[col] = series.astype('category')
+            elif isinstance(series.dtype, np.dtype):
+                columns[col] = np.ascontiguousarray(series.to_numpy())
+            else:
+                columns[col] = series
+        
+        before = df.memory_usage(deep=True).sum()
+        compact = pd.DataFrame(columns, index=pd.RangeIndex(len(df)))
+        self.df = compact
+        after = compact.memory_usage(deep=True).sum()
+        print(f"🧊 Compacted dataset for sharing: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
+        
+        self._warm_derived()
+        self.get_areas()
+    
+    @with_snapshot
+    def _warm_derived(self):
+        """Precompute the catalogue-wide tables right after a dataset load"""
+        if self.snapshot.has_data:
+            self._get_area_metrics()
+            self._get_investment_features()
+            self._get_forecast_models('price')
+            self._get_forecast_models('demand')
+            self._get_sketches('price')
+            self._get_rollups()
+            # ETags for the read endpoints hash the whole frame once per snapshot
+            self.snapshot.fingerprint
+    
     def load_default_data(self):
         """Load the default sample_data.xlsx file"""
         try:
-            # Look for sample_data.xlsx in project root
+            if getattr(settings, 'SHARD_URLS', None):
+                # A shard router holds no rows: questions, areas and uploads go to the shards
+                print("🔀 Shard router: the dataset lives on the shards, not loading sample data")
+                self.df = pd.DataFrame()
+                return
+            
+            # A restart with the database backend picks up the last stored dataset without re-reading Excel
+            if getattr(settings, 'DATA_BACKEND', 'memory') == 'database' and self._restore_from_database():
+                return
+            
+            # Look for sample_data.xlsx in project root unless SAMPLE_DATA_FILE points elsewhere
             base_dir = Path(settings.BASE_DIR).parent
-            sample_file = base_dir / 'Sample_data.xlsx'
+            sample_file = Path(getattr(settings, 'SAMPLE_DATA_FILE', None) or base_dir / 'Sample_data.xlsx')
             
             print(f"🔍 Looking for sample data at: {sample_file}")
             
@@ -35,10 +401,36 @@ class DataProcessor:
             print(f"❌ Error loading default data: {e}")
             self.df = pd.DataFrame()
     
-    def load_excel_file(self, file_path: str) -> bool:
-        """Load and validate Excel file"""
+    def load_excel_file(self, file_path: str, append: bool = False) -> bool:
+        """Load and validate Excel file, replacing the dataset or (append=True) adding its rows to it"""
+        df = self.read_dataset(file_path)
+        if df is None:
+            return False
+        
+        try:
+            self.load_frame(df, append)
+        except OffloadBusy:
+            raise
+        except Exception as e:
+            print(f"Error loading Excel file: {e}")
+            return False
+        return True
+    
+    def load_frame(self, df: pd.DataFrame, append: bool = False):
+        """Publish an already cleaned dataset (replacing the current one, or appended to it) and warm its caches"""
+        if append and self.snapshot.has_data:
+            self._append_dataset(df)
+        else:
+            self._publish_dataset(df)
+        with telemetry.span('load.derive'):
+            self._warm_derived()
+        cache_warmer.warm(self)
+    
+    def read_dataset(self, file_path: str) -> Optional[pd.DataFrame]:
+        """Read and clean a workbook into the dataset's columns without publishing it (None if it is unusable)"""
         try:
-            df = pd.read_excel(file_path)
+            with telemetry.span('load.read_excel'):
+                df = offloader.read_workbook(file_path)
             
             # Print original columns for debugging
             print(f"Original columns: {df.columns.tolist()}")
@@ -56,16 +448,10 @@ class DataProcessor:
                 'locality': 'area',
                 'place': 'area',
                 'city': 'area',
-                'flat - weighted average rate': 'price',
-                'office - weighted average rate': 'price',
                 'cost': 'price',
                 'amount': 'price',
                 'value': 'price',
                 'rate': 'price',
-                'total sold - igr': 'demand',
-                'residential_sold - igr': 'demand',
-                'flat_sold - igr': 'demand',
-                'total units': 'demand',
                 'demand_score': 'demand',
                 'demand_index': 'demand',
                 'popularity': 'demand'
@@ -92,6 +478,14 @@ class DataProcessor:
                             df.columns.values[idx] = f"{req_col}_{i}"
                         print(f"🔧 Resolved duplicate column '{req_col}'")
             
+            # Monthly and quarterly feeds keep a full date; the year is derived from it when missing
+            dates = extract_dates(df)
+            if dates is not None:
+                df['date'] = dates
+                if 'year' not in df.columns:
+                    df['year'] = dates.dt.year
+                print(f"🗓️ Keeping dates from {dates.min():%Y-%m} to {dates.max():%Y-%m}")
+            
             # Check required columns
             required_cols = ['year', 'area', 'price', 'demand']
             missing_cols = [col for col in required_cols if col not in df.columns]
@@ -145,17 +539,33 @@ class DataProcessor:
                 
                 print("✅ Successfully mapped all required columns")
             
+            # Keep the IGR columns as their own metrics (price/demand above are copies of them)
+            extra_metrics = metric_registry.source_columns(df.columns)
+            if extra_metrics:
+                renames = {}
+                for name, source in extra_metrics.items():
+                    if source in renames:
+                        df[name] = df[source]
+                    else:
+                        renames[source] = name
+                df = df.rename(columns=renames)
+                print(f"📐 Loaded extra metrics: {list(extra_metrics)}")
+            
             # Clean numeric fields
             print("🧹 Cleaning data fields...")
             
-            # Clean year
-            df['year'] = pd.to_numeric(df['year'], errors='coerce')
-            
-            # Clean price
-            df['price'] = self._clean_numeric_field(df['price'])
-            
-            # Clean demand
-            df['demand'] = self._clean_numeric_field(df['demand'])
+            with telemetry.span('load.clean_numeric'):
+                # Clean year
+                df['year'] = pd.to_numeric(df['year'], errors='coerce')
+                
+                # Clean price
+                df['price'] = self._clean_numeric_field(df['price'])
+                
+                # Clean demand
+                df['demand'] = self._clean_numeric_field(df['demand'])
+                
+                for name in extra_metrics:
+                    df[name] = self._clean_numeric_field(df[name])
             
             # Remove rows with invalid data first
             initial_count = len(df)
@@ -178,12 +588,14 @@ class DataProcessor:
             print(f"✅ Final dataset: {len(df)} records, {df['area'].nunique()} unique areas")
             
             print(f"Successfully loaded {len(df)} records")
-            self.df = df
-            return True
-            
+            return df
+        
+        except OffloadBusy:
+            # Not a problem with the file; let the view answer 503
+            raise
         except Exception as e:
             print(f"Error loading Excel file: {e}")
-            return False
+            return None
     
     def _clean_numeric_field(self, series):
         """Clean numeric fields by removing commas, currency symbols"""
@@ -210,18 +622,31 @@ class DataProcessor:
             # Return the series converted to numeric with errors as NaN
             return pd.to_numeric(series, errors='coerce')
     
+    @with_snapshot
     def get_areas(self) -> List[str]:
         """Get list of unique areas"""
-        if self.df is None or self.df.empty:
+        if not self.snapshot.has_data:
+            return []
+        if self.snapshot.store is not None:
+            return list(self.snapshot.store.areas)
+        return list(self._get_derived('areas', lambda: sorted(self.df['area'].unique().tolist())))
+    
+    @with_snapshot
+    def available_metrics(self) -> List[str]:
+        """Names of the registry metrics the loaded dataset has columns for"""
+        if not self.snapshot.has_data:
             return []
-        return sorted(self.df['area'].unique().tolist())
+        store = self.snapshot.store
+        columns = store.columns if store is not None else self.df.columns
+        return list(self._get_derived('metrics', lambda: [metric.name for metric in metric_registry.available(columns)]))
     
     def parse_query(self, query: str) -> Dict:
         """Parse natural language query to extract areas, metrics, and time window"""
         query_lower = query.lower()
         
         # Extract areas (fuzzy matching)
-        areas = self._extract_areas(query_lower)
+        with telemetry.span('extract_areas'):
+            areas = self._extract_areas(query_lower)
         
         # Extract metric preference with more keywords
         metric = 'both'  # default
@@ -236,9 +661,14 @@ class DataProcessor:
         elif has_demand and not has_price:
             metric = 'demand'
         
+        # Other registry metrics the question names ("units sold", "office rate") and the dataset has
+        available = self.available_metrics()
+        metrics = metric_names(metric) + [name for name in metric_registry.mentioned(query_lower) if name in available]
+        
         # Extract time window with more patterns
         years_match = re.search(r'(?:last|past|recent)\s*(\d+)\s*years?', query_lower)
         year_range_match = re.search(r'(\d{4})\s*(?:to|-)\s*(\d{4})', query_lower)
+        since_year_match = re.search(r'(?:since|from)\s*(\d{4})', query_lower)
         specific_year_match = re.search(r'(?:in|for|during)\s*(\d{4})', query_lower)
         
         years = None
@@ -250,36 +680,114 @@ class DataProcessor:
             start_year = int(year_range_match.group(1))
             end_year = int(year_range_match.group(2))
             year_filter = (start_year, end_year)
+        elif since_year_match:
+            year_filter = (int(since_year_match.group(1)), None)
         elif specific_year_match:
             year_filter = int(specific_year_match.group(1))
         
         # Extract analysis type
+        ranking_keywords = ['best', 'top', 'highest', 'maximum', 'peak', 'lowest', 'bottom', 'worst', 'rank']
+        investment_keywords = ['invest', 'investment', 'buy', 'purchase', 'recommend']
+        forecast_keywords = ['forecast', 'predict', 'projection', 'outlook', 'future', 'next year']
         analysis_type = 'overview'  # default
         if any(word in query_lower for word in ['compare', 'comparison', 'vs', 'versus', 'against']):
             analysis_type = 'comparison'
-        elif any(word in query_lower for word in ['trend', 'growth', 'change', 'over time']):
+        elif any(word in query_lower for word in investment_keywords) and not areas:
+            # "Where should I invest" is scored over the whole catalogue
+            analysis_type = 'investment'
+        elif any(word in query_lower for word in ranking_keywords) and not areas:
+            # Without named areas a ranking question is about the whole catalogue
+            analysis_type = 'ranking'
+        elif any(word in query_lower for word in ['trend', 'growth', 'change', 'over time'] + forecast_keywords):
             analysis_type = 'trend'
-        elif any(word in query_lower for word in ['best', 'top', 'highest', 'maximum', 'peak']):
+        elif any(word in query_lower for word in ranking_keywords):
             analysis_type = 'ranking'
-        elif any(word in query_lower for word in ['invest', 'investment', 'buy', 'purchase', 'recommend']):
+        elif any(word in query_lower for word in investment_keywords):
             analysis_type = 'investment'
         
+        # Ranking options: how many, by what and in which direction
+        top_n_match = re.search(r'(?:top|best|bottom|worst|lowest|highest)\s+(\d+)', query_lower)
+        top_n = int(top_n_match.group(1)) if top_n_match else None
+        ascending = any(word in query_lower for word in ['bottom', 'lowest', 'worst', 'least', 'cheapest'])
+        
+        growth_keywords = ['growth', 'appreciation', 'increase', 'rise', 'gain']
+        if analysis_type == 'investment':
+            ranking_metric = 'investment_score'
+        elif any(keyword in query_lower for keyword in growth_keywords) or metric == 'both':
+            ranking_metric = 'demand_growth' if metric == 'demand' else 'price_growth'
+        else:
+            ranking_metric = 'avg_demand' if metric == 'demand' else 'avg_price'
+        
+        # Finer than a year: "last 6 months", "past 2 quarters", "Q2 2023 vs Q2 2024", "March 2024"
+        period_filter = None
+        recent_match = re.search(r'(?:last|past|recent)\s*(\d+)\s*(months?|quarters?)', query_lower)
+        quarters = re.findall(r'\bq([1-4])\s*[-\']?\s*(\d{4})\b', query_lower)
+        quarters += [(quarter, year) for year, quarter in re.findall(r'\b(\d{4})\s*-?\s*q([1-4])\b', query_lower)]
+        months = [(MONTHS[name], year) for name, year in re.findall(r'\b([a-z]{3,9})\.?\s+(\d{4})\b', query_lower)
+                  if name in MONTHS]
+        if recent_match:
+            resolution = 'month' if recent_match.group(2).startswith('month') else 'quarter'
+            period_filter = {'resolution': resolution, 'last': int(recent_match.group(1))}
+        elif quarters:
+            period_filter = {'resolution': 'quarter', 'periods': [f'{year}Q{quarter}' for quarter, year in quarters]}
+        elif months:
+            period_filter = {'resolution': 'month', 'periods': [f'{year}-{month:02d}' for month, year in months]}
+        
+        # Distribution questions: "median price in Wakad", "price spread in Baner"
+        distribution = bool(re.search(r'\b(?:median|distribution|spread|percentiles?|quartiles?|p10|p90|box ?plot|skew(?:ed)?)\b',
+                                      query_lower))
+        
+        # Neighbour lookups: "areas near Baner", "localities similar to Wakad" ("around" only before a name, not "around 2020").
+        # The anchor is the first area named after the trigger; a trigger with no area after it ("are they comparable?") is not one
+        neighbour_mode, neighbour_anchor = None, None
+        positions = {area: query_lower.find(area.lower()) for area in areas}
+        for mode, pattern in (('nearby', r'\b(?:near|nearby|around(?=\s+[a-z])|close to|next to|neighbou?r(?:ing|hood)?)\b'),
+                              ('similar', r'\b(?:similar|comparable|alternatives?|areas like|localities like)\b')):
+            for trigger in re.finditer(pattern, query_lower):
+                after = [area for area in areas if positions[area] >= trigger.end()]
+                if after:
+                    neighbour_mode, neighbour_anchor = mode, min(after, key=lambda area: (positions[area], area))
+                    break
+            if neighbour_mode:
+                break
+        count_match = re.search(r'(\d+)\s+(?:areas|localities|places|neighbou?rs)', query_lower)
+        neighbour_count = int(count_match.group(1)) if count_match else (top_n or 5)
+        
+        # Forecast horizon: explicit "next N years", otherwise a default for trend questions
+        horizon_match = re.search(r'next\s*(\d+)\s*years?', query_lower)
+        if horizon_match:
+            forecast_horizon = int(horizon_match.group(1))
+        elif analysis_type == 'trend':
+            forecast_horizon = 1 if 'next year' in query_lower else DEFAULT_HORIZON
+        else:
+            forecast_horizon = None
+        
         return {
             'areas': areas,
             'metric': metric,
+            'metrics': metrics,
             'years': years,
             'year_filter': year_filter,
+            'period_filter': period_filter,
             'analysis_type': analysis_type,
             'comparison': len(areas) > 1,
+            'forecast_horizon': forecast_horizon,
+            'distribution': distribution,
+            'neighbour_mode': neighbour_mode,
+            'neighbour_anchor': neighbour_anchor,
+            'neighbour_count': neighbour_count,
+            'top_n': top_n,
+            'ranking_metric': ranking_metric,
+            'ascending': ascending,
             'original_query': query
         }
     
     def _extract_areas(self, query: str) -> List[str]:
         """Extract area names from query with improved fuzzy matching"""
-        if self.df is None or self.df.empty:
+        available_areas = self.get_areas()
+        if not available_areas:
             return []
         
-        available_areas = self.get_areas()
         found_areas = []
         query_words = set(query.lower().split())
         
@@ -306,70 +814,441 @@ class DataProcessor:
         
         return found_areas
     
-    def query_data(self, query: str) -> Dict:
+    @with_snapshot
+    def query_data(self, query: str, offset: int = 0, limit: Optional[int] = None) -> Dict:
         """Process query and return summary, chart data, and table data"""
-        if self.df is None or self.df.empty:
+        result, summary_inputs = self._answer_query(query, offset, limit)
+        if summary_inputs is None:
+            return result
+        
+        # Generate summary using LLM or fallback
+        with telemetry.span('summary'):
+            summary = self._get_summary(*summary_inputs)
+        return {'summary': summary, **result}
+    
+    def stream_query(self, query: str, offset: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[str, Dict]]:
+        """Answer a query as (event, data) pairs: chart and table first, then the summary as it is generated"""
+        # A generator outlives with_snapshot's call, so it pins for as long as it is being consumed
+        with self.pin():
+            result, summary_inputs = self._answer_query(query, offset, limit)
+            if summary_inputs is None:
+                yield 'failure', result
+                return
+            
+            yield 'result', result
+            summary = ''
+            for piece in self._stream_summary(*summary_inputs):
+                summary = piece['replace'] if 'replace' in piece else summary + piece['delta']
+                yield 'summary', piece
+            yield 'done', {'summary': summary}
+    
+    def _answer_query(self, query: str, offset: int = 0, limit: Optional[int] = None) -> Tuple[Dict, Optional[Tuple]]:
+        """Everything in a query answer except the summary, plus the (aggregated, query, parsed) to summarise"""
+        if not self.snapshot.has_data:
             return {
                 'error': 'No data available. Please upload a dataset first.',
                 'summary': '',
                 'chart': {},
                 'table': []
-            }
+            }, None
         
-        parsed = self.parse_query(query)
+        with telemetry.span('parse'):
+            parsed = self.parse_query(query)
         areas = parsed['areas']
         
+        if not areas and parsed['analysis_type'] in ('ranking', 'investment'):
+            with telemetry.span('ranking'):
+                return self._query_catalogue_ranking(query, parsed, offset=offset, limit=limit)
+        
         if not areas:
-            # Try to suggest similar areas
-            suggestions = self._get_area_suggestions(query)
-            available_areas = self.get_areas()
-            
-            if suggestions:
-                suggestion_text = f"No exact matches found. Did you mean: {', '.join(suggestions[:3])}?"
-            else:
-                suggestion_text = f"No matching areas found. Available areas: {', '.join(available_areas[:5])}{'...' if len(available_areas) > 5 else ''}"
-            
-            return {
-                'error': suggestion_text,
-                'summary': f"Unable to find data for the requested location in your query: '{query}'. Please try one of the suggested areas or check the available locations.",
-                'chart': {},
-                'table': [],
-                'suggestions': suggestions if suggestions else available_areas[:10]
-            }
+            return self._unknown_area_answer(query), None
+        
+        # "Near X" / "similar to X": add X's neighbours next to it, keeping the other areas the question names
+        neighbours = None
+        if parsed['neighbour_mode']:
+            anchor = parsed['neighbour_anchor']
+            with telemetry.span('neighbours'):
+                neighbours = self.find_neighbours(anchor, parsed['neighbour_mode'], parsed['neighbour_count'])
+            expanded = []
+            for area in areas:
+                expanded += [area] + ([n['area'] for n in neighbours['neighbours']] if area == anchor else [])
+            areas = list(dict.fromkeys(expanded))
+            parsed.update({'areas': areas, 'comparison': len(areas) > 1, 'analysis_type': 'comparison'})
+        
+        # Month and quarter questions are answered from the rollup pyramid when the data has dates
+        period_filter = parsed.get('period_filter')
+        rollups = self._get_rollups() if period_filter else None
+        spans = None
         
         # Filter data
-        filtered_df = self.df[self.df['area'].isin(areas)].copy()
-        
-        # Apply time window if specified
-        if parsed['years']:
-            max_year = filtered_df['year'].max()
-            min_year = max_year - parsed['years'] + 1
-            filtered_df = filtered_df[filtered_df['year'] >= min_year]
-        elif parsed['year_filter']:
-            if isinstance(parsed['year_filter'], tuple):
-                start_year, end_year = parsed['year_filter']
-                filtered_df = filtered_df[(filtered_df['year'] >= start_year) & (filtered_df['year'] <= end_year)]
+        with telemetry.span('filter'):
+            if rollups is not None:
+                periods = rollups.select(period_filter['resolution'], areas,
+                                         period_filter.get('periods'), period_filter.get('last'))
+                spans = period_spans(periods['period'].tolist(), period_filter['resolution'])
+                window = self._span_years(spans)
+                rows = self._select(areas, *window).within_dates(spans)
             else:
-                filtered_df = filtered_df[filtered_df['year'] == parsed['year_filter']]
+                rows, window = self._filter_rows(areas, parsed)
         
         # Generate aggregated data
-        aggregated = self._aggregate_data(filtered_df, areas)
-        
-        # Generate summary using LLM or fallback
-        summary = self._get_summary(aggregated, query, parsed)
+        with telemetry.span('aggregate'):
+            if rollups is not None:
+                aggregated = self._aggregate_periods(periods, areas)
+            else:
+                aggregated = self._aggregate_data(rows, areas, parsed['metrics'])
+            if parsed['analysis_type'] == 'investment':
+                self._attach_investment_scores(aggregated, *window)
         
         # Generate chart data
-        chart_data = self._generate_chart_data(aggregated, parsed['metric'])
+        with telemetry.span('chart'):
+            chart_metrics = parsed['metrics'] if rollups is None else parsed['metric']
+            chart_data = self._generate_chart_data(aggregated, chart_metrics)
         
         # Prepare table data (limit to 500 rows)
-        table_data = filtered_df.head(500).to_dict('records')
+        with telemetry.span('table'):
+            table_data = rows.head(500).to_dict('records')
         
-        return {
-            'summary': summary,
+        result = {
             'chart': chart_data,
             'table': table_data,
-            'total_rows': len(filtered_df)
+            'total_rows': rows.count(),
+            'result_handle': self._remember_result(rows, areas, *window, spans=spans)
         }
+        
+        if neighbours is not None:
+            result['neighbours'] = neighbours
+        
+        if period_filter:
+            result['resolution'] = period_filter['resolution'] if rollups is not None else 'year'
+            if rollups is None:
+                result['note'] = 'This dataset only has yearly figures, so the answer covers whole years.'
+        
+        # Forecasts come from models fitted once per dataset version, never per request
+        if parsed.get('forecast_horizon') and rollups is None:
+            with telemetry.span('forecast'):
+                forecasts = self.forecast_areas(list(aggregated.keys()), parsed['forecast_horizon'])
+                result['forecast'] = forecasts
+                result['chart'] = self._add_forecast_to_chart(chart_data, forecasts, parsed['metric'])
+        
+        # Medians and percentiles come from the per-(area, year) sketches, not another pass over the rows
+        if parsed.get('distribution'):
+            with telemetry.span('distribution'):
+                metric = 'demand' if parsed['metric'] == 'demand' else 'price'
+                result['distribution'] = self.distribution(areas, *window, metric=metric)
+                # Whole-window spread per area for the summary
+                for row in self.distribution(list(aggregated), *window, metric=metric, group_by='area')['groups']:
+                    aggregated[row['area']]['distribution'] = {
+                        'metric': metric, 'p10': row['p10'], 'median': row['median'], 'p90': row['p90']
+                    }
+        
+        return result, (aggregated, query, parsed)
+    
+    def _unknown_area_answer(self, query: str) -> Dict:
+        """Error answer for a question naming no known area, with suggestions"""
+        # Try to suggest similar areas
+        with telemetry.span('suggestions'):
+            suggestions = self._get_area_suggestions(query)
+        available_areas = self.get_areas()
+        
+        if suggestions:
+            suggestion_text = f"No exact matches found. Did you mean: {', '.join(suggestions[:3])}?"
+        else:
+            suggestion_text = f"No matching areas found. Available areas: {', '.join(available_areas[:5])}{'...' if len(available_areas) > 5 else ''}"
+        
+        return {
+            'error': suggestion_text,
+            'summary': f"Unable to find data for the requested location in your query: '{query}'. Please try one of the suggested areas or check the available locations.",
+            'chart': {},
+            'table': [],
+            'suggestions': suggestions if suggestions else available_areas[:10]
+        }
+    
+    @with_snapshot
+    def shard_catalogue(self) -> Dict:
+        """What this instance holds, for a shard router: each area's year range (and newest month) and the metrics"""
+        if not self.snapshot.has_data:
+            return {'version': self.dataset_version, 'areas': {}, 'metrics': [], 'dated': False}
+        
+        def build():
+            rows = self._select().values(['area', 'year'])
+            grouped = rows.groupby('area', observed=True)['year']
+            areas = pd.DataFrame({'first_year': grouped.min(), 'last_year': grouped.max()})
+            rollups = self._get_rollups()
+            if rollups is not None:
+                newest = rollups.levels['month'].groupby('area')['start'].max()
+                areas['last_month'] = newest.reindex(areas.index).dt.strftime('%Y-%m-%d')
+            areas = areas.astype(object).where(areas.notna(), None)
+            return {'areas': areas.to_dict('index'), 'metrics': self.available_metrics(), 'dated': rollups is not None}
+        
+        return {'version': self.dataset_version, **self._get_derived('shard_catalogue', build)}
+    
+    @with_snapshot
+    def partial_aggregates(self, areas: List[str], start_year: Optional[int] = None, end_year: Optional[int] = None,
+                           metrics: Optional[List[str]] = None, resolution: Optional[str] = None,
+                           periods: Optional[List[str]] = None, table_limit: int = 500,
+                           forecast_horizon: Optional[int] = None, distribution: Optional[str] = None) -> Dict:
+        """Per-(area, year) or per-(area, period) sums and counts for a shard router to add up, plus the first rows.
+        
+        A shard holds every row of its areas, so forecasts and distributions (per area) are answered here whole.
+        """
+        if not self.snapshot.has_data:
+            return {'version': self.dataset_version, 'groups': [], 'table': [], 'total_rows': 0}
+        
+        if resolution:
+            # The rollup levels already hold sums and counts
+            rollups = self._get_rollups()
+            if rollups is None:
+                raise ValueError('This shard only has yearly figures')
+            level = rollups.levels[resolution]
+            level = level[level['area'].isin(areas)]
+            labels = period_labels(level['start'], resolution)
+            keep = labels.isin(periods or []).to_numpy()
+            groups = level[keep].drop(columns='start').assign(period=labels[keep])
+            spans = period_spans(periods or [], resolution)
+            rows = self._select(areas, *self._span_years(spans)).within_dates(spans)
+        else:
+            available = self.available_metrics()
+            requested = metric_registry.resolve(list(CORE_METRICS) + [name for name in metrics or [] if name in available])
+            columns = list(dict.fromkeys(['area', 'year'] + [column for metric in requested for column in metric.columns]))
+            rows = self._select(areas, start_year, end_year)
+            groups = partial_sums(rows.values(columns), requested, ['area', 'year'])
+        
+        table = rows.head(table_limit)
+        result = {
+            'version': self.dataset_version,
+            'groups': groups.to_dict('records'),
+            'table': table.astype(object).where(table.notna(), None).to_dict('records'),
+            'total_rows': int(rows.count())
+        }
+        if forecast_horizon:
+            result['forecast'] = self.forecast_areas(areas, int(forecast_horizon))
+        if distribution:
+            result['distribution'] = self.distribution(areas, start_year, end_year, metric=distribution)['groups']
+            result['spread'] = self.distribution(areas, start_year, end_year, metric=distribution, group_by='area')['groups']
+        return result
+    
+    @with_snapshot
+    def structured_query(self, spec: Dict) -> Dict:
+        """Run an explicit query spec directly against the dataset, skipping NL parsing"""
+        if not self.snapshot.has_data:
+            raise ValueError('No data available. Please upload a dataset first.')
+        
+        requested = spec.get('areas')
+        if not isinstance(requested, list) or not requested:
+            raise ValueError('areas must be a non-empty list of area names')
+        
+        # Exact (case-insensitive) lookups only - no fuzzy matching
+        lookup = self._get_derived('area_lookup', lambda: {area.lower(): area for area in self.get_areas()})
+        unknown = [area for area in requested if str(area).strip().lower() not in lookup]
+        if unknown:
+            raise ValueError(f"Unknown areas: {unknown}")
+        areas = list(dict.fromkeys(lookup[str(area).strip().lower()] for area in requested))
+        
+        # 'both', one metric name or a list of them; any registry metric the dataset has is accepted
+        metric = spec.get('metric', 'both')
+        available = self.available_metrics()
+        value_cols = metric_names(metric) if isinstance(metric, (str, list)) else []
+        if not value_cols or any(name not in available for name in value_cols):
+            choices = STRUCTURED_METRICS + [name for name in available if name not in CORE_METRICS]
+            raise ValueError(f"metric must be one of: {', '.join(choices)} (or a list of them)")
+        
+        aggregations = spec.get('aggregations', ['mean'])
+        if not isinstance(aggregations, list) or not aggregations or \
+                any(agg not in STRUCTURED_AGGREGATIONS for agg in aggregations):
+            raise ValueError(f"aggregations must be a list drawn from: {', '.join(STRUCTURED_AGGREGATIONS)}")
+        
+        # Bad client values are ValueErrors (400); a TypeError from here on is a bug (500)
+        try:
+            year_from = int(spec['year_from']) if spec.get('year_from') is not None else None
+            year_to = int(spec['year_to']) if spec.get('year_to') is not None else None
+            table_limit = max(int(spec.get('table_limit', 500)), 0)
+        except (TypeError, ValueError):
+            raise ValueError('year_from, year_to and table_limit must be whole numbers')
+        
+        include_spec = spec.get('include') or {}
+        if not isinstance(include_spec, dict):
+            raise ValueError('include must be an object of summary/chart/table/aggregates flags')
+        include = {'aggregates': True, 'chart': False, 'table': False, 'summary': False}
+        include.update({key: bool(value) for key, value in include_spec.items() if key in include})
+        
+        rows = self._select(areas, year_from, year_to)
+        
+        result = {
+            'areas': areas,
+            'metric': metric,
+            'year_from': year_from,
+            'year_to': year_to,
+            'total_rows': int(rows.count())
+        }
+        
+        if include['aggregates']:
+            aggregates = rows.aggregate(value_cols, aggregations).round(2).replace([np.inf, -np.inf], np.nan)
+            # std of a single-row group is NaN, which strict JSON cannot carry
+            result['aggregates'] = aggregates.astype(object).where(aggregates.notna(), None).to_dict('records')
+        
+        # Growth/average aggregation is only needed for charts and summaries
+        if include['chart'] or include['summary']:
+            aggregated = self._aggregate_data(rows, areas, value_cols)
+            if include['chart']:
+                result['chart'] = self._generate_chart_data(aggregated, value_cols)
+            if include['summary']:
+                parsed = {'areas': areas, 'metric': metric, 'metrics': value_cols, 'comparison': len(areas) > 1,
+                          'analysis_type': spec.get('analysis_type', 'comparison' if len(areas) > 1 else 'overview')}
+                if spec.get('llm'):
+                    query = spec.get('query') or f"Analyze {', '.join(areas)}"
+                    result['summary'] = self._get_summary(aggregated, query, parsed)
+                else:
+                    result['summary'] = self._get_mock_summary(aggregated, parsed)
+        
+        if include['table']:
+            result['table'] = rows.head(table_limit).to_dict('records')
+            result['result_handle'] = self._remember_result(rows, areas, year_from, year_to)
+        
+        return result
+    
+    def _remember_result(self, rows, areas: List[str], start_year: Optional[int], end_year: Optional[int],
+                         spans: Optional[List[Tuple[str, str]]] = None) -> str:
+        """Keep a query's full result server-side and return the handle exports use to fetch it"""
+        handle = result_cache.make_handle(self.snapshot.fingerprint, areas, start_year, end_year, spans)
+        # On disk-backed data the export re-runs the scan instead of holding the rows
+        if isinstance(rows, FrameSelection):
+            result_cache.put(handle, rows.df)
+        return handle
+    
+    @with_snapshot
+    def get_result(self, handle: str) -> pd.DataFrame:
+        """Rows behind a result handle: from this worker's cache, else rebuilt from the handle's recipe"""
+        recipe = result_cache.read_handle(handle)
+        if recipe.get('fp') != self.snapshot.fingerprint:
+            raise ResultExpired('The dataset has changed since this result was produced. Run the query again.')
+        
+        cached = result_cache.get(handle)
+        if cached is not None:
+            return cached
+        
+        # Another worker answered the query; the recipe reproduces the same slice
+        rows = self._select(recipe['areas'], recipe['start'], recipe['end'])
+        if recipe.get('dates'):
+            rows = rows.within_dates(recipe['dates'])
+        if isinstance(rows, FrameSelection):
+            result_cache.put(handle, rows.df)
+        return rows.to_frame()
+    
+    def _year_window(self, parsed: Dict, rows=None) -> Tuple[Optional[int], Optional[int]]:
+        """Resolve the parsed time window into an inclusive (start, end) year range"""
+        if parsed.get('years'):
+            if rows is None:
+                rows = self._select()
+            elif isinstance(rows, pd.DataFrame):
+                rows = FrameSelection(rows)
+            max_year = rows.year_range()[1]
+            if max_year is None:
+                return None, None
+            max_year = int(max_year)
+            return max_year - parsed['years'] + 1, max_year
+        
+        year_filter = parsed.get('year_filter')
+        if isinstance(year_filter, tuple):
+            return year_filter
+        if year_filter:
+            return year_filter, year_filter
+        return None, None
+    
+    def _select(self, areas: Optional[List[str]] = None, start_year: Optional[int] = None,
+                end_year: Optional[int] = None):
+        """Rows for some areas and years from whichever backend holds the dataset"""
+        store = self.snapshot.store
+        if store is not None:
+            return store.select(areas, start_year, end_year)
+        
+        df = self.df
+        rows = FrameSelection(df if areas is None else df[df['area'].isin(areas)])
+        return rows.within(start_year, end_year)
+    
+    @staticmethod
+    def _span_years(spans: List[Tuple[str, str]]) -> Tuple[Optional[int], Optional[int]]:
+        """The whole years covering some [start, end) date spans"""
+        if not spans:
+            return None, None
+        return pd.Timestamp(spans[0][0]).year, (pd.Timestamp(spans[-1][1]) - pd.Timedelta(days=1)).year
+    
+    def _filter_rows(self, areas: List[str], parsed: Dict):
+        """Select the requested areas and time window; returns the rows and the (start, end) years used"""
+        rows = self._select(areas)
+        
+        # "Last N years" counts back from the newest year these areas have
+        start_year, end_year = self._year_window(parsed, rows)
+        return rows.within(start_year, end_year), (start_year, end_year)
+    
+    @with_snapshot
+    def rank_areas(self, metric: str = 'price_growth', limit: int = 10, offset: int = 0,
+                   ascending: bool = False, min_points: int = 1, start_year: Optional[int] = None,
+                   end_year: Optional[int] = None, include_ties: bool = True) -> Dict:
+        """Rank every area in the catalogue by a precomputed metric"""
+        if not self.snapshot.has_data:
+            return select_top(pd.DataFrame(columns=AREA_METRIC_COLUMNS), metric, limit=limit, offset=offset)
+        
+        # Growth needs two points; level metrics are fine with one
+        if metric.endswith('_growth'):
+            min_points = max(min_points, 2)
+        
+        if metric == 'investment_score':
+            metrics = self.score_areas(start_year, end_year)
+        else:
+            metrics = self._get_area_metrics(start_year, end_year)
+        ranking = select_top(metrics, metric, limit=limit, offset=offset, ascending=ascending,
+                             min_points=min_points, include_ties=include_ties)
+        ranking['start_year'] = start_year
+        ranking['end_year'] = end_year
+        return ranking
+    
+    def _query_catalogue_ranking(self, query: str, parsed: Dict, offset: int = 0,
+                                 limit: Optional[int] = None) -> Tuple[Dict, Optional[Tuple]]:
+        """Answer a ranking question over every area instead of only the named ones"""
+        start_year, end_year = self._year_window(parsed)
+        ranking = self.rank_areas(
+            metric=parsed['ranking_metric'],
+            limit=limit or parsed.get('top_n') or 10,
+            offset=offset,
+            ascending=parsed['ascending'],
+            start_year=start_year,
+            end_year=end_year
+        )
+        
+        if not ranking['items']:
+            return {
+                'error': 'Not enough data to rank areas for the requested period.',
+                'summary': '',
+                'chart': {},
+                'table': [],
+                'ranking': ranking
+            }, None
+        
+        areas = [item['area'] for item in ranking['items']]
+        rows, window = self._filter_rows(areas, parsed)
+        aggregated = self._aggregate_data(rows, areas, parsed['metrics'])
+        if parsed['ranking_metric'] == 'investment_score':
+            self._attach_investment_scores(aggregated, start_year, end_year)
+        
+        return {
+            'chart': self._generate_chart_data(aggregated, parsed['metrics']),
+            'table': rows.head(500).to_dict('records'),
+            'total_rows': rows.count(),
+            'result_handle': self._remember_result(rows, areas, *window),
+            'ranking': ranking
+        }, (aggregated, query, parsed)
+    
+    def _attach_investment_scores(self, aggregated: Dict, start_year: Optional[int] = None,
+                                  end_year: Optional[int] = None):
+        """Add catalogue-relative investment scores to already aggregated areas"""
+        if not aggregated:
+            return
+        
+        scores = self.score_areas(start_year, end_year).set_index('area')['investment_score']
+        for area, data in aggregated.items():
+            if area in scores.index:
+                data['investment_score'] = round(float(scores[area]), 1)
     
     def _get_area_suggestions(self, query: str) -> List[str]:
         """Get intelligent area suggestions with scoring"""
@@ -412,47 +1291,135 @@ class DataProcessor:
         suggestions.sort(key=lambda x: x[1], reverse=True)
         return [area for area, score in suggestions[:5]]
     
-    def _aggregate_data(self, df: pd.DataFrame, areas: List[str]) -> Dict:
-        """Aggregate data by year and area"""
-        if df.empty:
+    def _aggregate_data(self, df, areas: List[str], metrics: Optional[List[str]] = None) -> Dict:
+        """Aggregate data by year and area (df may be a frame or a row selection from _select)"""
+        rows = FrameSelection(df) if isinstance(df, pd.DataFrame) else df
+        
+        # Price and demand always (summaries and scores use them), plus any other requested metrics
+        requested = metric_registry.resolve(list(CORE_METRICS) + list(metrics or []))
+        
+        # Every metric grouped by year and area in one pass (pushed down to the scan on disk-backed data)
+        grouped = rows.area_year_means(requested).sort_values('year', kind='stable')
+        if grouped.empty:
             return {}
         
-        # Group by year and area
-        grouped = df.groupby(['year', 'area']).agg({
-            'price': 'mean',
-            'demand': 'mean'
-        }).reset_index()
+        # Growth and averages for every area and metric at once
+        stats, year_counts = growth_table(grouped, requested)
+        if grouped.isna().any().any():
+            # Metrics missing for some years come out as null, not NaN
+            grouped = grouped.astype(object).where(grouped.notna(), None)
+            stats = stats.astype(object).where(stats.notna(), None)
+        records = {area: frame.to_dict('records') for area, frame in grouped.groupby('area', sort=False, observed=True)}
+        stats = stats.to_dict('index')
         
-        # Calculate growth rates
         result = {}
         for area in areas:
-            area_data = grouped[grouped['area'] == area].sort_values('year')
-            if len(area_data) >= 2:
-                price_growth = ((area_data['price'].iloc[-1] - area_data['price'].iloc[0]) / 
-                               area_data['price'].iloc[0] * 100)
-                demand_growth = ((area_data['demand'].iloc[-1] - area_data['demand'].iloc[0]) / 
-                                area_data['demand'].iloc[0] * 100)
-                
-                result[area] = {
-                    'data': area_data.to_dict('records'),
-                    'price_growth': round(price_growth, 2),
-                    'demand_growth': round(demand_growth, 2),
-                    'avg_price': round(area_data['price'].mean(), 2),
-                    'avg_demand': round(area_data['demand'].mean(), 2)
-                }
+            if year_counts.get(area, 0) >= 2:
+                result[area] = {'data': records[area], **stats[area]}
         
         return result
     
+    def _aggregate_periods(self, periods: pd.DataFrame, areas: List[str]) -> Dict:
+        """Same shape as _aggregate_data, from rollup rows (one per area and month, quarter or year)"""
+        if periods.empty:
+            return {}
+        
+        stats, period_counts = growth_table(periods, metric_registry.resolve(CORE_METRICS), order='start')
+        columns = ['period', 'area', 'price', 'demand', 'records']
+        records = {area: frame[columns].to_dict('records') for area, frame in periods.groupby('area', sort=False)}
+        stats = stats.to_dict('index')
+        
+        # A single named month or quarter is a valid answer here, unlike a single year of a trend
+        return {area: {'data': records[area], **stats[area]} for area in areas if period_counts.get(area, 0) >= 1}
+    
     def _get_summary(self, aggregated: Dict, query: str, parsed: Dict) -> str:
-        """Generate summary using Google LLM or fallback"""
-        try:
-            if settings.GOOGLE_API_KEY:
-                return self._get_llm_summary(aggregated, query, parsed)
-        except Exception as e:
-            print(f"LLM API error: {e}")
+        """Generate summary using Google LLM or fallback, reusing this snapshot's summary for a repeated question"""
+        with self.pin():
+            key = self._summary_key(query, parsed)
+            summary = self._cached_summary(key)
+            if summary is not None:
+                return summary
+            
+            try:
+                if settings.GOOGLE_API_KEY:
+                    # Never queue behind other LLM calls: over the limit, answer with the deterministic summary
+                    with admission.gate('llm').admit(blocking=False):
+                        summary = self._get_llm_summary(aggregated, query, parsed)
+                else:
+                    telemetry.inc('llm_fallbacks_total', reason='no_api_key')
+            except Overloaded:
+                telemetry.inc('llm_fallbacks_total', reason='overloaded')
+                return self._get_mock_summary(aggregated, parsed)
+            except Exception as e:
+                print(f"LLM API error: {e}")
+                telemetry.inc('llm_fallbacks_total', reason='error')
+                # Fallback to deterministic summary; not cached so the next ask retries the LLM
+                return self._get_mock_summary(aggregated, parsed)
+            
+            if summary is None:
+                summary = self._get_mock_summary(aggregated, parsed)
+            self._store_summary(key, summary)
+            return summary
+    
+    def _stream_summary(self, aggregated: Dict, query: str, parsed: Dict) -> Iterator[Dict]:
+        """Like _get_summary, but yields {'delta': text} pieces as they arrive ({'replace': text} after a failed stream)"""
+        key = self._summary_key(query, parsed)
+        summary = self._cached_summary(key)
+        if summary is not None:
+            yield {'delta': summary}
+            return
         
-        # Fallback to deterministic summary
-        return self._get_mock_summary(aggregated, parsed)
+        if settings.GOOGLE_API_KEY:
+            pieces = []
+            try:
+                with admission.gate('llm').admit(blocking=False):
+                    for text in self._stream_llm_summary(aggregated, query, parsed):
+                        pieces.append(text)
+                        yield {'delta': text}
+                if not ''.join(pieces).strip():
+                    raise Exception("No response from LLM")
+                self._store_summary(key, ''.join(pieces))
+                return
+            except Overloaded:
+                telemetry.inc('llm_fallbacks_total', reason='overloaded')
+            except Exception as e:
+                print(f"LLM API error: {e}")
+                telemetry.inc('llm_fallbacks_total', reason='error')
+                if pieces:
+                    # The client already shows part of the LLM's text; swap in the whole fallback at once
+                    yield {'replace': self._get_mock_summary(aggregated, parsed)}
+                    return
+            # Fallbacks are not cached, so the next ask retries the LLM
+            summary = self._get_mock_summary(aggregated, parsed)
+        else:
+            telemetry.inc('llm_fallbacks_total', reason='no_api_key')
+            summary = self._get_mock_summary(aggregated, parsed)
+            self._store_summary(key, summary)
+        
+        # Deterministic summary, one line at a time
+        for line in summary.splitlines(keepends=True):
+            yield {'delta': line}
+    
+    def _summary_key(self, query: str, parsed: Dict) -> Tuple:
+        # Investment answers depend on the scorer weights as well as the dataset
+        return normalize_text(query), canonical_query(parsed), json.dumps(self.investment_scorer.weights, sort_keys=True)
+    
+    def _cached_summary(self, key: Tuple) -> Optional[str]:
+        """Summary already generated for this question on the pinned snapshot, if any"""
+        summaries = self.snapshot.derived.setdefault('summaries', OrderedDict())
+        with self._summary_lock:
+            summary = summaries.get(key)
+            if summary is not None:
+                summaries.move_to_end(key)
+        telemetry.inc('cache_requests_total', cache='summaries', result='miss' if summary is None else 'hit')
+        return summary
+    
+    def _store_summary(self, key: Tuple, summary: str):
+        summaries = self.snapshot.derived.setdefault('summaries', OrderedDict())
+        with self._summary_lock:
+            summaries[key] = summary
+            while len(summaries) > getattr(settings, 'SUMMARY_CACHE_SIZE', 256):
+                summaries.popitem(last=False)
     
     def _get_llm_summary(self, aggregated: Dict, query: str, parsed: Dict) -> str:
         """Get summary from Google LLM"""
@@ -460,7 +1427,7 @@ class DataProcessor:
         prompt = self._build_llm_prompt(aggregated, query, parsed)
         
         # Call Google LLM API (using Gemini)
-        url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent?key={settings.GOOGLE_API_KEY}"
+        url = f"{settings.GEMINI_API_URL}?key={settings.GOOGLE_API_KEY}"
         
         payload = {
             "contents": [{
@@ -468,7 +1435,8 @@ class DataProcessor:
             }]
         }
         
-        response = requests.post(url, json=payload, timeout=10)
+        with telemetry.span('llm'):
+            response = requests.post(url, json=payload, timeout=settings.LLM_TIMEOUT)
         response.raise_for_status()
         
         result = response.json()
@@ -477,6 +1445,30 @@ class DataProcessor:
         
         raise Exception("No response from LLM")
     
+    def _stream_llm_summary(self, aggregated: Dict, query: str, parsed: Dict) -> Iterator[str]:
+        """Stream the summary from Gemini's streamGenerateContent endpoint (server-sent events)"""
+        prompt = self._build_llm_prompt(aggregated, query, parsed)
+        url = f"{settings.GEMINI_STREAM_URL}?alt=sse&key={settings.GOOGLE_API_KEY}"
+        payload = {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }]
+        }
+        
+        # Only the wait for the first bytes is timed; the body arrives while the client reads it
+        with telemetry.span('llm'):
+            response = requests.post(url, json=payload, timeout=settings.LLM_TIMEOUT, stream=True)
+        with response:
+            response.raise_for_status()
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                chunk = json.loads(line[5:])
+                for candidate in chunk.get('candidates', [])[:1]:
+                    for part in candidate.get('content', {}).get('parts', []):
+                        if part.get('text'):
+                            yield part['text']
+    
     def _build_llm_prompt(self, aggregated: Dict, query: str, parsed: Dict) -> str:
         """Build enhanced prompt for LLM with context"""
         areas = list(aggregated.keys())
@@ -493,6 +1485,17 @@ class DataProcessor:
             prompt += f"  • Average Demand Score: {data['avg_demand']:.1f}/10\n"
             prompt += f"  • Price Growth: {data['price_growth']:+.1f}%\n"
             prompt += f"  • Demand Growth: {data['demand_growth']:+.1f}%\n"
+            if 'investment_score' in data:
+                prompt += f"  • Investment Score: {data['investment_score']:.0f}/100 (relative to all areas)\n"
+            if 'distribution' in data:
+                spread = data['distribution']
+                unit = metric_registry.get(spread['metric'])
+                prompt += (f"  • Median {unit.label}: {unit.format(spread['median'])} "
+                           f"(p10 {unit.format(spread['p10'])}, p90 {unit.format(spread['p90'])})\n")
+            for metric in self._extra_metrics(parsed):
+                if data.get(f'avg_{metric.name}') is not None:
+                    prompt += (f"  • {metric.label}: {metric.format(data[f'avg_{metric.name}'])} average, "
+                               f"{data[f'{metric.name}_growth']:+.1f}% growth\n")
         
         # Add context based on analysis type
         context_prompts = {
@@ -532,6 +1535,13 @@ class DataProcessor:
             lines = []
             lines.append(f"{area} market analysis shows average property price of ₹{data['avg_price']:,.0f} with {data['price_growth']:+.1f}% growth.")
             lines.append(f"Demand score stands at {data['avg_demand']:.1f}/10 with {data['demand_growth']:+.1f}% growth trend.")
+            if 'distribution' in data:
+                spread = data['distribution']
+                unit = metric_registry.get(spread['metric'])
+                lines.append(f"Median {unit.label.lower()} is {unit.format(spread['median'])}, with the middle 80% between {unit.format(spread['p10'])} and {unit.format(spread['p90'])}.")
+            for metric in self._extra_metrics(parsed):
+                if data.get(f'avg_{metric.name}') is not None:
+                    lines.append(f"{metric.label} averages {metric.format(data[f'avg_{metric.name}'])} with {data[f'{metric.name}_growth']:+.1f}% growth.")
             
             if data['price_growth'] > 5 and data['demand_growth'] > 0:
                 lines.append(f"Strong market momentum indicates robust investment potential.")
@@ -555,8 +1565,18 @@ class DataProcessor:
             lines.append(f"Comparative analysis of {len(areas)} areas: {', '.join(areas)}.")
             lines.append(f"{best_price[0]} leads in price appreciation at {best_price[1]['price_growth']:+.1f}%, while {best_demand[0]} shows highest demand growth at {best_demand[1]['demand_growth']:+.1f}%.")
             lines.append(f"{highest_price[0]} commands premium pricing at ₹{highest_price[1]['avg_price']:,.0f} average.")
+            for metric in self._extra_metrics(parsed):
+                reported = [item for item in aggregated.items() if item[1].get(f'avg_{metric.name}') is not None]
+                if reported:
+                    leader = max(reported, key=lambda x: x[1][f'avg_{metric.name}'])
+                    lines.append(f"{leader[0]} leads on {metric.label.lower()} at {metric.format(leader[1][f'avg_{metric.name}'])} average.")
             
-            if best_price[0] == best_demand[0]:
+            scored = [item for item in aggregated.items() if 'investment_score' in item[1]]
+            if analysis_type == 'investment' and scored:
+                best_score = max(scored, key=lambda x: x[1]['investment_score'])
+                lines.append(f"{best_score[0]} has the highest investment score at {best_score[1]['investment_score']:.0f}/100 across growth, momentum, volatility and demand.")
+                lines.append(f"Recommendation: Shortlist {best_score[0]} and validate locally before committing capital.")
+            elif best_price[0] == best_demand[0]:
                 lines.append(f"{best_price[0]} emerges as the clear market leader with strong fundamentals.")
                 lines.append(f"Recommendation: Prioritize {best_price[0]} for balanced growth and demand potential.")
             else:
@@ -565,73 +1585,133 @@ class DataProcessor:
             
             return '\n'.join(lines)
     
-    def _generate_chart_data(self, aggregated: Dict, metric: str) -> Dict:
-        """Generate Chart.js compatible data"""
+    def _extra_metrics(self, parsed: Dict) -> List:
+        """Metrics beyond price and demand that the question asked for"""
+        return metric_registry.resolve(name for name in parsed.get('metrics', []) if name not in CORE_METRICS)
+    
+    def _generate_chart_data(self, aggregated: Dict, metric) -> Dict:
+        """Generate Chart.js compatible data ('both', one metric name or a list of them)"""
         if not aggregated:
             return {}
         
+        names = metric_names(metric)
+        # Rollup answers are keyed by period ('2024-03', '2024Q1') rather than year
+        axis = 'period' if 'period' in next(iter(aggregated.values()))['data'][0] else 'year'
+        
         # Get all years across all areas
         all_years = set()
         for area_data in aggregated.values():
             for record in area_data['data']:
-                all_years.add(record['year'])
+                all_years.add(record[axis])
         
         years = sorted(list(all_years))
         
         datasets = []
         colors = ['#007bff', '#28a745', '#dc3545', '#ffc107', '#17a2b8']
+        # The first metric is drawn solid, the others dashed in the area's colour
+        dashes = [[5, 5], [2, 2], [10, 5], [5, 2, 2, 2]]
         
         for i, (area, data) in enumerate(aggregated.items()):
             color = colors[i % len(colors)]
             
-            # Create data arrays for price and demand
-            area_df = pd.DataFrame(data['data'])
+            # One row per year, every metric aligned to the shared year axis
+            area_df = pd.DataFrame(data['data']).set_index(axis).reindex(years)
+            area_df = area_df.astype(object).where(area_df.notna(), None)
             
-            if metric in ['price', 'both']:
-                price_data = []
-                for year in years:
-                    year_data = area_df[area_df['year'] == year]
-                    price_data.append(year_data['price'].iloc[0] if not year_data.empty else None)
-                
-                datasets.append({
-                    'label': f'{area} - Price',
-                    'data': price_data,
+            for position, name in enumerate(names):
+                dataset = {
+                    'label': f'{area} - {metric_registry.get(name).label}',
+                    'data': area_df[name].tolist(),
                     'borderColor': color,
                     'backgroundColor': color + '20',
                     'fill': False,
                     'tension': 0.1
-                })
+                }
+                if position:
+                    dataset['borderDash'] = dashes[(position - 1) % len(dashes)]
+                elif name == 'demand':
+                    dataset['borderDash'] = []
+                datasets.append(dataset)
+        
+        return {
+            'labels': [str(year) for year in years],
+            'datasets': datasets
+        }
+    
+    def _add_forecast_to_chart(self, chart_data: Dict, forecasts: Dict, metric: str) -> Dict:
+        """Extend Chart.js data with dashed forecast lines and confidence bands"""
+        if not chart_data or not forecasts:
+            return chart_data
+        
+        labels = chart_data['labels']
+        future_years = sorted({point['year'] for points in forecasts.values() for point in points})
+        new_labels = [str(year) for year in future_years if str(year) not in labels]
+        all_labels = labels + new_labels
+        
+        datasets = chart_data['datasets']
+        for dataset in datasets:
+            dataset['data'] = dataset['data'] + [None] * len(new_labels)
+        
+        for area, points in forecasts.items():
+            by_year = {str(point['year']): point for point in points}
             
-            if metric in ['demand', 'both']:
-                demand_data = []
-                for year in years:
-                    year_data = area_df[area_df['year'] == year]
-                    demand_data.append(year_data['demand'].iloc[0] if not year_data.empty else None)
+            for key, name in (('price', 'Price'), ('demand', 'Demand')):
+                if metric not in (key, 'both') or key not in points[0]:
+                    continue
+                
+                base = next((d for d in datasets if d['label'] == f'{area} - {name}'), None)
+                color = base['borderColor'] if base else '#6c757d'
+                
+                series = {}
+                for field in (key, f'{key}_lower', f'{key}_upper'):
+                    series[field] = [by_year[label][field] if label in by_year else None for label in all_labels]
+                
+                # Start every forecast line at the last observed point so it connects
+                if base:
+                    observed = [i for i, value in enumerate(base['data']) if value is not None]
+                    if observed:
+                        for field in series:
+                            series[field][observed[-1]] = base['data'][observed[-1]]
                 
                 datasets.append({
-                    'label': f'{area} - Demand',
-                    'data': demand_data,
+                    'label': f'{area} - {name} Forecast',
+                    'data': series[key],
                     'borderColor': color,
                     'backgroundColor': color + '20',
                     'fill': False,
                     'tension': 0.1,
-                    'borderDash': [5, 5] if metric == 'both' else []
+                    'borderDash': [2, 4]
+                })
+                datasets.append({
+                    'label': f'{area} - {name} Forecast Lower',
+                    'data': series[f'{key}_lower'],
+                    'borderColor': 'transparent',
+                    'pointRadius': 0,
+                    'fill': False
+                })
+                datasets.append({
+                    'label': f'{area} - {name} Forecast Upper',
+                    'data': series[f'{key}_upper'],
+                    'borderColor': 'transparent',
+                    'backgroundColor': color + '20',
+                    'pointRadius': 0,
+                    'fill': '-1'
                 })
         
-        return {
-            'labels': [str(year) for year in years],
-            'datasets': datasets
-        }
+        chart_data['labels'] = all_labels
+        return chart_data
     
+    @with_snapshot
     def get_filtered_data(self, area: str = None) -> pd.DataFrame:
         """Get filtered data for download"""
-        if self.df is None or self.df.empty:
+        if not self.snapshot.has_data:
             return pd.DataFrame()
         
+        store = self.snapshot.store
+        if store is not None:
+            return store.select(area_pattern=area or None).to_frame()
+        
         if area:
             return self.df[self.df['area'].str.contains(area, case=False, na=False)]
         
-        return self.df
-
-# Global instance
-data_processor = DataProcessor()
\ No newline at end of file
+        return self.df
\ No newline at end of file
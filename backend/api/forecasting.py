@@ -0,0 +1,210 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+FORECAST_MODELS = ['linear', 'log_linear', 'holt']
+
+DEFAULT_HORIZON = 3
+MAX_HORIZON = 10
+
+# 95% confidence band
+CONFIDENCE_Z = 1.96
+
+# Smoothing parameters for Holt's linear (double exponential) smoothing
+HOLT_ALPHA = 0.6
+HOLT_BETA = 0.3
+
+PARAM_COLUMNS = ['area', 'model', 'intercept', 'slope', 'level', 'trend', 'sigma',
+                 'n', 'x_mean', 'sxx', 'last_year', 'last_value']
+
+
+def _fit_regression(frame: pd.DataFrame, value_col: str) -> pd.DataFrame:
+    """Closed-form least squares of value on x for every area in one grouped pass"""
+    frame = frame.assign(xy=frame['x'] * frame[value_col], xx=frame['x'] ** 2)
+    sums = frame.groupby('area', sort=True).agg(
+        n=('x', 'size'),
+        sx=('x', 'sum'),
+        sy=(value_col, 'sum'),
+        sxx_raw=('xx', 'sum'),
+        sxy=('xy', 'sum'),
+    )
+    sxx = sums['sxx_raw'] - sums['sx'] ** 2 / sums['n']
+    sxy = sums['sxy'] - sums['sx'] * sums['sy'] / sums['n']
+
+    params = pd.DataFrame(index=sums.index)
+    params['slope'] = (sxy / sxx.where(sxx > 0)).fillna(0.0)
+    params['x_mean'] = sums['sx'] / sums['n']
+    params['intercept'] = sums['sy'] / sums['n'] - params['slope'] * params['x_mean']
+    params['n'] = sums['n']
+    params['sxx'] = sxx
+    return params
+
+
+def _residual_sigma(frame: pd.DataFrame, predicted: pd.Series, value_col: str, params: pd.DataFrame) -> pd.Series:
+    """Residual standard deviation per area"""
+    squared = (frame[value_col] - predicted) ** 2
+    sse = squared.groupby(frame['area']).sum()
+    dof = (params['n'] - 2).clip(lower=1)
+    return np.sqrt(sse.reindex(params.index) / dof)
+
+
+def _fit_holt(frame: pd.DataFrame, value_col: str) -> pd.DataFrame:
+    """Holt's linear smoothing, vectorised across areas by stepping through years"""
+    matrix = frame.pivot(index='area', columns='year', values=value_col).sort_index()
+    values = matrix.to_numpy(dtype=float)
+
+    level = np.full(len(matrix), np.nan)
+    trend = np.zeros(len(matrix))
+    errors = np.zeros(len(matrix))
+    steps = np.zeros(len(matrix))
+
+    for column in range(values.shape[1]):
+        observed = values[:, column]
+        present = ~np.isnan(observed)
+
+        first = present & np.isnan(level)
+        level[first] = observed[first]
+
+        update = present & ~first
+        forecast = level + trend
+        errors[update] += (observed[update] - forecast[update]) ** 2
+        steps[update] += 1
+
+        new_level = HOLT_ALPHA * observed + (1 - HOLT_ALPHA) * forecast
+        new_trend = HOLT_BETA * (new_level - level) + (1 - HOLT_BETA) * trend
+        level = np.where(update, new_level, level)
+        trend = np.where(update, new_trend, trend)
+
+    params = pd.DataFrame(index=matrix.index)
+    params['level'] = level
+    params['trend'] = trend
+    params['sigma'] = np.sqrt(errors / np.maximum(steps, 1))
+    return params
+
+
+def fit_models(yearly: pd.DataFrame, metric: str, model: str = 'auto') -> pd.DataFrame:
+    """Fit a trend model for `metric` to every area's yearly series in one batch"""
+    if model != 'auto' and model not in FORECAST_MODELS:
+        raise ValueError(f"Unknown forecast model '{model}'. Use auto or one of: {', '.join(FORECAST_MODELS)}")
+
+    frame = yearly[['area', 'year', metric]].dropna()
+    if frame.empty:
+        return pd.DataFrame(columns=PARAM_COLUMNS)
+
+    frame = frame.sort_values(['area', 'year']).reset_index(drop=True)
+    frame['x'] = frame['year'] - frame['year'].min()
+    frame['log_value'] = np.log(frame[metric].clip(lower=1e-9))
+    base_year = frame['year'].min()
+
+    last = frame.groupby('area', sort=True).agg(last_year=('year', 'last'), last_value=(metric, 'last'))
+
+    candidates = {}
+    linear = _fit_regression(frame, metric)
+    linear_pred = frame['area'].map(linear['intercept']) + frame['area'].map(linear['slope']) * frame['x']
+    linear['sigma'] = _residual_sigma(frame, linear_pred, metric, linear)
+    candidates['linear'] = linear
+
+    log_linear = _fit_regression(frame, 'log_value')
+    log_pred = frame['area'].map(log_linear['intercept']) + frame['area'].map(log_linear['slope']) * frame['x']
+    # Band width is kept in log space; compare models on original-scale error
+    log_linear['sigma'] = _residual_sigma(frame, log_pred, 'log_value', log_linear)
+    log_linear['rmse'] = _residual_sigma(frame, np.exp(log_pred), metric, log_linear)
+    candidates['log_linear'] = log_linear
+
+    holt = _fit_holt(frame, metric)
+    holt = holt.join(linear[['n', 'x_mean', 'sxx']])
+    candidates['holt'] = holt
+
+    if model == 'auto':
+        # Pick the model with the smallest in-sample error for each area
+        errors = pd.DataFrame({
+            'linear': linear['sigma'],
+            'log_linear': log_linear['rmse'],
+            'holt': holt['sigma'],
+        }).fillna(np.inf)
+        # Holt needs a few points before its one-step errors mean anything
+        errors.loc[linear['n'] < 4, 'holt'] = np.inf
+        chosen = errors.idxmin(axis=1)
+    else:
+        chosen = pd.Series(model, index=linear.index)
+
+    params = []
+    for name, fitted in candidates.items():
+        areas = chosen.index[chosen == name]
+        if len(areas) == 0:
+            continue
+        part = fitted.loc[areas].reindex(columns=PARAM_COLUMNS[2:-2])
+        part['model'] = name
+        params.append(part)
+
+    params = pd.concat(params).join(last)
+    params['base_year'] = base_year
+    params.index.name = 'area'
+    return params.reset_index().sort_values('area').reset_index(drop=True)
+
+
+def forecast(params: pd.DataFrame, horizon: int = DEFAULT_HORIZON) -> pd.DataFrame:
+    """Project fitted models `horizon` years ahead with confidence bands"""
+    horizon = max(1, min(int(horizon), MAX_HORIZON))
+    if params.empty:
+        return pd.DataFrame(columns=['area', 'year', 'model', 'value', 'lower', 'upper'])
+
+    steps = np.arange(1, horizon + 1)
+    rows = params.loc[params.index.repeat(horizon)].reset_index(drop=True)
+    rows['step'] = np.tile(steps, len(params))
+    rows['year'] = rows['last_year'] + rows['step']
+    x = rows['year'] - rows['base_year']
+
+    # Prediction-interval widening for regressions
+    n = rows['n'].astype(float)
+    leverage = np.sqrt(1 + 1 / n + (x - rows['x_mean']) ** 2 / rows['sxx'].where(rows['sxx'] > 0))
+    leverage = leverage.fillna(1.0)
+
+    value = pd.Series(np.nan, index=rows.index)
+    lower = pd.Series(np.nan, index=rows.index)
+    upper = pd.Series(np.nan, index=rows.index)
+
+    is_linear = rows['model'] == 'linear'
+    centre = rows['intercept'] + rows['slope'] * x
+    width = CONFIDENCE_Z * rows['sigma'] * leverage
+    value[is_linear] = centre[is_linear]
+    lower[is_linear] = (centre - width)[is_linear]
+    upper[is_linear] = (centre + width)[is_linear]
+
+    is_log = rows['model'] == 'log_linear'
+    value[is_log] = np.exp(centre[is_log])
+    lower[is_log] = np.exp((centre - width)[is_log])
+    upper[is_log] = np.exp((centre + width)[is_log])
+
+    is_holt = rows['model'] == 'holt'
+    centre = rows['level'] + rows['step'] * rows['trend']
+    width = CONFIDENCE_Z * rows['sigma'] * np.sqrt(rows['step'])
+    value[is_holt] = centre[is_holt]
+    lower[is_holt] = (centre - width)[is_holt]
+    upper[is_holt] = (centre + width)[is_holt]
+
+    result = pd.DataFrame({
+        'area': rows['area'],
+        'year': rows['year'].astype(int),
+        'model': rows['model'],
+        'value': value,
+        'lower': lower.clip(lower=0),
+        'upper': upper,
+    })
+    return result
+
+
+def forecast_records(frames: Dict[str, pd.DataFrame], areas: List[str]) -> Dict:
+    """Shape per-metric forecast frames into {area: [{year, price, price_lower, ...}]}"""
+    result = {}
+    for metric, frame in frames.items():
+        subset = frame[frame['area'].isin(areas)]
+        for row in subset.itertuples(index=False):
+            points = result.setdefault(row.area, {})
+            point = points.setdefault(row.year, {'year': row.year})
+            point[metric] = round(float(row.value), 2)
+            point[f'{metric}_lower'] = round(float(row.lower), 2)
+            point[f'{metric}_upper'] = round(float(row.upper), 2)
+            point[f'{metric}_model'] = row.model
+
+    return {area: [points[year] for year in sorted(points)] for area, points in result.items()}
@@ -0,0 +1,128 @@
+import gc
+import os
+import threading
+import time
+from django.conf import settings
+
+STARTING = 'starting'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class LazyDataProcessor:
+    """Process-wide DataProcessor that is built on first use or by warm_up(), not at import time.
+
+    Importing this module pulls in neither pandas nor the dataset, so management
+    commands (migrate, collectstatic) and URL loading stay fast. Attribute access
+    and assignment are forwarded to the real processor, building it if needed.
+    """
+
+    def __init__(self):
+        object.__setattr__(self, '_instance', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+        object.__setattr__(self, '_state', STARTING)
+        object.__setattr__(self, '_error', None)
+        object.__setattr__(self, '_load_seconds', None)
+
+    @property
+    def state(self) -> str:
+        return self._state
+
+    @property
+    def is_ready(self) -> bool:
+        return self._state == READY
+
+    @property
+    def error(self):
+        return self._error
+
+    @property
+    def load_seconds(self):
+        return self._load_seconds
+
+    def _get(self):
+        instance = self._instance
+        if instance is not None:
+            return instance
+
+        with self._lock:
+            if self._instance is None:
+                object.__setattr__(self, '_state', LOADING)
+                started = time.perf_counter()
+                try:
+                    # Deferred: pulls in pandas, numpy and the sample workbook
+                    from .data_processor import DataProcessor
+                    instance = DataProcessor()
+                except Exception as e:
+                    object.__setattr__(self, '_state', FAILED)
+                    object.__setattr__(self, '_error', str(e))
+                    raise
+                object.__setattr__(self, '_load_seconds', time.perf_counter() - started)
+                object.__setattr__(self, '_instance', instance)
+                object.__setattr__(self, '_error', None)
+                object.__setattr__(self, '_state', READY)
+                print(f"✅ Data processor ready in {self._load_seconds:.2f}s")
+            return self._instance
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._get(), name, value)
+
+    def warm_up(self, background: bool = False):
+        """Build the processor now, or on a daemon thread so the worker can answer health checks meanwhile"""
+        if not background:
+            self._get()
+            return None
+        if self._state in (LOADING, READY):
+            return None
+
+        def run():
+            try:
+                self._get()
+            except Exception as e:
+                print(f"❌ Data processor warm-up failed: {e}")
+
+        thread = threading.Thread(target=run, name='data-processor-warmup', daemon=True)
+        thread.start()
+        return thread
+
+    def prepare_for_fork(self):
+        """Load and compact the dataset in a preloading master, then freeze the GC before workers fork.
+
+        gc.freeze() moves every object alive now into a permanent generation, so
+        collections in the workers never write to (and un-share) those pages.
+        """
+        from .querylog import cache_warmer
+        instance = self._get()
+        # A warm-up started by the load would only fill caches the compaction throws away
+        cache_warmer.wait()
+        instance.compact_for_sharing()
+        # Replay popular questions now so every worker inherits the filled caches
+        cache_warmer.warm(instance, background=False)
+        gc.collect()
+        gc.freeze()
+        print(f"🧊 Froze {gc.get_freeze_count():,} objects for copy-on-write sharing")
+
+    def _after_fork_in_child(self):
+        # A warm-up thread does not survive fork; let the child start over instead of waiting on its lock
+        object.__setattr__(self, '_lock', threading.Lock())
+        if self._instance is None:
+            object.__setattr__(self, '_state', STARTING)
+
+
+data_processor = LazyDataProcessor()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=data_processor._after_fork_in_child)
+
+
+def warm_up_on_start():
+    """Called from the WSGI/ASGI entry points; DATA_WARMUP is background, eager or lazy"""
+    mode = getattr(settings, 'DATA_WARMUP', 'background')
+    if mode == 'eager':
+        data_processor.warm_up()
+    elif mode == 'background':
+        data_processor.warm_up(background=True)
@@ -0,0 +1,96 @@
+import argparse
+import os
+import time
+from typing import Dict, List, Optional
+
+# /proc/<pid>/smaps_rollup fields we report, in kB
+SMAPS_FIELDS = {
+    'Rss': 'rss',
+    'Pss': 'pss',
+    'Shared_Clean': 'shared_clean',
+    'Shared_Dirty': 'shared_dirty',
+    'Private_Clean': 'private_clean',
+    'Private_Dirty': 'private_dirty',
+}
+
+
+def read_smaps_rollup(pid: int) -> Optional[Dict[str, float]]:
+    """Shared vs private memory of a process in MB (Linux only; None elsewhere or if it exited)"""
+    totals = {name: 0 for name in SMAPS_FIELDS.values()}
+    for filename in ('smaps_rollup', 'smaps'):
+        try:
+            with open(f'/proc/{pid}/{filename}') as f:
+                for line in f:
+                    key, _, rest = line.partition(':')
+                    if key in SMAPS_FIELDS:
+                        totals[SMAPS_FIELDS[key]] += int(rest.split()[0])
+            break
+        except (OSError, ValueError, IndexError):
+            continue
+    else:
+        return None
+
+    report = {name: round(kb / 1024, 1) for name, kb in totals.items()}
+    report['shared'] = round(report['shared_clean'] + report['shared_dirty'], 1)
+    report['private'] = round(report['private_clean'] + report['private_dirty'], 1)
+    return report
+
+
+def child_pids(pid: int) -> List[int]:
+    """Direct children of a process, e.g. the workers of a gunicorn master"""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def worker_memory_report(master_pid: int) -> Dict:
+    """Shared/private breakdown for a master and each of its workers"""
+    workers = {}
+    for pid in child_pids(master_pid):
+        usage = read_smaps_rollup(pid)
+        if usage is not None:
+            workers[pid] = usage
+
+    return {
+        'master': read_smaps_rollup(master_pid),
+        'workers': workers,
+        # What the fleet really costs: unique pages per worker plus one copy of the shared ones
+        'total_private': round(sum(w['private'] for w in workers.values()), 1),
+        'total_pss': round(sum(w['pss'] for w in workers.values()), 1),
+    }
+
+
+def format_report(report: Dict) -> str:
+    lines = [f"{'pid':>8} {'rss':>9} {'pss':>9} {'shared':>9} {'private':>9}  (MB)"]
+    rows = [('master', report['master'])] + sorted(report['workers'].items())
+    for pid, usage in rows:
+        if usage is None:
+            continue
+        lines.append(f"{pid:>8} {usage['rss']:>9.1f} {usage['pss']:>9.1f} "
+                     f"{usage['shared']:>9.1f} {usage['private']:>9.1f}")
+    lines.append(f"workers: {report['total_private']:.1f} MB private, {report['total_pss']:.1f} MB PSS in total")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report shared vs private memory for gunicorn workers')
+    parser.add_argument('pid', type=int, nargs='?', help='gunicorn master pid (defaults to $GUNICORN_PID)')
+    parser.add_argument('--watch', type=float, default=0, help='repeat every N seconds')
+    args = parser.parse_args()
+
+    pid = args.pid or int(os.environ.get('GUNICORN_PID', 0))
+    if not pid:
+        parser.error('pass the gunicorn master pid')
+
+    while True:
+        print(format_report(worker_memory_report(pid)))
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+AGGREGATIONS = ('mean', 'sum', 'weighted_mean')
+
+METRIC_NAME = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+
+class Metric:
+    """A numeric dataset column the engine aggregates per (area, year), charts and summarises.
+
+    `aggregation` says how rows of one area and year combine: a plain mean, a
+    sum (counts such as units sold), or a mean weighted by another column
+    (`weight`, e.g. a rate weighted by units sold). `sources` are workbook
+    headers (lower-case) loaded into this column; `keywords` are phrases that
+    ask for it in a question.
+    """
+
+    __slots__ = ('name', 'label', 'aggregation', 'weight', 'sources', 'keywords', 'unit')
+
+    def __init__(self, name: str, label: str, aggregation: str = 'mean', weight: Optional[str] = None,
+                 sources: Sequence[str] = (), keywords: Sequence[str] = (), unit: str = ''):
+        if not METRIC_NAME.match(name):
+            raise ValueError(f"Metric name must be a lower-case identifier: {name!r}")
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"aggregation must be one of: {', '.join(AGGREGATIONS)}")
+        if aggregation == 'weighted_mean' and not weight:
+            raise ValueError(f"Metric {name!r} needs a weight column for weighted_mean")
+        self.name = name
+        self.label = label
+        self.aggregation = aggregation
+        self.weight = weight
+        self.sources = tuple(source.lower() for source in sources)
+        self.keywords = tuple(keyword.lower() for keyword in keywords)
+        self.unit = unit
+
+    @property
+    def columns(self) -> List[str]:
+        return [self.name] + ([self.weight] if self.weight else [])
+
+    def format(self, value: float) -> str:
+        if self.unit == '₹':
+            return f"₹{value:,.0f}"
+        return f"{value:,.1f}{self.unit}"
+
+    def to_dict(self) -> Dict:
+        return {'name': self.name, 'label': self.label, 'aggregation': self.aggregation, 'weight': self.weight}
+
+
+# price and demand are always present; the rest are loaded when the workbook has them (the IGR export does)
+DEFAULT_METRICS = [
+    Metric('price', 'Price', sources=('flat - weighted average rate', 'cost', 'amount', 'value', 'rate'), unit='₹'),
+    Metric('demand', 'Demand', sources=('total sold - igr', 'demand_score', 'demand_index', 'popularity'),
+           unit='/10'),
+    Metric('total_sold', 'Units Sold', 'sum', sources=('total sold - igr',),
+           keywords=('units sold', 'total sold', 'sold units')),
+    Metric('total_sales', 'Sales Value', 'sum', sources=('total_sales - igr',),
+           keywords=('sales value', 'total sales', 'turnover'), unit='₹'),
+    Metric('flat_sold', 'Flats Sold', 'sum', sources=('flat_sold - igr',), keywords=('flats sold', 'flat sales')),
+    Metric('residential_sold', 'Residential Sold', 'sum', sources=('residential_sold - igr',),
+           keywords=('residential',)),
+    Metric('office_sold', 'Offices Sold', 'sum', sources=('office_sold - igr',), keywords=('offices sold',)),
+    Metric('shop_sold', 'Shops Sold', 'sum', sources=('shop_sold - igr',), keywords=('shops sold',)),
+    Metric('commercial_sold', 'Commercial Sold', 'sum', sources=('commercial_sold - igr',),
+           keywords=('commercial',)),
+    Metric('flat_rate', 'Flat Rate', 'weighted_mean', weight='flat_sold',
+           sources=('flat - weighted average rate',), keywords=('flat rate',), unit='₹'),
+    Metric('office_rate', 'Office Rate', 'weighted_mean', weight='office_sold',
+           sources=('office - weighted average rate',), keywords=('office rate', 'office price'), unit='₹'),
+    Metric('shop_rate', 'Shop Rate', 'weighted_mean', weight='shop_sold',
+           sources=('shop - weighted average rate',), keywords=('shop rate', 'shop price'), unit='₹'),
+    Metric('total_units', 'Units Supplied', 'sum', sources=('total units',),
+           keywords=('total units', 'units supplied', 'supply')),
+    Metric('carpet_area', 'Carpet Area Supplied', 'sum', sources=('total carpet area supplied (sqft)',),
+           keywords=('carpet area',), unit=' sqft'),
+]
+
+CORE_METRICS = ('price', 'demand')
+
+
+class MetricRegistry:
+    """Every metric the engine knows, in declaration order"""
+
+    def __init__(self, metrics: Iterable[Metric] = ()):
+        self._metrics: Dict[str, Metric] = {}
+        for metric in metrics:
+            self.register(metric)
+
+    @classmethod
+    def from_settings(cls, custom: Iterable[Dict] = ()) -> 'MetricRegistry':
+        """Defaults plus CUSTOM_METRICS entries from settings ({"name", "label", "aggregation", "weight", "sources"...})"""
+        registry = cls(DEFAULT_METRICS)
+        for options in custom:
+            registry.register(Metric(**options))
+        return registry
+
+    def register(self, metric: Metric):
+        if metric.name in ('year', 'area'):
+            raise ValueError(f"{metric.name!r} is a key column, not a metric")
+        self._metrics[metric.name] = metric
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._metrics
+
+    def __iter__(self):
+        return iter(self._metrics.values())
+
+    def get(self, name: str) -> Metric:
+        try:
+            return self._metrics[name]
+        except KeyError:
+            raise ValueError(f"Unknown metric: {name!r}")
+
+    def resolve(self, names: Iterable[str]) -> List[Metric]:
+        return [self.get(name) for name in dict.fromkeys(names)]
+
+    def available(self, columns: Iterable[str]) -> List[Metric]:
+        """Metrics whose columns (and weight column) are all in a dataset"""
+        columns = set(columns)
+        return [metric for metric in self if set(metric.columns) <= columns]
+
+    def source_columns(self, columns: Iterable[str]) -> Dict[str, str]:
+        """Workbook header -> metric column for the extra (non-core) metrics a workbook provides"""
+        columns = list(columns)
+        mapping = {}
+        for metric in self:
+            if metric.name in CORE_METRICS or metric.name in columns:
+                continue
+            source = next((source for source in metric.sources if source in columns), None)
+            if source is not None:
+                mapping.setdefault(metric.name, source)
+        return mapping
+
+    def mentioned(self, text: str) -> List[str]:
+        """Names of the extra metrics a question asks for by keyword"""
+        return [metric.name for metric in self
+                if metric.name not in CORE_METRICS and any(keyword in text for keyword in metric.keywords)]
+
+
+def group_metrics(frame: pd.DataFrame, metrics: Sequence[Metric], by: List[str]) -> pd.DataFrame:
+    """Aggregate every metric per `by` group in one groupby pass (weighted means as two sums)"""
+    named = {}
+    helpers = {}
+    for metric in metrics:
+        if metric.aggregation == 'weighted_mean':
+            values, weights = frame[metric.name], frame[metric.weight]
+            valid = values.notna() & weights.notna()
+            helpers[f'__{metric.name}_wx'] = (values * weights).where(valid)
+            helpers[f'__{metric.name}_w'] = weights.where(valid)
+            named[f'__{metric.name}_wx'] = (f'__{metric.name}_wx', 'sum')
+            named[f'__{metric.name}_w'] = (f'__{metric.name}_w', 'sum')
+        else:
+            named[metric.name] = (metric.name, metric.aggregation)
+
+    plain = [metric.name for metric in metrics if metric.aggregation != 'weighted_mean']
+    work = frame[by + plain]
+    if helpers:
+        work = work.assign(**helpers)
+    grouped = work.groupby(by, observed=True).agg(**named)
+
+    for metric in metrics:
+        if metric.aggregation == 'weighted_mean':
+            weight = grouped.pop(f'__{metric.name}_w')
+            grouped[metric.name] = grouped.pop(f'__{metric.name}_wx') / weight.replace(0, np.nan)
+    return grouped[[metric.name for metric in metrics]].reset_index()
+
+
+def partial_sums(frame: pd.DataFrame, metrics: Sequence[Metric], by: List[str]) -> pd.DataFrame:
+    """Per-group `{metric}_sum` and `{metric}_count` columns plus `records`, which add up across partitions.
+
+    For a weighted mean the sum is of value x weight and the count is the
+    weight, so merge_partials() gives the same figures as group_metrics()
+    over all the rows, however they were split.
+    """
+    work = {column: frame[column] for column in by}
+    for metric in metrics:
+        values = frame[metric.name]
+        if metric.aggregation == 'weighted_mean':
+            weights = frame[metric.weight]
+            valid = values.notna() & weights.notna()
+            work[f'{metric.name}_sum'] = (values * weights).where(valid, 0)
+            work[f'{metric.name}_count'] = weights.where(valid, 0)
+        else:
+            work[f'{metric.name}_sum'] = values.fillna(0)
+            work[f'{metric.name}_count'] = values.notna().astype('int64')
+    work['records'] = np.ones(len(frame), dtype='int64')
+    return pd.DataFrame(work).groupby(by, sort=True, observed=True).sum().reset_index()
+
+
+def merge_partials(partials: pd.DataFrame, metrics: Sequence[Metric], by: List[str]) -> pd.DataFrame:
+    """Add up partial_sums() rows from several partitions and turn each metric back into its value"""
+    merged = partials.fillna(0).groupby(by, sort=True, observed=True).sum(numeric_only=True).reset_index()
+    for metric in metrics:
+        total, count = merged.pop(f'{metric.name}_sum'), merged.pop(f'{metric.name}_count')
+        merged[metric.name] = total if metric.aggregation == 'sum' else total / count.replace(0, np.nan)
+    return merged
+
+
+def metric_names(metric) -> List[str]:
+    """Metric names from a query's metric: 'both', one name or a list of names"""
+    if metric == 'both':
+        return list(CORE_METRICS)
+    if isinstance(metric, str):
+        return [metric]
+    return list(metric)
+
+
+def sql_expressions(metrics: Sequence[Metric]) -> List[str]:
+    """SELECT expressions computing each metric per group, matching group_metrics"""
+    expressions = []
+    for metric in metrics:
+        if metric.aggregation == 'weighted_mean':
+            value, weight = f'"{metric.name}"', f'"{metric.weight}"'
+            expressions.append(
+                f'sum({value} * {weight}) / nullif(sum(CASE WHEN {value} IS NOT NULL THEN {weight} END), 0) '
+                f'AS "{metric.name}"'
+            )
+        else:
+            function = 'avg' if metric.aggregation == 'mean' else 'sum'
+            expressions.append(f'{function}("{metric.name}") AS "{metric.name}"')
+    return expressions
+
+
+def growth_table(grouped: pd.DataFrame, metrics: Sequence[Metric], order: str = 'year') -> Tuple[pd.DataFrame, pd.Series]:
+    """Per-area growth (first to last reported period, %) and average of each metric, plus each area's period count"""
+    names = [metric.name for metric in metrics]
+    by_area = grouped.sort_values(['area', order], kind='stable').groupby('area', sort=False, observed=True)
+    # first()/last() skip missing values, so a metric a workbook lacks for some years still gets a growth figure
+    first = by_area[names].first()
+    last = by_area[names].last()
+    table = pd.DataFrame(index=first.index)
+    for name in names:
+        table[f'{name}_growth'] = ((last[name] - first[name]) / first[name] * 100).round(2)
+    for name in names:
+        table[f'avg_{name}'] = by_area[name].mean().round(2)
+    return table, by_area.size()
+
+
+registry = MetricRegistry.from_settings(getattr(settings, 'CUSTOM_METRICS', []))
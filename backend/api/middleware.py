@@ -0,0 +1,161 @@
+import re
+import time
+from django.conf import settings
+from django.http import JsonResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from .admission import Overloaded, admission
+from .telemetry import telemetry
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+re_accepts_brotli = re.compile(r'\bbr\b')
+
+# Already-compressed formats (xlsx is a zip archive); compressing them again only costs CPU. Arrow streams
+# compress their own buffers when asked (?compression=lz4|zstd) and are read straight from the body
+INCOMPRESSIBLE_TYPES = ('application/vnd.openxmlformats', 'application/zip', 'application/gzip', 'image/',
+                        'application/vnd.apache.arrow')
+
+# Server-sent events must reach the client event by event, not whenever the compressor fills a block
+UNBUFFERED_TYPES = ('text/event-stream',)
+
+# Fast settings suit per-request compression; 11 is for static assets
+BROTLI_QUALITY = 5
+
+
+class TelemetryMiddleware:
+    """Record end-to-end request time per endpoint and response serialization time"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not telemetry.enabled:
+            return self.get_response(request)
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.url_name if match and match.url_name else 'other'
+        telemetry.observe('request_duration_seconds', time.perf_counter() - started, endpoint=endpoint)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that rendering
+        if telemetry.enabled:
+            started = time.perf_counter()
+
+            def record(rendered):
+                telemetry.observe('stage_duration_seconds', time.perf_counter() - started, stage='serialize')
+
+            response.add_post_render_callback(record)
+        return response
+
+
+class AdmissionMiddleware:
+    """Send expensive endpoints through their admission gate (ADMISSION_ENDPOINTS); shed excess load with 429.
+
+    Endpoints without a gate never wait here, which keeps health checks and
+    other cheap reads answering while uploads and exports are saturated.
+    Streamed responses hold their slot until the last chunk is sent.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            self._release(request)
+            raise
+
+        ticket = getattr(request, '_admission_ticket', None)
+        if ticket is not None and response.streaming:
+            response.streaming_content = self._release_after(response.streaming_content, request)
+        else:
+            self._release(request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method == 'OPTIONS':
+            return None
+        gate = admission.for_endpoint(request.resolver_match.url_name)
+        if gate is None:
+            return None
+        try:
+            request._admission_ticket = (gate, gate.acquire())
+        except Overloaded as e:
+            response = JsonResponse({'error': str(e)}, status=429)
+            response['Retry-After'] = str(e.retry_after)
+            return response
+        return None
+
+    @staticmethod
+    def _release(request):
+        ticket = getattr(request, '_admission_ticket', None)
+        if ticket is not None:
+            request._admission_ticket = None
+            gate, acquired_at = ticket
+            gate.release(acquired_at)
+
+    def _release_after(self, chunks, request):
+        try:
+            yield from chunks
+        finally:
+            self._release(request)
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Brotli or gzip for responses of at least COMPRESSION_MIN_BYTES, streamed ones included.
+
+    Brotli is used when the client accepts it and the optional `brotli` package is
+    installed; otherwise Django's gzip handling applies.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.min_bytes = getattr(settings, 'COMPRESSION_MIN_BYTES', 1024)
+
+    def process_response(self, request, response):
+        if response.has_header('Content-Encoding'):
+            return response
+        if response.get('Content-Type', '').startswith(INCOMPRESSIBLE_TYPES + UNBUFFERED_TYPES):
+            return response
+        if not response.streaming and len(response.content) < self.min_bytes:
+            return response
+
+        accepts = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is None or not re_accepts_brotli.search(accepts) or getattr(response, 'is_async', False):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if response.streaming:
+            response.streaming_content = self._brotli_sequence(response.streaming_content)
+            del response.headers['Content-Length']
+        else:
+            compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+    @staticmethod
+    def _brotli_sequence(chunks):
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        for chunk in chunks:
+            # Flush per chunk so a streamed export reaches the client as it is produced
+            data = compressor.process(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Dataset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(max_length=32, unique=True)),
+                ('rows', models.PositiveIntegerField()),
+                ('columns', models.JSONField()),
+                ('dtypes', models.JSONField()),
+                ('areas', models.JSONField()),
+                ('is_active', models.BooleanField(db_index=True, default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='AreaYearAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('area', models.CharField(max_length=255)),
+                ('year', models.FloatField()),
+                ('price', models.FloatField()),
+                ('demand', models.FloatField()),
+                ('records', models.PositiveIntegerField()),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='aggregates', to='api.dataset')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='DatasetRow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_id', models.PositiveIntegerField()),
+                ('year', models.FloatField()),
+                ('area', models.CharField(max_length=255)),
+                ('price', models.FloatField()),
+                ('demand', models.FloatField()),
+                ('extra', models.JSONField(null=True)),
+                ('dataset', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='row_set', to='api.dataset')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dataset', 'area', 'year'], name='api_row_area_year')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='datasetrow',
+            constraint=models.UniqueConstraint(fields=('dataset', 'row_id'), name='api_row_order'),
+        ),
+        migrations.AddIndex(
+            model_name='areayearaggregate',
+            index=models.Index(fields=['dataset', 'area', 'year'], name='api_aggregate_area_year'),
+        ),
+    ]
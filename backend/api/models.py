@@ -0,0 +1,51 @@
+from django.db import models
+
+
+class Dataset(models.Model):
+    """One cleaned, uploaded dataset persisted by the database backend; one is active at a time"""
+    fingerprint = models.CharField(max_length=32, unique=True)
+    rows = models.PositiveIntegerField()
+    # Layout of the cleaned frame, so rows come back with the same columns and dtypes
+    columns = models.JSONField()
+    dtypes = models.JSONField()
+    areas = models.JSONField()
+    is_active = models.BooleanField(default=False, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.fingerprint} ({self.rows} rows{', active' if self.is_active else ''})"
+
+
+class DatasetRow(models.Model):
+    """One cleaned workbook row; columns beyond year/area/price/demand go in `extra`"""
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='row_set')
+    row_id = models.PositiveIntegerField()
+    year = models.FloatField()
+    area = models.CharField(max_length=255)
+    price = models.FloatField()
+    demand = models.FloatField()
+    extra = models.JSONField(null=True)
+
+    class Meta:
+        indexes = [
+            # Area + year range scans for queries and downloads
+            models.Index(fields=['dataset', 'area', 'year'], name='api_row_area_year'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['dataset', 'row_id'], name='api_row_order'),
+        ]
+
+
+class AreaYearAggregate(models.Model):
+    """Per-(area, year) means and record counts, computed once when a dataset is stored"""
+    dataset = models.ForeignKey(Dataset, on_delete=models.CASCADE, related_name='aggregates')
+    area = models.CharField(max_length=255)
+    year = models.FloatField()
+    price = models.FloatField()
+    demand = models.FloatField()
+    records = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['dataset', 'area', 'year'], name='api_aggregate_area_year'),
+        ]
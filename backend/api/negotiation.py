@@ -0,0 +1,24 @@
+from rest_framework.negotiation import DefaultContentNegotiation
+
+# Kept apart from arrow.py: DRF imports the negotiation class while the URLs load, before pyarrow is needed
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+
+
+def accepts_arrow(request) -> bool:
+    """True when the client asks for an Arrow IPC stream (?format=arrow or Accept: application/vnd.apache.arrow.stream)"""
+    return (request.GET.get('format', '').lower() == 'arrow'
+            or ARROW_STREAM in request.META.get('HTTP_ACCEPT', ''))
+
+
+class ArrowNegotiation(DefaultContentNegotiation):
+    """DRF negotiation that lets Arrow requests reach the views that stream Arrow.
+
+    Only JSON is a DRF renderer, so an Accept of the Arrow media type would be
+    refused with a 406 before the view runs. Such requests are rendered as
+    JSON instead: the view answers with the stream, and its errors stay JSON.
+    """
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        if ARROW_STREAM in request.META.get('HTTP_ACCEPT', ''):
+            return renderers[0], renderers[0].media_type
+        return super().select_renderer(request, renderers, format_suffix)
@@ -0,0 +1,151 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+import pandas as pd
+from django.conf import settings
+from .offload_tasks import TASKS, free_frame, pack_frame, run_task, unpack_frame
+from .telemetry import telemetry
+
+
+class OffloadBusy(Exception):
+    """The offload queue is full; callers should answer 503 with Retry-After"""
+
+    def __init__(self, retry_after: int,
+                 message: str = 'Server is busy processing other large requests. Please retry shortly.'):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class OffloadTimeout(OffloadBusy):
+    """A task outlived task_timeout; it keeps its queue slot until the pool process finishes it"""
+
+
+class ProcessOffloader:
+    """Runs CPU-heavy pandas/openpyxl work in a process pool so it does not hold the worker's GIL.
+
+    Frames travel through shared memory (see offload_tasks.pack_frame) rather
+    than being pickled. Work below `min_rows` (or `min_bytes` for files) runs
+    inline, where a round trip would cost more than it saves. At most `max_queue`
+    tasks are in flight; further callers wait up to `queue_timeout` seconds and
+    then get OffloadBusy. The pool starts on first use, after any fork.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 8, queue_timeout: float = 5.0,
+                 task_timeout: float = 120.0, min_rows: int = 100_000, min_bytes: int = 2_000_000):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.task_timeout = task_timeout
+        self.min_rows = min_rows
+        self.min_bytes = min_bytes
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(max_queue, 1))
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Forking a threaded web worker is unsafe; start pool processes fresh
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                print(f"⚙️ Started offload pool with {self.workers} processes")
+            return self._executor
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _after_fork_in_child(self):
+        # The parent's pool belongs to the parent; a forked child starts its own on demand
+        self._executor = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(self.max_queue, 1))
+
+    def run(self, task: str, size: int, frame: Optional[pd.DataFrame] = None, *args, threshold: Optional[int] = None):
+        """Run `task` in the pool when `size` reaches the threshold, otherwise inline"""
+        threshold = self.min_rows if threshold is None else threshold
+        if not self.enabled or size < threshold:
+            telemetry.inc('offload_tasks_total', task=task, mode='inline')
+            return TASKS[task](*((frame,) + args if frame is not None else args))
+
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            telemetry.inc('offload_tasks_total', task=task, mode='rejected')
+            raise OffloadBusy(retry_after=max(int(self.queue_timeout), 1))
+
+        spec = None
+        future = None
+        abandoned = False
+        try:
+            with telemetry.span(f'offload.{task}'):
+                spec = pack_frame(frame) if frame is not None else None
+                future = self._get_executor().submit(run_task, task, spec, args)
+                kind, result = future.result(timeout=self.task_timeout)
+            telemetry.inc('offload_tasks_total', task=task, mode='process')
+        except FutureTimeout:
+            telemetry.inc('offload_tasks_total', task=task, mode='timeout')
+            print(f"⚠️ Offload task {task} passed {self.task_timeout}s; giving up on it")
+            abandoned = True
+            future.cancel()
+            raise OffloadTimeout(max(int(self.queue_timeout), 1),
+                                 'The request took too long to process. Please retry shortly.')
+        except BrokenProcessPool:
+            # A pool process died (e.g. OOM); rebuild the pool next time and do this one inline
+            print(f"⚠️ Offload pool broke during {task}; running inline")
+            self.shutdown()
+            telemetry.inc('offload_tasks_total', task=task, mode='inline')
+            return TASKS[task](*((frame,) + args if frame is not None else args))
+        finally:
+            if abandoned:
+                # The pool process may still attach to the input and publish a result: keep the slot
+                # (so max_queue bounds the work really in flight) and both blocks until it is done
+                future.add_done_callback(lambda done: self._settle_abandoned(done, spec))
+            else:
+                free_frame(spec)
+                self._slots.release()
+
+        if kind == 'frame':
+            return unpack_frame(result, unlink=True)
+        return result
+
+    def _settle_abandoned(self, future, spec: Optional[Dict]):
+        """Done callback of a timed-out task: free its input block, any frame it returned, and its slot"""
+        try:
+            free_frame(spec)
+            if not future.cancelled() and future.exception() is None:
+                kind, result = future.result()
+                if kind == 'frame':
+                    free_frame(result)
+        finally:
+            self._slots.release()
+
+    def frame_to_xlsx(self, df: pd.DataFrame) -> bytes:
+        return self.run('frame_to_xlsx', len(df), df)
+
+    def read_workbook(self, path: str) -> pd.DataFrame:
+        return self.run('read_workbook', os.path.getsize(path), None, path, threshold=self.min_bytes)
+
+    def yearly_means(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.run('yearly_means', len(df), df[['area', 'year', 'price', 'demand']])
+
+
+offloader = ProcessOffloader(
+    workers=getattr(settings, 'OFFLOAD_WORKERS', 2),
+    max_queue=getattr(settings, 'OFFLOAD_MAX_QUEUE', 8),
+    queue_timeout=getattr(settings, 'OFFLOAD_QUEUE_TIMEOUT', 5.0),
+    task_timeout=getattr(settings, 'OFFLOAD_TASK_TIMEOUT', 120.0),
+    min_rows=getattr(settings, 'OFFLOAD_MIN_ROWS', 100_000),
+    min_bytes=getattr(settings, 'OFFLOAD_MIN_FILE_BYTES', 2_000_000),
+)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=offloader._after_fork_in_child)
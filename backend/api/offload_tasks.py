@@ -0,0 +1,137 @@
+"""CPU-heavy tasks that run in the offload process pool, plus the shared-memory frame transport.
+
+This module must stay importable without Django: pool processes are started
+with forkserver/spawn and only import what a task needs.
+"""
+import io
+from multiprocessing import shared_memory
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+
+# Columns stored as raw bytes; everything else is dictionary-encoded (codes + values)
+RAW_KINDS = 'biufcmM'
+ALIGNMENT = 8
+
+
+def pack_frame(df: pd.DataFrame) -> Dict:
+    """Copy a frame's columns into one shared-memory block and return a small picklable descriptor.
+
+    Numeric and datetime columns are copied byte for byte. Text and other object
+    columns are dictionary-encoded: int codes go into shared memory and only the
+    distinct values are pickled, so a million-row area column costs one small list.
+    """
+    layout = []
+    arrays = []
+    size = 0
+    for position in range(df.shape[1]):
+        series = df.iloc[:, position]
+        if isinstance(series.dtype, np.dtype) and series.dtype.kind in RAW_KINDS:
+            array = np.ascontiguousarray(series.to_numpy())
+            kind, values = 'raw', None
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            array = series.cat.codes.to_numpy()
+            kind, values = 'category', series.cat.categories.tolist()
+        else:
+            codes, uniques = pd.factorize(series.astype(object), use_na_sentinel=True)
+            array = codes
+            kind, values = 'object', list(uniques)
+
+        layout.append({'name': df.columns[position], 'kind': kind, 'dtype': array.dtype.str,
+                       'offset': size, 'values': values})
+        arrays.append(array)
+        size += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    block = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        for column, array in zip(layout, arrays):
+            target = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf, offset=column['offset'])
+            target[...] = array
+            del target
+    finally:
+        block.close()
+
+    return {'shm': block.name, 'rows': len(df), 'columns': layout}
+
+
+def unpack_frame(spec: Dict, unlink: bool = False) -> pd.DataFrame:
+    """Rebuild a frame from pack_frame's descriptor; data is copied out so the block can be freed"""
+    block = shared_memory.SharedMemory(name=spec['shm'])
+    try:
+        rows = spec['rows']
+        data = {}
+        for position, column in enumerate(spec['columns']):
+            view = np.ndarray(rows, dtype=np.dtype(column['dtype']), buffer=block.buf, offset=column['offset'])
+            array = view.copy()
+            del view
+            if column['kind'] == 'category':
+                array = pd.Categorical.from_codes(array, categories=column['values'])
+            elif column['kind'] == 'object':
+                values = np.empty(len(column['values']) + 1, dtype=object)
+                for i, value in enumerate(column['values']):
+                    values[i] = value
+                values[-1] = np.nan
+                # Code -1 (missing) indexes the trailing NaN
+                array = values[array]
+            data[position] = array
+        frame = pd.DataFrame(data, index=pd.RangeIndex(rows))
+        frame.columns = [column['name'] for column in spec['columns']]
+        return frame
+    finally:
+        block.close()
+        if unlink:
+            block.unlink()
+
+
+def free_frame(spec: Optional[Dict]):
+    """Release a shared block that will not be unpacked"""
+    if not spec:
+        return
+    try:
+        block = shared_memory.SharedMemory(name=spec['shm'])
+        block.close()
+        block.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def frame_to_xlsx(df: pd.DataFrame) -> bytes:
+    """Render a frame as an .xlsx workbook"""
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False, engine='openpyxl')
+    return buffer.getvalue()
+
+
+def read_workbook(path: str) -> pd.DataFrame:
+    """Parse the first sheet of an Excel workbook"""
+    return pd.read_excel(path)
+
+
+def yearly_means(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-(area, year) price and demand means and record counts"""
+    yearly = df.groupby(['area', 'year'], sort=True, observed=True).agg(
+        price=('price', 'mean'),
+        demand=('demand', 'mean'),
+        records=('price', 'size')
+    ).reset_index()
+    # Small per-area frame: plain strings keep later groupbys free of unobserved categories
+    yearly['area'] = yearly['area'].astype(object)
+    return yearly
+
+
+TASKS = {
+    'frame_to_xlsx': frame_to_xlsx,
+    'read_workbook': read_workbook,
+    'yearly_means': yearly_means,
+}
+
+
+def run_task(name: str, frame_spec: Optional[Dict], args: tuple):
+    """Pool entry point: attach the input frame, run the task, ship a frame result back the same way"""
+    args = tuple(args)
+    if frame_spec is not None:
+        args = (unpack_frame(frame_spec),) + args
+    result = TASKS[name](*args)
+    if isinstance(result, pd.DataFrame):
+        return 'frame', pack_frame(result)
+    return 'value', result
@@ -0,0 +1,193 @@
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from django.conf import settings
+from .telemetry import telemetry
+
+# How many functions to include in the JSON summary
+TOP_FUNCTIONS = 25
+
+PROFILE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# cProfile can only have one active profiler per process
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Another request holds the profiler; callers should answer 409"""
+
+
+def _profile_dir() -> str:
+    return str(getattr(settings, 'PROFILE_DIR', os.path.join(settings.MEDIA_ROOT, 'profiles')))
+
+
+def profiling_requested(request) -> bool:
+    """True when the caller asked for a profile with ?profile=1 or an X-Profile header"""
+    flag = request.GET.get('profile') or request.headers.get('X-Profile') or ''
+    return flag.lower() in ('1', 'true', 'yes')
+
+
+def is_profiling_authorized(request) -> bool:
+    """Profiling is only for admins holding PROFILING_TOKEN; it is off when the token is unset"""
+    token = getattr(settings, 'PROFILING_TOKEN', None)
+    if not token:
+        return False
+    supplied = request.headers.get('X-Profile-Token', '')
+    if not supplied:
+        auth = request.headers.get('Authorization', '')
+        supplied = auth[7:] if auth.startswith('Bearer ') else ''
+    return hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def _function_rows(stats: pstats.Stats, predicate=None, limit: int = TOP_FUNCTIONS) -> List[Dict]:
+    rows = []
+    for (filename, line, name), (calls, ncalls, tottime, cumtime, _) in stats.stats.items():
+        if predicate and not predicate(filename):
+            continue
+        rows.append({
+            'function': f'{os.path.basename(filename)}:{line}({name})',
+            'path': filename,
+            'calls': ncalls,
+            'total_ms': round(tottime * 1000, 3),
+            'cumulative_ms': round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda row: row['cumulative_ms'], reverse=True)
+    return rows[:limit]
+
+
+def _is_pandas(filename: str) -> bool:
+    return f'{os.sep}pandas{os.sep}' in filename
+
+
+def _is_app(filename: str) -> bool:
+    return f'{os.sep}api{os.sep}' in filename and 'site-packages' not in filename
+
+
+class RequestProfiler:
+    """Profile one request with cProfile and record its DataProcessor stage timings"""
+
+    def __init__(self, label: str, meta: Optional[Dict] = None):
+        self.label = label
+        self.meta = meta or {}
+        self.profile_id = uuid.uuid4().hex
+        self.profiler = cProfile.Profile()
+        self.stages = []
+        self.duration = 0.0
+        self.acquired = False
+
+    def __enter__(self):
+        # A second profiled request waits rather than failing inside cProfile
+        self.acquired = _profile_lock.acquire(timeout=30)
+        if not self.acquired:
+            raise ProfilerBusy('Another request is being profiled; try again shortly')
+        self._capture = telemetry.capture_stages()
+        self.stages = self._capture.__enter__()
+        self.started = time.perf_counter()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self.profiler.disable()
+            self.duration = time.perf_counter() - self.started
+            self._capture.__exit__(*exc)
+        finally:
+            _profile_lock.release()
+        return False
+
+    def summary(self) -> Dict:
+        stats = pstats.Stats(self.profiler)
+        stage_totals = {}
+        for stage, seconds in self.stages:
+            stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+
+        return {
+            'id': self.profile_id,
+            'label': self.label,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'duration_ms': round(self.duration * 1000, 3),
+            'total_calls': stats.total_calls,
+            'stages_ms': {stage: round(seconds * 1000, 3) for stage, seconds in stage_totals.items()},
+            'top_functions': _function_rows(stats),
+            'app_functions': _function_rows(stats, _is_app),
+            'pandas_operations': _function_rows(stats, _is_pandas),
+            **self.meta,
+        }
+
+    def save(self) -> Dict:
+        """Write the .prof (pstats format) and a JSON summary; return the summary"""
+        directory = _profile_dir()
+        os.makedirs(directory, exist_ok=True)
+
+        summary = self.summary()
+        self.profiler.dump_stats(os.path.join(directory, f'{self.profile_id}.prof'))
+        with open(os.path.join(directory, f'{self.profile_id}.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        prune_profiles()
+        print(f"🔬 Saved profile {self.profile_id} ({summary['duration_ms']:.1f} ms) for {self.label}")
+        return summary
+
+
+def prune_profiles(keep: Optional[int] = None):
+    """Keep only the newest PROFILE_KEEP profiles"""
+    keep = keep if keep is not None else getattr(settings, 'PROFILE_KEEP', 50)
+    directory = _profile_dir()
+    if not os.path.isdir(directory):
+        return
+    ids = [name[:-5] for name in os.listdir(directory) if name.endswith('.json')]
+    ids.sort(key=lambda pid: os.path.getmtime(os.path.join(directory, f'{pid}.json')), reverse=True)
+    for pid in ids[keep:]:
+        for ext in ('.prof', '.json'):
+            try:
+                os.remove(os.path.join(directory, pid + ext))
+            except OSError:
+                pass
+
+
+def list_profiles() -> List[Dict]:
+    """Newest-first list of stored profile summaries (without the function tables)"""
+    directory = _profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as f:
+                summary = json.load(f)
+        except (OSError, ValueError):
+            continue
+        profiles.append({key: value for key, value in summary.items()
+                         if key not in ('top_functions', 'app_functions', 'pandas_operations')})
+    profiles.sort(key=lambda p: p.get('created_at', ''), reverse=True)
+    return profiles
+
+
+def profile_path(profile_id: str, ext: str = '.prof') -> Optional[str]:
+    """Path of a stored artifact, or None for unknown / malformed ids"""
+    if not PROFILE_ID_PATTERN.match(profile_id or ''):
+        return None
+    path = os.path.join(_profile_dir(), profile_id + ext)
+    return path if os.path.exists(path) else None
+
+
+def render_text(profile_id: str, limit: int = 40) -> Optional[str]:
+    """Human-readable cumulative-time report for a stored profile"""
+    path = profile_path(profile_id)
+    if path is None:
+        return None
+    buffer = io.StringIO()
+    stats = pstats.Stats(path, stream=buffer)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return buffer.getvalue()
@@ -0,0 +1,240 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from django.conf import settings
+from .telemetry import telemetry
+
+try:
+    import fcntl
+except ImportError:  # Windows: flushes from several workers may drop a few counts
+    fcntl = None
+
+
+def canonical_query(parsed: Dict) -> str:
+    """Key that is equal for questions that parse the same way ("wakad price" / "Price of Wakad?")"""
+    return json.dumps({key: value for key, value in parsed.items() if key != 'original_query'},
+                      sort_keys=True, default=str)
+
+
+def normalize_text(query: str) -> str:
+    return re.sub(r'\s+', ' ', query.strip().lower()).rstrip('?.! ')
+
+
+class QueryLog:
+    """Frequency log of the questions users ask, used to prewarm caches after uploads and restarts.
+
+    `record()` only appends the raw question to an in-memory queue. A daemon
+    thread drains it every `flush_interval` seconds (or once `batch_size`
+    questions are waiting), parses each one off the request path, and merges
+    the counts into a small JSON file shared by all workers, keeping the
+    `max_entries` most frequent questions. Setting QUERY_LOG_PATH to an empty
+    value turns logging off.
+    """
+
+    def __init__(self, flush_interval: float = 5.0, batch_size: int = 500, max_entries: int = 500,
+                 max_pending: int = 10_000):
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_entries = max_entries
+        # Oldest questions are dropped if the writer falls behind
+        self._pending = deque(maxlen=max_pending)
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._flush_lock = threading.Lock()
+
+    @property
+    def path(self) -> Optional[str]:
+        path = getattr(settings, 'QUERY_LOG_PATH', None)
+        return str(path) if path else None
+
+    def record(self, query: str):
+        if not self.path:
+            return
+        self._pending.append(query)
+        if self._thread is None:
+            self._start()
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def _start(self):
+        with self._flush_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='query-log-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Could not write the query log: {e}")
+
+    def flush(self):
+        """Parse the queued questions and merge their counts into the log file"""
+        path = self.path
+        batch = []
+        while self._pending:
+            batch.append(self._pending.popleft())
+        if not batch or not path:
+            return
+
+        counts = {}
+        for query in batch:
+            key, text = self._normalize(query)
+            count, _ = counts.get(key, (0, text))
+            # Remember the latest wording for replay
+            counts[key] = (count + 1, text)
+
+        with self._flush_lock, _locked(path):
+            entries = self._read(path)
+            now = time.time()
+            for key, (count, text) in counts.items():
+                entry = entries.setdefault(key, {'count': 0})
+                entry.update(count=entry['count'] + count, query=text, last_seen=now)
+            if len(entries) > self.max_entries:
+                kept = sorted(entries.items(), key=lambda item: (item[1]['count'], item[1]['last_seen']), reverse=True)
+                entries = dict(kept[:self.max_entries])
+            self._write(path, entries)
+        telemetry.inc('query_log_records_total', len(batch))
+
+    @staticmethod
+    def _normalize(query: str):
+        text = normalize_text(query)
+        from .lazy import data_processor
+        if data_processor.is_ready:
+            try:
+                return canonical_query(data_processor.parse_query(text)), query.strip()
+            except Exception:
+                pass
+        return text, query.strip()
+
+    @staticmethod
+    def _read(path: str) -> Dict:
+        try:
+            with open(path) as f:
+                return json.load(f).get('queries', {})
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _write(path: str, entries: Dict):
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.query_log-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'queries': entries}, f, separators=(',', ':'))
+        os.replace(tmp, path)
+
+    def top(self, limit: int) -> List[str]:
+        """The `limit` most frequently asked questions, most frequent first"""
+        path = self.path
+        if not path or limit <= 0:
+            return []
+        entries = self._read(path)
+        ranked = sorted(entries.values(), key=lambda entry: (entry['count'], entry['last_seen']), reverse=True)
+        return [entry['query'] for entry in ranked[:limit]]
+
+    def _after_fork_in_child(self):
+        # The writer thread stays in the parent; the child starts its own on first record()
+        self._pending = deque(maxlen=self._pending.maxlen)
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._flush_lock = threading.Lock()
+
+
+class _locked:
+    """Exclusive lock on `<path>.lock` so workers merge into the log one at a time"""
+
+    def __init__(self, path: str):
+        self.path = path + '.lock'
+        self.fd = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self.fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            os.close(self.fd)
+            self.fd = None
+
+
+class CacheWarmer:
+    """Replays the most popular questions against a freshly loaded dataset before traffic arrives.
+
+    Each replay goes through query_data, so it fills the derived aggregate
+    tables, the summary cache and the result cache exactly as a real request
+    would. A run stops as soon as a newer dataset is published.
+    """
+
+    def __init__(self, query_log: QueryLog, limit: int = 20):
+        self.query_log = query_log
+        self.limit = limit
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def warm(self, processor, background: bool = True) -> Optional[threading.Thread]:
+        queries = self.query_log.top(self.limit)
+        if not queries:
+            return None
+        if not background:
+            self._replay(processor, queries)
+            return None
+
+        with self._lock:
+            thread = threading.Thread(target=self._replay, args=(processor, queries),
+                                      name='cache-prewarm', daemon=True)
+            self._thread = thread
+        thread.start()
+        return thread
+
+    def _replay(self, processor, queries: List[str]):
+        version = processor.dataset_version
+        started = time.perf_counter()
+        warmed = 0
+        with telemetry.span('prewarm'):
+            for query in queries:
+                if processor.dataset_version != version:
+                    telemetry.inc('prewarm_queries_total', result='superseded')
+                    break
+                try:
+                    processor.query_data(query)
+                    warmed += 1
+                    telemetry.inc('prewarm_queries_total', result='ok')
+                except Exception as e:
+                    print(f"⚠️ Prewarm query failed ({query!r}): {e}")
+                    telemetry.inc('prewarm_queries_total', result='error')
+        print(f"🔥 Prewarmed {warmed} popular queries in {time.perf_counter() - started:.2f}s")
+
+    def wait(self, timeout: Optional[float] = None):
+        """Block until the running warm-up (if any) finishes"""
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def _after_fork_in_child(self):
+        self._thread = None
+        self._lock = threading.Lock()
+
+
+query_log = QueryLog(
+    flush_interval=getattr(settings, 'QUERY_LOG_FLUSH_SECONDS', 5.0),
+    batch_size=getattr(settings, 'QUERY_LOG_BATCH_SIZE', 500),
+    max_entries=getattr(settings, 'QUERY_LOG_MAX_ENTRIES', 500),
+)
+cache_warmer = CacheWarmer(query_log, limit=getattr(settings, 'PREWARM_TOP_QUERIES', 20))
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=query_log._after_fork_in_child)
+    os.register_at_fork(after_in_child=cache_warmer._after_fork_in_child)
@@ -0,0 +1,128 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+# Metrics that can be ranked across the whole catalogue
+RANKING_METRICS = {
+    'price_growth': 'Price Growth (%)',
+    'demand_growth': 'Demand Growth (%)',
+    'avg_price': 'Average Price',
+    'avg_demand': 'Average Demand',
+    'investment_score': 'Investment Score',
+}
+
+AREA_METRIC_COLUMNS = [
+    'area', 'first_year', 'last_year', 'data_points',
+    'avg_price', 'avg_demand', 'price_growth', 'demand_growth',
+]
+
+
+def compute_area_metrics(yearly: pd.DataFrame, start_year: Optional[int] = None,
+                         end_year: Optional[int] = None) -> pd.DataFrame:
+    """Compute one row of ranking metrics per area from per-(area, year) means"""
+    window = yearly
+    if start_year is not None:
+        window = window[window['year'] >= start_year]
+    if end_year is not None:
+        window = window[window['year'] <= end_year]
+
+    if window.empty:
+        return pd.DataFrame(columns=AREA_METRIC_COLUMNS)
+
+    window = window.sort_values(['area', 'year'])
+    metrics = window.groupby('area', sort=True).agg(
+        first_year=('year', 'first'),
+        last_year=('year', 'last'),
+        data_points=('year', 'size'),
+        first_price=('price', 'first'),
+        last_price=('price', 'last'),
+        first_demand=('demand', 'first'),
+        last_demand=('demand', 'last'),
+        avg_price=('price', 'mean'),
+        avg_demand=('demand', 'mean'),
+    )
+
+    # Growth is only meaningful with at least two years of data
+    multi_year = metrics['data_points'] >= 2
+    metrics['price_growth'] = ((metrics['last_price'] - metrics['first_price']) /
+                               metrics['first_price'] * 100).where(multi_year)
+    metrics['demand_growth'] = ((metrics['last_demand'] - metrics['first_demand']) /
+                                metrics['first_demand'] * 100).where(multi_year)
+
+    return metrics.reset_index()[AREA_METRIC_COLUMNS]
+
+
+def select_top(metrics: pd.DataFrame, metric: str, limit: int = 10, offset: int = 0,
+               ascending: bool = False, min_points: int = 1, include_ties: bool = True) -> Dict:
+    """Select one page of the top-N areas using partial selection instead of a full sort"""
+    if metric not in RANKING_METRICS:
+        raise ValueError(f"Unknown ranking metric '{metric}'. Use one of: {', '.join(RANKING_METRICS)}")
+
+    limit = max(int(limit), 1)
+    offset = max(int(offset), 0)
+
+    eligible = metrics[metrics['data_points'] >= min_points]
+    values = eligible[metric].to_numpy(dtype=float)
+    valid = np.flatnonzero(~np.isnan(values))
+    values = values[valid]
+    eligible = eligible.iloc[valid]
+    names = eligible['area'].to_numpy(dtype=str)
+    total = len(values)
+
+    result = {
+        'metric': metric,
+        'label': RANKING_METRICS[metric],
+        'order': 'asc' if ascending else 'desc',
+        'items': [],
+        'total': total,
+        'offset': offset,
+        'limit': limit,
+        'next_offset': None,
+    }
+
+    # Smaller key == better rank in both directions
+    keys = values if ascending else -values
+    k = min(offset + limit, total)
+    if k <= offset:
+        return result
+
+    if k < total:
+        candidates = np.argpartition(keys, k - 1)[:k]
+    else:
+        candidates = np.arange(total)
+
+    # Deterministic order inside the selection: by key, then by area name
+    order = candidates[np.lexsort((names[candidates], keys[candidates]))]
+
+    # Pull in everything tied with the last selected value
+    if include_ties and k < total:
+        tied = np.flatnonzero(keys == keys[order[-1]])
+        tied = np.setdiff1d(tied, order, assume_unique=True)
+        if tied.size:
+            order = np.concatenate([order, tied[np.argsort(names[tied], kind='stable')]])
+
+    sorted_keys = keys[order]
+    # Competition ranking (1, 2, 2, 4): everything strictly better is inside the selection
+    ranks = np.searchsorted(sorted_keys, sorted_keys, side='left') + 1
+
+    page_end = offset + limit
+    if include_ties:
+        page_end = int(np.searchsorted(sorted_keys, sorted_keys[page_end - 1], side='right')) \
+            if page_end <= len(order) else len(order)
+    page_end = min(page_end, len(order))
+
+    rows = eligible.iloc[order[offset:page_end]]
+    result['items'] = [
+        {
+            'rank': int(rank),
+            'area': row['area'],
+            'value': round(float(row[metric]), 2),
+            'data_points': int(row['data_points']),
+            'first_year': int(row['first_year']),
+            'last_year': int(row['last_year']),
+        }
+        for rank, (_, row) in zip(ranks[offset:page_end], rows.iterrows())
+    ]
+    result['next_offset'] = page_end if page_end < total else None
+
+    return result
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+import pandas as pd
+from django.conf import settings
+from django.core import signing
+from .telemetry import telemetry
+
+SIGNING_SALT = 'api.results'
+
+
+class ResultExpired(Exception):
+    """The handle is unknown, tampered with, past its TTL, or refers to a replaced dataset"""
+
+
+class ResultCache:
+    """Short-lived server-side copies of query results, addressed by handle, so exports never re-upload the table.
+
+    A handle is a signed recipe (areas, year window, dataset fingerprint), not a random id.
+    The worker that answered the query keeps the rows themselves in an LRU bounded by
+    `max_entries` and `max_rows`; any other worker can rebuild the same slice from the
+    recipe as long as it holds the same data (snapshot fingerprints match; per-worker
+    version counters say nothing about that). Entries and handles both expire after
+    `ttl` seconds.
+    """
+
+    def __init__(self, ttl: float = 600.0, max_entries: int = 256, max_rows: int = 2_000_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._entries = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def make_handle(self, fingerprint: str, areas: List[str], start_year: Optional[int], end_year: Optional[int],
+                    dates: Optional[List[Tuple[str, str]]] = None) -> str:
+        recipe = {'fp': fingerprint, 'areas': list(areas), 'start': start_year, 'end': end_year}
+        if dates:
+            recipe['dates'] = [list(span) for span in dates]
+        return signing.dumps(recipe, salt=SIGNING_SALT, compress=True)
+
+    def read_handle(self, handle: str) -> Dict:
+        """Decode a handle's recipe; raises ResultExpired if it is invalid or too old"""
+        try:
+            return signing.loads(handle, salt=SIGNING_SALT, max_age=self.ttl)
+        except signing.BadSignature:
+            # SignatureExpired is a BadSignature too
+            raise ResultExpired('Result handle is invalid or has expired. Run the query again.')
+
+    def put(self, handle: str, frame: pd.DataFrame):
+        if self.max_entries <= 0 or len(frame) > self.max_rows:
+            return
+        with self._lock:
+            previous = self._entries.pop(handle, None)
+            if previous is not None:
+                self._rows -= len(previous[1])
+            self._entries[handle] = (time.monotonic() + self.ttl, frame)
+            self._rows += len(frame)
+            # Least recently used first
+            while self._entries and (len(self._entries) > self.max_entries or self._rows > self.max_rows):
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._rows -= len(evicted)
+
+    def get(self, handle: str) -> Optional[pd.DataFrame]:
+        with self._lock:
+            entry = self._entries.get(handle)
+            if entry is None:
+                telemetry.inc('cache_requests_total', cache='results', result='miss')
+                return None
+            expires_at, frame = entry
+            if expires_at < time.monotonic():
+                del self._entries[handle]
+                self._rows -= len(frame)
+                telemetry.inc('cache_requests_total', cache='results', result='miss')
+                return None
+            self._entries.move_to_end(handle)
+        telemetry.inc('cache_requests_total', cache='results', result='hit')
+        return frame
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    def _after_fork_in_child(self):
+        self._lock = threading.Lock()
+
+
+result_cache = ResultCache(
+    ttl=getattr(settings, 'RESULT_CACHE_TTL', 600.0),
+    max_entries=getattr(settings, 'RESULT_CACHE_MAX_ENTRIES', 256),
+    max_rows=getattr(settings, 'RESULT_CACHE_MAX_ROWS', 2_000_000),
+)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=result_cache._after_fork_in_child)
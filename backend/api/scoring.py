@@ -0,0 +1,111 @@
+import math
+import threading
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+# Feature weights for the investment score. Positive weights reward a feature,
+# negative weights penalise it (e.g. volatility, already-expensive areas).
+DEFAULT_INVESTMENT_WEIGHTS = {
+    'growth': 0.35,
+    'momentum': 0.25,
+    'volatility': -0.15,
+    'demand_trend': 0.20,
+    'price_percentile': -0.05,
+}
+
+INVESTMENT_FEATURES = list(DEFAULT_INVESTMENT_WEIGHTS)
+
+FEATURE_COLUMNS = ['area', 'first_year', 'last_year', 'data_points', 'last_price'] + INVESTMENT_FEATURES
+
+
+def compute_investment_features(yearly: pd.DataFrame) -> pd.DataFrame:
+    """Build one feature vector per area from per-(area, year) means"""
+    if yearly.empty:
+        return pd.DataFrame(columns=FEATURE_COLUMNS)
+
+    yearly = yearly.sort_values(['area', 'year'])
+    yearly = yearly.assign(price_change=yearly.groupby('area', sort=False)['price'].pct_change() * 100)
+
+    features = yearly.groupby('area', sort=True).agg(
+        first_year=('year', 'first'),
+        last_year=('year', 'last'),
+        data_points=('year', 'size'),
+        first_price=('price', 'first'),
+        last_price=('price', 'last'),
+        first_demand=('demand', 'first'),
+        last_demand=('demand', 'last'),
+        momentum=('price_change', 'last'),
+        volatility=('price_change', 'std'),
+    )
+
+    # Annualised price growth, so long and short histories are comparable
+    span = (features['last_year'] - features['first_year']).where(lambda s: s > 0)
+    features['growth'] = ((features['last_price'] / features['first_price']) ** (1 / span) - 1) * 100
+    features['demand_trend'] = ((features['last_demand'] - features['first_demand']) /
+                                features['first_demand'] * 100).where(features['data_points'] >= 2)
+    features['price_percentile'] = features['last_price'].rank(pct=True) * 100
+
+    return features.reset_index()[FEATURE_COLUMNS]
+
+
+class InvestmentScorer:
+    """Scores every area at once as a weighted sum of standardised features"""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self._lock = threading.Lock()
+        self._weights = dict(DEFAULT_INVESTMENT_WEIGHTS)
+        if weights:
+            self.set_weights(weights)
+
+    @property
+    def weights(self) -> Dict[str, float]:
+        return dict(self._weights)
+
+    def set_weights(self, weights: Dict[str, float]) -> Dict[str, float]:
+        """Update some or all feature weights at runtime"""
+        unknown = [name for name in weights if name not in DEFAULT_INVESTMENT_WEIGHTS]
+        if unknown:
+            raise ValueError(f"Unknown investment features: {unknown}. Use: {', '.join(INVESTMENT_FEATURES)}")
+
+        values = {name: float(value) for name, value in weights.items()}
+        # JSON bodies may carry NaN and Infinity; a weight like that breaks every score and response after it
+        invalid = [name for name, value in values.items() if not math.isfinite(value)]
+        if invalid:
+            raise ValueError(f"Weights must be finite numbers: {', '.join(invalid)}")
+
+        # Copy and replace under the lock, so concurrent partial updates both land
+        with self._lock:
+            self._weights = {**self._weights, **values}
+            return dict(self._weights)
+
+    def reset_weights(self) -> Dict[str, float]:
+        with self._lock:
+            self._weights = dict(DEFAULT_INVESTMENT_WEIGHTS)
+        return self.weights
+
+    def score(self, features: pd.DataFrame) -> pd.DataFrame:
+        """Return the features with an investment_score column (0-100 scale)"""
+        scored = features.copy()
+        if scored.empty:
+            scored['investment_score'] = pd.Series(dtype=float)
+            return scored
+
+        matrix = scored[INVESTMENT_FEATURES].to_numpy(dtype=float)
+        with warnings.catch_warnings():
+            # A feature can be entirely missing when every area has a single year
+            warnings.simplefilter('ignore', RuntimeWarning)
+            mean = np.nanmean(matrix, axis=0)
+            std = np.nanstd(matrix, axis=0)
+        std[~(std > 0)] = 1.0
+        # Missing features (single-year areas) count as average
+        z_scores = np.nan_to_num((matrix - mean) / std)
+
+        weights = self._weights
+        raw = z_scores @ np.array([weights[name] for name in INVESTMENT_FEATURES])
+
+        # Map onto 0-100 so scores read naturally in summaries
+        spread = raw.max() - raw.min()
+        scored['investment_score'] = (raw - raw.min()) / spread * 100 if spread > 0 else 50.0
+        return scored
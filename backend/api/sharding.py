@@ -0,0 +1,403 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+import requests
+from django.conf import settings
+from .data_processor import DataProcessor
+from .metric_registry import CORE_METRICS, merge_partials, registry as metric_registry
+from .rollups import RESOLUTIONS
+from .sketches import box_plot_chart
+
+
+class ShardError(Exception):
+    """A shard could not be reached or refused a sub-query"""
+
+
+def owner_of(area: str, shards: List[str]) -> str:
+    """The shard that owns an area, by rendezvous hashing.
+
+    Every shard scores the area and the highest score wins, so adding a shard
+    only moves the areas it now wins and removing one only moves its own.
+    """
+    key = str(area).strip().lower()
+    return max(shards, key=lambda shard: hashlib.md5(f'{shard}|{key}'.encode()).digest())
+
+
+def partition(df: pd.DataFrame, shards: List[str]) -> Dict[str, pd.DataFrame]:
+    """Rows of a dataset split by the shard owning their area (shards owning nothing are left out)"""
+    owners = {area: owner_of(area, shards) for area in df['area'].unique()}
+    return {shard: rows.reset_index(drop=True) for shard, rows in df.groupby(df['area'].map(owners), sort=False)}
+
+
+def frame_to_payload(frame: pd.DataFrame) -> Dict:
+    """JSON-safe rows for a shard request ({'columns', 'dtypes', 'data'}; dates as ISO strings, NaN as null)"""
+    dtypes = {column: str(dtype) for column, dtype in frame.dtypes.items()}
+    frame = frame.copy()
+    for column, dtype in dtypes.items():
+        if dtype.startswith('datetime'):
+            frame[column] = frame[column].dt.strftime('%Y-%m-%dT%H:%M:%S')
+    return {
+        'columns': frame.columns.tolist(),
+        'dtypes': dtypes,
+        'data': frame.astype(object).where(frame.notna(), None).values.tolist()
+    }
+
+
+def frame_from_payload(payload: Dict) -> pd.DataFrame:
+    frame = pd.DataFrame(payload['data'], columns=payload['columns'])
+    for column, dtype in payload['dtypes'].items():
+        if dtype.startswith('datetime'):
+            frame[column] = pd.to_datetime(frame[column])
+        elif dtype not in ('object', 'category', 'str', 'string'):
+            frame[column] = frame[column].astype(dtype)
+    return frame
+
+
+class HttpTransport:
+    """Calls a shard's /api/shard/ endpoints over HTTP, with the shared SHARD_TOKEN"""
+
+    def __init__(self, timeout: float = 10.0, token: Optional[str] = None):
+        self.timeout = timeout
+        self.token = token
+
+    def call(self, shard: str, method: str, path: str, payload: Optional[Dict] = None) -> Dict:
+        headers = {'X-Shard-Token': self.token} if self.token else {}
+        try:
+            response = requests.request(method, f"{shard}/api/shard/{path}/", json=payload, headers=headers,
+                                        timeout=self.timeout)
+        except requests.RequestException as e:
+            raise ShardError(f"Shard {shard} is unreachable: {e}")
+        if response.status_code >= 400:
+            raise ShardError(f"Shard {shard} answered {response.status_code}: {response.text[:200]}")
+        return response.json()
+
+
+class CataloguePlanner(DataProcessor):
+    """Parses questions and writes answers for the router from the shards' combined catalogue; holds no rows"""
+
+    def __init__(self, router: 'ShardRouter'):
+        self.router = router
+        super().__init__()
+
+    def load_default_data(self):
+        # Rows live on the shards
+        self.df = pd.DataFrame()
+
+    def _sync_stored_dataset(self):
+        # Whatever the router's own database holds is not the sharded dataset
+        return
+
+    def get_areas(self) -> List[str]:
+        return sorted(self.router.catalogue()['areas'])
+
+    def available_metrics(self) -> List[str]:
+        return self.router.catalogue()['metrics']
+
+
+class ShardRouter:
+    """Answers /api/query/ for a sharded deployment by scatter-gather over the shards' partial aggregates.
+
+    Areas are spread over the shards by rendezvous hashing. A question is
+    parsed against the shards' combined area catalogue; only the shards owning
+    its areas are asked, each for per-(area, year) or per-(area, period) sums
+    and counts, and those are added up before any mean is taken, so the chart
+    and summary match what one instance holding every row would give.
+    """
+
+    def __init__(self, shards: List[str], transport=None, catalogue_seconds: float = 30.0, table_limit: int = 500,
+                 state_path: Optional[str] = None):
+        self.shards = list(dict.fromkeys(shards))
+        self.transport = transport or HttpTransport()
+        self.catalogue_seconds = catalogue_seconds
+        self.table_limit = table_limit
+        self.state_path = str(state_path) if state_path else None
+        self._state_stamp = None
+        self._catalogue = None
+        self._catalogue_at = 0.0
+        self._signature = None
+        self._planner = None
+        self._lock = threading.Lock()
+        self._sync_shards()
+
+    def _sync_shards(self):
+        """Take the shard list a reshard stored at state_path (by any worker, before or since a restart)"""
+        if not self.state_path:
+            return
+        try:
+            stamp = os.stat(self.state_path).st_mtime_ns
+            if stamp == self._state_stamp:
+                return
+            with open(self.state_path) as f:
+                shards = json.load(f)['shards']
+        except (OSError, ValueError, KeyError):
+            return
+        with self._lock:
+            self.shards, self._state_stamp = shards, stamp
+            self._catalogue = None
+
+    def _store_shards(self, shards: List[str]):
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(self.state_path) or '.', prefix='.shards-')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'shards': shards}, f)
+        os.replace(tmp, self.state_path)
+
+    @property
+    def planner(self) -> CataloguePlanner:
+        if self._planner is None:
+            with self._lock:
+                if self._planner is None:
+                    self._planner = CataloguePlanner(self)
+        return self._planner
+
+    def _scatter(self, calls: Dict[str, Tuple]) -> Dict[str, Dict]:
+        """Send (method, path, payload) calls to several shards at once and wait for every answer"""
+        if not calls:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(calls)) as pool:
+            futures = {shard: pool.submit(self.transport.call, shard, *call) for shard, call in calls.items()}
+            return {shard: future.result() for shard, future in futures.items()}
+
+    def catalogue(self, refresh: bool = False) -> Dict:
+        """Every area (with its shard, year range and newest month) and metric across the shards, cached briefly"""
+        self._sync_shards()
+        cached = self._catalogue
+        if cached is not None and not refresh and time.monotonic() - self._catalogue_at < self.catalogue_seconds:
+            return cached
+
+        shards = self.shards
+        answers = self._scatter({shard: ('GET', 'catalogue', None) for shard in shards})
+        areas, metrics = {}, {}
+        for shard in shards:
+            answer = answers[shard]
+            for area, info in answer['areas'].items():
+                # Rows left behind on a shard that no longer owns the area are ignored
+                if owner_of(area, shards) == shard:
+                    areas[area] = {**info, 'shard': shard, 'dated': answer['dated']}
+            metrics.update(dict.fromkeys(answer['metrics']))
+
+        catalogue = {'areas': areas, 'metrics': list(metrics)}
+        signature = tuple((shard, answers[shard]['version']) for shard in shards)
+        with self._lock:
+            self._catalogue, self._catalogue_at = catalogue, time.monotonic()
+            changed, self._signature = signature != self._signature, signature
+        if changed and self._planner is not None:
+            # A new snapshot for the planner drops summaries written from the old shard data
+            self._planner.df = pd.DataFrame()
+        return catalogue
+
+    def query_data(self, query: str, offset: int = 0, limit: Optional[int] = None) -> Dict:
+        """Answer a natural-language question from the shards owning its areas"""
+        # On one instance offset/limit page rankings over every area, which the router does not answer
+        if offset or limit is not None:
+            return {'error': 'offset and limit are not available on a sharded deployment yet.', 'summary': '',
+                    'chart': {}, 'table': []}
+        planner = self.planner
+        catalogue = self.catalogue()
+        if not catalogue['areas']:
+            return {'error': 'No data available. Please upload a dataset first.', 'summary': '', 'chart': {},
+                    'table': []}
+
+        with planner.pin():
+            parsed = planner.parse_query(query)
+            areas = parsed['areas']
+            if not areas and parsed['analysis_type'] in ('ranking', 'investment'):
+                return {'error': 'Rankings over every area are not available on a sharded deployment yet. '
+                                 'Name the areas to compare.', 'summary': '', 'chart': {}, 'table': []}
+            if not areas:
+                return planner._unknown_area_answer(query)
+
+            owners = {}
+            for area in areas:
+                owners.setdefault(catalogue['areas'][area]['shard'], []).append(area)
+
+            period_filter = parsed.get('period_filter')
+            dated = bool(period_filter) and all(catalogue['areas'][area]['dated'] for area in areas)
+            if dated:
+                resolution = period_filter['resolution']
+                periods = period_filter.get('periods') or self._latest_periods(areas, resolution,
+                                                                              period_filter['last'])
+                # Areas without a single dated row fall back to whole years, as on an undated shard
+                dated = bool(periods)
+            if dated:
+                spec = {'resolution': resolution, 'periods': periods}
+            else:
+                window = self._year_window(parsed, areas)
+                spec = {'start_year': window[0], 'end_year': window[1], 'metrics': parsed['metrics'],
+                        'forecast_horizon': parsed.get('forecast_horizon')}
+                if parsed.get('distribution'):
+                    spec['distribution'] = 'demand' if parsed['metric'] == 'demand' else 'price'
+            spec['table_limit'] = self.table_limit
+
+            answers = self._scatter({shard: ('POST', 'partials', {**spec, 'areas': owned})
+                                     for shard, owned in owners.items()})
+            groups = pd.concat([pd.DataFrame(answer['groups']) for answer in answers.values()], ignore_index=True)
+
+            if groups.empty:
+                aggregated = {}
+            elif dated:
+                merged = merge_partials(groups, metric_registry.resolve(CORE_METRICS), ['area', 'period'])
+                merged['start'] = pd.PeriodIndex(merged['period'], freq=RESOLUTIONS[resolution]).start_time
+                aggregated = planner._aggregate_periods(merged, areas)
+            else:
+                metrics = [metric for metric in metric_registry.resolve(list(CORE_METRICS) + parsed['metrics'])
+                           if f'{metric.name}_sum' in groups.columns]
+                merged = merge_partials(groups, metrics, ['area', 'year'])
+                aggregated = planner._aggregate_data(GatheredSelection(merged), areas,
+                                                     [metric.name for metric in metrics])
+
+            chart_metrics = parsed['metric'] if dated else parsed['metrics']
+            table = [row for shard in owners for row in answers[shard]['table']][:self.table_limit]
+            result = {
+                'chart': planner._generate_chart_data(aggregated, chart_metrics),
+                'table': table,
+                'total_rows': sum(answer['total_rows'] for answer in answers.values()),
+                'shards': list(owners)
+            }
+            if period_filter:
+                result['resolution'] = period_filter['resolution'] if dated else 'year'
+                if not dated:
+                    result['note'] = 'This dataset only has yearly figures, so the answer covers whole years.'
+            
+            # Each area's forecast and distribution come whole from its own shard
+            if 'forecast_horizon' in spec and spec['forecast_horizon']:
+                forecasts = {}
+                for answer in answers.values():
+                    forecasts.update(answer.get('forecast', {}))
+                forecasts = {area: forecasts[area] for area in aggregated if area in forecasts}
+                result['forecast'] = forecasts
+                result['chart'] = planner._add_forecast_to_chart(result['chart'], forecasts, parsed['metric'])
+            if spec.get('distribution'):
+                groups = [group for answer in answers.values() for group in answer['distribution']]
+                table = pd.DataFrame(groups)
+                if not table.empty:
+                    table = table.sort_values(['area', 'year']).reset_index(drop=True)
+                result['distribution'] = {'metric': spec['distribution'], 'group_by': 'area_year',
+                                          'year_from': window[0], 'year_to': window[1],
+                                          'groups': table.to_dict('records'), 'chart': box_plot_chart(table)}
+                for answer in answers.values():
+                    for row in answer['spread']:
+                        if row['area'] in aggregated:
+                            aggregated[row['area']]['distribution'] = {
+                                'metric': spec['distribution'], 'p10': row['p10'], 'median': row['median'],
+                                'p90': row['p90']
+                            }
+            
+            return {'summary': planner._get_summary(aggregated, query, parsed), **result}
+
+    def stream_query(self, query: str, offset: int = 0, limit: Optional[int] = None) -> Iterator[Tuple[str, Dict]]:
+        """query_data() as the (event, data) pairs of DataProcessor.stream_query, the summary in one piece"""
+        result = self.query_data(query, offset, limit)
+        if 'error' in result:
+            yield 'failure', result
+            return
+        summary = result.pop('summary')
+        yield 'result', result
+        yield 'summary', {'delta': summary}
+        yield 'done', {'summary': summary}
+
+    def _year_window(self, parsed: Dict, areas: List[str]) -> Tuple[Optional[int], Optional[int]]:
+        if parsed.get('years'):
+            # "Last N years" counts back from the newest year these areas have, as on one instance
+            newest = int(max(self.catalogue()['areas'][area]['last_year'] for area in areas))
+            return newest - parsed['years'] + 1, newest
+        return self.planner._year_window(parsed)
+
+    def _latest_periods(self, areas: List[str], resolution: str, count: int) -> List[str]:
+        """Labels of the `count` periods up to the newest month any of these areas has (none if none has a month)"""
+        catalogue = self.catalogue()['areas']
+        newest = max((pd.Timestamp(catalogue[area]['last_month']) for area in areas
+                      if catalogue[area].get('last_month')), default=None)
+        if newest is None:
+            return []
+        last = pd.Period(newest, RESOLUTIONS[resolution])
+        return [str(last - offset) for offset in reversed(range(count))]
+
+    def load(self, df: pd.DataFrame, append: bool = False) -> Dict[str, int]:
+        """Split a cleaned dataset by area owner and load each part on its shard; returns rows sent per shard"""
+        parts = partition(df, self.shards)
+        calls = {}
+        for shard in self.shards:
+            # Replacing clears every shard, including ones that own none of the new areas
+            if shard in parts or not append:
+                rows = parts.get(shard, df.iloc[0:0])
+                calls[shard] = ('POST', 'rows', {'mode': 'append' if append else 'replace',
+                                                 'rows': frame_to_payload(rows)})
+        self._scatter(calls)
+        self.catalogue(refresh=True)
+        return {shard: len(parts.get(shard, ())) for shard in calls}
+
+    def reshard(self, shards: List[str]) -> Dict:
+        """Move areas to the owners a new shard list gives them, reloading only the shards whose areas change.
+
+        The new list is stored at state_path, which every worker checks before
+        reading the catalogue and which outlives SHARD_URLS on a restart; without
+        it only this process would see the new owners, so resharding is refused.
+        """
+        shards = list(dict.fromkeys(shard.rstrip('/') for shard in shards))
+        if not shards:
+            raise ValueError('shards must be a non-empty list of shard base URLs')
+        if not self.state_path:
+            raise ValueError('Resharding needs SHARD_STATE_PATH so every worker and restart sees the new shard list')
+        directory = os.path.dirname(self.state_path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        if not os.access(directory, os.W_OK):
+            raise ValueError(f'Cannot store the shard list in {directory}; nothing was moved')
+
+        current = {area: info['shard'] for area, info in self.catalogue(refresh=True)['areas'].items()}
+        target = {area: owner_of(area, shards) for area in current}
+        moved = [area for area in current if current[area] != target[area]]
+        touched = {current[area] for area in moved} | {target[area] for area in moved}
+
+        # Everything the affected old shards own, then each affected new shard's share of it
+        exported = self._scatter({shard: ('GET', 'rows', None) for shard in touched if shard in self.shards})
+        frames = []
+        for shard, answer in exported.items():
+            rows = frame_from_payload(answer['rows'])
+            frames.append(rows[rows['area'].map(current) == shard])
+        rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['area'])
+
+        owners = rows['area'].map(target)
+        calls = {}
+        for shard in touched:
+            if shard in shards:
+                calls[shard] = ('POST', 'rows', {'mode': 'replace',
+                                                 'rows': frame_to_payload(rows[owners == shard])})
+        self._scatter(calls)
+
+        self._store_shards(shards)
+        self._sync_shards()
+        self.catalogue(refresh=True)
+        return {'shards': shards, 'moved_areas': sorted(moved), 'reloaded': sorted(calls)}
+
+    def status(self, refresh: bool = True) -> Dict:
+        catalogue = self.catalogue(refresh=refresh)
+        counts = {shard: 0 for shard in self.shards}
+        for info in catalogue['areas'].values():
+            counts[info['shard']] += 1
+        return {'shards': [{'url': shard, 'areas': counts[shard]} for shard in self.shards],
+                'areas': len(catalogue['areas'])}
+
+
+class GatheredSelection:
+    """Per-(area, year) metric values merged from the shards, in the shape _aggregate_data reads"""
+
+    def __init__(self, merged: pd.DataFrame):
+        self.merged = merged
+
+    def area_year_means(self, metrics=None) -> pd.DataFrame:
+        names = [metric.name for metric in metrics] if metrics else list(CORE_METRICS)
+        return self.merged[['year', 'area'] + names]
+
+
+shard_router = ShardRouter(
+    getattr(settings, 'SHARD_URLS', []),
+    transport=HttpTransport(getattr(settings, 'SHARD_TIMEOUT', 10.0), getattr(settings, 'SHARD_TOKEN', None)),
+    catalogue_seconds=getattr(settings, 'SHARD_CATALOGUE_SECONDS', 30.0),
+    state_path=getattr(settings, 'SHARD_STATE_PATH', None),
+)
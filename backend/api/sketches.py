@@ -0,0 +1,177 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional
+
+# Centroids kept per (area, year); groups with at most this many values stay exact
+DEFAULT_COMPRESSION = 100
+
+# Quantiles reported for every group, as output column -> fraction
+QUANTILES = {
+    'p10': 0.10,
+    'p25': 0.25,
+    'median': 0.50,
+    'p75': 0.75,
+    'p90': 0.90,
+}
+
+# group_by option -> key columns the sketches are merged over
+GROUPINGS = {
+    'area_year': ['area', 'year'],
+    'area': ['area'],
+    'year': ['year'],
+}
+
+DISTRIBUTION_COLUMNS = ['count', 'min'] + list(QUANTILES) + ['max', 'mean']
+
+
+def _compress(centroids: pd.DataFrame, keys: List[str], compression: int) -> pd.DataFrame:
+    """Merge neighbouring centroids of each group so no group keeps more than about `compression` of them.
+
+    t-digest's k1 scale puts the bucket edges where asin(2q - 1) steps by a
+    constant, so buckets are small in the tails and wide around the median,
+    which keeps the extreme quantiles (p10, p90) accurate. Every group is
+    bucketed in one vectorized pass; groups that are already small are left
+    alone and stay exact.
+    """
+    ordered = centroids.sort_values(keys + ['mean'], kind='stable')
+    grouped = ordered.groupby(keys, sort=False, observed=True)
+    sizes = grouped['weight'].transform('size')
+    if not (sizes > compression).any():
+        return ordered.reset_index(drop=True)
+
+    weight = ordered['weight']
+    before = grouped['weight'].cumsum() - weight
+    q = ((before + weight / 2) / grouped['weight'].transform('sum')).clip(0, 1)
+    scaled = np.floor(compression / (2 * np.pi) * np.arcsin(2 * q - 1))
+    bucket = np.where(sizes > compression, scaled, grouped.cumcount())
+
+    work = ordered[keys].assign(bucket=bucket, weighted=ordered['mean'] * weight, weight=weight)
+    merged = work.groupby(keys + ['bucket'], sort=True, observed=True).agg(
+        weighted=('weighted', 'sum'), weight=('weight', 'sum'))
+    merged['mean'] = merged.pop('weighted') / merged['weight']
+    return merged.reset_index()[keys + ['mean', 'weight']]
+
+
+def _interpolate(means: np.ndarray, weights: np.ndarray, low: float, high: float,
+                 fractions: np.ndarray) -> np.ndarray:
+    """Quantiles of one group from its sorted centroids and exact min/max"""
+    ends = np.cumsum(weights)
+    count = ends[-1]
+    # A centroid sits at the middle rank it covers, so singletons reproduce linear interpolation exactly
+    centres = ends - (weights + 1) / 2
+    positions = np.concatenate([[0.0], centres, [count - 1]])
+    values = np.concatenate([[low], means, [high]])
+    return np.interp(fractions * (count - 1), positions, values)
+
+
+def _within(frame: pd.DataFrame, areas: Optional[List[str]], start_year: Optional[float],
+            end_year: Optional[float]) -> pd.DataFrame:
+    mask = np.ones(len(frame), dtype=bool)
+    if areas is not None:
+        mask &= frame['area'].isin([str(area) for area in areas]).to_numpy()
+    if start_year is not None:
+        mask &= (frame['year'] >= start_year).to_numpy()
+    if end_year is not None:
+        mask &= (frame['year'] <= end_year).to_numpy()
+    return frame[mask]
+
+
+class QuantileSketches:
+    """Mergeable t-digest quantile sketches of one metric for every (area, year).
+
+    Built once per dataset in a single sort and groupby, and extended by
+    merging in a sketch of appended rows rather than rebuilding from the raw
+    data. Answering a distribution question only merges the centroids of the
+    selected groups (at most `compression` per group), so its cost depends on
+    how many areas and years are asked about, not on how many rows they hold.
+    Exact count, min and max are kept alongside.
+    """
+
+    def __init__(self, metric: str, centroids: pd.DataFrame, bounds: pd.DataFrame,
+                 compression: int = DEFAULT_COMPRESSION):
+        self.metric = metric
+        self.centroids = centroids
+        self.bounds = bounds
+        self.compression = compression
+
+    @classmethod
+    def build(cls, frame: pd.DataFrame, metric: str, compression: int = DEFAULT_COMPRESSION) -> 'QuantileSketches':
+        values = frame[['area', 'year', metric]].dropna()
+        values = values.assign(area=values['area'].astype(str))
+        grouped = values.groupby(['area', 'year'], sort=True, observed=True)[metric]
+        bounds = grouped.agg(['count', 'min', 'max'])
+
+        centroids = values.rename(columns={metric: 'mean'}).assign(weight=1.0)
+        return cls(metric, _compress(centroids, ['area', 'year'], compression), bounds, compression)
+
+    def merge(self, other: 'QuantileSketches') -> 'QuantileSketches':
+        """One sketch covering the values of both"""
+        centroids = pd.concat([self.centroids, other.centroids], ignore_index=True)
+        bounds = pd.concat([self.bounds, other.bounds]).groupby(level=['area', 'year'], sort=True).agg(
+            {'count': 'sum', 'min': 'min', 'max': 'max'})
+        return QuantileSketches(self.metric, _compress(centroids, ['area', 'year'], self.compression), bounds,
+                                self.compression)
+
+    def append(self, frame: pd.DataFrame) -> 'QuantileSketches':
+        """Sketches with new rows added, without revisiting the rows already summarised"""
+        return self.merge(QuantileSketches.build(frame, self.metric, self.compression))
+
+    @property
+    def size(self) -> int:
+        return len(self.centroids)
+
+    def summarize(self, areas: Optional[List[str]] = None, start_year: Optional[float] = None,
+                  end_year: Optional[float] = None, group_by: str = 'area_year') -> pd.DataFrame:
+        """Count, min, quantiles, max and mean for the selected areas and years, merged per `group_by`"""
+        keys = GROUPINGS[group_by]
+        centroids = _within(self.centroids, areas, start_year, end_year)
+        bounds = _within(self.bounds.reset_index(), areas, start_year, end_year)
+        if bounds.empty:
+            return pd.DataFrame(columns=keys + DISTRIBUTION_COLUMNS)
+
+        # Bounds and centroids cover the same groups, so both come out in the same key order
+        merged = bounds.groupby(keys, sort=True).agg({'count': 'sum', 'min': 'min', 'max': 'max'}).reset_index()
+        ordered = centroids.sort_values(keys + ['mean'], kind='stable')
+        codes = ordered.groupby(keys, sort=True).ngroup().to_numpy()
+        edges = np.flatnonzero(np.diff(codes)) + 1
+        fractions = np.array(list(QUANTILES.values()))
+
+        quantiles, means = [], []
+        lows, highs = merged['min'].to_numpy(), merged['max'].to_numpy()
+        groups = zip(np.split(ordered['mean'].to_numpy(), edges), np.split(ordered['weight'].to_numpy(), edges))
+        for index, (values, weights) in enumerate(groups):
+            quantiles.append(_interpolate(values, weights, lows[index], highs[index], fractions))
+            means.append(np.dot(values, weights) / weights.sum())
+
+        result = merged[keys + ['count', 'min']].copy()
+        result[list(QUANTILES)] = np.vstack(quantiles)
+        result['max'] = highs
+        result['mean'] = means
+        return result
+
+
+def box_plot_chart(distribution: pd.DataFrame, group_by: str = 'area_year') -> Dict:
+    """Chart data for a box plot (chartjs-chart-boxplot format) from summarize() output"""
+    if distribution.empty:
+        return {}
+
+    def box(row) -> Dict:
+        return {'min': row['min'], 'q1': row['p25'], 'median': row['median'], 'q3': row['p75'],
+                'max': row['max'], 'whiskerMin': row['p10'], 'whiskerMax': row['p90'], 'mean': row['mean']}
+
+    if group_by != 'area_year':
+        label = GROUPINGS[group_by][0]
+        return {
+            'labels': [str(value) for value in distribution[label]],
+            'datasets': [{'label': 'Distribution', 'data': [box(row) for _, row in distribution.iterrows()]}]
+        }
+
+    years = sorted(distribution['year'].unique())
+    datasets = []
+    for area, rows in distribution.groupby('area', sort=False):
+        by_year = {row['year']: box(row) for _, row in rows.iterrows()}
+        datasets.append({'label': area, 'data': [by_year.get(year) for year in years]})
+    return {
+        'labels': [str(int(year)) if float(year).is_integer() else str(year) for year in years],
+        'datasets': datasets
+    }
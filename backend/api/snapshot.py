@@ -0,0 +1,86 @@
+import hashlib
+import time
+from typing import Dict, Optional
+import pandas as pd
+
+# Derived entries that depend on the coordinates and must not outlive them
+ATTRIBUTE_DEPENDENT = ('geo_index', 'fingerprint', 'summaries')
+
+
+def _hash_frame(df: Optional[pd.DataFrame], digest):
+    if df is None:
+        digest.update(b'none')
+        return
+    digest.update('\0'.join(map(str, df.columns)).encode())
+    # Categorical and object columns with the same values hash alike, so compaction keeps the fingerprint
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+
+
+class DatasetSnapshot:
+    """One published version of the dataset together with everything derived from it.
+
+    A snapshot is never changed after it is published: uploads build a new one
+    and swap it in. Requests hold on to the snapshot they started with, so they
+    see one consistent dataset however many swaps happen meanwhile. Only the
+    derived-data cache fills in lazily, and every entry in it is computed from
+    this snapshot's own frame.
+    """
+
+    __slots__ = ('df', 'store', 'version', 'area_attributes', 'derived', 'created_at')
+
+    def __init__(self, df: Optional[pd.DataFrame], version: int, area_attributes: Optional[pd.DataFrame] = None,
+                 derived: Optional[Dict] = None, store=None):
+        # Exactly one of df (in-memory backend) and store (storage.ParquetStore) holds the rows
+        self.df = df
+        self.store = store
+        self.version = version
+        self.area_attributes = area_attributes
+        self.derived = derived if derived is not None else {}
+        self.created_at = time.time()
+
+    @property
+    def has_data(self) -> bool:
+        return self.row_count > 0
+    
+    @property
+    def row_count(self) -> int:
+        if self.store is not None:
+            return self.store.rows
+        return len(self.df) if self.df is not None else 0
+    
+    @property
+    def area_count(self) -> int:
+        if self.store is not None:
+            return len(self.store.areas)
+        return self.df['area'].nunique() if self.has_data else 0
+    
+    @property
+    def fingerprint(self) -> str:
+        """Content hash of the dataset and coordinates; workers that loaded the same data agree on it"""
+        fingerprint = self.derived.get('fingerprint')
+        if fingerprint is None:
+            digest = hashlib.blake2b(digest_size=12)
+            if self.store is not None:
+                digest.update(self.store.fingerprint.encode())
+            else:
+                _hash_frame(self.df, digest)
+            _hash_frame(self.area_attributes, digest)
+            fingerprint = self.derived['fingerprint'] = digest.hexdigest()
+        return fingerprint
+
+    def with_data(self, df: Optional[pd.DataFrame], store=None) -> 'DatasetSnapshot':
+        """Next snapshot with a new dataset; nothing derived carries over"""
+        return DatasetSnapshot(df, self.version + 1, self.area_attributes, store=store)
+
+    def with_area_attributes(self, area_attributes: Optional[pd.DataFrame]) -> 'DatasetSnapshot':
+        """Next snapshot with new coordinates; keeps derived data that does not depend on them"""
+        derived = {key: value for key, value in self.derived.items() if key not in ATTRIBUTE_DEPENDENT}
+        return DatasetSnapshot(self.df, self.version + 1, area_attributes, derived, store=self.store)
+
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a frame, used to name its on-disk copy"""
+    digest = hashlib.blake2b(digest_size=12)
+    _hash_frame(df, digest)
+    return digest.hexdigest()
@@ -0,0 +1,159 @@
+import heapq
+import warnings
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipy is optional; fall back to the pure numpy tree below
+    cKDTree = None
+
+EARTH_RADIUS_KM = 6371.0
+
+# Standardised per-area features used for "similar to" lookups
+SIMILARITY_FEATURES = ['log_price', 'price_growth', 'avg_demand', 'demand_growth']
+
+ATTRIBUTE_COLUMN_MAPPING = {
+    'final location': 'area',
+    'location': 'area',
+    'locality': 'area',
+    'region': 'area',
+    'place': 'area',
+    'latitude': 'lat',
+    'lat.': 'lat',
+    'longitude': 'lon',
+    'long': 'lon',
+    'lng': 'lon',
+}
+
+
+class KDTree:
+    """Minimal k-d tree for k-nearest-neighbour queries when scipy is not installed"""
+
+    def __init__(self, points):
+        self.points = np.asarray(points, dtype=float)
+        self.dims = self.points.shape[1] if self.points.ndim == 2 else 0
+        self._root = self._build(np.arange(len(self.points)), 0)
+
+    def _build(self, indices, depth):
+        if len(indices) == 0:
+            return None
+        axis = depth % self.dims
+        order = indices[np.argsort(self.points[indices, axis], kind='stable')]
+        mid = len(order) // 2
+        return (order[mid], axis, self._build(order[:mid], depth + 1), self._build(order[mid + 1:], depth + 1))
+
+    def query(self, point, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        point = np.asarray(point, dtype=float)
+        best = []  # max-heap of (-distance, index)
+
+        def search(node):
+            if node is None:
+                return
+            index, axis, left, right = node
+            distance = float(np.sqrt(((self.points[index] - point) ** 2).sum()))
+            if len(best) < k:
+                heapq.heappush(best, (-distance, index))
+            elif distance < -best[0][0]:
+                heapq.heapreplace(best, (-distance, index))
+
+            diff = point[axis] - self.points[index, axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            search(near)
+            # Only cross the splitting plane if it is closer than the current k-th best
+            if len(best) < k or abs(diff) < -best[0][0]:
+                search(far)
+
+        search(self._root)
+        ordered = sorted((-distance, index) for distance, index in best)
+        return np.array([d for d, _ in ordered]), np.array([i for _, i in ordered], dtype=int)
+
+
+class AreaIndex:
+    """Nearest-neighbour index over one point per area"""
+
+    def __init__(self, areas: List[str], points, kind: str):
+        self.areas = list(areas)
+        self.kind = kind
+        self._positions = {area: i for i, area in enumerate(self.areas)}
+        self._points = np.asarray(points, dtype=float)
+        self._tree = cKDTree(self._points) if cKDTree is not None else KDTree(self._points)
+
+    def __contains__(self, area: str) -> bool:
+        return area in self._positions
+
+    def nearest(self, area: str, k: int = 5) -> List[Dict]:
+        """Return the k closest other areas to `area`"""
+        if area not in self._positions or len(self.areas) < 2:
+            return []
+
+        k = min(k + 1, len(self.areas))
+        distances, indices = self._tree.query(self._points[self._positions[area]], k=k)
+        distances, indices = np.atleast_1d(distances), np.atleast_1d(indices)
+
+        neighbours = []
+        for distance, index in zip(distances, indices):
+            name = self.areas[int(index)]
+            if name == area:
+                continue
+            if self.kind == 'geo':
+                # Chord length on the unit sphere -> great-circle kilometres
+                km = 2 * EARTH_RADIUS_KM * np.arcsin(min(float(distance) / 2, 1.0))
+                neighbours.append({'area': name, 'distance_km': round(float(km), 2)})
+            else:
+                neighbours.append({'area': name, 'distance': round(float(distance), 3)})
+        return neighbours[:k - 1]
+
+
+def build_geo_index(attributes: pd.DataFrame) -> Optional[AreaIndex]:
+    """Index areas by location; lat/lon go onto the unit sphere so Euclidean order matches distance"""
+    if attributes is None or attributes.empty:
+        return None
+
+    lat = np.radians(attributes['lat'].to_numpy(dtype=float))
+    lon = np.radians(attributes['lon'].to_numpy(dtype=float))
+    points = np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+    return AreaIndex(attributes['area'].tolist(), points, 'geo')
+
+
+def build_similarity_index(area_metrics: pd.DataFrame) -> Optional[AreaIndex]:
+    """Index areas by standardised price level, growth and demand"""
+    if area_metrics is None or area_metrics.empty:
+        return None
+
+    features = pd.DataFrame({
+        'log_price': np.log(area_metrics['avg_price'].clip(lower=1)),
+        'price_growth': area_metrics['price_growth'],
+        'avg_demand': area_metrics['avg_demand'],
+        'demand_growth': area_metrics['demand_growth'],
+    })[SIMILARITY_FEATURES].to_numpy(dtype=float)
+
+    with warnings.catch_warnings():
+        # Growth columns are entirely missing when every area has a single year
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(features, axis=0)
+        std = np.nanstd(features, axis=0)
+    std[~(std > 0)] = 1.0
+    # Missing growth (single-year areas) counts as average
+    points = np.nan_to_num((features - mean) / std)
+    return AreaIndex(area_metrics['area'].tolist(), points, 'similarity')
+
+
+def clean_area_attributes(df: pd.DataFrame) -> pd.DataFrame:
+    """Normalise an uploaded area-attributes sheet to area, lat, lon (+ any extra columns)"""
+    df = df.copy()
+    df.columns = df.columns.astype(str).str.strip().str.lower()
+    df = df.rename(columns=ATTRIBUTE_COLUMN_MAPPING)
+    df = df.loc[:, ~df.columns.duplicated()]
+
+    missing = [col for col in ['area', 'lat', 'lon'] if col not in df.columns]
+    if missing:
+        raise ValueError(f"Could not find columns {missing}. Available columns: {df.columns.tolist()}")
+
+    df['area'] = df['area'].astype(str).str.strip().str.title()
+    df['lat'] = pd.to_numeric(df['lat'], errors='coerce')
+    df['lon'] = pd.to_numeric(df['lon'], errors='coerce')
+    df = df.dropna(subset=['area', 'lat', 'lon'])
+    df = df[df['lat'].between(-90, 90) & df['lon'].between(-180, 180)]
+    return df.drop_duplicates(subset='area', keep='last').reset_index(drop=True)
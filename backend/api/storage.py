@@ -0,0 +1,551 @@
+"""Storage backends for the cleaned dataset.
+
+The default keeps the whole frame in memory. The optional Parquet backend writes
+it to disk, partitioned by area bucket and year, and answers filters and
+per-(area, year) aggregations with DuckDB, so a worker never holds more than
+the rows a request selects. The database backend persists rows and per-(area,
+year) aggregates in the project's configured database, so restarts and other
+workers pick up the same dataset. All of them hand out row selections with the
+same methods, so DataProcessor builds identical responses from any of them.
+"""
+import json
+import os
+import shutil
+import threading
+import uuid
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from django.conf import settings
+from django.db import DatabaseError, connection as db_connection, transaction
+from django.db.models import Max, Min
+from .metric_registry import CORE_METRICS, Metric, group_metrics, registry, sql_expressions
+from .models import AreaYearAggregate, Dataset, DatasetRow
+from .offload_tasks import yearly_means
+
+try:
+    import duckdb
+except ImportError:  # optional: only needed for DATA_BACKEND=parquet
+    duckdb = None
+
+# SQL for the aggregations structured_query accepts
+SQL_AGGREGATIONS = {
+    'mean': 'avg',
+    'median': 'median',
+    'sum': 'sum',
+    'min': 'min',
+    'max': 'max',
+    'count': 'count',
+    'std': 'stddev_samp',
+}
+
+# Columns the store adds for ordering and partition pruning; never returned
+ROW_ID = '_row_id'
+AREA_BUCKET = '_area_bucket'
+META_FILE = '_meta.json'
+
+
+# Columns every cleaned dataset has; the database backend stores the rest as JSON
+CORE_COLUMNS = ['year', 'area', 'price', 'demand']
+
+
+def core_metrics(metrics: Optional[Sequence[Metric]]) -> List[Metric]:
+    """The requested metrics, or price and demand when none are given"""
+    return list(metrics) if metrics else registry.resolve(CORE_METRICS)
+
+
+def restore_columns(frame: pd.DataFrame, dtypes: Dict, columns: List[str]) -> pd.DataFrame:
+    """Give key columns back the dtypes they had in the cleaned frame"""
+    for column in columns:
+        frame[column] = frame[column].astype(dtypes[column])
+    return frame
+
+
+def restore_layout(frame: pd.DataFrame, columns: List[str], dtypes: Dict) -> pd.DataFrame:
+    """Return stored rows in the cleaned frame's column order and dtypes"""
+    frame = frame[columns].copy()
+    for column, dtype in dtypes.items():
+        if dtype != 'object' and str(frame[column].dtype) != dtype:
+            frame[column] = frame[column].astype(dtype)
+        elif dtype == 'object' and frame[column].dtype != object:
+            frame[column] = frame[column].astype(object)
+    return frame.reset_index(drop=True)
+
+
+def area_bucket(area: str, buckets: int) -> int:
+    """Stable partition for an area name (crc32, so it is the same in every process)"""
+    return zlib.crc32(str(area).encode('utf-8')) % buckets
+
+
+class FrameSelection:
+    """Rows of the in-memory dataset matching a filter"""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+
+    @property
+    def empty(self) -> bool:
+        return self.df.empty
+
+    def count(self) -> int:
+        return len(self.df)
+
+    def head(self, n: int) -> pd.DataFrame:
+        return self.df.head(n)
+
+    def to_frame(self) -> pd.DataFrame:
+        return self.df
+
+    def values(self, columns: List[str]) -> pd.DataFrame:
+        return self.df[columns]
+
+    def within(self, start_year: Optional[float] = None, end_year: Optional[float] = None) -> 'FrameSelection':
+        df = self.df
+        if start_year is not None:
+            df = df[df['year'] >= start_year]
+        if end_year is not None:
+            df = df[df['year'] <= end_year]
+        return FrameSelection(df) if df is not self.df else self
+
+    def within_dates(self, spans: List[Tuple[str, str]]) -> 'FrameSelection':
+        """Rows dated inside any of the [start, end) spans"""
+        mask = np.zeros(len(self.df), dtype=bool)
+        for start, end in spans:
+            mask |= ((self.df['date'] >= pd.Timestamp(start)) & (self.df['date'] < pd.Timestamp(end))).to_numpy()
+        return FrameSelection(self.df[mask])
+
+    def year_range(self) -> Tuple[Optional[float], Optional[float]]:
+        if self.df.empty:
+            return None, None
+        return self.df['year'].min(), self.df['year'].max()
+
+    def area_year_means(self, metrics: Optional[Sequence[Metric]] = None) -> pd.DataFrame:
+        return group_metrics(self.df, core_metrics(metrics), ['year', 'area'])
+
+    def yearly_means(self) -> pd.DataFrame:
+        return yearly_means(self.df)
+
+    def aggregate(self, value_cols: List[str], aggregations: List[str]) -> pd.DataFrame:
+        grouped = self.df.groupby(['area', 'year'], sort=True, observed=True)[value_cols].agg(aggregations)
+        grouped.columns = [f'{col}_{agg}' for col, agg in grouped.columns]
+        return grouped.reset_index()
+
+
+class ParquetSelection:
+    """Rows of a ParquetStore matching a filter; every method is one pushed-down DuckDB query"""
+
+    def __init__(self, store: 'ParquetStore', where: str, params: List):
+        self.store = store
+        self.where = where
+        self.params = params
+
+    @property
+    def empty(self) -> bool:
+        return self.count() == 0
+
+    def _query(self, select: str, tail: str = '') -> pd.DataFrame:
+        return self.store.query(f"SELECT {select} FROM {self.store.source} WHERE {self.where} {tail}", self.params)
+
+    def count(self) -> int:
+        return int(self._query('count(*) AS n')['n'].iloc[0])
+
+    def head(self, n: int) -> pd.DataFrame:
+        return self.store.restore(self._query('*', f'ORDER BY {ROW_ID} LIMIT {int(n)}'))
+
+    def to_frame(self) -> pd.DataFrame:
+        return self.store.restore(self._query('*', f'ORDER BY {ROW_ID}'))
+
+    def values(self, columns: List[str]) -> pd.DataFrame:
+        """Only some columns of the selected rows, in no particular order"""
+        frame = self._query(', '.join(f'"{column}"' for column in columns))
+        return self.store.restore_columns(frame, [column for column in columns if column in ('year', 'area')])
+
+    def within(self, start_year: Optional[float] = None, end_year: Optional[float] = None) -> 'ParquetSelection':
+        where, params = self.where, list(self.params)
+        if start_year is not None:
+            where += ' AND year >= ?'
+            params.append(float(start_year))
+        if end_year is not None:
+            where += ' AND year <= ?'
+            params.append(float(end_year))
+        return ParquetSelection(self.store, where, params)
+
+    def within_dates(self, spans: List[Tuple[str, str]]) -> 'ParquetSelection':
+        clauses = ['("date" >= CAST(? AS TIMESTAMP) AND "date" < CAST(? AS TIMESTAMP))'] * len(spans)
+        params = list(self.params) + [bound for span in spans for bound in span]
+        return ParquetSelection(self.store, f"{self.where} AND ({' OR '.join(clauses) or 'FALSE'})", params)
+
+    def year_range(self) -> Tuple[Optional[float], Optional[float]]:
+        row = self._query('min(year) AS lo, max(year) AS hi').iloc[0]
+        if pd.isna(row['hi']):
+            return None, None
+        return row['lo'], row['hi']
+
+    def area_year_means(self, metrics: Optional[Sequence[Metric]] = None) -> pd.DataFrame:
+        frame = self._query(', '.join(['year', 'area'] + sql_expressions(core_metrics(metrics))),
+                            'GROUP BY year, area ORDER BY year, area')
+        return self.store.restore_columns(frame, ['year', 'area'])
+
+    def yearly_means(self) -> pd.DataFrame:
+        """Same frame as offload_tasks.yearly_means, computed in the scan"""
+        frame = self._query('area, year, avg(price) AS price, avg(demand) AS demand, count(price) AS records',
+                            'GROUP BY area, year ORDER BY area, year')
+        frame['records'] = frame['records'].astype('int64')
+        return self.store.restore_columns(frame, ['area', 'year'])
+
+    def aggregate(self, value_cols: List[str], aggregations: List[str]) -> pd.DataFrame:
+        expressions = [f'{SQL_AGGREGATIONS[agg]}({col}) AS "{col}_{agg}"' for col in value_cols for agg in aggregations]
+        frame = self._query(', '.join(['area', 'year'] + expressions), 'GROUP BY area, year ORDER BY area, year')
+        for column in frame.columns:
+            if column.endswith('_count'):
+                frame[column] = frame[column].astype('int64')
+        return self.store.restore_columns(frame, ['area', 'year'])
+
+
+class ParquetStore:
+    """One immutable dataset as hive-partitioned Parquet under `path`, queried through DuckDB.
+
+    Directories are named after the data's content hash, so every worker that
+    loads the same workbook reuses one copy on disk. Areas are hashed into
+    `buckets` partitions rather than one directory each, which keeps the file
+    count bounded for catalogues with thousands of areas while still letting a
+    query for a few areas skip most of the files.
+    """
+
+    def __init__(self, path: Path, meta: Dict):
+        self.path = Path(path)
+        self.meta = meta
+        self.fingerprint = meta['fingerprint']
+        self.rows = meta['rows']
+        self.areas = meta['areas']
+        self.buckets = meta['buckets']
+        self.columns = meta['columns']
+        hive_types = {AREA_BUCKET: 'INTEGER', 'year': meta['year_type']}
+        self.source = (f"read_parquet('{self.path.as_posix()}/**/*.parquet', hive_partitioning = true, "
+                       f"hive_types = {hive_types})")
+
+    @classmethod
+    def open(cls, path: Path) -> 'ParquetStore':
+        with open(Path(path) / META_FILE) as f:
+            return cls(path, json.load(f))
+
+    @classmethod
+    def write(cls, df: pd.DataFrame, root: Path, fingerprint: str, buckets: int = 64,
+              keep: int = 3) -> 'ParquetStore':
+        """Write a cleaned frame (or reuse an identical one already on disk) and return its store"""
+        root = Path(root)
+        target = root / fingerprint
+        if (target / META_FILE).exists():
+            return cls.open(target)
+
+        root.mkdir(parents=True, exist_ok=True)
+        staging = root / f'.staging-{fingerprint}-{uuid.uuid4().hex[:8]}'
+        frame = df.copy()
+        for column in frame.columns:
+            if frame[column].dtype == object and column != 'area':
+                # DuckDB needs one type per column; spreadsheets mix numbers and text
+                frame[column] = frame[column].astype('string')
+        frame[ROW_ID] = np.arange(len(frame), dtype='int64')
+        frame[AREA_BUCKET] = [area_bucket(area, buckets) for area in frame['area']]
+
+        try:
+            cursor = connection().cursor()
+            cursor.register('frame', frame)
+            cursor.execute(f"COPY (SELECT * FROM frame) TO '{staging.as_posix()}' "
+                           f"(FORMAT PARQUET, PARTITION_BY ({AREA_BUCKET}, year))")
+            cursor.close()
+
+            meta = {
+                'fingerprint': fingerprint,
+                'rows': int(len(df)),
+                'areas': sorted(df['area'].unique().tolist()),
+                'buckets': buckets,
+                'columns': [str(column) for column in df.columns],
+                'dtypes': {str(column): str(dtype) for column, dtype in df.dtypes.items()},
+                'year_type': 'BIGINT' if pd.api.types.is_integer_dtype(df['year']) else 'DOUBLE',
+            }
+            with open(staging / META_FILE, 'w') as f:
+                json.dump(meta, f)
+            # Publish atomically; if another worker got there first, use its copy
+            os.rename(staging, target)
+        except OSError:
+            if not (target / META_FILE).exists():
+                raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        prune_stores(root, keep=keep, current=fingerprint)
+        print(f"🗄️ Wrote {len(df)} rows as Parquet to {target}")
+        return cls.open(target)
+
+    def query(self, sql: str, params: List) -> pd.DataFrame:
+        cursor = connection().cursor()
+        try:
+            return cursor.execute(sql, params).df()
+        finally:
+            cursor.close()
+
+    def restore_columns(self, frame: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        return restore_columns(frame, self.meta['dtypes'], columns)
+
+    def restore(self, frame: pd.DataFrame) -> pd.DataFrame:
+        """Drop the store's helper columns and return rows in the cleaned frame's layout"""
+        return restore_layout(frame, self.meta['columns'], self.meta['dtypes'])
+
+    def select(self, areas: Optional[List[str]] = None, start_year: Optional[float] = None,
+               end_year: Optional[float] = None, area_pattern: Optional[str] = None) -> ParquetSelection:
+        """Rows for the given areas and year window; bucket and year filters prune whole partitions"""
+        clauses, params = ['true'], []
+        if areas is not None:
+            areas = list(areas)
+            if not areas:
+                return ParquetSelection(self, 'false', [])
+            buckets = sorted({area_bucket(area, self.buckets) for area in areas})
+            clauses.append(f"{AREA_BUCKET} IN ({', '.join(str(bucket) for bucket in buckets)})")
+            clauses.append(f"area IN ({', '.join('?' for _ in areas)})")
+            params += areas
+        if area_pattern:
+            # Case-insensitive regex, like Series.str.contains(case=False)
+            clauses.append("regexp_matches(area, ?, 'i')")
+            params.append(area_pattern)
+        return ParquetSelection(self, ' AND '.join(clauses), params).within(start_year, end_year)
+
+
+class DatabaseSelection:
+    """Rows of a DatabaseStore matching a filter, read with indexed (dataset, area, year) range scans"""
+
+    def __init__(self, store: 'DatabaseStore', areas: Optional[List[str]] = None, start_year: Optional[float] = None,
+                 end_year: Optional[float] = None, area_pattern: Optional[str] = None):
+        self.store = store
+        self.areas = None if areas is None else list(areas)
+        self.start_year = start_year
+        self.end_year = end_year
+        self.area_pattern = area_pattern
+
+    def _filter(self, queryset):
+        queryset = queryset.filter(dataset_id=self.store.dataset_id)
+        if self.areas is not None:
+            queryset = queryset.filter(area__in=self.areas)
+        if self.start_year is not None:
+            queryset = queryset.filter(year__gte=float(self.start_year))
+        if self.end_year is not None:
+            queryset = queryset.filter(year__lte=float(self.end_year))
+        if self.area_pattern:
+            queryset = queryset.filter(area__iregex=self.area_pattern)
+        return queryset
+
+    @property
+    def rows(self):
+        return self._filter(DatasetRow.objects.all())
+
+    @property
+    def empty(self) -> bool:
+        return not self.rows.exists()
+
+    def count(self) -> int:
+        return self.rows.count()
+
+    def _frame(self, queryset) -> pd.DataFrame:
+        records = list(queryset.values_list(*CORE_COLUMNS, 'extra'))
+        frame = pd.DataFrame.from_records(records, columns=CORE_COLUMNS + ['extra'])
+        extra = pd.DataFrame.from_records([value or {} for value in frame.pop('extra')],
+                                          columns=self.store.extra_columns, index=frame.index)
+        return self.store.restore(pd.concat([frame, extra], axis=1))
+
+    def head(self, n: int) -> pd.DataFrame:
+        return self._frame(self.rows.order_by('row_id')[:n])
+
+    def to_frame(self) -> pd.DataFrame:
+        return self._frame(self.rows.order_by('row_id'))
+
+    def values(self, columns: List[str]) -> pd.DataFrame:
+        """Only some columns of the selected rows, in no particular order"""
+        if not set(columns) <= set(CORE_COLUMNS):
+            return self.to_frame()[columns]
+        frame = pd.DataFrame.from_records(list(self.rows.values_list(*columns)), columns=columns)
+        return self.store.restore_columns(frame, [column for column in columns if column in ('year', 'area')])
+
+    def within(self, start_year: Optional[float] = None, end_year: Optional[float] = None) -> 'DatabaseSelection':
+        if self.start_year is not None and start_year is not None:
+            start_year = max(start_year, self.start_year)
+        if self.end_year is not None and end_year is not None:
+            end_year = min(end_year, self.end_year)
+        return DatabaseSelection(
+            self.store, self.areas,
+            self.start_year if start_year is None else start_year,
+            self.end_year if end_year is None else end_year,
+            self.area_pattern
+        )
+
+    def within_dates(self, spans: List[Tuple[str, str]]) -> FrameSelection:
+        # Dates live in the extra-columns JSON, so the rows are filtered after loading
+        return FrameSelection(self.to_frame()).within_dates(spans)
+
+    def year_range(self) -> Tuple[Optional[float], Optional[float]]:
+        bounds = self.rows.aggregate(lo=Min('year'), hi=Max('year'))
+        return bounds['lo'], bounds['hi']
+
+    def _aggregates(self, order: List[str]) -> pd.DataFrame:
+        if self.area_pattern:
+            # Stored aggregates cover whole (area, year) groups; pattern selections group their rows instead
+            return FrameSelection(self.to_frame()).yearly_means().sort_values(order).reset_index(drop=True)
+        queryset = self._filter(AreaYearAggregate.objects.all()).order_by(*order)
+        frame = pd.DataFrame.from_records(list(queryset.values_list('area', 'year', 'price', 'demand', 'records')),
+                                          columns=['area', 'year', 'price', 'demand', 'records'])
+        frame['records'] = frame['records'].astype('int64')
+        return self.store.restore_columns(frame, ['area', 'year'])
+
+    def area_year_means(self, metrics: Optional[Sequence[Metric]] = None) -> pd.DataFrame:
+        metrics = core_metrics(metrics)
+        if any(metric.name not in CORE_METRICS or metric.aggregation != 'mean' for metric in metrics):
+            # Only price and demand means are stored; other metrics are grouped from the selected rows
+            return FrameSelection(self.to_frame()).area_year_means(metrics)
+        # A year window never splits a group, so the stored means are exactly what a groupby would give
+        names = [metric.name for metric in metrics]
+        return self._aggregates(['year', 'area'])[['year', 'area'] + names].reset_index(drop=True)
+
+    def yearly_means(self) -> pd.DataFrame:
+        return self._aggregates(['area', 'year'])
+
+    def aggregate(self, value_cols: List[str], aggregations: List[str]) -> pd.DataFrame:
+        # Only the filter runs in SQL: medians are not portable, and pandas keeps results identical
+        frame = pd.DataFrame.from_records(list(self.rows.values_list('area', 'year', *value_cols)),
+                                          columns=['area', 'year'] + value_cols)
+        return FrameSelection(self.store.restore_columns(frame, ['area', 'year'])).aggregate(value_cols, aggregations)
+
+
+class DatabaseStore:
+    """A dataset persisted in the project's database (rows plus per-(area, year) aggregates).
+
+    Only the active dataset's metadata is held in memory. Writes go in with
+    executemany batches inside one transaction and flip `is_active`, so every
+    worker (and the next restart) sees either the old dataset or the new one.
+    """
+
+    def __init__(self, dataset: Dataset):
+        self.dataset_id = dataset.pk
+        self.fingerprint = dataset.fingerprint
+        self.rows = dataset.rows
+        self.areas = dataset.areas
+        self.columns = dataset.columns
+        self.dtypes = dataset.dtypes
+        self.extra_columns = [column for column in dataset.columns if column not in CORE_COLUMNS]
+
+    @classmethod
+    def active(cls) -> Optional['DatabaseStore']:
+        dataset = Dataset.objects.filter(is_active=True).order_by('-created_at').first()
+        return cls(dataset) if dataset is not None else None
+
+    @classmethod
+    def active_fingerprint(cls) -> Optional[str]:
+        return Dataset.objects.filter(is_active=True).values_list('fingerprint', flat=True).first()
+
+    @classmethod
+    def write(cls, df: pd.DataFrame, fingerprint: str, batch_size: int = 5000, keep: int = 2) -> 'DatabaseStore':
+        """Store a cleaned frame (unless an identical one is already stored) and make it the active dataset"""
+        extra_columns = [column for column in df.columns if column not in CORE_COLUMNS]
+        try:
+            with transaction.atomic():
+                dataset = Dataset.objects.select_for_update().filter(fingerprint=fingerprint).first()
+                if dataset is None:
+                    dataset = Dataset.objects.create(
+                        fingerprint=fingerprint,
+                        rows=len(df),
+                        columns=[str(column) for column in df.columns],
+                        dtypes={str(column): str(dtype) for column, dtype in df.dtypes.items()},
+                        areas=sorted(df['area'].unique().tolist())
+                    )
+                    cls._insert_rows(dataset, df, extra_columns, batch_size)
+                    cls._insert_aggregates(dataset, df, batch_size)
+                    print(f"🗄️ Stored {len(df)} rows in the database")
+                Dataset.objects.exclude(pk=dataset.pk).filter(is_active=True).update(is_active=False)
+                Dataset.objects.filter(pk=dataset.pk).update(is_active=True)
+        except DatabaseError:
+            # Another worker stored the same data at the same time; use its copy
+            dataset = Dataset.objects.filter(fingerprint=fingerprint).first()
+            if dataset is None:
+                raise
+
+        stale = Dataset.objects.filter(is_active=False).order_by('-created_at').values_list('pk', flat=True)[max(keep - 1, 0):]
+        Dataset.objects.filter(pk__in=list(stale)).delete()
+        return cls(Dataset.objects.get(pk=dataset.pk))
+
+    @staticmethod
+    def _insert_rows(dataset: Dataset, df: pd.DataFrame, extra_columns: List[str], batch_size: int):
+        table = DatasetRow._meta.db_table
+        sql = (f"INSERT INTO {table} (dataset_id, row_id, year, area, price, demand, extra) "
+               f"VALUES (%s, %s, %s, %s, %s, %s, %s)")
+        with db_connection.cursor() as cursor:
+            for start in range(0, len(df), batch_size):
+                chunk = df.iloc[start:start + batch_size]
+                if extra_columns:
+                    extras = chunk[extra_columns].to_json(orient='records', lines=True, date_format='iso').splitlines()
+                else:
+                    extras = [None] * len(chunk)
+                cursor.executemany(sql, [
+                    (dataset.pk, start + offset, float(year), str(area), float(price), float(demand), extra)
+                    for offset, (year, area, price, demand, extra) in enumerate(zip(
+                        chunk['year'], chunk['area'], chunk['price'], chunk['demand'], extras))
+                ])
+
+    @staticmethod
+    def _insert_aggregates(dataset: Dataset, df: pd.DataFrame, batch_size: int):
+        yearly = FrameSelection(df).yearly_means()
+        table = AreaYearAggregate._meta.db_table
+        sql = (f"INSERT INTO {table} (dataset_id, area, year, price, demand, records) "
+               f"VALUES (%s, %s, %s, %s, %s, %s)")
+        records = [(dataset.pk, str(area), float(year), float(price), float(demand), int(count))
+                   for area, year, price, demand, count in yearly.itertuples(index=False)]
+        with db_connection.cursor() as cursor:
+            for start in range(0, len(records), batch_size):
+                cursor.executemany(sql, records[start:start + batch_size])
+
+    def restore_columns(self, frame: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+        return restore_columns(frame, self.dtypes, columns)
+
+    def restore(self, frame: pd.DataFrame) -> pd.DataFrame:
+        return restore_layout(frame, self.columns, self.dtypes)
+
+    def select(self, areas: Optional[List[str]] = None, start_year: Optional[float] = None,
+               end_year: Optional[float] = None, area_pattern: Optional[str] = None) -> DatabaseSelection:
+        return DatabaseSelection(self, areas, start_year, end_year, area_pattern)
+
+
+def prune_stores(root: Path, keep: int, current: str):
+    """Delete all but the `keep` most recently written datasets (never `current`)"""
+    stores = [path for path in Path(root).iterdir()
+              if path.is_dir() and not path.name.startswith('.') and path.name != current]
+    stores.sort(key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in stores[max(keep - 1, 0):]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+_connection = None
+_connection_lock = threading.Lock()
+
+
+def connection():
+    """The process's DuckDB connection; use .cursor() per query, cursors are safe across threads"""
+    global _connection
+    if duckdb is None:
+        raise RuntimeError('The Parquet backend needs DuckDB: pip install duckdb')
+    with _connection_lock:
+        if _connection is None:
+            _connection = duckdb.connect()
+            memory_limit = getattr(settings, 'DUCKDB_MEMORY_LIMIT', None)
+            if memory_limit:
+                _connection.execute('SET memory_limit = ?', [memory_limit])
+        return _connection
+
+
+def _after_fork_in_child():
+    # DuckDB connections do not survive fork; the child opens its own on first use
+    global _connection, _connection_lock
+    _connection = None
+    _connection_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
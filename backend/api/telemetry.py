@@ -0,0 +1,177 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from django.conf import settings
+
+PREFIX = 'realestate'
+
+# Latency buckets in seconds, from sub-millisecond lookups to slow LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# name -> (type, help)
+FAMILIES = {
+    'stage_duration_seconds': ('histogram', 'Time spent in each DataProcessor stage'),
+    'request_duration_seconds': ('histogram', 'End-to-end API request time by endpoint'),
+    'cache_requests_total': ('counter', 'Derived-data cache lookups by cache and result'),
+    'llm_fallbacks_total': ('counter', 'Summaries served by the deterministic generator instead of the LLM'),
+    'offload_tasks_total': ('counter', 'CPU-heavy tasks by where they ran: process pool, inline or rejected'),
+    'admission_requests_total': ('counter', 'Requests through an admission gate: admitted, queued or rejected'),
+    'admission_in_flight': ('gauge', 'Requests currently holding an admission slot, by gate'),
+    'query_log_records_total': ('counter', 'Questions written to the query log'),
+    'prewarm_queries_total': ('counter', 'Popular questions replayed after a load, by outcome'),
+    'dataset_rows': ('gauge', 'Rows in the active dataset'),
+    'dataset_areas': ('gauge', 'Distinct areas in the active dataset'),
+    'dataset_version': ('gauge', 'Version counter of the active dataset'),
+}
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _NoopSpan:
+    """Returned by span() when telemetry is off so disabled timing costs one call"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('telemetry', 'stage', 'capture', 'started')
+
+    def __init__(self, telemetry, stage: str, capture=None):
+        self.telemetry = telemetry
+        self.stage = stage
+        self.capture = capture
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        if self.capture is not None:
+            self.capture.append((self.stage, elapsed))
+        self.telemetry.observe('stage_duration_seconds', elapsed, stage=self.stage)
+        return False
+
+
+class Telemetry:
+    """In-process metrics registry exported in Prometheus text format"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, Dict[Tuple, object]] = {name: {} for name in FAMILIES}
+        self._local = threading.local()
+
+    def _get(self, family: str, labels: Dict):
+        key = tuple(sorted(labels.items()))
+        series = self._metrics[family]
+        metric = series.get(key)
+        if metric is None:
+            kind = FAMILIES[family][0]
+            metric = Histogram() if kind == 'histogram' else Counter() if kind == 'counter' else Gauge()
+            series[key] = metric
+        return metric
+
+    def span(self, stage: str):
+        """Time a block of code into the stage histogram"""
+        capture = getattr(self._local, 'stages', None)
+        if not self.enabled and capture is None:
+            return _NOOP_SPAN
+        return _Span(self, stage, capture)
+
+    @contextmanager
+    def capture_stages(self):
+        """Also collect (stage, seconds) for spans on this thread, even when metrics are disabled"""
+        stages: List[Tuple[str, float]] = []
+        previous = getattr(self._local, 'stages', None)
+        self._local.stages = stages
+        try:
+            yield stages
+        finally:
+            self._local.stages = previous
+
+    def observe(self, family: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._get(family, labels).observe(value)
+
+    def inc(self, family: str, amount: float = 1, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._get(family, labels).inc(amount)
+
+    def set_gauge(self, family: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._get(family, labels).set(value)
+
+    def reset(self):
+        with self._lock:
+            self._metrics = {name: {} for name in FAMILIES}
+
+    def render_prometheus(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for family, (kind, help_text) in FAMILIES.items():
+                name = f'{PREFIX}_{family}'
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+
+                for key, metric in sorted(self._metrics[family].items()):
+                    pairs = [f'{label}="{value}"' for label, value in key]
+                    labels = '{' + ','.join(pairs) + '}' if pairs else ''
+                    if kind == 'histogram':
+                        cumulative = 0
+                        for bound, count in zip(list(metric.buckets) + ['+Inf'], metric.counts):
+                            cumulative += count
+                            bucket_labels = ','.join(pairs + [f'le="{bound}"'])
+                            lines.append(f'{name}_bucket{{{bucket_labels}}} {cumulative}')
+                        lines.append(f'{name}_sum{labels} {metric.sum}')
+                        lines.append(f'{name}_count{labels} {metric.count}')
+                    else:
+                        lines.append(f'{name}{labels} {metric.value}')
+
+        return '\n'.join(lines) + '\n'
+
+
+telemetry = Telemetry(enabled=getattr(settings, 'METRICS_ENABLED', True))
@@ -3,10 +3,25 @@ from . import views
 
 urlpatterns = [
     path('upload/', views.upload_file, name='upload'),
+    path('upload-locations/', views.upload_area_attributes, name='upload_locations'),
     path('query/', views.query_data, name='query'),
+    path('query/stream/', views.query_stream, name='query_stream'),
+    path('query/structured/', views.structured_query, name='structured_query'),
     path('download/', views.download_data, name='download'),
     path('download-sample/', views.download_sample_dataset, name='download_sample'),
     path('generate-excel/', views.generate_excel, name='generate_excel'),
+    path('results/<str:handle>/export/', views.export_result, name='export_result'),
     path('areas/', views.get_areas, name='areas'),
+    path('rankings/', views.get_rankings, name='rankings'),
+    path('distribution/', views.get_distribution, name='distribution'),
+    path('neighbours/', views.get_neighbours, name='neighbours'),
+    path('shard/catalogue/', views.shard_catalogue, name='shard_catalogue'),
+    path('shard/partials/', views.shard_partials, name='shard_partials'),
+    path('shard/rows/', views.shard_rows, name='shard_rows'),
+    path('shards/', views.shards, name='shards'),
+    path('investment/weights/', views.investment_weights, name='investment_weights'),
     path('health/', views.health_check, name='health'),
+    path('metrics/', views.metrics, name='metrics'),
+    path('profiles/', views.get_profiles, name='profiles'),
+    path('profiles/<str:profile_id>/', views.download_profile, name='download_profile'),
 ]
\ No newline at end of file
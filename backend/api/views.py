@@ -1,21 +1,127 @@
+import hmac
 import os
-import pandas as pd
-from django.http import JsonResponse, HttpResponse
+from functools import wraps
+from django.conf import settings
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import condition, require_http_methods
+from django.views.decorators.vary import vary_on_headers
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework import status
 import json
-from .data_processor import data_processor
+from .admission import admission
+from .caching import dataset_condition, make_etag, revalidate
+from .lazy import data_processor
+from .querylog import query_log
+from .telemetry import telemetry
+from .profiling import (ProfilerBusy, RequestProfiler, is_profiling_authorized, list_profiles, profile_path,
+                        profiling_requested, render_text)
+
+def _busy_response(error):
+    """503 + Retry-After when the offload pool's queue is full"""
+    response = Response({'error': str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response['Retry-After'] = str(error.retry_after)
+    return response
+
+def _sharded(request=None):
+    # A shard router holds no rows: queries and uploads go to the shards, so its own dataset ETags mean nothing
+    return bool(getattr(settings, 'SHARD_URLS', None))
+
+def _shard_authorized(request):
+    """Shard calls and reshards need SHARD_TOKEN in X-Shard-Token; they are refused when the token is unset"""
+    token = getattr(settings, 'SHARD_TOKEN', None)
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('X-Shard-Token', '').encode(), token.encode())
+
+def _shard_forbidden():
+    return Response({'error': 'A valid X-Shard-Token is required (set SHARD_TOKEN on the router and the shards).'}, 
+                  status=status.HTTP_403_FORBIDDEN)
+
+def _unsharded(view):
+    """Views answered from this instance's own rows: 501 on a shard router, which holds none"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if _sharded():
+            return JsonResponse({'error': 'Not available on a shard router; ask the shards directly.'}, 
+                                status=status.HTTP_501_NOT_IMPLEMENTED)
+        return view(request, *args, **kwargs)
+    return wrapper
+
+def _load_shards(file_path, mode):
+    """Upload on a shard router: clean the workbook here, then send each shard the rows of the areas it owns"""
+    from .sharding import ShardError, shard_router
+    
+    df = shard_router.planner.read_dataset(file_path)
+    if df is None:
+        return Response({'error': 'Failed to process the uploaded file. Please check the format.'}, 
+                      status=status.HTTP_400_BAD_REQUEST)
+    try:
+        loaded = shard_router.load(df, append=mode == 'append')
+    except ShardError as e:
+        return Response({'error': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+    
+    return Response({
+        'message': 'File uploaded and split across the shards',
+        'mode': mode,
+        'areas': shard_router.planner.get_areas(),
+        'shards': loaded
+    })
+
+def _answer_variant(request):
+    # The same answer as JSON and as an Arrow stream must not share an ETag
+    from .negotiation import accepts_arrow
+    
+    return 'arrow' if accepts_arrow(request) else 'json'
+
+def _arrow_refusal(request):
+    """406 without pyarrow, 400 for an unknown ?compression=; None when an Arrow stream can be sent"""
+    from .arrow import arrow_compression, pa
+    
+    if pa is None:
+        return Response({'error': 'Arrow responses need the pyarrow package on the server'}, 
+                      status=status.HTTP_406_NOT_ACCEPTABLE)
+    try:
+        arrow_compression(request)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return None
+
+def _arrow_response(request, df, metadata, filename=None):
+    """Stream a frame as Arrow IPC record batches (check _arrow_refusal first)"""
+    from .arrow import arrow_compression, stream_frame
+    from .negotiation import ARROW_STREAM
+    
+    response = StreamingHttpResponse(stream_frame(df, metadata, arrow_compression(request)), 
+                                     content_type=ARROW_STREAM)
+    if filename:
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+def _arrow_answer(request, query, result):
+    """A query answer as an Arrow stream: every result row, with the rest of the answer in the schema metadata"""
+    import pandas as pd
+    
+    metadata = {'query': query, **{key: value for key, value in result.items() if key != 'table'}}
+    handle = result.get('result_handle')
+    if handle:
+        df = data_processor.get_result(handle)
+        metadata['dataset_version'] = data_processor.dataset_version
+    else:
+        # Shard routers hold no rows; their answer carries the merged table
+        df = pd.DataFrame(result.get('table', []))
+    return _arrow_response(request, df, metadata)
 
 @csrf_exempt
 @api_view(['POST'])
 def upload_file(request):
-    """Handle Excel file upload"""
+    """Handle Excel file upload (mode=append adds the rows to the current dataset instead of replacing it)"""
     try:
+        from .offload import OffloadBusy
+        
         if 'file' not in request.FILES:
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
         
@@ -26,45 +132,233 @@ def upload_file(request):
             return Response({'error': 'Invalid file type. Please upload an Excel file.'}, 
                           status=status.HTTP_400_BAD_REQUEST)
         
+        mode = request.data.get('mode', request.GET.get('mode', 'replace'))
+        if mode not in ('replace', 'append'):
+            return Response({'error': 'mode must be replace or append'}, status=status.HTTP_400_BAD_REQUEST)
+        
         # Save file temporarily
         file_path = default_storage.save(f'uploads/{uploaded_file.name}', ContentFile(uploaded_file.read()))
         full_path = default_storage.path(file_path)
         
         # Load the new data
-        success = data_processor.load_excel_file(full_path)
-        
-        # Clean up temporary file
-        default_storage.delete(file_path)
+        try:
+            if _sharded():
+                return _load_shards(full_path, mode)
+            success = data_processor.load_excel_file(full_path, append=mode == 'append')
+        finally:
+            # Clean up temporary file
+            default_storage.delete(file_path)
         
         if success:
             return Response({
                 'message': 'File uploaded and processed successfully',
+                'mode': mode,
                 'areas': data_processor.get_areas()
             })
         else:
             return Response({'error': 'Failed to process the uploaded file. Please check the format.'}, 
                           status=status.HTTP_400_BAD_REQUEST)
     
+    except OffloadBusy as e:
+        return _busy_response(e)
     except Exception as e:
         return Response({'error': f'Upload failed: {str(e)}'}, 
                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@_unsharded
 @csrf_exempt
 @api_view(['POST'])
+def upload_area_attributes(request):
+    """Handle upload of an area-attributes sheet (area, lat, lon)"""
+    try:
+        if 'file' not in request.FILES:
+            return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        uploaded_file = request.FILES['file']
+        
+        if not uploaded_file.name.endswith(('.xlsx', '.xls')):
+            return Response({'error': 'Invalid file type. Please upload an Excel file.'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        file_path = default_storage.save(f'uploads/{uploaded_file.name}', ContentFile(uploaded_file.read()))
+        full_path = default_storage.path(file_path)
+        
+        success = data_processor.load_area_attributes(full_path)
+        
+        default_storage.delete(file_path)
+        
+        if success:
+            return Response({
+                'message': 'Area coordinates uploaded successfully',
+                'areas_with_coordinates': len(data_processor.area_attributes)
+            })
+        else:
+            return Response({'error': 'Failed to process the file. It needs area, lat and lon columns.'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+    
+    except Exception as e:
+        return Response({'error': f'Upload failed: {str(e)}'}, 
+                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+def _scoring_weights(request):
+    # Investment answers change when the weights do, without a new dataset
+    return json.dumps(data_processor.investment_scorer.weights, sort_keys=True)
+
+def _query_variant(request):
+    return f"{_scoring_weights(request)}|{_answer_variant(request)}"
+
+def _uncached_query(request):
+    return profiling_requested(request) or _sharded(request)
+
+@vary_on_headers('Accept')
+@dataset_condition(vary_on=('query', 'offset', 'limit', 'compression'), extra=_query_variant, 
+                   skip=_uncached_query)
+@csrf_exempt
+@api_view(['GET', 'POST'])
 def query_data(request):
-    """Handle natural language queries"""
+    """Handle natural language queries (GET /api/query/?query=... is cacheable with ETags, ?format=arrow streams the rows)"""
     try:
-        data = json.loads(request.body)
+        from .negotiation import accepts_arrow
+        
+        data = json.loads(request.body) if request.method == 'POST' else request.GET
         query = data.get('query', '').strip()
         
         if not query:
             return Response({'error': 'Query cannot be empty'}, status=status.HTTP_400_BAD_REQUEST)
         
-        result = data_processor.query_data(query)
+        offset = int(data.get('offset', 0) or 0)
+        limit = int(data['limit']) if data.get('limit') else None
+        
+        arrow = accepts_arrow(request)
+        if arrow:
+            refusal = _arrow_refusal(request)
+            if refusal is not None:
+                return refusal
+        
+        if _sharded():
+            # Scatter to the shards owning the question's areas and merge their partial aggregates
+            from .sharding import ShardError, shard_router
+            try:
+                result = shard_router.query_data(query, offset=offset, limit=limit)
+            except ShardError as e:
+                return Response({'error': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+            if 'error' in result:
+                return Response(result, status=status.HTTP_400_BAD_REQUEST)
+            return _arrow_answer(request, query, result) if arrow else Response(result)
+        
+        if profiling_requested(request):
+            # Admin-only: profile this one request and keep the artifact for download
+            if not is_profiling_authorized(request):
+                return Response({'error': 'Profiling requires a valid X-Profile-Token'}, 
+                              status=status.HTTP_403_FORBIDDEN)
+            try:
+                with RequestProfiler('query_data', {'query': query}) as profiler:
+                    result = data_processor.query_data(query, offset=offset, limit=limit)
+            except ProfilerBusy as e:
+                # Only one request can be profiled at a time
+                return Response({'error': str(e)}, status=status.HTTP_409_CONFLICT)
+            summary = profiler.save()
+            result['profile'] = {
+                'id': summary['id'],
+                'duration_ms': summary['duration_ms'],
+                'stages_ms': summary['stages_ms'],
+                'pandas_operations': summary['pandas_operations'][:10],
+                'download_url': f"/api/profiles/{summary['id']}/",
+            }
+        else:
+            result = data_processor.query_data(query, offset=offset, limit=limit)
         
         if 'error' in result:
             return Response(result, status=status.HTTP_400_BAD_REQUEST)
         
+        # Queued only; parsing and writing happen on the log's writer thread
+        query_log.record(query)
+        if arrow:
+            return _arrow_answer(request, query, result)
+        return Response(result)
+    
+    except json.JSONDecodeError:
+        return Response({'error': 'Invalid JSON in request body'}, status=status.HTTP_400_BAD_REQUEST)
+    except (TypeError, ValueError):
+        return Response({'error': 'offset and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': f'Query processing failed: {str(e)}'}, 
+                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@require_http_methods(['GET'])
+def query_stream(request):
+    """Answer a query as Server-Sent Events: chart and table as soon as they are ready, then the summary"""
+    # Plain Django view: DRF would refuse EventSource's Accept: text/event-stream with a 406
+    query = request.GET.get('query', '').strip()
+    if not query:
+        return JsonResponse({'error': 'Query cannot be empty'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        offset = int(request.GET.get('offset', 0) or 0)
+        limit = int(request.GET['limit']) if request.GET.get('limit') else None
+    except ValueError:
+        return JsonResponse({'error': 'offset and limit must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    response = StreamingHttpResponse(_sse_events(query, offset, limit), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies (nginx, Render) from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+def _sse_events(query, offset, limit):
+    from rest_framework.utils.encoders import JSONEncoder
+    
+    def event(name, data):
+        return f"event: {name}\ndata: {json.dumps(data, cls=JSONEncoder)}\n\n"
+    
+    try:
+        if _sharded():
+            # Same events on a shard router, answered from the shards owning the question's areas
+            from .sharding import shard_router
+            events = shard_router.stream_query(query, offset=offset, limit=limit)
+        else:
+            events = data_processor.stream_query(query, offset=offset, limit=limit)
+        for name, data in events:
+            if name == 'result':
+                query_log.record(query)
+            yield event(name, data)
+    except Exception as e:
+        yield event('failure', {'error': f'Query processing failed: {str(e)}'})
+
+@_unsharded
+@csrf_exempt
+@api_view(['POST'])
+def structured_query(request):
+    """Handle machine-readable queries (explicit areas, metric, years) without NL parsing"""
+    try:
+        from .negotiation import accepts_arrow
+        
+        spec = json.loads(request.body)
+        if not isinstance(spec, dict):
+            return Response({'error': 'Request body must be a JSON object'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        arrow = accepts_arrow(request)
+        if arrow:
+            refusal = _arrow_refusal(request)
+            if refusal is not None:
+                return refusal
+        
+        try:
+            result = data_processor.structured_query(spec)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if arrow:
+            import pandas as pd
+            
+            # The aggregates are the stream's rows; the table's rows stay behind result_handle
+            if 'aggregates' not in result:
+                return Response({'error': 'Arrow responses carry the aggregates; keep include.aggregates on'}, 
+                              status=status.HTTP_400_BAD_REQUEST)
+            df = pd.DataFrame(result.pop('aggregates'))
+            metadata = {key: value for key, value in result.items() if key != 'table'}
+            metadata['dataset_version'] = data_processor.dataset_version
+            return _arrow_response(request, df, metadata)
+        
         return Response(result)
     
     except json.JSONDecodeError:
@@ -73,16 +367,26 @@ def query_data(request):
         return Response({'error': f'Query processing failed: {str(e)}'}, 
                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@_unsharded
+@vary_on_headers('Accept')
+@dataset_condition(vary_on=('area', 'format', 'compression'), extra=_answer_variant)
 @api_view(['GET'])
 def download_data(request):
-    """Download filtered data as CSV or XLSX"""
+    """Download filtered data as CSV, XLSX or an Arrow IPC stream"""
     try:
+        from .negotiation import accepts_arrow
+        from .offload import OffloadBusy, offloader
+        
         area = request.GET.get('area', '')
-        format_type = request.GET.get('format', 'csv').lower()
+        format_type = 'arrow' if accepts_arrow(request) else request.GET.get('format', 'csv').lower()
         
-        if format_type not in ['csv', 'xlsx']:
-            return Response({'error': 'Invalid format. Use csv or xlsx.'}, 
+        if format_type not in ['csv', 'xlsx', 'arrow']:
+            return Response({'error': 'Invalid format. Use csv, xlsx or arrow.'}, 
                           status=status.HTTP_400_BAD_REQUEST)
+        if format_type == 'arrow':
+            refusal = _arrow_refusal(request)
+            if refusal is not None:
+                return refusal
         
         # Get filtered data
         filtered_df = data_processor.get_filtered_data(area)
@@ -95,6 +399,10 @@ def download_data(request):
         area_name = area.replace(' ', '_').lower() if area else 'all_areas'
         filename = f"{area_name}_data.{format_type}"
         
+        if format_type == 'arrow':
+            metadata = {'area': area, 'dataset_version': data_processor.dataset_version}
+            return _arrow_response(request, filtered_df, metadata, filename)
+        
         # Create response
         response = HttpResponse(content_type='application/octet-stream')
         response['Content-Disposition'] = f'attachment; filename="{filename}"'
@@ -104,24 +412,45 @@ def download_data(request):
             filtered_df.to_csv(response, index=False)
         else:
             response['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-            filtered_df.to_excel(response, index=False, engine='openpyxl')
+            # Large workbooks are rendered in the offload pool so other requests keep the GIL
+            response.write(offloader.frame_to_xlsx(filtered_df))
         
         return response
     
+    except OffloadBusy as e:
+        return _busy_response(e)
     except Exception as e:
         return Response({'error': f'Download failed: {str(e)}'}, 
                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+def _sample_file():
+    from pathlib import Path
+    from django.conf import settings
+    
+    return Path(settings.BASE_DIR).parent / 'Sample_data.xlsx'
+
+def _sample_etag(request):
+    try:
+        stat = _sample_file().stat()
+    except OSError:
+        return None
+    return make_etag(stat.st_mtime_ns, stat.st_size)
+
+def _sample_last_modified(request):
+    from datetime import datetime, timezone
+    
+    try:
+        return datetime.fromtimestamp(_sample_file().stat().st_mtime, tz=timezone.utc)
+    except OSError:
+        return None
+
+@revalidate(condition(etag_func=_sample_etag, last_modified_func=_sample_last_modified))
 @api_view(['GET'])
 def download_sample_dataset(request):
     """Download the original Sample_data.xlsx file"""
     try:
-        from pathlib import Path
-        from django.conf import settings
-        
         # Get the actual sample data file
-        base_dir = Path(settings.BASE_DIR).parent
-        sample_file = base_dir / 'Sample_data.xlsx'
+        sample_file = _sample_file()
         
         if sample_file.exists():
             # Serve the actual sample file
@@ -140,11 +469,73 @@ def download_sample_dataset(request):
         return Response({'error': f'Failed to download sample dataset: {str(e)}'}, 
                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+# Rows per CSV chunk when streaming an export
+EXPORT_CHUNK_ROWS = 10000
+
+def _stream_csv(df):
+    for start in range(0, max(len(df), 1), EXPORT_CHUNK_ROWS):
+        yield df.iloc[start:start + EXPORT_CHUNK_ROWS].to_csv(index=False, header=start == 0)
+
+@_unsharded
+@api_view(['GET'])
+def export_result(request, handle):
+    """Export a query's full result by its result_handle as CSV (streamed), XLSX or an Arrow IPC stream"""
+    try:
+        from .negotiation import accepts_arrow
+        from .offload import OffloadBusy, offloader
+        from .results import ResultExpired
+        
+        format_type = 'arrow' if accepts_arrow(request) else request.GET.get('format', 'csv').lower()
+        if format_type not in ['csv', 'xlsx', 'arrow']:
+            return Response({'error': 'Invalid format. Use csv, xlsx or arrow.'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        if format_type == 'arrow':
+            refusal = _arrow_refusal(request)
+            if refusal is not None:
+                return refusal
+        
+        try:
+            result_df = data_processor.get_result(handle)
+        except ResultExpired as e:
+            return Response({'error': str(e)}, status=status.HTTP_410_GONE)
+        
+        areas = result_df['area'].dropna().unique().tolist()
+        if len(areas) == 1:
+            name = str(areas[0]).replace(' ', '_').lower()
+        elif areas:
+            name = f"{len(areas)}_areas_comparison"
+        else:
+            name = 'analysis_results'
+        filename = f"{name}.{format_type}"
+        
+        if format_type == 'arrow':
+            metadata = {'result_handle': handle, 'areas': areas, 'dataset_version': data_processor.dataset_version}
+            return _arrow_response(request, result_df, metadata, filename)
+        if format_type == 'csv':
+            response = StreamingHttpResponse(_stream_csv(result_df), content_type='text/csv')
+        else:
+            # openpyxl can't emit a workbook incrementally; render it (in the pool when large) and send it whole
+            response = HttpResponse(
+                offloader.frame_to_xlsx(result_df),
+                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            )
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+    
+    except OffloadBusy as e:
+        return _busy_response(e)
+    except Exception as e:
+        return Response({'error': f'Export failed: {str(e)}'}, 
+                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @csrf_exempt
 @api_view(['POST'])
 def generate_excel(request):
-    """Generate Excel file from JSON data"""
+    """Generate Excel file from JSON data (kept for older clients; prefer /api/results/<handle>/export/)"""
     try:
+        import pandas as pd
+        from .offload import OffloadBusy, offloader
+        
         data = json.loads(request.body)
         table_data = data.get('data', [])
         
@@ -161,29 +552,349 @@ def generate_excel(request):
         response['Content-Disposition'] = 'attachment; filename="analysis_results.xlsx"'
         
         # Write Excel data
-        df.to_excel(response, index=False, engine='openpyxl')
+        response.write(offloader.frame_to_xlsx(df))
         
         return response
     
+    except OffloadBusy as e:
+        return _busy_response(e)
     except Exception as e:
         return Response({'error': f'Failed to generate Excel file: {str(e)}'}, 
                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@dataset_condition(skip=_sharded)
 @api_view(['GET'])
 def get_areas(request):
     """Get list of available areas for autocomplete"""
     try:
+        if _sharded():
+            # Every area the shards hold, from the router's briefly cached catalogue
+            from .sharding import ShardError, shard_router
+            try:
+                return Response({'areas': shard_router.planner.get_areas()})
+            except ShardError as e:
+                return Response({'error': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+        
         areas = data_processor.get_areas()
         return Response({'areas': areas})
     except Exception as e:
         return Response({'error': f'Failed to get areas: {str(e)}'}, 
                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@_unsharded
+@api_view(['GET'])
+def get_rankings(request):
+    """Rank every area by a metric, e.g. /api/rankings/?metric=price_growth&since=2018&limit=10"""
+    try:
+        from .ranking import RANKING_METRICS
+        
+        metric = request.GET.get('metric', 'price_growth')
+        if metric not in RANKING_METRICS:
+            return Response({'error': f"Invalid metric. Use one of: {', '.join(RANKING_METRICS)}"},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            since = request.GET.get('since')
+            until = request.GET.get('until')
+            ranking = data_processor.rank_areas(
+                metric=metric,
+                limit=int(request.GET.get('limit', 10)),
+                offset=int(request.GET.get('offset', 0)),
+                ascending=request.GET.get('order', 'desc').lower() == 'asc',
+                min_points=int(request.GET.get('min_points', 1)),
+                start_year=int(since) if since else None,
+                end_year=int(until) if until else None,
+                include_ties=request.GET.get('ties', 'true').lower() != 'false'
+            )
+        except ValueError:
+            return Response({'error': 'limit, offset, min_points, since and until must be integers'},
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(ranking)
+    except Exception as e:
+        return Response({'error': f'Failed to rank areas: {str(e)}'}, 
+                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@_unsharded
+@dataset_condition(vary_on=('areas', 'since', 'until', 'metric', 'group_by'))
+@api_view(['GET'])
+def get_distribution(request):
+    """Quantiles and box-plot data, e.g. /api/distribution/?areas=Wakad,Baner&since=2019&group_by=area_year"""
+    try:
+        areas = [area.strip().title() for area in request.GET.get('areas', '').split(',') if area.strip()]
+        
+        try:
+            since = request.GET.get('since')
+            until = request.GET.get('until')
+            distribution = data_processor.distribution(
+                areas=areas or None,
+                start_year=int(since) if since else None,
+                end_year=int(until) if until else None,
+                metric=request.GET.get('metric', 'price'),
+                group_by=request.GET.get('group_by', 'area_year')
+            )
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(distribution)
+    except Exception as e:
+        return Response({'error': f'Failed to compute distribution: {str(e)}'}, 
+                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@api_view(['GET'])
+def shard_catalogue(request):
+    """Areas (year ranges, newest month) and metrics this instance holds, for a shard router"""
+    if not _shard_authorized(request):
+        return _shard_forbidden()
+    try:
+        return Response(data_processor.shard_catalogue())
+    except Exception as e:
+        return Response({'error': f'Failed to list the catalogue: {str(e)}'}, 
+                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@csrf_exempt
+@api_view(['POST'])
+def shard_partials(request):
+    """A shard router's sub-query: per-(area, year) or per-(area, period) sums and counts plus the first rows"""
+    if not _shard_authorized(request):
+        return _shard_forbidden()
+    try:
+        from .rollups import RESOLUTIONS
+        
+        spec = json.loads(request.body)
+        if not isinstance(spec, dict) or not isinstance(spec.get('areas'), list):
+            return Response({'error': 'areas must be a list of area names'}, status=status.HTTP_400_BAD_REQUEST)
+        resolution = spec.get('resolution')
+        if resolution is not None and resolution not in RESOLUTIONS:
+            return Response({'error': f"resolution must be one of: {', '.join(RESOLUTIONS)}"}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            result = data_processor.partial_aggregates(
+                spec['areas'],
+                start_year=spec.get('start_year'),
+                end_year=spec.get('end_year'),
+                metrics=spec.get('metrics'),
+                resolution=resolution,
+                periods=spec.get('periods'),
+                table_limit=int(spec.get('table_limit', 500)),
+                forecast_horizon=spec.get('forecast_horizon'),
+                distribution=spec.get('distribution')
+            )
+        except (TypeError, ValueError) as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(result)
+    
+    except json.JSONDecodeError:
+        return Response({'error': 'Invalid JSON in request body'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': f'Sub-query failed: {str(e)}'}, 
+                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@csrf_exempt
+@api_view(['GET', 'POST'])
+def shard_rows(request):
+    """GET: every row this shard holds (for resharding). POST {"mode", "rows"}: cleaned rows sent by a router"""
+    if not _shard_authorized(request):
+        return _shard_forbidden()
+    try:
+        from .sharding import frame_from_payload, frame_to_payload
+        
+        if request.method == 'GET':
+            return Response({'rows': frame_to_payload(data_processor.get_filtered_data())})
+        
+        payload = json.loads(request.body)
+        mode = payload.get('mode', 'replace') if isinstance(payload, dict) else None
+        if mode not in ('replace', 'append') or not isinstance(payload.get('rows'), dict):
+            return Response({'error': 'Send {"mode": "replace" or "append", "rows": {...}}'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        df = frame_from_payload(payload['rows'])
+        data_processor.load_frame(df, append=mode == 'append')
+        return Response({'mode': mode, 'rows': len(df), 'dataset_version': data_processor.dataset_version})
+    
+    except json.JSONDecodeError:
+        return Response({'error': 'Invalid JSON in request body'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': f'Shard load failed: {str(e)}'}, 
+                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@csrf_exempt
+@api_view(['GET', 'POST'])
+def shards(request):
+    """Shard router only. GET: shards and how many areas each owns. POST {"shards": [...]}: reshard"""
+    if not _sharded():
+        return Response({'error': 'This instance is not a shard router. Set SHARD_URLS to enable sharding.'}, 
+                      status=status.HTTP_404_NOT_FOUND)
+    try:
+        from .sharding import ShardError, shard_router
+        
+        if request.method == 'GET':
+            return Response(shard_router.status())
+        
+        # A reshard sends rows to the listed URLs, so only a holder of the shard token may ask for one
+        if not _shard_authorized(request):
+            return _shard_forbidden()
+        data = json.loads(request.body)
+        urls = data.get('shards') if isinstance(data, dict) else None
+        if not isinstance(urls, list) or not all(isinstance(url, str) and url.strip() for url in urls):
+            return Response({'error': 'shards must be a non-empty list of shard base URLs'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            return Response(shard_router.reshard(urls))
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ShardError as e:
+            return Response({'error': str(e)}, status=status.HTTP_502_BAD_GATEWAY)
+    
+    except json.JSONDecodeError:
+        return Response({'error': 'Invalid JSON in request body'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': f'Resharding failed: {str(e)}'}, 
+                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@_unsharded
+@api_view(['GET'])
+def get_neighbours(request):
+    """Areas near (mode=nearby) or similar to (mode=similar) an area"""
+    try:
+        area = request.GET.get('area', '').strip().title()
+        mode = request.GET.get('mode', 'nearby').lower()
+        
+        if not area:
+            return Response({'error': 'area is required'}, status=status.HTTP_400_BAD_REQUEST)
+        if mode not in ['nearby', 'similar']:
+            return Response({'error': 'Invalid mode. Use nearby or similar.'}, 
+                          status=status.HTTP_400_BAD_REQUEST)
+        if area not in data_processor.get_areas():
+            return Response({'error': f'Unknown area: {area}'}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            k = int(request.GET.get('k', 5))
+        except ValueError:
+            return Response({'error': 'k must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response(data_processor.find_neighbours(area, mode, max(k, 1)))
+    except Exception as e:
+        return Response({'error': f'Failed to find neighbours: {str(e)}'}, 
+                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+@_unsharded
+@csrf_exempt
+@api_view(['GET', 'POST'])
+def investment_weights(request):
+    """Get or update the investment score weights at runtime"""
+    try:
+        from .scoring import INVESTMENT_FEATURES
+        
+        scorer = data_processor.investment_scorer
+        
+        if request.method == 'POST':
+            data = json.loads(request.body)
+            if data.get('reset'):
+                scorer.reset_weights()
+            else:
+                weights = data.get('weights')
+                if not isinstance(weights, dict) or not weights:
+                    return Response({'error': 'Provide a "weights" object or "reset": true'}, 
+                                  status=status.HTTP_400_BAD_REQUEST)
+                try:
+                    scorer.set_weights(weights)
+                except (TypeError, ValueError) as e:
+                    return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({'weights': scorer.weights, 'features': INVESTMENT_FEATURES})
+    
+    except json.JSONDecodeError:
+        return Response({'error': 'Invalid JSON in request body'}, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({'error': f'Failed to update weights: {str(e)}'}, 
+                       status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 @api_view(['GET'])
 def health_check(request):
-    """Health check endpoint"""
+    """Health check endpoint; 503 with state "starting" until the dataset is loaded"""
+    if not data_processor.is_ready:
+        # A probe counts as first use, so a lazily started worker begins loading now
+        data_processor.warm_up(background=True)
+        return Response({
+            'status': 'starting',
+            'state': data_processor.state,
+            'ready': False,
+            'error': data_processor.error,
+            'data_loaded': False,
+            'total_records': 0
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    if _sharded():
+        # A router is healthy when it can list the shards' areas
+        from .sharding import ShardError, shard_router
+        try:
+            shards = shard_router.status(refresh=False)
+        except ShardError as e:
+            return Response({'status': 'unavailable', 'ready': False, 'role': 'router', 'error': str(e)}, 
+                          status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        return Response({
+            'status': 'healthy',
+            'state': data_processor.state,
+            'ready': True,
+            'role': 'router',
+            'data_loaded': shards['areas'] > 0,
+            'shards': shards['shards'],
+            'areas': shards['areas'],
+            'admission': admission.state()
+        })
+    
+    snapshot = data_processor.snapshot
     return Response({
         'status': 'healthy',
-        'data_loaded': data_processor.df is not None and not data_processor.df.empty,
-        'total_records': len(data_processor.df) if data_processor.df is not None else 0
-    })
\ No newline at end of file
+        'state': data_processor.state,
+        'ready': True,
+        'load_seconds': round(data_processor.load_seconds, 3),
+        'dataset_version': snapshot.version,
+        'data_loaded': snapshot.has_data,
+        'total_records': snapshot.row_count,
+        'admission': admission.state()
+    })
+
+@require_http_methods(['GET'])
+def metrics(request):
+    """Prometheus-style metrics: stage latency histograms, cache and LLM fallback counters"""
+    if not telemetry.enabled:
+        return HttpResponse('Metrics are disabled. Set METRICS_ENABLED=true to enable them.\n',
+                            status=404, content_type='text/plain')
+    return HttpResponse(telemetry.render_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api_view(['GET'])
+def get_profiles(request):
+    """List stored request profiles (admin token required)"""
+    if not is_profiling_authorized(request):
+        return Response({'error': 'Profiling requires a valid X-Profile-Token'}, status=status.HTTP_403_FORBIDDEN)
+    return Response({'profiles': list_profiles()})
+
+@api_view(['GET'])
+def download_profile(request, profile_id):
+    """Download a stored profile as .prof (pstats), or ?format=json / ?format=text"""
+    if not is_profiling_authorized(request):
+        return Response({'error': 'Profiling requires a valid X-Profile-Token'}, status=status.HTTP_403_FORBIDDEN)
+    
+    format_type = request.GET.get('format', 'prof').lower()
+    if format_type not in ['prof', 'json', 'text']:
+        return Response({'error': 'Invalid format. Use prof, json or text.'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    path = profile_path(profile_id, '.json' if format_type == 'json' else '.prof')
+    if path is None:
+        return Response({'error': 'Profile not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if format_type == 'json':
+        with open(path) as f:
+            return Response(json.load(f))
+    if format_type == 'text':
+        return HttpResponse(render_text(profile_id), content_type='text/plain; charset=utf-8')
+    
+    with open(path, 'rb') as f:
+        response = HttpResponse(f.read(), content_type='application/octet-stream')
+    response['Content-Disposition'] = f'attachment; filename="query_{profile_id}.prof"'
+    return response
\ No newline at end of file
@@ -0,0 +1,49 @@
+"""Gunicorn settings: load the dataset once in the master and fork warm workers.
+
+With preload (the default) the master imports the app, loads, cleans and indexes
+the dataset, compacts it into a copy-on-write-friendly layout and freezes the GC,
+so forked workers share those pages instead of each building its own copy.
+Set GUNICORN_PRELOAD=false to go back to per-worker loading.
+
+GUNICORN_MEMORY_REPORT=<seconds> makes the master log shared vs private memory
+per worker at that interval (Linux only).
+"""
+import os
+import threading
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Queries read immutable dataset snapshots without locking, so threads are safe; >1 selects gthread.
+# Admission gates cap uploads, downloads and LLM calls below this, leaving threads free for cheap endpoints.
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+
+if preload_app:
+    # The dataset has to be in memory before the fork; a warm-up thread would be lost
+    os.environ.setdefault('DATA_WARMUP', 'eager')
+
+MEMORY_REPORT_INTERVAL = float(os.getenv('GUNICORN_MEMORY_REPORT', '0'))
+
+
+def when_ready(server):
+    if preload_app:
+        from api.lazy import data_processor
+        from api.offload import offloader
+        # Workers start their own pools; don't keep the master's around
+        offloader.shutdown()
+        data_processor.prepare_for_fork()
+
+    if MEMORY_REPORT_INTERVAL > 0:
+        from api.memory import format_report, worker_memory_report
+
+        def report():
+            while True:
+                threading.Event().wait(MEMORY_REPORT_INTERVAL)
+                server.log.info('Worker memory:\n%s', format_report(worker_memory_report(os.getpid())))
+
+        threading.Thread(target=report, name='memory-report', daemon=True).start()
+
+
+def worker_exit(server, worker):
+    # Write out questions still queued for the query log
+    from api.querylog import query_log
+    query_log.flush()
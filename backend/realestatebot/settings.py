@@ -1,4 +1,5 @@
 import os
+import json
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -27,12 +28,15 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.TelemetryMiddleware',
+    'api.middleware.AdmissionMiddleware',
 ]
 
 ROOT_URLCONF = 'realestatebot.urls'
@@ -97,6 +101,10 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
+    # Accept: application/vnd.apache.arrow.stream reaches the views that stream Arrow instead of a 406
+    'DEFAULT_CONTENT_NEGOTIATION_CLASS': 'api.negotiation.ArrowNegotiation',
+    # ?format= picks the file type (csv, xlsx, arrow) in the views, not a DRF renderer
+    'URL_FORMAT_OVERRIDE': None,
 }
 
 CORS_ALLOWED_ORIGINS = [
@@ -123,6 +131,9 @@ CORS_ALLOWED_HEADERS = [
     'x-requested-with',
 ]
 
+# Let the frontend read export filenames, retry hints and cache validators
+CORS_EXPOSE_HEADERS = ['Content-Disposition', 'Retry-After', 'ETag', 'Last-Modified']
+
 CORS_ALLOW_CREDENTIALS = True
 
 # Automatically append trailing slashes to URLs
@@ -131,4 +142,115 @@ APPEND_SLASH = True
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
-GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
\ No newline at end of file
+GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
+
+# Overridable so load tests can point the app at a local fake Gemini server
+GEMINI_API_URL = os.getenv(
+    'GEMINI_API_URL',
+    'https://generativelanguage.googleapis.com/v1beta/models/gemini-pro:generateContent'
+)
+# Used by /api/query/stream/ to relay the summary as Gemini generates it
+GEMINI_STREAM_URL = os.getenv(
+    'GEMINI_STREAM_URL',
+    GEMINI_API_URL.replace(':generateContent', ':streamGenerateContent')
+)
+LLM_TIMEOUT = float(os.getenv('LLM_TIMEOUT', '10'))
+
+# Dataset loaded at startup; defaults to Sample_data.xlsx in the project root
+SAMPLE_DATA_FILE = os.getenv('SAMPLE_DATA_FILE')
+
+# When web workers load the dataset: "background" (right after boot, health reports "starting"
+# until done), "eager" (block boot until loaded) or "lazy" (on the first request that needs it)
+DATA_WARMUP = os.getenv('DATA_WARMUP', 'background')
+
+# Optional JSON object overriding investment score weights, e.g. {"growth": 0.5, "volatility": -0.3}
+INVESTMENT_WEIGHTS = json.loads(os.getenv('INVESTMENT_WEIGHTS', '{}'))
+
+# Optional JSON list of extra metrics on top of the built-in ones (price, demand and the IGR columns), e.g.
+# [{"name": "others_sold", "label": "Others Sold", "aggregation": "sum", "sources": ["others_sold - igr"]}]
+# aggregation is mean, sum or weighted_mean (which also needs "weight": another metric's name)
+CUSTOM_METRICS = json.loads(os.getenv('CUSTOM_METRICS', '[]'))
+
+# Per-stage latency histograms and counters served at /api/metrics/
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+
+# Admin token for per-request profiling (?profile=1 + X-Profile-Token); profiling is off when unset
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN')
+PROFILE_DIR = Path(os.getenv('PROFILE_DIR', str(MEDIA_ROOT / 'profiles')))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '50'))
+
+# Process pool for CPU-heavy work (large groupbys, XLSX export, workbook parsing); 0 runs everything inline.
+# Smaller jobs stay inline; at most OFFLOAD_MAX_QUEUE jobs are in flight, later ones wait
+# OFFLOAD_QUEUE_TIMEOUT seconds and then get a 503 with Retry-After.
+OFFLOAD_WORKERS = int(os.getenv('OFFLOAD_WORKERS', '2'))
+OFFLOAD_MAX_QUEUE = int(os.getenv('OFFLOAD_MAX_QUEUE', '8'))
+OFFLOAD_QUEUE_TIMEOUT = float(os.getenv('OFFLOAD_QUEUE_TIMEOUT', '5'))
+OFFLOAD_TASK_TIMEOUT = float(os.getenv('OFFLOAD_TASK_TIMEOUT', '120'))
+OFFLOAD_MIN_ROWS = int(os.getenv('OFFLOAD_MIN_ROWS', '100000'))
+OFFLOAD_MIN_FILE_BYTES = int(os.getenv('OFFLOAD_MIN_FILE_BYTES', '2000000'))
+
+# Query results kept server-side for /api/results/<handle>/export/ (LRU, bounded by entries and total rows)
+RESULT_CACHE_TTL = float(os.getenv('RESULT_CACHE_TTL', '600'))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '256'))
+RESULT_CACHE_MAX_ROWS = int(os.getenv('RESULT_CACHE_MAX_ROWS', '2000000'))
+
+# Responses smaller than this are sent uncompressed (brotli when installed, otherwise gzip)
+COMPRESSION_MIN_BYTES = int(os.getenv('COMPRESSION_MIN_BYTES', '1024'))
+
+# Where the cleaned dataset lives: "memory" (one pandas frame per worker), "parquet"
+# (partitioned Parquet under PARQUET_DIR, queried with DuckDB; needs `pip install duckdb`)
+# or "database" (indexed tables in DATABASES['default'])
+DATA_BACKEND = os.getenv('DATA_BACKEND', 'memory')
+PARQUET_DIR = Path(os.getenv('PARQUET_DIR', str(MEDIA_ROOT / 'datasets')))
+PARQUET_AREA_BUCKETS = int(os.getenv('PARQUET_AREA_BUCKETS', '64'))
+PARQUET_KEEP = int(os.getenv('PARQUET_KEEP', '3'))
+DUCKDB_MEMORY_LIMIT = os.getenv('DUCKDB_MEMORY_LIMIT')
+# DATA_BACKEND=database: rows and per-(area, year) aggregates live in DATABASES['default'] (run migrate first).
+# Restarts reuse the stored dataset, and workers pick up another worker's upload within DATABASE_SYNC_SECONDS.
+DATABASE_BATCH_SIZE = int(os.getenv('DATABASE_BATCH_SIZE', '5000'))
+DATABASE_SYNC_SECONDS = float(os.getenv('DATABASE_SYNC_SECONDS', '2'))
+DATABASE_KEEP = int(os.getenv('DATABASE_KEEP', '2'))
+
+# Popular questions are logged (asynchronously, in batches) and replayed after each upload or restart
+# to prewarm the aggregate, summary and result caches. An empty QUERY_LOG_PATH turns this off.
+QUERY_LOG_PATH = os.getenv('QUERY_LOG_PATH', str(MEDIA_ROOT / 'query_log.json'))
+QUERY_LOG_FLUSH_SECONDS = float(os.getenv('QUERY_LOG_FLUSH_SECONDS', '5'))
+QUERY_LOG_BATCH_SIZE = int(os.getenv('QUERY_LOG_BATCH_SIZE', '500'))
+QUERY_LOG_MAX_ENTRIES = int(os.getenv('QUERY_LOG_MAX_ENTRIES', '500'))
+PREWARM_TOP_QUERIES = int(os.getenv('PREWARM_TOP_QUERIES', '20'))
+SUMMARY_CACHE_SIZE = int(os.getenv('SUMMARY_CACHE_SIZE', '256'))
+# Centroids per (area, year) in the price quantile sketches; groups up to this size give exact quantiles
+SKETCH_COMPRESSION = int(os.getenv('SKETCH_COMPRESSION', '100'))
+# Arrow IPC responses (?format=arrow or Accept: application/vnd.apache.arrow.stream; needs pyarrow): rows per
+# record batch, and the buffer compression used when a request gives no ?compression= (lz4, zstd or none)
+ARROW_BATCH_ROWS = int(os.getenv('ARROW_BATCH_ROWS', '65536'))
+ARROW_COMPRESSION = os.getenv('ARROW_COMPRESSION', 'none')
+# Sharded deployment: set SHARD_URLS (comma-separated base URLs of ordinary instances) on a router. The router
+# holds no rows; it splits uploads across the shards by area and answers /api/query/ from the shards owning
+# the asked areas. POST /api/shards/ {"shards": [...]} reshards, moving only the areas whose owner changes.
+SHARD_URLS = [url.strip().rstrip('/') for url in os.getenv('SHARD_URLS', '').split(',') if url.strip()]
+# A reshard stores the new shard list here; every router worker reads it, and after a restart it wins over
+# SHARD_URLS (share it between routers on different hosts). Empty refuses resharding.
+SHARD_STATE_PATH = os.getenv('SHARD_STATE_PATH', str(MEDIA_ROOT / 'shards.json'))
+SHARD_TIMEOUT = float(os.getenv('SHARD_TIMEOUT', '10'))
+# Shared secret for the router-to-shard calls (/api/shard/...) and for POST /api/shards/; set the same value on the
+# router and every shard (sent as X-Shard-Token). Those endpoints answer 403 when it is unset.
+SHARD_TOKEN = os.getenv('SHARD_TOKEN')
+SHARD_CATALOGUE_SECONDS = float(os.getenv('SHARD_CATALOGUE_SECONDS', '30'))
+# Admission control, per worker: at most `limit` requests of a kind run at once, `queue` more wait up to
+# `timeout` seconds, and the rest get 429 with Retry-After. Endpoints not listed in ADMISSION_ENDPOINTS
+# (health, areas, rankings, ...) never wait. Over the `llm` limit, queries get the deterministic summary.
+ADMISSION_GATES = {
+    'upload': {'limit': int(os.getenv('ADMISSION_UPLOAD_LIMIT', '1')), 'queue': 2, 'timeout': 10.0},
+    'download': {'limit': int(os.getenv('ADMISSION_DOWNLOAD_LIMIT', '2')), 'queue': 4, 'timeout': 5.0},
+    'llm': {'limit': int(os.getenv('ADMISSION_LLM_LIMIT', '2')), 'queue': 0, 'timeout': 0.0},
+}
+ADMISSION_ENDPOINTS = {
+    'upload': 'upload',
+    'upload_locations': 'upload',
+    'download': 'download',
+    'generate_excel': 'download',
+    'export_result': 'download',
+    'shard_rows': 'upload',
+    'shards': 'upload',
+}
\ No newline at end of file
@@ -10,7 +10,10 @@ def root_view(request):
         'status': 'running',
         'endpoints': {
             'health': '/api/health/',
+            'metrics': '/api/metrics/',
             'areas': '/api/areas/',
+            'rankings': '/api/rankings/',
+            'neighbours': '/api/neighbours/',
             'query': '/api/query/',
             'upload': '/api/upload/',
             'download': '/api/download/',
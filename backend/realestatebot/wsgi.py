@@ -3,4 +3,9 @@ from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
 
-application = get_wsgi_application()
\ No newline at end of file
+application = get_wsgi_application()
+
+# Start loading the dataset now that the app is up (see DATA_WARMUP)
+from api.lazy import warm_up_on_start
+
+warm_up_on_start()
\ No newline at end of file
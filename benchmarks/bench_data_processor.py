@@ -0,0 +1,350 @@
+"""Benchmarks for the DataProcessor hot paths.
+
+Usage (from the repository root):
+
+    python benchmarks/bench_data_processor.py --rows 10000,100000 --areas 10,1000
+    python benchmarks/bench_data_processor.py --output baseline.json
+    python benchmarks/bench_data_processor.py --compare baseline.json --threshold 0.15
+
+Each benchmark is run once cold and then `--repeat` times warm; the median warm
+time is what --compare checks. With --compare the exit code is 1 when any
+benchmark is slower than the baseline by more than the threshold, so the script
+can gate changes locally or in CI.
+"""
+import argparse
+import contextlib
+import fnmatch
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+# Benchmarks measure the deterministic path, never a network call
+os.environ['GOOGLE_API_KEY'] = ''
+
+import django
+
+django.setup()
+
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from api.data_processor import DataProcessor
+from synthetic import area_names, generate_dataset, to_processor_frame
+
+settings.GOOGLE_API_KEY = None
+
+# XLSX tops out at 1,048,576 rows and openpyxl is slow well before that
+DEFAULT_EXCEL_MAX_ROWS = 200_000
+
+BENCHMARKS = []
+
+
+def benchmark(name, max_rows=None, reset_each=False):
+    """Register a benchmark. The decorated function gets a Context and returns the callable to time."""
+    def register(func):
+        BENCHMARKS.append({'name': name, 'build': func, 'max_rows': max_rows, 'reset_each': reset_each})
+        return func
+    return register
+
+
+class Context:
+    def __init__(self, rows, areas, workdir, seed):
+        self.rows = rows
+        self.areas = areas
+        self.workdir = workdir
+        self.raw = generate_dataset(rows, areas, seed=seed)
+        self.frame = to_processor_frame(self.raw)
+        self.names = area_names(areas)
+        self.processor = DataProcessor()
+        self.processor.df = self.frame
+        self._excel_path = None
+
+    @property
+    def excel_path(self):
+        if self._excel_path is None:
+            self._excel_path = os.path.join(self.workdir, f'synthetic_{self.rows}_{self.areas}.xlsx')
+            self.raw.to_excel(self._excel_path, index=False)
+        return self._excel_path
+
+    def reset(self):
+        """Publish the dataset again so every derived cache starts cold"""
+        self.processor.df = self.frame
+
+
+@benchmark('load_excel_file', max_rows=DEFAULT_EXCEL_MAX_ROWS)
+def bench_load_excel(ctx):
+    path = ctx.excel_path
+    processor = DataProcessor()
+    return lambda: processor.load_excel_file(path)
+
+
+@benchmark('clean_numeric_field.numeric')
+def bench_clean_numeric(ctx):
+    series = ctx.raw['Flat - Weighted Average Rate']
+    return lambda: ctx.processor._clean_numeric_field(series)
+
+
+@benchmark('clean_numeric_field.dirty_strings', max_rows=1_000_000)
+def bench_clean_numeric_dirty(ctx):
+    series = generate_dataset(ctx.rows, ctx.areas, dirty=True)['Flat - Weighted Average Rate']
+    return lambda: ctx.processor._clean_numeric_field(series)
+
+
+@benchmark('parse_query.single_area')
+def bench_parse_single(ctx):
+    query = f'Show price growth for {ctx.names[0]} over the last 3 years'
+    return lambda: ctx.processor.parse_query(query)
+
+
+@benchmark('parse_query.long_multi_area')
+def bench_parse_long(ctx):
+    picked = ctx.names[:min(5, len(ctx.names))]
+    query = ('Compare ' + ', '.join(picked) + ' demand and price trends from 2015 to 2023 '
+             'and tell me which one is the better investment considering recent market activity')
+    return lambda: ctx.processor.parse_query(query)
+
+
+@benchmark('extract_areas')
+def bench_extract_areas(ctx):
+    query = f'compare {ctx.names[0].lower()} and {ctx.names[-1].lower()}'
+    return lambda: ctx.processor._extract_areas(query)
+
+
+@benchmark('area_suggestions.typo')
+def bench_suggestions_typo(ctx):
+    return lambda: ctx.processor._get_area_suggestions('wkad')
+
+
+@benchmark('area_suggestions.sentence')
+def bench_suggestions_sentence(ctx):
+    return lambda: ctx.processor._get_area_suggestions('how is the market doing in westside heights lately')
+
+
+@benchmark('query_data.single_area')
+def bench_query_single(ctx):
+    query = f'Analyze {ctx.names[0]}'
+    return lambda: ctx.processor.query_data(query)
+
+
+@benchmark('query_data.comparison')
+def bench_query_comparison(ctx):
+    query = f'Compare {ctx.names[0]} and {ctx.names[1 % len(ctx.names)]} demand trends'
+    return lambda: ctx.processor.query_data(query)
+
+
+@benchmark('query_data.catalogue_ranking')
+def bench_query_ranking(ctx):
+    return lambda: ctx.processor.query_data('Top 10 areas by price growth since 2015')
+
+
+@benchmark('query_data.catalogue_ranking.cold', reset_each=True)
+def bench_query_ranking_cold(ctx):
+    return lambda: ctx.processor.query_data('Top 10 areas by price growth since 2015')
+
+
+@benchmark('query_data.no_match')
+def bench_query_no_match(ctx):
+    return lambda: ctx.processor.query_data('Analyze Atlantis')
+
+
+@benchmark('generate_chart_data')
+def bench_chart(ctx):
+    picked = ctx.names[:min(5, len(ctx.names))]
+    aggregated = ctx.processor._aggregate_data(ctx.frame[ctx.frame['area'].isin(picked)], picked)
+    return lambda: ctx.processor._generate_chart_data(aggregated, 'both')
+
+
+@benchmark('download.csv.all')
+def bench_download_csv(ctx):
+    def run():
+        buffer = io.StringIO()
+        ctx.processor.get_filtered_data().to_csv(buffer, index=False)
+        return buffer
+    return run
+
+
+@benchmark('download.csv.area')
+def bench_download_csv_area(ctx):
+    area = ctx.names[0]
+
+    def run():
+        buffer = io.StringIO()
+        ctx.processor.get_filtered_data(area).to_csv(buffer, index=False)
+        return buffer
+    return run
+
+
+@benchmark('download.xlsx.area', max_rows=DEFAULT_EXCEL_MAX_ROWS)
+def bench_download_xlsx_area(ctx):
+    area = ctx.names[0]
+
+    def run():
+        buffer = io.BytesIO()
+        ctx.processor.get_filtered_data(area).to_excel(buffer, index=False, engine='openpyxl')
+        return buffer
+    return run
+
+
+def measure(fn, repeat, reset=None):
+    """Return (cold, warm timings) in seconds"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        # DataProcessor logs with print(); keep it out of the report
+        return _measure(fn, repeat, reset)
+
+
+def _measure(fn, repeat, reset):
+    if reset:
+        reset()
+    started = time.perf_counter()
+    fn()
+    cold = time.perf_counter() - started
+
+    timings = []
+    for _ in range(repeat):
+        if reset:
+            reset()
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return cold, timings
+
+
+def run_benchmarks(rows_list, areas_list, repeat, pattern, excel_max_rows, seed):
+    results = []
+    with tempfile.TemporaryDirectory(prefix='realestate-bench-') as workdir:
+        for rows in rows_list:
+            for areas in areas_list:
+                if areas > rows:
+                    continue
+                print(f'\n📊 {rows:,} rows x {areas:,} areas', flush=True)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    ctx = Context(rows, areas, workdir, seed)
+
+                for spec in BENCHMARKS:
+                    if pattern and not fnmatch.fnmatch(spec['name'], pattern):
+                        continue
+                    max_rows = spec['max_rows']
+                    if spec['max_rows'] == DEFAULT_EXCEL_MAX_ROWS:
+                        max_rows = excel_max_rows
+                    if max_rows is not None and rows > max_rows:
+                        print(f'   {spec["name"]:<42} skipped (> {max_rows:,} rows)')
+                        continue
+
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        ctx.reset()
+                        fn = spec['build'](ctx)
+                    cold, timings = measure(fn, repeat, ctx.reset if spec['reset_each'] else None)
+                    result = {
+                        'name': spec['name'],
+                        'rows': rows,
+                        'areas': areas,
+                        'repeat': repeat,
+                        'cold_s': cold,
+                        'median_s': statistics.median(timings),
+                        'min_s': min(timings),
+                        'mean_s': statistics.fmean(timings),
+                    }
+                    results.append(result)
+                    print(f'   {spec["name"]:<42} median {result["median_s"] * 1000:10.3f} ms   '
+                          f'cold {cold * 1000:10.3f} ms', flush=True)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table and return the regressions"""
+    previous = {(r['name'], r['rows'], r['areas']): r for r in baseline['results']}
+    regressions = []
+
+    print(f'\n{"benchmark":<42} {"rows":>9} {"areas":>6} {"baseline ms":>12} {"current ms":>12} {"change":>8}')
+    for result in results:
+        key = (result['name'], result['rows'], result['areas'])
+        if key not in previous:
+            continue
+        before = previous[key]['median_s']
+        after = result['median_s']
+        change = (after - before) / before if before > 0 else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  ⚠️ regression'
+            regressions.append({**result, 'baseline_median_s': before, 'change': change})
+        elif change < -threshold:
+            flag = '  ✅ faster'
+        print(f'{result["name"]:<42} {result["rows"]:>9,} {result["areas"]:>6,} '
+              f'{before * 1000:>12.3f} {after * 1000:>12.3f} {change:>+8.1%}{flag}')
+    return regressions
+
+
+def parse_sizes(value):
+    sizes = []
+    for part in value.split(','):
+        part = part.strip().lower()
+        multiplier = 1
+        if part.endswith('k'):
+            multiplier, part = 1_000, part[:-1]
+        elif part.endswith('m'):
+            multiplier, part = 1_000_000, part[:-1]
+        sizes.append(int(float(part) * multiplier))
+    return sizes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the DataProcessor hot paths')
+    parser.add_argument('--rows', default='10k,100k', help='comma-separated row counts, e.g. 10k,1m,5m')
+    parser.add_argument('--areas', default='10,1000', help='comma-separated area counts, e.g. 10,1k,10k')
+    parser.add_argument('--repeat', type=int, default=5, help='warm runs per benchmark')
+    parser.add_argument('--only', default=None, help='glob of benchmark names to run, e.g. "query_data.*"')
+    parser.add_argument('--excel-max-rows', type=int, default=DEFAULT_EXCEL_MAX_ROWS,
+                        help='skip Excel read/write benchmarks above this many rows')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results.json', help='where to write machine-readable results')
+    parser.add_argument('--compare', default=None, help='baseline results JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=0.15,
+                        help='relative slowdown of the median that counts as a regression')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(parse_sizes(args.rows), parse_sizes(args.areas), args.repeat,
+                             args.only, args.excel_max_rows, args.seed)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor() or platform.machine(),
+        },
+        'results': results,
+    }
+
+    exit_code = 0
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        report['comparison'] = {'baseline': args.compare, 'threshold': args.threshold, 'regressions': regressions}
+        if regressions:
+            print(f'\n❌ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}')
+            exit_code = 1
+        else:
+            print(f'\n✅ No regressions above {args.threshold:.0%}')
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\n📝 Results written to {args.output}')
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
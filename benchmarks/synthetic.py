@@ -0,0 +1,62 @@
+"""Synthetic IGR-style datasets for benchmarking the DataProcessor hot paths"""
+import numpy as np
+import pandas as pd
+
+AREA_PREFIXES = ['Wakad', 'Aundh', 'Baner', 'Kothrud', 'Hadapsar', 'Kharadi', 'Hinjewadi', 'Viman Nagar',
+                 'Pimple Saudagar', 'Magarpatta', 'Undri', 'Wagholi', 'Balewadi', 'Bavdhan', 'Ravet']
+
+
+def area_names(count: int):
+    """Realistic-looking, unique area names (multi-word ones exercise the fuzzy matcher)"""
+    names = []
+    for i in range(count):
+        base = AREA_PREFIXES[i % len(AREA_PREFIXES)]
+        names.append(base if i < len(AREA_PREFIXES) else f'{base} Sector {i // len(AREA_PREFIXES)}')
+    return names
+
+
+def generate_dataset(rows: int, areas: int, start_year: int = 2010, end_year: int = 2024,
+                     seed: int = 42, dirty: bool = False) -> pd.DataFrame:
+    """Build a dataset with the raw column names the loader maps from.
+
+    Each area gets its own price level and growth rate so rankings, scores and
+    forecasts have something to separate. With dirty=True numeric columns are
+    written as formatted strings ("₹1,23,456") to exercise _clean_numeric_field.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array(area_names(areas), dtype=object)
+
+    area_idx = rng.integers(0, areas, size=rows)
+    years = rng.integers(start_year, end_year + 1, size=rows)
+
+    base_price = rng.uniform(3_000, 15_000, size=areas)
+    growth = rng.normal(0.06, 0.04, size=areas)
+    price = base_price[area_idx] * (1 + growth[area_idx]) ** (years - start_year)
+    price *= rng.lognormal(0, 0.08, size=rows)
+
+    base_units = rng.uniform(20, 400, size=areas)
+    units = np.maximum(1, base_units[area_idx] * rng.lognormal(0, 0.3, size=rows)).round()
+
+    df = pd.DataFrame({
+        'Year': years,
+        'Final Location': names[area_idx],
+        'Flat - Weighted Average Rate': price.round(2),
+        'Total Sold - IGR': units.astype(int),
+    })
+
+    if dirty:
+        df['Flat - Weighted Average Rate'] = ['₹' + f'{value:,.0f}' for value in df['Flat - Weighted Average Rate']]
+        df['Total Sold - IGR'] = [f'{value:,}' for value in df['Total Sold - IGR']]
+
+    return df
+
+
+def to_processor_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Shape a synthetic dataset like DataProcessor.df after loading (skips Excel)"""
+    demand = df['Total Sold - IGR'].astype(float)
+    return pd.DataFrame({
+        'year': df['Year'].astype(int),
+        'area': df['Final Location'].astype(str),
+        'price': df['Flat - Weighted Average Rate'].astype(float),
+        'demand': demand / demand.max() * 9 + 1,
+    })
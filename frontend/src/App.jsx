@@ -4,7 +4,7 @@ import Header from './components/Header';
 import QueryPanel from './components/QueryPanel';
 import ResultsPanel from './components/ResultsPanel';
 import FileUpload from './components/FileUpload';
-import { queryData, getAreas, checkHealth } from './services/api';
+import { queryData, streamQuery, getAreas, checkHealth } from './services/api';
 
 function App() {
   // Updated API endpoints with trailing slashes - v1.1
@@ -61,6 +61,13 @@ function App() {
     }
   };
 
+  const rememberQuery = (query) => {
+    // Add to recent queries
+    const newRecentQueries = [query, ...recentQueries.filter(q => q !== query)].slice(0, 5);
+    setRecentQueries(newRecentQueries);
+    localStorage.setItem('recentQueries', JSON.stringify(newRecentQueries));
+  };
+
   const handleQuery = async (query) => {
     if (!query.trim()) return;
 
@@ -68,14 +75,57 @@ function App() {
     setError('');
     setResults(null);
 
+    if (window.EventSource) {
+      streamQueryResults(query);
+    } else {
+      await fetchQueryResults(query);
+    }
+  };
+
+  const streamQueryResults = (query) => {
+    let received = false;
+
+    streamQuery(query, {
+      onResult: (data) => {
+        // Chart and table are ready; the summary fills in while they are on screen
+        received = true;
+        setResults({ ...data, summary: '', summaryStreaming: true });
+        setLoading(false);
+        rememberQuery(query);
+      },
+      onSummary: ({ delta, replace }) => {
+        setResults((current) => current && {
+          ...current,
+          summary: replace !== undefined ? replace : current.summary + delta,
+        });
+      },
+      onDone: ({ summary }) => {
+        setResults((current) => current && { ...current, summary, summaryStreaming: false });
+      },
+      onFailure: (data) => {
+        if (!data) {
+          // The stream could not be opened (or dropped): fall back to a regular request
+          if (received) {
+            setResults((current) => current && { ...current, summaryStreaming: false });
+          } else {
+            fetchQueryResults(query);
+          }
+          return;
+        }
+        setError(data.error || 'Failed to process query. Please try again.');
+        if (data.suggestions) {
+          setResults({ suggestions: data.suggestions });
+        }
+        setLoading(false);
+      },
+    });
+  };
+
+  const fetchQueryResults = async (query) => {
     try {
       const response = await queryData(query);
       setResults(response.data);
-
-      // Add to recent queries
-      const newRecentQueries = [query, ...recentQueries.filter(q => q !== query)].slice(0, 5);
-      setRecentQueries(newRecentQueries);
-      localStorage.setItem('recentQueries', JSON.stringify(newRecentQueries));
+      rememberQuery(query);
 
     } catch (err) {
       const errorMessage = err.response?.data?.error || 'Failed to process query. Please try again.';
@@ -9,6 +9,7 @@ import {
   Title,
   Tooltip,
   Legend,
+  Filler,
 } from 'chart.js';
 import { Line } from 'react-chartjs-2';
 
@@ -19,7 +20,8 @@ ChartJS.register(
   LineElement,
   Title,
   Tooltip,
-  Legend
+  Legend,
+  Filler
 );
 
 const ChartCard = ({ chartData }) => {
@@ -69,7 +71,9 @@ const ChartCard = ({ chartData }) => {
             padding: 20,
             font: {
               size: 12
-            }
+            },
+            // Confidence band edges are drawn but not listed
+            filter: (item) => !/Forecast (Lower|Upper)$/.test(item.text)
           }
         },
         title: {
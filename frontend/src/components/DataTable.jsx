@@ -1,8 +1,8 @@
 import React, { useState, useMemo } from 'react';
 import { Card, Table, Form, Row, Col, Button, Badge, Pagination } from 'react-bootstrap';
-import { downloadData } from '../services/api';
+import { downloadData, exportResult } from '../services/api';
 
-const DataTable = ({ data, totalRows }) => {
+const DataTable = ({ data, totalRows, resultHandle }) => {
   const [searchTerm, setSearchTerm] = useState('');
   const [sortField, setSortField] = useState('year');
   const [sortDirection, setSortDirection] = useState('desc');
@@ -62,9 +62,34 @@ const DataTable = ({ data, totalRows }) => {
     setCurrentPage(1);
   };
 
+  const saveBlob = (blob, filename) => {
+    const url = window.URL.createObjectURL(blob);
+    const link = document.createElement('a');
+    link.href = url;
+    link.setAttribute('download', filename);
+    document.body.appendChild(link);
+    link.click();
+    link.remove();
+    window.URL.revokeObjectURL(url);
+  };
+
   const handleDownload = async (format) => {
     setDownloading(true);
     try {
+      // Unfiltered table: export every row of the result straight from the server's copy
+      if (resultHandle && !searchTerm) {
+        try {
+          const response = await exportResult(resultHandle, format);
+          const disposition = response.headers['content-disposition'] || '';
+          const match = disposition.match(/filename="([^"]+)"/);
+          saveBlob(response.data, match ? match[1] : `analysis_results.${format}`);
+          return;
+        } catch (error) {
+          // Expired handle (410): fall back to exporting the rows we have
+          if (error.response?.status !== 410) throw error;
+        }
+      }
+
       // Use the current filtered and sorted data from the table
       const dataToDownload = filteredAndSortedData;
       
@@ -102,14 +127,7 @@ const DataTable = ({ data, totalRows }) => {
 
         // Create and download CSV
         const blob = new Blob([csvContent], { type: 'text/csv;charset=utf-8;' });
-        const url = window.URL.createObjectURL(blob);
-        const link = document.createElement('a');
-        link.href = url;
-        link.setAttribute('download', filename);
-        document.body.appendChild(link);
-        link.click();
-        link.remove();
-        window.URL.revokeObjectURL(url);
+        saveBlob(blob, filename);
       } else {
         // For Excel, we'll send the data to backend to generate proper Excel file
         const response = await fetch('/api/generate-excel', {
@@ -122,14 +140,7 @@ const DataTable = ({ data, totalRows }) => {
 
         if (response.ok) {
           const blob = await response.blob();
-          const url = window.URL.createObjectURL(blob);
-          const link = document.createElement('a');
-          link.href = url;
-          link.setAttribute('download', filename);
-          document.body.appendChild(link);
-          link.click();
-          link.remove();
-          window.URL.revokeObjectURL(url);
+          saveBlob(blob, filename);
         } else {
           throw new Error('Failed to generate Excel file');
         }
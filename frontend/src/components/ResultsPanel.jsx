@@ -65,8 +65,8 @@ const ResultsPanel = ({ results, loading, onSuggestionClick }) => {
   return (
     <div className="results-container fade-in">
       {/* Summary Card */}
-      {results.summary && (
-        <SummaryCard summary={results.summary} />
+      {(results.summary || results.summaryStreaming) && (
+        <SummaryCard summary={results.summary} streaming={results.summaryStreaming} />
       )}
 
       {/* Chart Card */}
@@ -79,6 +79,7 @@ const ResultsPanel = ({ results, loading, onSuggestionClick }) => {
         <DataTable 
           data={results.table} 
           totalRows={results.total_rows}
+          resultHandle={results.result_handle}
         />
       )}
 
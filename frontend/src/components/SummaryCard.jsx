@@ -1,7 +1,7 @@
 import React from 'react';
 import { Card } from 'react-bootstrap';
 
-const SummaryCard = ({ summary }) => {
+const SummaryCard = ({ summary, streaming = false }) => {
   return (
     <Card className="mb-4">
       <Card.Header className="d-flex align-items-center">
@@ -12,6 +12,11 @@ const SummaryCard = ({ summary }) => {
         <div className="summary-content">
           <p className="mb-0 lead" style={{ lineHeight: '1.6' }}>
             {summary}
+            {streaming && (
+              <span className="spinner-grow spinner-grow-sm text-secondary ms-2" role="status">
+                <span className="visually-hidden">Writing summary...</span>
+              </span>
+            )}
           </p>
         </div>
       </Card.Body>
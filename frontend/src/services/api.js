@@ -44,7 +44,35 @@ api.interceptors.response.use(
 );
 
 export const queryData = (query) => {
-  return api.post('/query/', { query });
+  // GET so the browser can revalidate repeated questions with ETags (304 until the data changes)
+  return api.get('/query/', { params: { query } });
+};
+
+export const streamQuery = (query, { onResult, onSummary, onDone, onFailure }) => {
+  // Server-Sent Events: chart and table arrive first, then the summary piece by piece
+  const params = new URLSearchParams({ query });
+  const source = new EventSource(`${API_BASE_URL}/query/stream/?${params.toString()}`);
+  const parse = (event) => JSON.parse(event.data);
+
+  source.addEventListener('result', (event) => onResult(parse(event)));
+  source.addEventListener('summary', (event) => onSummary(parse(event)));
+  source.addEventListener('done', (event) => {
+    source.close();
+    onDone(parse(event));
+  });
+  source.addEventListener('failure', (event) => {
+    source.close();
+    onFailure(parse(event));
+  });
+  // A dropped connection would make EventSource reconnect and re-run the query; stop instead
+  source.onerror = () => {
+    if (source.readyState !== EventSource.CLOSED) {
+      source.close();
+      onFailure(null);
+    }
+  };
+
+  return () => source.close();
 };
 
 export const uploadFile = (file) => {
@@ -68,6 +96,13 @@ export const downloadData = (area = '', format = 'csv') => {
   });
 };
 
+export const exportResult = (handle, format = 'csv') => {
+  // The server keeps the full query result; only the handle goes over the wire
+  return api.get(`/results/${encodeURIComponent(handle)}/export/?format=${format}`, {
+    responseType: 'blob',
+  });
+};
+
 export const downloadSampleDataset = () => {
   // Download the sample dataset from the backend
   return api.get('/download-sample/', {
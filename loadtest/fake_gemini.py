@@ -0,0 +1,143 @@
+"""Fake Gemini generateContent server for load tests.
+
+Answers POST /v1beta/models/<model>:generateContent with a canned summary after
+a configurable delay, and fails a configurable share of calls so the app's LLM
+fallback path is exercised too. Point the app at it with GEMINI_API_URL.
+
+:streamGenerateContent?alt=sse sends the same summary as server-sent events, a
+few words per event, `chunk_delay` seconds apart (GEMINI_STREAM_URL).
+
+    python loadtest/fake_gemini.py --port 8765 --latency 0.8 --jitter 0.3 --error-rate 0.05
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUMMARY = ("**Market Overview**: Prices have risen steadily with demand holding up. "
+           "This is a canned response from the load-test Gemini stub.")
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.8, jitter=0.0, error_rate=0.0, error_status=503, seed=None,
+                 chunk_delay=0.05, words_per_chunk=4):
+        super().__init__(address, FakeGeminiHandler)
+        self.chunk_delay = chunk_delay
+        self.words_per_chunk = words_per_chunk
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0}
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}/v1beta/models/gemini-pro:generateContent'
+
+    @property
+    def stream_url(self) -> str:
+        return self.url.replace(':generateContent', ':streamGenerateContent')
+
+    def next_response(self):
+        """Pick (delay, fail) for one call"""
+        with self.lock:
+            self.stats['requests'] += 1
+            delay = max(0.0, self.random.gauss(self.latency, self.jitter)) if self.jitter else self.latency
+            fail = self.random.random() < self.error_rate
+            if fail:
+                self.stats['errors'] += 1
+        return delay, fail
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(length)
+
+        endpoint = self.path.split('?')[0]
+        if not endpoint.endswith((':generateContent', ':streamGenerateContent')):
+            self._send(404, {'error': {'code': 404, 'message': 'Not found'}})
+            return
+
+        delay, fail = self.server.next_response()
+        time.sleep(delay)
+
+        if fail:
+            status = self.server.error_status
+            self._send(status, {'error': {'code': status, 'message': 'Simulated upstream failure'}})
+        elif endpoint.endswith(':streamGenerateContent'):
+            self._stream()
+        else:
+            self._send(200, {'candidates': [{'content': {'parts': [{'text': SUMMARY}], 'role': 'model'}}]})
+
+    def do_GET(self):
+        # Lets the harness poll for readiness and collect call counts
+        with self.server.lock:
+            self._send(200, dict(self.server.stats))
+
+    def _stream(self):
+        # No Content-Length: the body ends when the connection closes
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        words = SUMMARY.split(' ')
+        size = self.server.words_per_chunk
+        for start in range(0, len(words), size):
+            text = ' '.join(words[start:start + size]) + (' ' if start + size < len(words) else '')
+            chunk = {'candidates': [{'content': {'parts': [{'text': text}], 'role': 'model'}}]}
+            self.wfile.write(f'data: {json.dumps(chunk)}\r\n\r\n'.encode())
+            self.wfile.flush()
+            time.sleep(self.server.chunk_delay)
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_gemini(host='127.0.0.1', port=0, **options) -> FakeGeminiServer:
+    """Start the stub on a background thread; port 0 picks a free port"""
+    server = FakeGeminiServer((host, port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fake Gemini server for load tests')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.8, help='mean response delay in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='standard deviation of the delay')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of calls that fail (0-1)')
+    parser.add_argument('--error-status', type=int, default=503)
+    args = parser.parse_args()
+
+    server = FakeGeminiServer((args.host, args.port), latency=args.latency, jitter=args.jitter,
+                              error_rate=args.error_rate, error_status=args.error_status)
+    print(f'🤖 Fake Gemini listening on {server.url}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,390 @@
+"""Load-test the Django API under gunicorn with a stubbed LLM.
+
+Boots `realestatebot` under gunicorn for each requested worker model, points it
+at a local fake Gemini server (see fake_gemini.py), drives a weighted mix of
+/api/query/, /api/areas/, /api/download/ and /api/upload/ at each concurrency
+level, and reports throughput, p50/p95/p99 latency and per-worker memory.
+
+Usage (from the repository root):
+
+    python loadtest/run_loadtest.py --worker-class sync,gthread --concurrency 4,16,64
+    python loadtest/run_loadtest.py --worker-class asgi --llm-latency 1.5 --llm-error-rate 0.1
+    python loadtest/run_loadtest.py --mix query=90,areas=10 --env METRICS_ENABLED=false
+    python loadtest/run_loadtest.py --preload on,off --workers 4   # shared vs private memory per worker
+
+The ASGI run uses uvicorn's gunicorn worker and needs `pip install uvicorn`.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import requests
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND = os.path.join(ROOT, 'backend')
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from api.memory import child_pids, read_smaps_rollup
+from fake_gemini import start_fake_gemini
+from synthetic import area_names, generate_dataset
+
+# worker model -> (gunicorn worker class, application)
+WORKER_MODELS = {
+    'sync': ('sync', 'realestatebot.wsgi:application'),
+    'gthread': ('gthread', 'realestatebot.wsgi:application'),
+    'asgi': ('uvicorn.workers.UvicornWorker', 'realestatebot.asgi:application'),
+}
+
+DEFAULT_MIX = 'query=70,areas=15,download=10,upload=5'
+
+QUERY_TEMPLATES = [
+    'Analyze {a}',
+    'Give me analysis of {a}',
+    'Compare {a} and {b} demand trends',
+    'Show price growth for {a} over the last 3 years',
+    'Is {a} a good investment?',
+    'Forecast prices for {a}',
+    'Top 10 areas by price growth since 2015',
+    'Which areas are best to invest in?',
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, weight = part.split('=')
+        name = name.strip()
+        if name not in ('query', 'areas', 'download', 'upload'):
+            raise ValueError(f"Unknown endpoint '{name}' in --mix. Use query, areas, download or upload.")
+        mix[name] = float(weight)
+    return mix
+
+
+class Server:
+    """One gunicorn master plus its workers"""
+
+    def __init__(self, model, workers, threads, env, log_path):
+        if model not in WORKER_MODELS:
+            raise ValueError(f"Unknown worker class '{model}'. Use one of: {', '.join(WORKER_MODELS)}")
+        if model == 'asgi' and importlib.util.find_spec('uvicorn') is None:
+            raise RuntimeError('The asgi worker model needs uvicorn: pip install uvicorn')
+
+        worker_class, app = WORKER_MODELS[model]
+        self.port = free_port()
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        command = [
+            sys.executable, '-m', 'gunicorn', app,
+            '--bind', f'127.0.0.1:{self.port}',
+            '--workers', str(workers),
+            '--worker-class', worker_class,
+            '--timeout', '120',
+        ]
+        if model == 'gthread':
+            command += ['--threads', str(threads)]
+
+        self.log = open(log_path, 'w')
+        self.process = subprocess.Popen(command, cwd=BACKEND, env=env, stdout=self.log, stderr=subprocess.STDOUT)
+        self.workers = workers
+
+    def wait_ready(self, timeout=180):
+        """Wait until every worker has booted and the dataset is loaded"""
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f'gunicorn exited with code {self.process.returncode}; see {self.log.name}')
+            try:
+                health = requests.get(f'{self.base_url}/api/health/', timeout=5).json()
+                if health.get('data_loaded') and len(self.worker_pids()) >= self.workers:
+                    return health
+            except requests.RequestException:
+                pass
+            time.sleep(0.5)
+        raise RuntimeError(f'Server did not become ready within {timeout}s; see {self.log.name}')
+
+    def worker_pids(self):
+        return child_pids(self.process.pid)
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self.log.close()
+
+
+def worker_memory(server):
+    """Shared/private memory (MB) of each worker, from /proc/<pid>/smaps_rollup"""
+    usage = {}
+    for pid in server.worker_pids():
+        report = read_smaps_rollup(pid)
+        if report is not None:
+            usage[pid] = report
+    return usage
+
+
+class MemorySampler(threading.Thread):
+    """Track peak RSS per worker while a load level runs, plus a final shared/private breakdown"""
+
+    def __init__(self, server, interval=0.5):
+        super().__init__(daemon=True)
+        self.server = server
+        self.interval = interval
+        self.peak = {}
+        self.last = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def sample(self):
+        for pid, usage in worker_memory(self.server).items():
+            self.last[pid] = usage
+            self.peak[pid] = max(usage['rss'], self.peak.get(pid, 0))
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.sample()
+
+
+class Client(threading.Thread):
+    """Closed-loop virtual user: send a request, wait for the answer, repeat"""
+
+    def __init__(self, base_url, mix, names, upload_path, deadline, seed):
+        super().__init__(daemon=True)
+        self.base_url = base_url
+        self.endpoints = list(mix)
+        self.weights = list(mix.values())
+        self.names = names
+        self.upload_path = upload_path
+        self.deadline = deadline
+        self.random = random.Random(seed)
+        self.session = requests.Session()
+        self.samples = []  # (endpoint, seconds, ok)
+
+    def run(self):
+        while time.time() < self.deadline:
+            endpoint = self.random.choices(self.endpoints, self.weights)[0]
+            started = time.perf_counter()
+            try:
+                response = getattr(self, f'call_{endpoint}')()
+                ok = response.status_code < 500
+            except requests.RequestException:
+                ok = False
+            self.samples.append((endpoint, time.perf_counter() - started, ok))
+
+    def call_query(self):
+        a, b = self.random.sample(self.names, 2) if len(self.names) > 1 else (self.names[0], self.names[0])
+        query = self.random.choice(QUERY_TEMPLATES).format(a=a, b=b)
+        return self.session.post(f'{self.base_url}/api/query/', json={'query': query}, timeout=120)
+
+    def call_areas(self):
+        return self.session.get(f'{self.base_url}/api/areas/', timeout=120)
+
+    def call_download(self):
+        params = {'format': 'xlsx' if self.random.random() < 0.2 else 'csv'}
+        if self.random.random() < 0.8:
+            params['area'] = self.random.choice(self.names)
+        return self.session.get(f'{self.base_url}/api/download/', params=params, timeout=120)
+
+    def call_upload(self):
+        with open(self.upload_path, 'rb') as f:
+            return self.session.post(f'{self.base_url}/api/upload/', files={'file': ('loadtest.xlsx', f)}, timeout=120)
+
+
+def summarise(samples, duration):
+    latencies = np.array([s[1] for s in samples]) if samples else np.array([0.0])
+    errors = sum(1 for s in samples if not s[2])
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) * 1000
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'throughput_rps': round(len(samples) / duration, 2),
+        'p50_ms': round(float(p50), 2),
+        'p95_ms': round(float(p95), 2),
+        'p99_ms': round(float(p99), 2),
+    }
+
+
+def run_level(server, concurrency, duration, mix, names, upload_path, seed):
+    sampler = MemorySampler(server)
+    sampler.start()
+
+    deadline = time.time() + duration
+    clients = [Client(server.base_url, mix, names, upload_path, deadline, seed + i) for i in range(concurrency)]
+    started = time.time()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.time() - started
+    sampler.stop()
+
+    samples = [s for client in clients for s in client.samples]
+    result = {'concurrency': concurrency, 'duration_s': round(elapsed, 2), **summarise(samples, elapsed)}
+    result['endpoints'] = {
+        endpoint: summarise([s for s in samples if s[0] == endpoint], elapsed)
+        for endpoint in mix
+    }
+    result['worker_memory_mb'] = {
+        str(pid): {'peak_rss': sampler.peak[pid], **sampler.last[pid]}
+        for pid in sorted(sampler.peak)
+    }
+    return result
+
+
+def memory_text(workers):
+    if not workers:
+        return 'n/a'
+    peak = max(w['peak_rss'] if 'peak_rss' in w else w['rss'] for w in workers.values())
+    private = sum(w['private'] for w in workers.values())
+    shared = max(w['shared'] for w in workers.values())
+    return f'{peak:.0f} MB peak RSS, {private:.0f} MB private total, {shared:.0f} MB shared'
+
+
+def print_level(result):
+    print(f'   c={result["concurrency"]:<4} {result["throughput_rps"]:>8.1f} req/s   '
+          f'p50 {result["p50_ms"]:>8.1f}   p95 {result["p95_ms"]:>8.1f}   p99 {result["p99_ms"]:>8.1f} ms   '
+          f'errors {result["errors"]:<5} workers: {memory_text(result["worker_memory_mb"])}', flush=True)
+    for endpoint, stats in result['endpoints'].items():
+        if not stats['requests']:
+            continue
+        print(f'      {endpoint:<10} {stats["requests"]:>7} req   p50 {stats["p50_ms"]:>8.1f}   '
+              f'p95 {stats["p95_ms"]:>8.1f}   p99 {stats["p99_ms"]:>8.1f} ms   errors {stats["errors"]}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load-test the API under gunicorn with a fake Gemini server')
+    parser.add_argument('--worker-class', default='sync,gthread', help='comma-separated: sync, gthread, asgi')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--threads', type=int, default=4, help='threads per worker for gthread')
+    parser.add_argument('--preload', default='on', help='preload the dataset in the master: on, off or on,off')
+    parser.add_argument('--concurrency', default='1,8,32', help='comma-separated virtual user counts')
+    parser.add_argument('--duration', type=float, default=30, help='seconds per concurrency level')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='endpoint weights, e.g. query=70,areas=15,download=10,upload=5')
+    parser.add_argument('--rows', type=int, default=50_000, help='rows in the synthetic dataset')
+    parser.add_argument('--areas', type=int, default=200, help='areas in the synthetic dataset')
+    parser.add_argument('--upload-rows', type=int, default=5_000, help='rows in the file sent to /api/upload/')
+    parser.add_argument('--llm-latency', type=float, default=0.8, help='mean fake Gemini delay in seconds')
+    parser.add_argument('--llm-jitter', type=float, default=0.2, help='standard deviation of the fake Gemini delay')
+    parser.add_argument('--llm-error-rate', type=float, default=0.0, help='share of fake Gemini calls that fail')
+    parser.add_argument('--no-llm', action='store_true', help='run without an API key (deterministic summaries only)')
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help='extra environment for the app, e.g. METRICS_ENABLED=false (repeatable)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='loadtest_results.json')
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    models = [m.strip() for m in args.worker_class.split(',') if m.strip()]
+    preload_modes = [p.strip() for p in args.preload.split(',') if p.strip()]
+    if any(p not in ('on', 'off') for p in preload_modes):
+        parser.error('--preload takes on, off or on,off')
+    levels = [int(c) for c in args.concurrency.split(',')]
+
+    llm = start_fake_gemini(latency=args.llm_latency, jitter=args.llm_jitter,
+                            error_rate=args.llm_error_rate, seed=args.seed)
+    print(f'🤖 Fake Gemini at {llm.url} ({args.llm_latency}s ± {args.llm_jitter}s, '
+          f'{args.llm_error_rate:.0%} errors)')
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'rows': args.rows,
+            'areas': args.areas,
+            'workers': args.workers,
+            'threads': args.threads,
+            'mix': mix,
+            'llm': {'latency': args.llm_latency, 'jitter': args.llm_jitter,
+                    'error_rate': args.llm_error_rate, 'enabled': not args.no_llm},
+            'env': args.env,
+        },
+        'runs': [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix='realestate-loadtest-') as workdir:
+        names = area_names(args.areas)
+        dataset_path = os.path.join(workdir, 'dataset.xlsx')
+        upload_path = os.path.join(workdir, 'upload.xlsx')
+        print(f'📊 Writing synthetic dataset: {args.rows:,} rows x {args.areas:,} areas')
+        # Upload the same areas the workers start with so later queries keep matching
+        generate_dataset(args.rows, args.areas, seed=args.seed).to_excel(dataset_path, index=False)
+        generate_dataset(args.upload_rows, args.areas, seed=args.seed + 1).to_excel(upload_path, index=False)
+
+        env = dict(os.environ)
+        env.update({
+            'SAMPLE_DATA_FILE': dataset_path,
+            'GEMINI_API_URL': llm.url,
+            'GOOGLE_API_KEY': '' if args.no_llm else 'load-test',
+            'DEBUG': 'False',
+            'PYTHONUNBUFFERED': '1',
+        })
+        for item in args.env:
+            key, _, value = item.partition('=')
+            env[key] = value
+
+        for model in models:
+            for preload in preload_modes:
+                run_env = dict(env, GUNICORN_PRELOAD='true' if preload == 'on' else 'false')
+                print(f'\n🚀 {model}: {args.workers} worker(s)' +
+                      (f' x {args.threads} threads' if model == 'gthread' else '') + f', preload {preload}')
+                server = None
+                try:
+                    log_path = os.path.join(workdir, f'gunicorn_{model}_{preload}.log')
+                    server = Server(model, args.workers, args.threads, run_env, log_path)
+                    server.wait_ready()
+                    idle = {str(pid): usage for pid, usage in worker_memory(server).items()}
+                    print(f'   idle  workers: {memory_text(idle)}')
+                    run = {'worker_class': model, 'preload': preload, 'idle_worker_memory_mb': idle, 'levels': []}
+                    for concurrency in levels:
+                        llm_before = dict(llm.stats)
+                        result = run_level(server, concurrency, args.duration, mix, names, upload_path, args.seed)
+                        result['llm_calls'] = llm.stats['requests'] - llm_before['requests']
+                        result['llm_errors'] = llm.stats['errors'] - llm_before['errors']
+                        run['levels'].append(result)
+                        print_level(result)
+                    report['runs'].append(run)
+                except RuntimeError as e:
+                    print(f'❌ {model}: {e}')
+                    if server is not None:
+                        with open(server.log.name) as f:
+                            print(f.read()[-2000:])
+                    report['runs'].append({'worker_class': model, 'preload': preload, 'error': str(e)})
+                finally:
+                    if server is not None:
+                        server.stop()
+
+    llm.shutdown()
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f'\n📝 Results written to {args.output}')
+    return 1 if any('error' in run for run in report['runs']) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,6 +12,8 @@ def pytest_configure():
     """Configure Django settings for pytest"""
     os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
     django.setup()
+    # Keep test queries out of the real query log; tests that need one point it at tmp_path
+    settings.QUERY_LOG_PATH = None
 
 @pytest.fixture(scope='session')
 def django_db_setup():
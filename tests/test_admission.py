@@ -0,0 +1,134 @@
+import pytest
+import json
+import threading
+import time
+import pandas as pd
+import os
+import sys
+import django
+from django.test import Client
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.admission import AdmissionGate, Overloaded, admission
+from api.data_processor import DataProcessor
+from api.views import data_processor
+
+def make_frame():
+    return pd.DataFrame({
+        'year': [2020, 2021, 2022] * 3,
+        'area': ['Wakad'] * 3 + ['Aundh'] * 3 + ['Baner'] * 3,
+        'price': [100.0, 110.0, 120.0, 90.0, 95.0, 99.0, 80.0, 85.0, 92.0],
+        'demand': [5.0, 5.5, 6.0, 4.0, 4.1, 4.3, 3.0, 3.2, 3.5]
+    })
+
+class TestAdmissionGate:
+    
+    def test_full_gate_sheds_load(self):
+        """Test that callers beyond the limit and queue are rejected with a retry hint"""
+        gate = AdmissionGate('upload', limit=1, queue=0)
+        acquired_at = gate.acquire()
+        with pytest.raises(Overloaded) as error:
+            gate.acquire()
+        assert error.value.retry_after >= 1
+        gate.release(acquired_at)
+        gate.release(gate.acquire())
+        assert gate.state() == {'limit': 1, 'active': 0, 'waiting': 0}
+    
+    def test_queued_caller_gets_freed_slot(self):
+        """Test that a queued caller runs once the slot frees up within the timeout"""
+        gate = AdmissionGate('download', limit=1, queue=1, timeout=5)
+        acquired_at = gate.acquire()
+        threading.Timer(0.1, gate.release, args=(acquired_at,)).start()
+        gate.release(gate.acquire())
+        
+        # A second waiter does not fit in the queue
+        acquired_at = gate.acquire()
+        waiter = threading.Thread(target=lambda: gate.release(gate.acquire()))
+        waiter.start()
+        while gate.waiting == 0:
+            time.sleep(0.01)
+        with pytest.raises(Overloaded):
+            gate.acquire()
+        gate.release(acquired_at)
+        waiter.join()
+    
+    def test_wait_times_out(self):
+        """Test that a queued caller gives up after the timeout"""
+        gate = AdmissionGate('download', limit=1, queue=1, timeout=0.05)
+        gate.acquire()
+        with pytest.raises(Overloaded):
+            gate.acquire()
+    
+    def test_disabled_gate_admits_everyone(self):
+        """Test that a zero limit (or an unconfigured gate) never blocks"""
+        gate = admission.gate('unconfigured')
+        with gate.admit(), gate.admit(blocking=False):
+            pass
+
+class TestAdmissionMiddleware:
+    
+    @pytest.fixture
+    def download_gate(self, monkeypatch):
+        data_processor.df = make_frame()
+        gate = AdmissionGate('download', limit=1, queue=0)
+        monkeypatch.setitem(admission.gates, 'download', gate)
+        return gate
+    
+    def test_overloaded_endpoint_answers_429(self, download_gate):
+        """Test that a saturated gate answers 429 while cheap endpoints keep working"""
+        client = Client()
+        acquired_at = download_gate.acquire()
+        
+        response = client.get('/api/download/?format=csv')
+        assert response.status_code == 429
+        assert int(response['Retry-After']) >= 1
+        assert 'busy' in response.json()['error']
+        
+        assert client.get('/api/health/').status_code == 200
+        assert client.get('/api/areas/').status_code == 200
+        
+        download_gate.release(acquired_at)
+        assert client.get('/api/download/?format=csv').status_code == 200
+        assert download_gate.active == 0
+    
+    def test_streamed_export_holds_slot_until_sent(self, download_gate):
+        """Test that a streamed export keeps its slot until the body has been consumed"""
+        client = Client()
+        result = client.post('/api/query/', json.dumps({'query': 'Compare Wakad and Aundh'}),
+                             content_type='application/json').json()
+        
+        response = client.get(f"/api/results/{result['result_handle']}/export/?format=csv")
+        assert response.status_code == 200
+        assert download_gate.active == 1
+        b''.join(response.streaming_content)
+        assert download_gate.active == 0
+
+class TestLLMDegradation:
+    
+    def test_busy_llm_falls_back_to_mock_summary(self, settings, monkeypatch):
+        """Test that queries answer with the deterministic summary instead of queueing for the LLM"""
+        settings.GOOGLE_API_KEY = 'test-key'
+        gate = AdmissionGate('llm', limit=1)
+        monkeypatch.setitem(admission.gates, 'llm', gate)
+        processor = DataProcessor()
+        processor.df = make_frame()
+        calls = []
+        processor._get_llm_summary = lambda *args: calls.append(args) or 'LLM summary'
+        
+        acquired_at = gate.acquire()
+        degraded = processor.query_data('Tell me about Wakad')
+        assert calls == []
+        assert degraded['summary'] != 'LLM summary'
+        
+        # The degraded answer is not cached; the next ask reaches the LLM
+        gate.release(acquired_at)
+        assert processor.query_data('Tell me about Wakad')['summary'] == 'LLM summary'
+        assert len(calls) == 1
@@ -0,0 +1,129 @@
+import pytest
+import json
+import pandas as pd
+import os
+import sys
+import django
+from django.test import Client
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api import arrow
+from api.arrow import stream_frame
+from api.negotiation import ARROW_STREAM
+from api.results import result_cache
+from api.views import data_processor
+
+def make_frame():
+    return pd.DataFrame({
+        'year': [2020, 2021, 2022] * 3,
+        'area': ['Wakad'] * 3 + ['Aundh'] * 3 + ['Baner'] * 3,
+        'price': [100.0, 110.0, 120.0, 90.0, 95.0, 99.0, 80.0, 85.0, 92.0],
+        'demand': [5.0, 5.5, 6.0, 4.0, 4.1, 4.3, 3.0, 3.2, 3.5]
+    })
+
+def read_stream(content):
+    pa = pytest.importorskip('pyarrow')
+    reader = pa.ipc.open_stream(content)
+    return reader.read_pandas(), {key.decode(): value.decode() for key, value in reader.schema.metadata.items()}
+
+class TestStreamFrame:
+
+    @pytest.mark.parametrize('compression', [None, 'lz4', 'zstd'])
+    def test_round_trip_in_batches(self, compression):
+        """Test that a frame comes back with its dtypes, one chunk per record batch, metadata alongside"""
+        pytest.importorskip('pyarrow')
+        df = make_frame().assign(date=pd.date_range('2020-01-01', periods=9, freq='MS'))
+        chunks = list(stream_frame(df, {'query': 'Wakad', 'total_rows': 9}, compression, batch_rows=4))
+
+        # Three batches plus the end-of-stream marker
+        assert len(chunks) == 4
+        frame, metadata = read_stream(b''.join(chunks))
+        pd.testing.assert_frame_equal(frame, df)
+        assert metadata['query'] == 'Wakad'
+        assert json.loads(metadata['total_rows']) == 9
+
+    def test_empty_frame_keeps_its_schema(self):
+        """Test that an empty frame still sends the columns"""
+        pytest.importorskip('pyarrow')
+        frame, _ = read_stream(b''.join(stream_frame(make_frame().iloc[:0])))
+        assert list(frame.columns) == ['year', 'area', 'price', 'demand']
+        assert frame.empty
+
+class TestArrowEndpoints:
+
+    def setup_method(self):
+        data_processor.df = make_frame()
+        result_cache.clear()
+        self.client = Client()
+
+    def test_download_as_arrow(self):
+        """Test that ?format=arrow and the Accept header both stream the dataset"""
+        pytest.importorskip('pyarrow')
+        response = self.client.get('/api/download/?area=Wakad&format=arrow&compression=zstd')
+        assert response.status_code == 200
+        assert response['Content-Type'] == ARROW_STREAM
+        assert 'wakad_data.arrow' in response['Content-Disposition']
+        frame, metadata = read_stream(b''.join(response.streaming_content))
+        pd.testing.assert_frame_equal(frame, make_frame().head(3))
+        assert json.loads(metadata['dataset_version']) == data_processor.dataset_version
+
+        by_accept = self.client.get('/api/download/', HTTP_ACCEPT=ARROW_STREAM)
+        assert by_accept['Content-Type'] == ARROW_STREAM
+        assert len(read_stream(b''.join(by_accept.streaming_content))[0]) == 9
+        assert by_accept['ETag'] != self.client.get('/api/download/')['ETag']
+        assert 'Accept' in by_accept['Vary']
+
+    def test_query_streams_every_result_row(self, monkeypatch):
+        """Test that an Arrow query answer holds the full result with the summary and chart in the metadata"""
+        pytest.importorskip('pyarrow')
+        monkeypatch.setattr('api.views.query_log.record', lambda query: None)
+        expected = self.client.get('/api/query/?query=Compare Wakad and Aundh').json()
+
+        response = self.client.get('/api/query/?query=Compare Wakad and Aundh', HTTP_ACCEPT=ARROW_STREAM)
+        assert response.status_code == 200
+        frame, metadata = read_stream(b''.join(response.streaming_content))
+        assert len(frame) == expected['total_rows'] == 6
+        assert set(frame['area']) == {'Wakad', 'Aundh'}
+        assert metadata['summary'] == expected['summary']
+        assert json.loads(metadata['chart']) == expected['chart']
+        assert 'table' not in metadata
+
+    def test_structured_aggregates_and_export(self):
+        """Test Arrow aggregates from /api/query/structured/ and an Arrow export of the result handle"""
+        pytest.importorskip('pyarrow')
+        spec = {'areas': ['Wakad', 'Baner'], 'metric': 'price', 'aggregations': ['mean', 'count'],
+                'include': {'table': True}}
+        response = self.client.post('/api/query/structured/?format=arrow', json.dumps(spec),
+                                    content_type='application/json')
+        assert response.status_code == 200
+        frame, metadata = read_stream(b''.join(response.streaming_content))
+        expected = data_processor.structured_query(spec)['aggregates']
+        assert frame.round(2).to_dict('records') == expected
+
+        handle = metadata['result_handle']
+        export = self.client.get(f'/api/results/{handle}/export/?format=arrow&compression=lz4')
+        assert export.status_code == 200
+        rows, _ = read_stream(b''.join(export.streaming_content))
+        assert len(rows) == 6
+
+    def test_refusals(self, monkeypatch):
+        """Test 406 without pyarrow and 400 for an unknown codec, both as JSON"""
+        monkeypatch.setattr(arrow, 'pa', None)
+        response = self.client.get('/api/download/?format=arrow')
+        assert response.status_code == 406
+        assert 'pyarrow' in response.json()['error']
+        response = self.client.get('/api/query/?query=Wakad', HTTP_ACCEPT=ARROW_STREAM)
+        assert response.status_code == 406
+
+        monkeypatch.undo()
+        response = self.client.get('/api/results/anything/export/?format=arrow&compression=gzip')
+        assert response.status_code == (400 if arrow.pa is not None else 406)
+        assert 'error' in response.json()
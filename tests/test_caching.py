@@ -0,0 +1,130 @@
+import pytest
+import gzip
+import json
+import pandas as pd
+import os
+import sys
+import django
+from django.test import Client
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api import middleware
+from api.views import data_processor
+
+def make_frame(areas=('Wakad', 'Aundh', 'Baner'), price=100.0):
+    return pd.DataFrame({
+        'year': [2020, 2021, 2022] * len(areas),
+        'area': [area for area in areas for _ in range(3)],
+        'price': [price, price * 1.1, price * 1.2] * len(areas),
+        'demand': [5.0, 5.5, 6.0] * len(areas)
+    })
+
+class TestConditionalGet:
+    
+    def setup_method(self):
+        data_processor.df = make_frame()
+        self.client = Client()
+    
+    def test_areas_not_modified(self):
+        """Test that a matching If-None-Match gets a 304 until the dataset changes"""
+        response = self.client.get('/api/areas/')
+        etag = response['ETag']
+        assert response.status_code == 200
+        assert 'Last-Modified' in response
+        assert 'no-cache' in response['Cache-Control']
+        
+        assert self.client.get('/api/areas/', HTTP_IF_NONE_MATCH=etag).status_code == 304
+        
+        data_processor.df = make_frame(('Wakad', 'Kothrud'))
+        response = self.client.get('/api/areas/', HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.json()['areas'] == ['Kothrud', 'Wakad']
+    
+    def test_same_data_same_etag(self):
+        """Test that re-publishing identical data (another worker, compaction) keeps the ETag"""
+        etag = self.client.get('/api/areas/')['ETag']
+        data_processor.df = make_frame()
+        assert self.client.get('/api/areas/')['ETag'] == etag
+    
+    def test_download_etag_depends_on_parameters(self):
+        """Test that different areas and formats get different validators"""
+        wakad = self.client.get('/api/download/?area=Wakad&format=csv')['ETag']
+        aundh = self.client.get('/api/download/?area=Aundh&format=csv')['ETag']
+        assert wakad != aundh
+        
+        response = self.client.get('/api/download/?area=Wakad&format=csv', HTTP_IF_NONE_MATCH=wakad)
+        assert response.status_code == 304
+    
+    def test_query_get_is_conditional(self):
+        """Test that GET queries revalidate and change with the investment weights"""
+        url = '/api/query/?query=Tell+me+about+Wakad'
+        response = self.client.get(url)
+        assert response.status_code == 200
+        assert response.json()['total_rows'] == 3
+        etag = response['ETag']
+        assert self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 304
+        
+        scorer = data_processor.investment_scorer
+        scorer.set_weights({'growth': 0.9})
+        try:
+            assert self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code == 200
+        finally:
+            scorer.reset_weights()
+    
+    def test_post_query_has_no_validator(self):
+        """Test that POST queries still work and are never answered with 304"""
+        response = self.client.post('/api/query/', json.dumps({'query': 'Tell me about Wakad'}),
+                                    content_type='application/json', HTTP_IF_NONE_MATCH='*')
+        assert response.status_code == 200
+        assert 'ETag' not in response
+
+class TestCompression:
+    
+    def setup_method(self):
+        data_processor.df = make_frame(tuple(f'Area {i}' for i in range(300)))
+        self.client = Client()
+    
+    def test_large_json_is_gzipped(self):
+        """Test that bodies above the threshold are compressed and the ETag is weakened"""
+        response = self.client.get('/api/areas/', HTTP_ACCEPT_ENCODING='gzip')
+        assert response['Content-Encoding'] == 'gzip'
+        assert 'Accept-Encoding' in response['Vary']
+        assert response['ETag'].startswith('W/')
+        assert len(json.loads(gzip.decompress(response.content))['areas']) == 300
+        
+        # The weak ETag still validates
+        revalidated = self.client.get('/api/areas/', HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=response['ETag'])
+        assert revalidated.status_code == 304
+    
+    def test_small_and_binary_bodies_are_not_compressed(self):
+        """Test the minimum size and that xlsx (already zipped) is left alone"""
+        data_processor.df = make_frame(('Wakad',))
+        assert not self.client.get('/api/areas/', HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding')
+        
+        response = self.client.get('/api/download/?format=xlsx', HTTP_ACCEPT_ENCODING='gzip')
+        assert response.status_code == 200
+        assert not response.has_header('Content-Encoding')
+    
+    def test_streamed_export_is_gzipped(self):
+        """Test that streamed CSV exports are compressed on the fly"""
+        handle = self.client.get('/api/query/?query=Compare+Area+1+and+Area+2').json()['result_handle']
+        response = self.client.get(f'/api/results/{handle}/export/', HTTP_ACCEPT_ENCODING='gzip')
+        
+        assert response['Content-Encoding'] == 'gzip'
+        body = gzip.decompress(b''.join(response.streaming_content)).decode()
+        assert body.startswith('year,area,price,demand')
+    
+    @pytest.mark.skipif(middleware.brotli is None, reason='brotli not installed')
+    def test_brotli_preferred(self):
+        """Test that brotli wins when the client accepts it"""
+        response = self.client.get('/api/areas/', HTTP_ACCEPT_ENCODING='gzip, br')
+        assert response['Content-Encoding'] == 'br'
+        assert len(json.loads(middleware.brotli.decompress(response.content))['areas']) == 300
@@ -152,6 +152,55 @@ class TestDataProcessor:
         assert 'error' in result
         assert 'suggestions' in result
     
+    def test_structured_query(self):
+        """Test explicit queries that bypass natural language parsing"""
+        self.processor.df = self.sample_data
+        
+        spec = {
+            'areas': ['wakad', 'Aundh'],
+            'metric': 'price',
+            'year_from': 2021,
+            'aggregations': ['mean', 'count'],
+            'include': {'chart': True}
+        }
+        
+        with patch.object(self.processor, 'parse_query') as mock_parse, \
+             patch.object(self.processor, '_get_summary') as mock_summary:
+            result = self.processor.structured_query(spec)
+            mock_parse.assert_not_called()
+            mock_summary.assert_not_called()
+        
+        assert result['areas'] == ['Wakad', 'Aundh']
+        assert result['total_rows'] == 4
+        assert {'area', 'year', 'price_mean', 'price_count'} == set(result['aggregates'][0])
+        assert len(result['chart']['datasets']) == 2
+        assert 'table' not in result and 'summary' not in result
+        
+        # Unknown areas are rejected rather than fuzzy matched
+        with pytest.raises(ValueError):
+            self.processor.structured_query({'areas': ['Wakadd']})
+    
+    def test_structured_query_std_of_single_rows(self):
+        """Test that std over one-row (area, year) groups comes back as null, which strict JSON accepts"""
+        import json
+        
+        self.processor.df = self.sample_data
+        result = self.processor.structured_query({'areas': ['Wakad'], 'aggregations': ['std']})
+        
+        assert [row['price_std'] for row in result['aggregates']] == [None, None, None]
+        json.dumps(result, allow_nan=False)
+    
+    def test_structured_query_rejects_malformed_specs(self):
+        """Test that wrongly typed spec fields are ValueErrors (400) with a usable message"""
+        self.processor.df = self.sample_data
+        
+        for aggregations in [5, None, 'mean', [], ['mode']]:
+            with pytest.raises(ValueError, match='aggregations must be a list'):
+                self.processor.structured_query({'areas': ['Wakad'], 'aggregations': aggregations})
+        for field in ['year_from', 'year_to', 'table_limit']:
+            with pytest.raises(ValueError, match='whole numbers'):
+                self.processor.structured_query({'areas': ['Wakad'], field: [2021]})
+    
     def test_get_filtered_data(self):
         """Test data filtering for download"""
         self.processor.df = self.sample_data
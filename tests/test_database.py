@@ -0,0 +1,133 @@
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+import django
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+# conftest.py skips database setup for the rest of the suite; these tests need the tables
+from pytest_django.fixtures import django_db_setup  # noqa: F401
+
+from api.data_processor import DataProcessor
+from api.models import AreaYearAggregate, Dataset, DatasetRow
+from api.storage import DatabaseStore
+
+QUERIES = [
+    'Tell me about Wakad',
+    'Compare Wakad and Aundh',
+    'Wakad vs Baner price over last 2 years',
+    'Best areas for investment',
+    'How did 2021 perform in Aundh',
+]
+
+def make_frame(seed=7):
+    rng = np.random.default_rng(seed)
+    areas = ['Wakad', 'Aundh', 'Baner', 'Kothrud', 'Hinjewadi']
+    rows = [(year, area) for area in areas for year in range(2018, 2024) for _ in range(3)]
+    return pd.DataFrame({
+        'year': [float(year) for year, _ in rows],
+        'area': [area for _, area in rows],
+        'price': rng.uniform(50, 150, len(rows)).round(2),
+        'demand': rng.uniform(1, 10, len(rows)).round(2),
+        'city': 'Pune'
+    })
+
+def rounded(value):
+    """Round floats so means summed in a different order compare equal"""
+    if isinstance(value, dict):
+        return {key: rounded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [rounded(item) for item in value]
+    if isinstance(value, float):
+        return round(value, 9)
+    return value
+
+def run_all(processor):
+    results = [processor.query_data(query) for query in QUERIES]
+    for result in results:
+        result.pop('summary', None)
+        result.pop('result_handle', None)
+    structured = processor.structured_query({'areas': ['Wakad', 'Baner'], 'metric': 'both', 'year_from': 2020,
+                                             'aggregations': ['mean', 'median', 'count', 'std'],
+                                             'include': {'chart': True, 'table': True}})
+    structured.pop('result_handle')
+    return rounded({
+        'queries': results,
+        'areas': processor.get_areas(),
+        'ranking': processor.rank_areas('price_growth', limit=3),
+        'structured': structured,
+        'download': processor.get_filtered_data('wak').to_dict('records'),
+    })
+
+@pytest.mark.django_db
+class TestDatabaseBackend:
+    
+    @pytest.fixture
+    def database(self, settings):
+        settings.DATA_BACKEND = 'database'
+        settings.DATABASE_SYNC_SECONDS = 0
+        settings.DATABASE_KEEP = 2
+        return settings
+    
+    def test_same_responses_as_memory(self, database):
+        """Test that the database backend answers exactly like the in-memory frame"""
+        memory = DataProcessor()
+        memory.df = make_frame()
+        expected = run_all(memory)
+        
+        processor = DataProcessor()
+        processor._publish_dataset(make_frame())
+        assert processor.df is None
+        assert processor.snapshot.row_count == len(make_frame())
+        assert DatasetRow.objects.count() == len(make_frame())
+        # Five areas over six years
+        assert AreaYearAggregate.objects.count() == 30
+        
+        pd.testing.assert_frame_equal(processor._get_yearly_frame(), memory._get_yearly_frame())
+        actual = run_all(processor)
+        assert actual == expected
+    
+    def test_restart_reuses_stored_dataset(self, database):
+        """Test that a new processor restores the active dataset instead of reading the workbook"""
+        DataProcessor()._publish_dataset(make_frame())
+        
+        restarted = DataProcessor()
+        store = restarted.snapshot.store
+        assert isinstance(store, DatabaseStore)
+        assert store.fingerprint == Dataset.objects.get(is_active=True).fingerprint
+        assert restarted.get_areas() == sorted(make_frame()['area'].unique())
+    
+    def test_workers_pick_up_new_dataset(self, database):
+        """Test that a dataset stored by one worker becomes visible to another"""
+        first = DataProcessor()
+        second = DataProcessor()
+        first._publish_dataset(make_frame())
+        second._publish_dataset(make_frame(seed=11))
+        
+        with first.pin() as snapshot:
+            assert snapshot.store.fingerprint == second.snapshot.store.fingerprint
+        assert Dataset.objects.filter(is_active=True).count() == 1
+    
+    def test_identical_data_is_stored_once(self, database):
+        """Test that uploading the same data twice reuses the stored rows"""
+        first = DatabaseStore.write(make_frame(), 'abc')
+        second = DatabaseStore.write(make_frame(), 'abc')
+        assert first.dataset_id == second.dataset_id
+        assert DatasetRow.objects.count() == len(make_frame())
+    
+    def test_stale_datasets_are_pruned(self, database):
+        """Test that only DATABASE_KEEP datasets (including the active one) are kept"""
+        for seed in range(3):
+            DatabaseStore.write(make_frame(seed), f'dataset{seed}', keep=2)
+        assert sorted(Dataset.objects.values_list('fingerprint', flat=True)) == ['dataset1', 'dataset2']
+        assert Dataset.objects.get(is_active=True).fingerprint == 'dataset2'
+        assert DatasetRow.objects.count() == 2 * len(make_frame())
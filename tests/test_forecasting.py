@@ -0,0 +1,70 @@
+import pytest
+import pandas as pd
+import os
+import sys
+import django
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.data_processor import DataProcessor
+from api.forecasting import fit_models, forecast
+
+class TestForecasting:
+    
+    def setup_method(self):
+        """Setup one linear and one compounding series"""
+        self.processor = DataProcessor()
+        self.processor.df = pd.DataFrame({
+            'year': list(range(2018, 2023)) * 2,
+            'area': ['Wakad'] * 5 + ['Aundh'] * 5,
+            'price': [100, 110, 120, 130, 140, 100, 110, 121, 133.1, 146.41],
+            'demand': [5.0, 5.5, 6.0, 6.5, 7.0, 6.0, 6.0, 6.0, 6.0, 6.0]
+        })
+    
+    def test_fit_models_batch(self):
+        """Test that every area is fitted in one batch and the best model is picked"""
+        params = fit_models(self.processor._get_yearly_frame(), 'price').set_index('area')
+        
+        assert set(params.index) == {'Wakad', 'Aundh'}
+        assert params.loc['Wakad', 'model'] == 'linear'
+        assert params.loc['Aundh', 'model'] == 'log_linear'
+    
+    def test_forecast_values_and_bands(self):
+        """Test projected values and that bands contain them"""
+        params = fit_models(self.processor._get_yearly_frame(), 'price', model='linear')
+        projected = forecast(params, horizon=2).set_index(['area', 'year'])
+        
+        assert projected.loc[('Wakad', 2023), 'value'] == pytest.approx(150.0)
+        assert projected.loc[('Wakad', 2024), 'value'] == pytest.approx(160.0)
+        assert (projected['lower'] <= projected['value']).all()
+        assert (projected['upper'] >= projected['value']).all()
+        
+        with pytest.raises(ValueError):
+            fit_models(self.processor._get_yearly_frame(), 'price', model='arima')
+    
+    def test_models_cached_per_dataset_version(self):
+        """Test that fitted models are reused until the dataset changes"""
+        first = self.processor._get_forecast_models('price')
+        assert self.processor._get_forecast_models('price') is first
+        
+        self.processor.df = self.processor.df.copy()
+        assert self.processor._get_forecast_models('price') is not first
+    
+    def test_trend_query_includes_forecast(self):
+        """Test that trend queries return forecasts and extend the chart"""
+        result = self.processor.query_data('Price forecast for Wakad for the next 2 years')
+        
+        assert [point['year'] for point in result['forecast']['Wakad']] == [2023, 2024]
+        assert result['chart']['labels'][-2:] == ['2023', '2024']
+        labels = [dataset['label'] for dataset in result['chart']['datasets']]
+        assert 'Wakad - Price Forecast' in labels
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -0,0 +1,72 @@
+import pytest
+import os
+import sys
+import subprocess
+import django
+from django.test import Client
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api import views
+from api.lazy import LazyDataProcessor, LOADING, READY, STARTING
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), '..', 'backend')
+
+class TestLazyDataProcessor:
+    
+    def test_importing_views_does_not_load_data(self):
+        """Test that URL loading skips pandas and the dataset"""
+        code = (
+            "import os, sys, django; os.environ['DJANGO_SETTINGS_MODULE'] = 'realestatebot.settings'; "
+            "django.setup(); import realestatebot.urls; from api.lazy import data_processor; "
+            "print(data_processor.state, 'pandas' in sys.modules)"
+        )
+        output = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR, capture_output=True,
+                                text=True, check=True).stdout.split()
+        assert output[-2:] == ['starting', 'False']
+    
+    def test_first_use_builds_processor(self):
+        """Test that attribute access builds the processor once and forwards assignments"""
+        lazy = LazyDataProcessor()
+        assert lazy.state == STARTING
+        
+        areas = lazy.get_areas()
+        assert lazy.state == READY
+        assert isinstance(areas, list)
+        assert lazy.load_seconds is not None
+        
+        instance = lazy._instance
+        lazy.investment_scorer = instance.investment_scorer
+        assert lazy._instance is instance
+    
+    def test_background_warm_up(self):
+        """Test that a background warm-up finishes in the ready state"""
+        lazy = LazyDataProcessor()
+        thread = lazy.warm_up(background=True)
+        thread.join(timeout=30)
+        assert lazy.is_ready
+        assert lazy.warm_up(background=True) is None
+    
+    def test_health_reports_starting_then_ready(self, monkeypatch):
+        """Test that /api/health/ distinguishes starting from ready"""
+        lazy = LazyDataProcessor()
+        monkeypatch.setattr(views, 'data_processor', lazy)
+        client = Client()
+        
+        response = client.get('/api/health/')
+        assert response.status_code == 503
+        assert response.json()['status'] == 'starting'
+        assert response.json()['state'] in (STARTING, LOADING, READY)
+        
+        lazy.warm_up()
+        response = client.get('/api/health/')
+        assert response.status_code == 200
+        assert response.json()['state'] == READY
+        assert response.json()['ready'] is True
@@ -0,0 +1,175 @@
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+import django
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.data_processor import DataProcessor
+from api.metric_registry import (Metric, MetricRegistry, group_metrics, growth_table, registry,
+                                 sql_expressions)
+
+SAMPLE_WORKBOOK = os.path.join(os.path.dirname(__file__), '..', 'Sample_Dataset.xlsx')
+
+def make_frame():
+    rng = np.random.default_rng(11)
+    areas = ['Wakad', 'Aundh', 'Baner']
+    rows = [(year, area) for area in areas for year in range(2019, 2024) for _ in range(3)]
+    frame = pd.DataFrame({
+        'year': [float(year) for year, _ in rows],
+        'area': [area for _, area in rows],
+        'price': rng.uniform(50, 150, len(rows)).round(2),
+        'demand': rng.uniform(1, 10, len(rows)).round(2),
+        'total_sold': rng.integers(10, 500, len(rows)).astype(float),
+        'office_sold': rng.integers(0, 50, len(rows)).astype(float),
+        'office_rate': rng.uniform(8000, 20000, len(rows)).round(2),
+    })
+    frame.loc[[2, 7], 'office_rate'] = np.nan
+    return frame
+
+class TestMetricRegistry:
+
+    def test_grouped_pass_matches_per_metric_aggregation(self):
+        """Test that mean, sum and weighted mean come out of one groupby like separate computations"""
+        frame = make_frame()
+        metrics = registry.resolve(['price', 'total_sold', 'office_rate'])
+        grouped = group_metrics(frame, metrics, ['year', 'area'])
+
+        for (year, area), rows in frame.groupby(['year', 'area']):
+            row = grouped[(grouped['year'] == year) & (grouped['area'] == area)].iloc[0]
+            assert row['price'] == pytest.approx(rows['price'].mean())
+            assert row['total_sold'] == pytest.approx(rows['total_sold'].sum())
+            valid = rows.dropna(subset=['office_rate'])
+            if valid['office_sold'].sum() > 0:
+                expected = (valid['office_rate'] * valid['office_sold']).sum() / valid['office_sold'].sum()
+                assert row['office_rate'] == pytest.approx(expected)
+            else:
+                assert np.isnan(row['office_rate'])
+
+    def test_sql_matches_pandas(self):
+        """Test that the DuckDB expressions compute the same metrics as the pandas pass"""
+        duckdb = pytest.importorskip('duckdb')
+        frame = make_frame()
+        metrics = registry.resolve(['price', 'demand', 'total_sold', 'office_rate'])
+        select = ', '.join(['year', 'area'] + sql_expressions(metrics))
+        actual = duckdb.query_df(frame, 'frame', f'SELECT {select} FROM frame GROUP BY year, area ORDER BY year, area').df()
+        expected = group_metrics(frame, metrics, ['year', 'area'])
+        pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+
+    def test_growth_table_skips_missing_years(self):
+        """Test that growth runs from the first to the last year a metric was reported"""
+        grouped = pd.DataFrame({
+            'year': [2020.0, 2021.0, 2022.0],
+            'area': ['Wakad'] * 3,
+            'price': [100.0, 110.0, 120.0],
+            'total_sold': [np.nan, 50.0, 75.0],
+        })
+        table, years = growth_table(grouped, registry.resolve(['price', 'total_sold']))
+        assert list(table.columns) == ['price_growth', 'total_sold_growth', 'avg_price', 'avg_total_sold']
+        assert table.loc['Wakad', 'price_growth'] == 20.0
+        assert table.loc['Wakad', 'total_sold_growth'] == 50.0
+        assert table.loc['Wakad', 'avg_total_sold'] == 62.5
+        assert years['Wakad'] == 3
+
+    def test_custom_metrics_are_validated(self):
+        """Test that settings can declare metrics and bad declarations are refused"""
+        custom = MetricRegistry.from_settings([
+            {'name': 'others_sold', 'label': 'Others Sold', 'aggregation': 'sum', 'sources': ['others_sold - igr']}
+        ])
+        assert custom.get('others_sold').aggregation == 'sum'
+        assert custom.source_columns(['others_sold - igr'])['others_sold'] == 'others_sold - igr'
+
+        with pytest.raises(ValueError):
+            Metric('bad', 'Bad', aggregation='median')
+        with pytest.raises(ValueError):
+            Metric('rate', 'Rate', aggregation='weighted_mean')
+        with pytest.raises(ValueError):
+            custom.register(Metric('year', 'Year'))
+        with pytest.raises(ValueError):
+            custom.get('unknown')
+
+class TestMetricQueries:
+
+    def setup_method(self):
+        self.processor = DataProcessor()
+        self.processor.df = make_frame()
+
+    def test_default_answer_is_price_and_demand(self):
+        """Test that questions naming no extra metric aggregate and chart price and demand only"""
+        result = self.processor.query_data('Compare Wakad and Aundh')
+        labels = [dataset['label'] for dataset in result['chart']['datasets']]
+        assert sorted(labels) == ['Aundh - Demand', 'Aundh - Price', 'Wakad - Demand', 'Wakad - Price']
+
+        aggregated = self.processor._aggregate_data(self.processor.df, ['Wakad'])
+        assert list(aggregated['Wakad']) == ['data', 'price_growth', 'demand_growth', 'avg_price', 'avg_demand']
+
+    def test_named_metrics_are_aggregated_charted_and_summarised(self):
+        """Test that metrics a question names are added to the aggregates, chart and summary"""
+        assert self.processor.parse_query('units sold in Wakad')['metrics'] == ['demand', 'total_sold']
+        parsed = self.processor.parse_query('units sold and office rate in Wakad')
+        assert parsed['metrics'] == ['price', 'demand', 'total_sold', 'office_rate']
+
+        result = self.processor.query_data('units sold and office rate in Wakad')
+        datasets = result['chart']['datasets']
+        assert [dataset['label'] for dataset in datasets] == ['Wakad - Price', 'Wakad - Demand', 'Wakad - Units Sold',
+                                                              'Wakad - Office Rate']
+        assert 'borderDash' not in datasets[0]
+        assert len({tuple(dataset['borderDash']) for dataset in datasets[1:]}) == 3
+
+        wakad = self.processor.df[self.processor.df['area'] == 'Wakad']
+        yearly_sold = wakad.groupby('year')['total_sold'].sum()
+        assert datasets[2]['data'] == pytest.approx(yearly_sold.tolist())
+        assert 'Units Sold averages' in result['summary']
+        assert 'Office Rate averages' in result['summary']
+
+    def test_metrics_missing_from_the_dataset_are_ignored(self):
+        """Test that a metric the dataset has no column for is not requested"""
+        parsed = self.processor.parse_query('carpet area in Wakad')
+        assert parsed['metrics'] == ['price', 'demand']
+
+    def test_structured_query_accepts_registry_metrics(self):
+        """Test that structured queries take any available metric or a list of them"""
+        result = self.processor.structured_query({'areas': ['Wakad'], 'metric': ['total_sold', 'office_rate'],
+                                                  'include': {'chart': True}})
+        assert set(result['aggregates'][0]) == {'area', 'year', 'total_sold_mean', 'office_rate_mean'}
+        assert [dataset['label'] for dataset in result['chart']['datasets']] == ['Wakad - Units Sold',
+                                                                                 'Wakad - Office Rate']
+        with pytest.raises(ValueError):
+            self.processor.structured_query({'areas': ['Wakad'], 'metric': 'carpet_area'})
+
+    def test_loader_keeps_igr_columns_as_metrics(self):
+        """Test that the IGR columns are loaded as named metrics instead of duplicate price/demand columns"""
+        assert self.processor.load_excel_file(SAMPLE_WORKBOOK)
+        df = self.processor.df
+        assert {'total_sold', 'flat_rate', 'office_rate', 'total_units'} <= set(df.columns)
+        assert not any(column.startswith(('price_', 'demand_')) for column in df.columns)
+        # price is still the flat rate; the metric keeps it under its own name
+        assert (df['price'] == df['flat_rate']).all()
+        assert 'office_rate' in self.processor.available_metrics()
+
+    def test_parquet_backend_aggregates_the_same(self, settings, tmp_path):
+        """Test that extra metrics pushed down to DuckDB match the in-memory pass"""
+        pytest.importorskip('duckdb')
+        settings.DATA_BACKEND = 'parquet'
+        settings.PARQUET_DIR = tmp_path / 'datasets'
+        processor = DataProcessor()
+        processor._publish_dataset(make_frame())
+        assert processor.df is None
+
+        metrics = ['total_sold', 'office_rate']
+        expected = self.processor._aggregate_data(self.processor._select(['Wakad', 'Baner']), ['Wakad', 'Baner'], metrics)
+        actual = processor._aggregate_data(processor._select(['Wakad', 'Baner']), ['Wakad', 'Baner'], metrics)
+        assert list(actual) == list(expected)
+        for area in expected:
+            assert [record['office_rate'] for record in actual[area]['data']] == pytest.approx(
+                [record['office_rate'] for record in expected[area]['data']])
+            assert actual[area]['total_sold_growth'] == pytest.approx(expected[area]['total_sold_growth'])
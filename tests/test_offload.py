@@ -0,0 +1,144 @@
+import pytest
+import io
+import numpy as np
+import pandas as pd
+import os
+import sys
+import django
+from django.test import Client
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api import offload
+from api.offload import OffloadBusy, OffloadTimeout, ProcessOffloader
+from api.offload_tasks import pack_frame, unpack_frame, yearly_means
+from api.views import data_processor
+
+def make_frame():
+    return pd.DataFrame({
+        'year': [2020, 2021, 2020, 2021, 2022],
+        'area': ['Wakad', 'Wakad', 'Aundh', None, 'Aundh'],
+        'price': [100.0, 110.0, np.nan, 95.0, 99.0],
+        'demand': [5.0, 5.5, 4.0, 4.1, 4.3],
+        'segment': pd.Categorical(['flat', 'office', 'flat', 'flat', 'shop']),
+        'recorded': pd.to_datetime(['2020-01-01', '2021-01-01', '2020-06-01', '2021-06-01', '2022-01-01']),
+        'verified': [True, False, True, True, False],
+    })
+
+class TestOffload:
+    
+    @pytest.fixture(scope='class')
+    def pool(self):
+        """One real pool for the class; thresholds of 0 send everything to it"""
+        offloader = ProcessOffloader(workers=1, max_queue=2, queue_timeout=0.1, min_rows=0, min_bytes=0)
+        yield offloader
+        offloader.shutdown()
+    
+    def test_shared_memory_round_trip(self):
+        """Test that every column kind survives the shared-memory transport"""
+        frame = make_frame()
+        restored = unpack_frame(pack_frame(frame), unlink=True)
+        
+        # Missing text comes back as NaN, which is how read_excel reports it too
+        assert pd.isna(restored['area'].iloc[3])
+        frame['area'] = frame['area'].fillna(np.nan)
+        pd.testing.assert_frame_equal(restored, frame)
+    
+    def test_small_work_runs_inline(self):
+        """Test that work below the threshold never starts a pool"""
+        offloader = ProcessOffloader(workers=1, min_rows=1000)
+        result = offloader.yearly_means(make_frame().dropna(subset=['area']))
+        
+        assert offloader._executor is None
+        assert len(result) == 4
+    
+    def test_pool_matches_inline(self, pool):
+        """Test that pool results equal the inline computation"""
+        frame = make_frame().dropna(subset=['area'])
+        
+        pd.testing.assert_frame_equal(pool.yearly_means(frame), yearly_means(frame))
+        
+        workbook = pool.frame_to_xlsx(frame)
+        pd.testing.assert_frame_equal(pd.read_excel(io.BytesIO(workbook)), pd.read_excel(io.BytesIO(
+            offload.TASKS['frame_to_xlsx'](frame))))
+        assert pool._executor is not None
+    
+    def test_read_workbook_in_pool(self, pool, tmp_path):
+        """Test that a parsed workbook comes back through shared memory"""
+        path = tmp_path / 'data.xlsx'
+        make_frame().drop(columns=['segment']).to_excel(path, index=False)
+        
+        result = pool.read_workbook(str(path))
+        assert result['area'].tolist()[:2] == ['Wakad', 'Wakad']
+        assert pd.isna(result['area'].iloc[3])
+    
+    def test_full_queue_raises_busy(self):
+        """Test that callers are turned away once max_queue tasks are in flight"""
+        offloader = ProcessOffloader(workers=1, max_queue=1, queue_timeout=0.05, min_rows=0)
+        offloader._slots.acquire()
+        
+        with pytest.raises(OffloadBusy):
+            offloader.frame_to_xlsx(make_frame())
+        assert offloader._executor is None
+    
+    def test_timed_out_task_keeps_its_slot_and_blocks(self, monkeypatch):
+        """Test that a task past task_timeout answers OffloadTimeout and holds its slot and memory until it ends"""
+        import threading
+        import time
+        from concurrent.futures import ThreadPoolExecutor
+        from multiprocessing import shared_memory
+        from api.offload_tasks import run_task
+        
+        finish = threading.Event()
+        specs = []
+        
+        def slow_task(name, spec, args):
+            specs.append(spec)
+            finish.wait(5)
+            time.sleep(0.05)
+            result = run_task(name, spec, args)
+            specs.append(result[1])
+            return result
+        
+        threads = ThreadPoolExecutor(max_workers=1)
+        offloader = ProcessOffloader(workers=1, max_queue=1, queue_timeout=0.05, task_timeout=0.1, min_rows=0)
+        monkeypatch.setattr(offloader, '_get_executor', lambda: type('Pool', (), {
+            'submit': lambda self, fn, *args: threads.submit(slow_task, *args)})())
+        
+        with pytest.raises(OffloadTimeout):
+            offloader.yearly_means(make_frame().dropna(subset=['area']))
+        
+        # Still running: the input block stays readable and the only slot stays taken
+        shared_memory.SharedMemory(name=specs[0]['shm']).close()
+        with pytest.raises(OffloadBusy):
+            offloader.yearly_means(make_frame())
+        
+        finish.set()
+        threads.shutdown(wait=True)
+        for spec in specs:
+            with pytest.raises(FileNotFoundError):
+                shared_memory.SharedMemory(name=spec['shm'])
+        assert offloader._slots.acquire(timeout=0)
+    
+    def test_busy_download_returns_503(self, monkeypatch):
+        """Test that the download endpoint answers 503 with Retry-After under backpressure"""
+        data_processor.df = make_frame().dropna(subset=['area'])
+        busy = ProcessOffloader(workers=1, max_queue=1, queue_timeout=0.05, min_rows=0)
+        busy._slots.acquire()
+        monkeypatch.setattr(offload, 'offloader', busy)
+        
+        response = Client().get('/api/download/?format=xlsx')
+        assert response.status_code == 503
+        assert response['Retry-After'] == '1'
+        
+        monkeypatch.undo()
+        response = Client().get('/api/download/?format=xlsx')
+        assert response.status_code == 200
+        assert response.content[:2] == b'PK'
@@ -0,0 +1,117 @@
+import pytest
+import pandas as pd
+import os
+import sys
+import django
+from django.test import Client, override_settings
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.telemetry import Telemetry
+from api.views import data_processor
+
+TOKEN = 'test-profiling-token'
+
+class TestProfiling:
+    
+    @pytest.fixture(autouse=True)
+    def profile_settings(self, tmp_path):
+        """Enable profiling with a known token and a throwaway profile directory"""
+        with override_settings(PROFILING_TOKEN=TOKEN, PROFILE_DIR=tmp_path, PROFILE_KEEP=2):
+            yield
+    
+    def setup_method(self):
+        """Setup a small dataset on the shared processor"""
+        data_processor.df = pd.DataFrame({
+            'year': [2020, 2021, 2022, 2020, 2021, 2022],
+            'area': ['Wakad', 'Wakad', 'Wakad', 'Aundh', 'Aundh', 'Aundh'],
+            'price': [5000000, 5500000, 6000000, 7000000, 7200000, 7500000],
+            'demand': [7.5, 8.0, 8.5, 6.0, 6.5, 7.0]
+        })
+        self.client = Client()
+    
+    def _profiled_query(self, query='Analyze Wakad', token=TOKEN):
+        return self.client.post('/api/query/?profile=1', {'query': query},
+                                content_type='application/json', HTTP_X_PROFILE_TOKEN=token)
+    
+    def test_capture_stages_works_with_metrics_disabled(self):
+        """Test that stage capture records spans even when the registry is off"""
+        registry = Telemetry(enabled=False)
+        with registry.capture_stages() as stages:
+            with registry.span('parse'):
+                pass
+        with registry.span('filter'):
+            pass
+        
+        assert [stage for stage, _ in stages] == ['parse']
+        assert 'stage="parse"' not in registry.render_prometheus()
+    
+    def test_profile_requires_token(self):
+        """Test that profiling is refused without the admin token"""
+        response = self._profiled_query(token='wrong')
+        assert response.status_code == 403
+        
+        response = self.client.get('/api/profiles/')
+        assert response.status_code == 403
+    
+    def test_busy_profiler_is_a_conflict(self, monkeypatch):
+        """Test that only a held profiler gives 409; other RuntimeErrors stay server errors"""
+        from api import profiling
+        
+        class HeldLock:
+            def acquire(self, timeout=None):
+                return False
+        
+        monkeypatch.setattr(profiling, '_profile_lock', HeldLock())
+        assert self._profiled_query().status_code == 409
+        
+        monkeypatch.undo()
+        
+        def fail(*args, **kwargs):
+            raise RuntimeError('numpy went wrong')
+        monkeypatch.setattr(data_processor, 'query_data', fail)
+        assert self._profiled_query().status_code == 500
+    
+    def test_unprofiled_query_has_no_profile(self):
+        """Test that ordinary queries are not profiled"""
+        response = self.client.post('/api/query/', {'query': 'Analyze Wakad'}, content_type='application/json')
+        assert response.status_code == 200
+        assert 'profile' not in response.json()
+    
+    def test_profiled_query_stores_artifact(self):
+        """Test that a profiled query returns timings and a downloadable .prof"""
+        response = self._profiled_query()
+        assert response.status_code == 200
+        
+        profile = response.json()['profile']
+        assert profile['duration_ms'] > 0
+        assert 'parse' in profile['stages_ms']
+        assert profile['pandas_operations']
+        
+        download = self.client.get(profile['download_url'], HTTP_X_PROFILE_TOKEN=TOKEN)
+        assert download.status_code == 200
+        assert download['Content-Disposition'].endswith('.prof"')
+        
+        summary = self.client.get(profile['download_url'] + '?format=json', HTTP_X_PROFILE_TOKEN=TOKEN).json()
+        assert summary['query'] == 'Analyze Wakad'
+        
+        text = self.client.get(profile['download_url'] + '?format=text', HTTP_X_PROFILE_TOKEN=TOKEN)
+        assert b'cumulative' in text.content
+    
+    def test_old_profiles_are_pruned(self):
+        """Test that only PROFILE_KEEP profiles are kept and unknown ids 404"""
+        for query in ['Analyze Wakad', 'Analyze Aundh', 'Compare Wakad and Aundh']:
+            assert self._profiled_query(query).status_code == 200
+        
+        profiles = self.client.get('/api/profiles/', HTTP_AUTHORIZATION=f'Bearer {TOKEN}').json()['profiles']
+        assert len(profiles) == 2
+        
+        missing = self.client.get('/api/profiles/../../settings/', HTTP_X_PROFILE_TOKEN=TOKEN)
+        assert missing.status_code == 404
@@ -0,0 +1,191 @@
+import pytest
+import json
+import re
+import pandas as pd
+import os
+import sys
+import django
+from django.test import Client
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.data_processor import DataProcessor
+from api.querylog import CacheWarmer, QueryLog, query_log
+from api.results import result_cache
+from api.telemetry import telemetry
+from api.views import data_processor
+
+def make_frame():
+    return pd.DataFrame({
+        'year': [2020, 2021, 2022] * 3,
+        'area': ['Wakad'] * 3 + ['Aundh'] * 3 + ['Baner'] * 3,
+        'price': [100.0, 110.0, 120.0, 90.0, 95.0, 99.0, 80.0, 85.0, 92.0],
+        'demand': [5.0, 5.5, 6.0, 4.0, 4.1, 4.3, 3.0, 3.2, 3.5]
+    })
+
+def cache_count(cache, result):
+    match = re.search(rf'realestate_cache_requests_total{{cache="{cache}",result="{result}"}} (\S+)',
+                      telemetry.render_prometheus())
+    return float(match.group(1)) if match else 0
+
+class TestQueryLog:
+    
+    @pytest.fixture
+    def log_path(self, settings, tmp_path):
+        settings.QUERY_LOG_PATH = str(tmp_path / 'query_log.json')
+        return settings.QUERY_LOG_PATH
+    
+    def test_record_is_queued_until_flush(self, log_path):
+        """Test that recording only queues and the writer merges counts in one batch"""
+        log = QueryLog(flush_interval=3600)
+        log.record('Tell me about Wakad')
+        assert not os.path.exists(log_path)
+        
+        log.record('tell me about wakad?')
+        log.record('Compare Wakad and Aundh')
+        log.flush()
+        assert log.top(5) == ['tell me about wakad?', 'Compare Wakad and Aundh']
+        
+        log.record('Compare Wakad and Aundh')
+        log.record('Compare Wakad and Aundh')
+        log.flush()
+        entries = json.load(open(log_path))['queries']
+        assert sorted(entry['count'] for entry in entries.values()) == [2, 3]
+        assert log.top(1) == ['Compare Wakad and Aundh']
+    
+    def test_parsed_queries_share_an_entry(self, log_path):
+        """Test that wordings that parse identically are counted together"""
+        data_processor.df = make_frame()
+        log = QueryLog(flush_interval=3600)
+        log.record('Compare Wakad and Aundh')
+        log.record('compare   wakad and aundh')
+        log.record('Tell me about Baner')
+        log.flush()
+        entries = json.load(open(log_path))['queries']
+        assert sorted(entry['count'] for entry in entries.values()) == [1, 2]
+    
+    def test_log_keeps_most_frequent(self, log_path):
+        """Test that the file keeps only max_entries questions"""
+        data_processor.df = make_frame()
+        log = QueryLog(flush_interval=3600, max_entries=2)
+        for area, times in [('Wakad', 3), ('Aundh', 1), ('Baner', 2)]:
+            for _ in range(times):
+                log.record(f'Tell me about {area}')
+        log.flush()
+        assert log.top(10) == ['Tell me about Wakad', 'Tell me about Baner']
+    
+    def test_disabled_without_path(self, settings):
+        """Test that an empty QUERY_LOG_PATH records nothing"""
+        settings.QUERY_LOG_PATH = ''
+        log = QueryLog(flush_interval=3600)
+        log.record('Tell me about Wakad')
+        assert log.top(5) == []
+        assert log._thread is None
+    
+    def test_view_records_successful_queries(self, log_path):
+        """Test that the query endpoint logs answered questions only"""
+        data_processor.df = make_frame()
+        client = Client()
+        client.get('/api/query/', {'query': 'Tell me about Wakad'})
+        client.get('/api/query/', {'query': 'Tell me about Nowhere'})
+        query_log.flush()
+        assert query_log.top(5) == ['Tell me about Wakad']
+
+class TestCacheWarmer:
+    
+    @pytest.fixture
+    def log(self, settings, tmp_path):
+        settings.QUERY_LOG_PATH = str(tmp_path / 'query_log.json')
+        log = QueryLog(flush_interval=3600)
+        for query in ['Compare Wakad and Aundh'] * 3 + ['Tell me about Baner']:
+            log.record(query)
+        log.flush()
+        return log
+    
+    def test_replay_fills_caches(self, log):
+        """Test that a warm-up answers the top questions so the first real request hits the caches"""
+        processor = DataProcessor()
+        processor.df = make_frame()
+        result_cache.clear()
+        
+        CacheWarmer(log, limit=1).warm(processor, background=False)
+        
+        hits = cache_count('summaries', 'hit')
+        results_hits = cache_count('results', 'hit')
+        result = processor.query_data('Compare Wakad and Aundh')
+        assert cache_count('summaries', 'hit') == hits + 1
+        assert processor.get_result(result['result_handle']) is not None
+        assert cache_count('results', 'hit') == results_hits + 1
+        # Only the top question was replayed
+        misses = cache_count('summaries', 'miss')
+        processor.query_data('Tell me about Baner')
+        assert cache_count('summaries', 'miss') == misses + 1
+    
+    def test_background_warm_after_load(self, log, tmp_path):
+        """Test that loading a workbook starts a warm-up against the new dataset"""
+        path = tmp_path / 'data.xlsx'
+        make_frame().to_excel(path, index=False)
+        processor = DataProcessor()
+        
+        warmer = CacheWarmer(log, limit=5)
+        with pytest.MonkeyPatch.context() as patch:
+            patch.setattr('api.data_processor.cache_warmer', warmer)
+            assert processor.load_excel_file(str(path))
+        warmer.wait(timeout=30)
+        
+        hits = cache_count('summaries', 'hit')
+        processor.query_data('Tell me about Baner')
+        assert cache_count('summaries', 'hit') == hits + 1
+    
+    def test_superseded_warm_up_stops(self, log):
+        """Test that a replay stops once a newer dataset is published"""
+        processor = DataProcessor()
+        processor.df = make_frame()
+        calls = []
+        
+        def query_data(query, **kwargs):
+            calls.append(query)
+            processor.df = make_frame()
+        
+        processor.query_data = query_data
+        CacheWarmer(log, limit=5).warm(processor, background=False)
+        assert calls == ['Compare Wakad and Aundh']
+
+class TestSummaryCache:
+    
+    def test_repeated_question_reuses_summary(self):
+        """Test that the same question against the same snapshot builds its summary once"""
+        processor = DataProcessor()
+        processor.df = make_frame()
+        first = processor.query_data('Compare Wakad and Aundh')
+        hits = cache_count('summaries', 'hit')
+        second = processor.query_data('compare wakad and aundh')
+        assert cache_count('summaries', 'hit') == hits + 1
+        assert second['summary'] == first['summary']
+        
+        processor.df = make_frame()
+        processor.query_data('Compare Wakad and Aundh')
+        assert cache_count('summaries', 'hit') == hits + 1
+    
+    def test_llm_errors_are_not_cached(self, settings):
+        """Test that a fallback summary after an LLM error is retried next time"""
+        settings.GOOGLE_API_KEY = 'test-key'
+        processor = DataProcessor()
+        processor.df = make_frame()
+        calls = []
+        
+        def failing(*args):
+            calls.append(args)
+            raise Exception('timeout')
+        
+        processor._get_llm_summary = failing
+        processor.query_data('Tell me about Wakad')
+        processor.query_data('Tell me about Wakad')
+        assert len(calls) == 2
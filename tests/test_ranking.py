@@ -0,0 +1,75 @@
+import pytest
+import pandas as pd
+import os
+import sys
+import django
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.data_processor import DataProcessor
+from api.ranking import compute_area_metrics, select_top
+
+class TestRanking:
+    
+    def setup_method(self):
+        """Setup a small catalogue with a tie and a single-year area"""
+        self.processor = DataProcessor()
+        self.processor.df = pd.DataFrame({
+            'year': [2018, 2022, 2018, 2022, 2018, 2022, 2018, 2022, 2022],
+            'area': ['Wakad', 'Wakad', 'Aundh', 'Aundh', 'Baner', 'Baner', 'Hadapsar', 'Hadapsar', 'Kharadi'],
+            'price': [100, 150, 100, 120, 100, 150, 100, 90, 500],
+            'demand': [5.0, 6.0, 5.0, 5.5, 5.0, 7.0, 5.0, 4.0, 9.0]
+        })
+    
+    def test_compute_area_metrics(self):
+        """Test per-area growth and data point counts"""
+        metrics = compute_area_metrics(self.processor._get_yearly_frame()).set_index('area')
+        
+        assert metrics.loc['Wakad', 'price_growth'] == 50.0
+        assert metrics.loc['Hadapsar', 'price_growth'] == -10.0
+        assert metrics.loc['Kharadi', 'data_points'] == 1
+        assert pd.isna(metrics.loc['Kharadi', 'price_growth'])
+    
+    def test_select_top_ties_and_pagination(self):
+        """Test that ties share a rank and pages continue after them"""
+        metrics = compute_area_metrics(self.processor._get_yearly_frame())
+        
+        page = select_top(metrics, 'price_growth', limit=1, min_points=2)
+        assert [item['area'] for item in page['items']] == ['Baner', 'Wakad']
+        assert [item['rank'] for item in page['items']] == [1, 1]
+        assert page['next_offset'] == 2
+        
+        page = select_top(metrics, 'price_growth', limit=1, offset=2, min_points=2)
+        assert [item['area'] for item in page['items']] == ['Aundh']
+        assert page['items'][0]['rank'] == 3
+        
+        page = select_top(metrics, 'price_growth', limit=1, ascending=True, min_points=2)
+        assert page['items'][0]['area'] == 'Hadapsar'
+    
+    def test_min_points_threshold(self):
+        """Test that sparse areas are excluded by the data point threshold"""
+        ranking = self.processor.rank_areas('avg_price', limit=10)
+        assert ranking['items'][0]['area'] == 'Kharadi'
+        
+        ranking = self.processor.rank_areas('avg_price', limit=10, min_points=2)
+        assert 'Kharadi' not in [item['area'] for item in ranking['items']]
+    
+    def test_catalogue_ranking_query(self):
+        """Test that top-N queries rank every area without naming any"""
+        result = self.processor.query_data('Top 2 areas by price growth since 2018')
+        
+        assert 'error' not in result
+        assert result['ranking']['metric'] == 'price_growth'
+        assert result['ranking']['start_year'] == 2018
+        assert {item['area'] for item in result['ranking']['items']} == {'Baner', 'Wakad'}
+        assert len(result['table']) == 4
+
+if __name__ == '__main__':
+    pytest.main([__file__])
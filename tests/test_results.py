@@ -0,0 +1,136 @@
+import pytest
+import io
+import json
+import time
+import pandas as pd
+import os
+import sys
+import django
+from django.test import Client
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.results import ResultCache, ResultExpired, result_cache
+from api.views import data_processor
+
+def make_frame():
+    return pd.DataFrame({
+        'year': [2020, 2021, 2022] * 3,
+        'area': ['Wakad'] * 3 + ['Aundh'] * 3 + ['Baner'] * 3,
+        'price': [100.0, 110.0, 120.0, 90.0, 95.0, 99.0, 80.0, 85.0, 92.0],
+        'demand': [5.0, 5.5, 6.0, 4.0, 4.1, 4.3, 3.0, 3.2, 3.5]
+    })
+
+class TestResultCache:
+    
+    def test_lru_eviction_by_entries_and_rows(self):
+        """Test that the least recently used entries go first when either bound is exceeded"""
+        cache = ResultCache(ttl=60, max_entries=2, max_rows=5)
+        frame = make_frame().head(2)
+        cache.put('a', frame)
+        cache.put('b', frame)
+        cache.get('a')
+        cache.put('c', frame)
+        
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        
+        cache.put('d', make_frame().head(4))
+        assert len(cache) == 1
+        assert cache.get('d') is not None
+    
+    def test_entries_expire(self):
+        """Test that entries past their TTL are dropped"""
+        cache = ResultCache(ttl=0.01)
+        cache.put('a', make_frame())
+        time.sleep(0.02)
+        assert cache.get('a') is None
+        assert len(cache) == 0
+    
+    def test_tampered_handle_rejected(self):
+        """Test that a handle whose recipe was edited does not decode"""
+        cache = ResultCache()
+        handle = cache.make_handle('0f' * 12, ['Wakad'], 2020, None)
+        assert cache.read_handle(handle)['areas'] == ['Wakad']
+        
+        with pytest.raises(ResultExpired):
+            cache.read_handle(handle[:-2] + ('AA' if not handle.endswith('AA') else 'BB'))
+
+class TestExportEndpoint:
+    
+    def setup_method(self):
+        data_processor.df = make_frame()
+        result_cache.clear()
+        self.client = Client()
+    
+    def query(self, text):
+        response = self.client.post('/api/query/', json.dumps({'query': text}), content_type='application/json')
+        assert response.status_code == 200
+        return response.json()
+    
+    def test_csv_export_streams_full_result(self, monkeypatch):
+        """Test that the CSV export covers every row of the result, in chunks"""
+        monkeypatch.setattr('api.views.EXPORT_CHUNK_ROWS', 2)
+        result = self.query('Compare Wakad and Aundh')
+        
+        response = self.client.get(f"/api/results/{result['result_handle']}/export/?format=csv")
+        assert response.status_code == 200
+        assert response.streaming
+        assert '2_areas_comparison.csv' in response['Content-Disposition']
+        
+        exported = pd.read_csv(io.BytesIO(b''.join(response.streaming_content)))
+        assert len(exported) == result['total_rows'] == 6
+        assert list(exported.columns) == list(make_frame().columns)
+    
+    def test_xlsx_export(self):
+        """Test that the XLSX export matches the query's rows"""
+        result = self.query('Tell me about Wakad')
+        
+        response = self.client.get(f"/api/results/{result['result_handle']}/export/?format=xlsx")
+        assert response.status_code == 200
+        assert 'wakad.xlsx' in response['Content-Disposition']
+        exported = pd.read_excel(io.BytesIO(response.content))
+        assert exported['area'].unique().tolist() == ['Wakad']
+    
+    def test_other_worker_rebuilds_from_handle(self):
+        """Test that a cache miss (e.g. another gunicorn worker) rebuilds the same slice"""
+        result = self.query('Compare Wakad and Aundh')
+        result_cache.clear()
+        
+        response = self.client.get(f"/api/results/{result['result_handle']}/export/")
+        exported = pd.read_csv(io.BytesIO(b''.join(response.streaming_content)))
+        assert sorted(exported['area'].unique()) == ['Aundh', 'Wakad']
+    
+    def test_stale_handle_is_gone(self):
+        """Test that handles stop working once a new dataset is published"""
+        result = self.query('Tell me about Wakad')
+        data_processor.df = make_frame().assign(price=lambda df: df['price'] + 1)
+        
+        response = self.client.get(f"/api/results/{result['result_handle']}/export/?format=csv")
+        assert response.status_code == 410
+        
+        response = self.client.get('/api/results/not-a-handle/export/')
+        assert response.status_code == 410
+    
+    def test_handle_follows_the_data_not_the_version_counter(self):
+        """Test that a worker at the same version with other data refuses a handle, and one with the same data serves it"""
+        from api.data_processor import DataProcessor
+        
+        answering, other, same = DataProcessor(), DataProcessor(), DataProcessor()
+        answering.df = make_frame()
+        other.df = make_frame().assign(price=lambda df: df['price'] * 2)
+        same.df = make_frame()
+        assert answering.dataset_version == other.dataset_version == same.dataset_version
+        
+        handle = answering.query_data('Tell me about Wakad')['result_handle']
+        result_cache.clear()
+        with pytest.raises(ResultExpired):
+            other.get_result(handle)
+        assert same.get_result(handle)['price'].tolist() == [100.0, 110.0, 120.0]
@@ -0,0 +1,171 @@
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+import django
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+# conftest.py skips database setup for the rest of the suite; the database backend test needs the tables
+from pytest_django.fixtures import django_db_setup  # noqa: F401
+
+from api.data_processor import DataProcessor
+from api.rollups import TimeRollups, extract_dates, period_spans
+
+def make_frame(years=(2023, 2024), seed=3):
+    rng = np.random.default_rng(seed)
+    rows = [(year, month, area) for area in ['Wakad', 'Baner'] for year in years for month in range(1, 13)
+            for _ in range(2)]
+    return pd.DataFrame({
+        'year': [year for year, _, _ in rows],
+        'month': [month for _, month, _ in rows],
+        'area': [area for _, _, area in rows],
+        'price': rng.uniform(50, 150, len(rows)).round(2),
+        'demand': rng.uniform(1, 10, len(rows)).round(2),
+    })
+
+def dated(frame):
+    return frame.assign(date=extract_dates(frame))
+
+class TestTimeRollups:
+
+    def test_levels_match_grouping_the_rows(self):
+        """Test that every level of the pyramid holds the means of its rows"""
+        frame = dated(make_frame())
+        rollups = TimeRollups.build(frame)
+
+        quarters = rollups.select('quarter', ['Wakad'])
+        assert quarters['period'].tolist() == [f'{year}Q{quarter}' for year in (2023, 2024) for quarter in range(1, 5)]
+        wakad = frame[frame['area'] == 'Wakad']
+        expected = wakad.groupby(wakad['date'].dt.to_period('Q'))['price'].mean()
+        np.testing.assert_allclose(quarters['price'], expected.to_numpy())
+        assert quarters['records'].tolist() == [6] * 8
+
+        years = rollups.select('year', ['Wakad'])
+        np.testing.assert_allclose(years['demand'], wakad.groupby('year')['demand'].mean().to_numpy())
+
+    def test_last_and_named_periods(self):
+        """Test selecting the latest N periods and named periods"""
+        rollups = TimeRollups.build(dated(make_frame()))
+        last = rollups.select('month', ['Baner'], last=6)
+        assert last['period'].tolist() == ['2024-07', '2024-08', '2024-09', '2024-10', '2024-11', '2024-12']
+        named = rollups.select('quarter', periods=['2023Q2', '2024Q2'])
+        assert sorted(set(named['period'])) == ['2023Q2', '2024Q2']
+        assert len(named) == 4
+
+    def test_append_matches_a_full_build(self):
+        """Test that appending a batch gives the same pyramid as building over all rows"""
+        first, second = dated(make_frame(years=(2023,))), dated(make_frame(years=(2023, 2024), seed=8))
+        appended = TimeRollups.build(first).append(second)
+        rebuilt = TimeRollups.build(pd.concat([first, second]))
+        pd.testing.assert_frame_equal(appended.select('quarter'), rebuilt.select('quarter'))
+
+    def test_dates_from_names_quarters_and_date_columns(self):
+        """Test that month names, quarter labels and date columns all give dates"""
+        names = pd.DataFrame({'year': [2024, 2024], 'month': ['March', 'dec']})
+        assert extract_dates(names).dt.month.tolist() == [3, 12]
+        quarters = pd.DataFrame({'year': [2024, 2024], 'quarter': ['Q1', 'Q3']})
+        assert extract_dates(quarters).dt.month.tolist() == [1, 7]
+        column = pd.DataFrame({'date': ['2024-05-17', '2023-11-02']})
+        assert extract_dates(column).dt.year.tolist() == [2024, 2023]
+        assert extract_dates(pd.DataFrame({'year': [2024]})) is None
+
+        assert period_spans(['2024-02', '2024-01', '2024-05'], 'month') == [
+            ('2024-01-01T00:00:00', '2024-03-01T00:00:00'), ('2024-05-01T00:00:00', '2024-06-01T00:00:00')]
+
+class TestPeriodQueries:
+
+    def setup_method(self):
+        self.processor = DataProcessor()
+
+    def load(self, tmp_path, frame=None):
+        path = tmp_path / 'monthly.xlsx'
+        (make_frame() if frame is None else frame).to_excel(path, index=False)
+        assert self.processor.load_excel_file(str(path))
+
+    def test_parse_periods(self):
+        """Test that month and quarter phrases are recognised"""
+        parse = lambda query: self.processor.parse_query(query)['period_filter']
+        assert parse('Wakad price last 6 months') == {'resolution': 'month', 'last': 6}
+        assert parse('past 2 quarters in Baner') == {'resolution': 'quarter', 'last': 2}
+        assert parse('Q2 2023 vs Q2 2024 in Wakad') == {'resolution': 'quarter', 'periods': ['2023Q2', '2024Q2']}
+        assert parse('Wakad in March 2024') == {'resolution': 'month', 'periods': ['2024-03']}
+        assert parse('Wakad since 2020') is None
+
+    def test_loader_keeps_dates(self, tmp_path):
+        """Test that monthly workbooks keep a date column alongside the year"""
+        self.load(tmp_path)
+        df = self.processor.df
+        assert df['date'].min() == pd.Timestamp('2023-01-01')
+        assert df['date'].dt.year.tolist() == df['year'].astype(int).tolist()
+
+    def test_quarter_comparison_is_served_from_rollups(self, tmp_path):
+        """Test that quarter questions chart quarters and their handle fetches only those rows"""
+        self.load(tmp_path)
+        result = self.processor.query_data('Compare Wakad and Baner Q2 2023 vs Q2 2024')
+        assert result['resolution'] == 'quarter'
+        assert result['chart']['labels'] == ['2023Q2', '2024Q2']
+
+        df = self.processor.df
+        wakad = df[(df['area'] == 'Wakad') & (df['year'] == 2024) & df['month'].between(4, 6)]
+        prices = next(dataset for dataset in result['chart']['datasets'] if dataset['label'] == 'Wakad - Price')
+        assert prices['data'][1] == pytest.approx(wakad['price'].mean())
+        rows = self.processor.get_result(result['result_handle'])
+        assert len(rows) == 24
+        assert set(rows['date'].dt.quarter) == {2}
+
+    def test_last_months(self, tmp_path):
+        """Test that "last N months" answers the newest months"""
+        self.load(tmp_path)
+        result = self.processor.query_data('Wakad price last 3 months')
+        assert result['chart']['labels'] == ['2024-10', '2024-11', '2024-12']
+        assert 'forecast' not in result
+
+    def test_yearly_data_falls_back_with_a_note(self):
+        """Test that month questions on yearly data are answered by year with a note"""
+        self.processor.df = make_frame().drop(columns='month')
+        result = self.processor.query_data('Wakad price last 6 months')
+        assert result['resolution'] == 'year'
+        assert 'yearly' in result['note']
+
+    def test_append_extends_rollups(self, tmp_path):
+        """Test that an appended upload folds its months into the existing rollups"""
+        self.load(tmp_path, make_frame(years=(2023,)))
+        self.processor._get_rollups()
+        second = tmp_path / 'second.xlsx'
+        make_frame(years=(2024,), seed=4).to_excel(second, index=False)
+        assert self.processor.load_excel_file(str(second), append=True)
+
+        with self.processor.pin() as snapshot:
+            assert 'rollups' in snapshot.derived
+        quarters = self.processor._get_rollups().select('quarter', ['Wakad'])
+        assert len(quarters) == 8
+
+    @pytest.mark.django_db
+    @pytest.mark.parametrize('backend', ['parquet', 'database'])
+    def test_disk_backends_answer_the_same(self, backend, settings, tmp_path):
+        """Test that period answers and handles agree with the in-memory backend"""
+        query = 'Compare Wakad and Baner Q2 2023 vs Q2 2024'
+        self.load(tmp_path)
+        expected = self.processor.query_data(query)
+
+        if backend == 'parquet':
+            pytest.importorskip('duckdb')
+            settings.PARQUET_DIR = tmp_path / 'datasets'
+        settings.DATA_BACKEND = backend
+        self.processor = DataProcessor()
+        self.load(tmp_path)
+        assert self.processor.df is None
+        result = self.processor.query_data(query)
+        assert result['chart'] == expected['chart']
+        rows = self.processor.get_result(result['result_handle'])
+        assert len(rows) == 24
+        assert set(pd.to_datetime(rows['date']).dt.quarter) == {2}
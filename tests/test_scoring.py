@@ -0,0 +1,111 @@
+import pytest
+import pandas as pd
+import os
+import sys
+import django
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.data_processor import DataProcessor
+from api.scoring import InvestmentScorer, compute_investment_features
+
+class TestInvestmentScoring:
+    
+    def setup_method(self):
+        """Setup a steady grower, a volatile grower and a decliner"""
+        self.processor = DataProcessor()
+        self.processor.df = pd.DataFrame({
+            'year': [2020, 2021, 2022] * 3,
+            'area': ['Wakad'] * 3 + ['Baner'] * 3 + ['Hadapsar'] * 3,
+            'price': [100, 110, 121, 100, 150, 121, 100, 95, 90],
+            'demand': [5.0, 6.0, 7.0, 5.0, 5.0, 5.5, 6.0, 5.0, 4.0]
+        })
+    
+    def test_compute_investment_features(self):
+        """Test growth, momentum and volatility per area"""
+        features = compute_investment_features(self.processor._get_yearly_frame()).set_index('area')
+        
+        assert features.loc['Wakad', 'growth'] == pytest.approx(10.0)
+        assert features.loc['Wakad', 'momentum'] == pytest.approx(10.0)
+        assert features.loc['Wakad', 'volatility'] == pytest.approx(0.0)
+        assert features.loc['Baner', 'volatility'] > features.loc['Wakad', 'volatility']
+        assert features.loc['Hadapsar', 'demand_trend'] < 0
+    
+    def test_score_ranks_full_catalogue(self):
+        """Test that the steady grower beats the decliner"""
+        scores = self.processor.score_areas().set_index('area')['investment_score']
+        
+        assert scores.max() == 100.0
+        assert scores.idxmax() == 'Wakad'
+        assert scores.idxmin() == 'Hadapsar'
+    
+    def test_runtime_weights(self):
+        """Test that weights can be changed and validated at runtime"""
+        scorer = InvestmentScorer()
+        features = self.processor._get_investment_features()
+        
+        scorer.set_weights({'growth': 0, 'momentum': 1, 'volatility': 0, 'demand_trend': 0, 'price_percentile': 0})
+        scores = scorer.score(features).set_index('area')['investment_score']
+        assert scores.idxmin() == 'Baner'  # Baner fell back in its last year
+        
+        with pytest.raises(ValueError):
+            scorer.set_weights({'unknown': 1})
+    
+    def test_non_finite_weights_are_refused(self):
+        """Test that NaN and infinite weights are a 400 and leave the weights as they were"""
+        from django.test import Client
+        from api.views import data_processor
+        
+        scorer = InvestmentScorer()
+        before = scorer.weights
+        for value in [float('nan'), float('inf'), '-Infinity']:
+            with pytest.raises(ValueError):
+                scorer.set_weights({'growth': 1, 'momentum': value})
+        assert scorer.weights == before
+        
+        client = Client()
+        before = data_processor.investment_scorer.weights
+        response = client.post('/api/investment/weights/', '{"weights": {"growth": NaN}}',
+                               content_type='application/json')
+        assert response.status_code == 400
+        assert 'growth' in response.json()['error']
+        assert client.get('/api/investment/weights/').json()['weights'] == before
+    
+    def test_concurrent_partial_updates_all_land(self):
+        """Test that partial updates from several threads at once each keep the others' weights"""
+        import threading
+        
+        scorer = InvestmentScorer()
+        features = ['growth', 'momentum', 'volatility', 'demand_trend', 'price_percentile']
+        barrier = threading.Barrier(len(features))
+        
+        def update(name):
+            barrier.wait()
+            for step in range(200):
+                scorer.set_weights({name: step})
+        
+        threads = [threading.Thread(target=update, args=(name,)) for name in features]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert scorer.weights == {name: 199.0 for name in features}
+    
+    def test_investment_query_scores_catalogue(self):
+        """Test that an investment question without areas ranks every area"""
+        result = self.processor.query_data('Where should I invest?')
+        
+        assert 'error' not in result
+        assert result['ranking']['metric'] == 'investment_score'
+        assert result['ranking']['items'][0]['area'] == 'Wakad'
+        assert 'investment score' in result['summary']
+
+if __name__ == '__main__':
+    pytest.main([__file__])
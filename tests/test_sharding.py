@@ -0,0 +1,320 @@
+import pytest
+import numpy as np
+import pandas as pd
+import json
+import os
+import sys
+import threading
+import django
+from django.test import Client, override_settings
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api import sharding, views
+from api.data_processor import DataProcessor
+from api.metric_registry import group_metrics, merge_partials, partial_sums, registry
+from api.sharding import ShardError, ShardRouter, owner_of
+
+AREAS = ['Wakad', 'Aundh', 'Baner', 'Hinjewadi', 'Kothrud', 'Viman Nagar', 'Kharadi', 'Pimple Saudagar']
+SHARDS = ['http://shard-a', 'http://shard-b', 'http://shard-c']
+TOKEN = 'shard-secret'
+
+def make_frame(seed=21):
+    rng = np.random.default_rng(seed)
+    rows = [(year, month, area) for area in AREAS for year in range(2020, 2025) for month in (2, 5, 8, 11)]
+    return pd.DataFrame({
+        'year': [float(year) for year, _, _ in rows],
+        'area': [area for _, _, area in rows],
+        'price': rng.uniform(50, 150, len(rows)).round(2),
+        'demand': rng.uniform(1, 10, len(rows)).round(2),
+        'total_sold': rng.integers(10, 500, len(rows)).astype(float),
+        'date': pd.to_datetime({'year': [year for year, _, _ in rows], 'month': [month for _, month, _ in rows],
+                                'day': 1}),
+    })
+
+class ClientTransport:
+    """Sends shard calls through the real shard views, each to its own in-process DataProcessor"""
+
+    def __init__(self, processors):
+        self.processors = processors
+        self.client = Client()
+        self.lock = threading.Lock()
+        self.calls = []
+
+    def call(self, shard, method, path, payload=None):
+        with self.lock:
+            self.calls.append((shard, path))
+            original = views.data_processor
+            views.data_processor = self.processors[shard]
+            try:
+                if method == 'GET':
+                    response = self.client.get(f'/api/shard/{path}/', HTTP_X_SHARD_TOKEN=TOKEN)
+                else:
+                    response = self.client.post(f'/api/shard/{path}/', json.dumps(payload),
+                                                content_type='application/json', HTTP_X_SHARD_TOKEN=TOKEN)
+            finally:
+                views.data_processor = original
+        if response.status_code >= 400:
+            raise ShardError(f"Shard {shard} answered {response.status_code}")
+        return response.json()
+
+def make_processor():
+    processor = DataProcessor()
+    processor.df = pd.DataFrame()
+    return processor
+
+class TestPartitioning:
+
+    def test_adding_a_shard_only_moves_areas_to_it(self):
+        """Test that rendezvous hashing keeps every area that does not move to the new shard"""
+        areas = [f'Area {index}' for index in range(200)]
+        before = {area: owner_of(area, SHARDS) for area in areas}
+        after = {area: owner_of(area, SHARDS + ['http://shard-d']) for area in areas}
+        moved = [area for area in areas if before[area] != after[area]]
+        assert all(after[area] == 'http://shard-d' for area in moved)
+        assert 20 < len(moved) < 80
+        assert owner_of(' wakad ', SHARDS) == owner_of('Wakad', SHARDS)
+
+    def test_partial_sums_merge_to_the_grouped_values(self):
+        """Test that sums and counts added up over any split give the one-pass metric values"""
+        frame = make_frame().assign(office_sold=lambda df: df['total_sold'] % 7,
+                                    office_rate=lambda df: df['price'] * 100)
+        frame.loc[::5, 'office_rate'] = np.nan
+        metrics = registry.resolve(['price', 'demand', 'total_sold', 'office_rate'])
+        parts = [partial_sums(frame.iloc[start::3], metrics, ['area', 'year']) for start in range(3)]
+        merged = merge_partials(pd.concat(parts), metrics, ['area', 'year'])
+
+        expected = group_metrics(frame, metrics, ['area', 'year'])
+        for metric in metrics:
+            np.testing.assert_allclose(merged[metric.name], expected[metric.name])
+        assert merged['records'].sum() == len(frame)
+
+class TestShardRouter:
+
+    def setup_method(self):
+        self.token = override_settings(SHARD_TOKEN=TOKEN)
+        self.token.enable()
+        self.single = make_processor()
+        self.single.df = make_frame()
+        self.processors = {shard: make_processor() for shard in SHARDS + ['http://shard-d']}
+        self.transport = ClientTransport(self.processors)
+        self.router = ShardRouter(SHARDS, transport=self.transport)
+        self.router.load(make_frame())
+
+    def teardown_method(self):
+        self.token.disable()
+
+    def test_load_splits_areas_by_owner(self):
+        """Test that each shard ends up holding exactly the areas it owns"""
+        for shard in SHARDS:
+            held = set(self.processors[shard].get_areas())
+            assert held == {area for area in AREAS if owner_of(area, SHARDS) == shard}
+        assert sorted(self.router.planner.get_areas()) == sorted(AREAS)
+
+    def test_answers_match_one_instance(self):
+        """Test that merged partials give the chart, summary and row count of an unsharded instance"""
+        for query in ['Compare Wakad and Kothrud', 'Hinjewadi units sold trend', 'Baner price last 2 years',
+                      'median price in Kharadi and Aundh']:
+            expected = self.single.query_data(query)
+            result = self.router.query_data(query)
+            assert result['chart']['labels'] == expected['chart']['labels']
+            for actual, wanted in zip(result['chart']['datasets'], expected['chart']['datasets']):
+                assert actual['label'] == wanted['label']
+                assert actual['data'] == pytest.approx(wanted['data'])
+            assert result['summary'] == expected['summary']
+            assert result['total_rows'] == expected['total_rows']
+            assert len(result['table']) == len(expected['table'])
+            assert result.get('distribution') == expected.get('distribution')
+            assert ('forecast' in result) == ('forecast' in expected)
+
+    def test_only_owning_shards_are_asked(self):
+        """Test that a sub-query goes only to the shards owning the question's areas"""
+        self.transport.calls.clear()
+        result = self.router.query_data('Tell me about Wakad')
+        asked = [shard for shard, path in self.transport.calls if path == 'partials']
+        assert asked == [owner_of('Wakad', SHARDS)] == result['shards']
+
+    def test_period_questions_merge_rollups(self):
+        """Test that quarter questions are answered from the shards' rollups"""
+        query = 'Compare Aundh and Kharadi Q2 2023 vs Q2 2024'
+        expected = self.single.query_data(query)
+        result = self.router.query_data(query)
+        assert result['resolution'] == 'quarter'
+        assert result['chart']['labels'] == expected['chart']['labels'] == ['2023Q2', '2024Q2']
+        for actual, wanted in zip(result['chart']['datasets'], expected['chart']['datasets']):
+            assert actual['data'] == pytest.approx(wanted['data'])
+        assert result['total_rows'] == expected['total_rows']
+
+        last = self.router.query_data('Aundh price last 3 months')
+        assert last['chart']['labels'] == self.single.query_data('Aundh price last 3 months')['chart']['labels']
+
+    def test_period_question_on_an_area_without_dates(self):
+        """Test that a month question about an area with no dated rows on a dated shard falls back to years"""
+        frame = make_frame()
+        frame.loc[frame['area'] == 'Wakad', 'date'] = pd.NaT
+        self.router.load(frame)
+        assert self.router.catalogue(refresh=True)['areas']['Wakad']['last_month'] is None
+
+        result = self.router.query_data('Wakad price last 3 months')
+        assert 'error' not in result
+        assert result['resolution'] == 'year'
+        assert 'yearly figures' in result['note']
+        assert result['total_rows'] == len(frame[frame['area'] == 'Wakad'])
+
+    def test_reshard_moves_only_changed_areas(self, tmp_path):
+        """Test that adding a shard reloads only the shards whose areas change and keeps the answers"""
+        self.router.state_path = str(tmp_path / 'shards.json')
+        query = 'Compare Wakad, Aundh, Baner and Kothrud'
+        before = self.router.query_data(query)
+        self.transport.calls.clear()
+
+        new_shards = SHARDS + ['http://shard-d']
+        result = self.router.reshard(new_shards)
+        moved = [area for area in AREAS if owner_of(area, SHARDS) != owner_of(area, new_shards)]
+        assert result['moved_areas'] == sorted(moved)
+        assert set(self.processors['http://shard-d'].get_areas()) == set(moved)
+
+        reloaded = {shard for shard, path in self.transport.calls if path == 'rows'}
+        assert 'http://shard-d' in reloaded
+        untouched = set(SHARDS) - {owner_of(area, SHARDS) for area in moved}
+        assert not reloaded & untouched
+
+        after = self.router.query_data(query)
+        assert after['summary'] == before['summary']
+        assert after['total_rows'] == before['total_rows']
+
+    def test_reshard_reaches_other_workers_and_restarts(self, tmp_path):
+        """Test that a stored reshard is taken by another worker and by a router restarted with the old SHARD_URLS"""
+        state_path = str(tmp_path / 'state' / 'shards.json')
+        self.router.state_path = state_path
+        other = ShardRouter(SHARDS, transport=self.transport, state_path=state_path)
+        query = 'Compare Wakad, Aundh, Baner and Kothrud'
+        expected = other.query_data(query)
+
+        new_shards = SHARDS + ['http://shard-d']
+        self.router.reshard(new_shards)
+        assert other.shards == SHARDS
+        assert sorted(other.planner.get_areas()) == sorted(AREAS)
+        assert other.shards == new_shards
+        assert other.query_data(query)['summary'] == expected['summary']
+
+        restarted = ShardRouter(SHARDS, transport=self.transport, state_path=state_path)
+        assert restarted.shards == new_shards
+        assert sorted(restarted.planner.get_areas()) == sorted(AREAS)
+
+    def test_reshard_without_a_state_path_is_refused(self):
+        """Test that a router that cannot store the shard list moves nothing"""
+        held = {shard: len(processor.df) for shard, processor in self.processors.items()}
+        with pytest.raises(ValueError, match='SHARD_STATE_PATH'):
+            self.router.reshard(SHARDS + ['http://shard-d'])
+        assert self.router.shards == SHARDS
+        assert {shard: len(processor.df) for shard, processor in self.processors.items()} == held
+
+    def test_unknown_areas_and_catalogue_rankings(self):
+        """Test the answers for questions the router cannot send to a shard"""
+        assert 'suggestions' in self.router.query_data('Tell me about Atlantis')
+        assert 'Name the areas' in self.router.query_data('Top 5 areas by price growth')['error']
+
+    def test_router_endpoints(self, settings, monkeypatch):
+        """Test /api/query/ and /api/shards/ on a router"""
+        settings.SHARD_URLS = SHARDS
+        monkeypatch.setattr(sharding, 'shard_router', self.router)
+        client = Client()
+
+        response = client.get('/api/query/?query=Compare Wakad and Kothrud')
+        assert response.status_code == 200
+        assert sorted(response.json()['shards']) == sorted({owner_of('Wakad', SHARDS), owner_of('Kothrud', SHARDS)})
+        assert 'ETag' not in response
+
+        status = client.get('/api/shards/').json()
+        assert sum(shard['areas'] for shard in status['shards']) == len(AREAS)
+        assert client.post('/api/shards/', json.dumps({'shards': []}), content_type='application/json',
+                           HTTP_X_SHARD_TOKEN=TOKEN).status_code == 400
+
+        assert client.get('/api/query/?query=Compare Wakad and Kothrud&offset=5').status_code == 400
+
+    def test_router_areas_stream_and_health_reflect_the_shards(self, settings, monkeypatch):
+        """Test that /api/areas/, /api/query/stream/ and /api/health/ on a router answer from the shards"""
+        settings.SHARD_URLS = SHARDS
+        monkeypatch.setattr(sharding, 'shard_router', self.router)
+        monkeypatch.setattr(views.data_processor, 'df', pd.DataFrame({'year': [2020.0], 'area': ['Atlantis'],
+                                                                       'price': [1.0], 'demand': [1.0]}))
+        client = Client()
+
+        areas = client.get('/api/areas/')
+        assert areas.json()['areas'] == sorted(AREAS)
+        assert 'ETag' not in areas
+
+        stream = client.get('/api/query/stream/?query=Compare Wakad and Kothrud')
+        events = [block.split('\n', 1) for block in b''.join(stream.streaming_content).decode().split('\n\n')
+                  if block]
+        names = [name.removeprefix('event: ') for name, _ in events]
+        assert names == ['result', 'summary', 'done']
+        result = json.loads(events[0][1].removeprefix('data: '))
+        expected = self.single.query_data('Compare Wakad and Kothrud')
+        assert result['chart']['labels'] == expected['chart']['labels']
+        assert json.loads(events[2][1].removeprefix('data: '))['summary'] == expected['summary']
+
+        unknown = client.get('/api/query/stream/?query=Tell me about Atlantis')
+        assert b'event: failure' in b''.join(unknown.streaming_content)
+
+        health = client.get('/api/health/').json()
+        assert health['role'] == 'router' and health['areas'] == len(AREAS)
+
+        # Endpoints answered from an instance's own rows are refused rather than served from the router
+        for path in ['/api/download/', '/api/rankings/', '/api/distribution/?areas=Wakad',
+                     '/api/results/anything/export/']:
+            assert client.get(path).status_code == 501
+        assert client.post('/api/query/structured/', json.dumps({'areas': ['Wakad']}),
+                           content_type='application/json').status_code == 501
+
+    def test_router_does_not_load_the_sample_workbook(self, settings, tmp_path):
+        """Test that a processor started on a router begins empty instead of reading the sample data"""
+        settings.SAMPLE_DATA_FILE = tmp_path / 'sample.xlsx'
+        make_frame().drop(columns='date').to_excel(settings.SAMPLE_DATA_FILE, index=False)
+        assert DataProcessor().snapshot.has_data
+
+        settings.SHARD_URLS = SHARDS
+        assert not DataProcessor().snapshot.has_data
+
+    def test_shard_calls_and_reshards_need_the_token(self, settings, monkeypatch):
+        """Test that shard endpoints and reshards refuse callers without SHARD_TOKEN, and nothing moves"""
+        settings.SHARD_URLS = SHARDS
+        monkeypatch.setattr(sharding, 'shard_router', self.router)
+        client = Client(HTTP_X_SHARD_TOKEN='guess')
+        held = {shard: len(processor.df) for shard, processor in self.processors.items()}
+
+        response = client.post('/api/shards/', json.dumps({'shards': ['http://attacker']}),
+                               content_type='application/json')
+        assert response.status_code == 403
+        assert self.router.shards == SHARDS
+        assert client.get('/api/shard/rows/').status_code == 403
+        assert client.post('/api/shard/rows/', json.dumps({'mode': 'replace', 'rows': {}}),
+                           content_type='application/json').status_code == 403
+        assert client.post('/api/shard/partials/', json.dumps({'areas': ['Wakad']}),
+                           content_type='application/json').status_code == 403
+        assert client.get('/api/shard/catalogue/').status_code == 403
+        assert {shard: len(processor.df) for shard, processor in self.processors.items()} == held
+
+        # No token configured: the endpoints stay closed whatever the caller sends
+        settings.SHARD_TOKEN = None
+        assert Client(HTTP_X_SHARD_TOKEN='').get('/api/shard/rows/').status_code == 403
+
+    def test_shard_endpoints_validate(self, settings):
+        """Test that malformed sub-queries and loads are refused"""
+        settings.SHARD_TOKEN = TOKEN
+        client = Client(HTTP_X_SHARD_TOKEN=TOKEN)
+        assert client.post('/api/shard/partials/', json.dumps({'areas': 'Wakad'}),
+                           content_type='application/json').status_code == 400
+        assert client.post('/api/shard/partials/', json.dumps({'areas': ['Wakad'], 'resolution': 'week'}),
+                           content_type='application/json').status_code == 400
+        assert client.post('/api/shard/rows/', json.dumps({'mode': 'merge', 'rows': {}}),
+                           content_type='application/json').status_code == 400
+        assert client.get('/api/shards/').status_code == 404
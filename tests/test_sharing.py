@@ -0,0 +1,79 @@
+import pytest
+import pandas as pd
+import os
+import sys
+import django
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.data_processor import DataProcessor
+from api.memory import read_smaps_rollup
+
+QUERIES = [
+    'Analyze Wakad',
+    'Compare Wakad and Aundh demand trends',
+    'Top 10 areas by price growth since 2019',
+    'Which areas are best to invest in?',
+    'Forecast prices for Baner',
+]
+
+class TestSharedLayout:
+    
+    def setup_method(self):
+        """Setup a processor with object-dtype areas and an extra text column"""
+        self.processor = DataProcessor()
+        self.processor.df = pd.DataFrame({
+            'year': [2019, 2020, 2021, 2022] * 3 + [2022],
+            'area': ['Wakad'] * 4 + ['Aundh'] * 4 + ['Baner'] * 4 + ['Kharadi'],
+            'price': [100, 110, 125, 140, 90, 95, 97, 100, 80, 88, 99, 115, 300],
+            'demand': [5.0, 5.5, 6.0, 6.5, 4.0, 4.1, 4.3, 4.2, 6.0, 6.2, 6.9, 7.4, 8.0],
+            'city': ['Pune'] * 13
+        })
+    
+    def _snapshot(self):
+        results = [self.processor.query_data(query) for query in QUERIES]
+        for result in results:
+            result.pop('summary', None)
+            # Handles name the dataset version, which compaction bumps
+            result.pop('result_handle', None)
+        return {
+            'queries': results,
+            'areas': self.processor.get_areas(),
+            'ranking': self.processor.rank_areas('price_growth', limit=10),
+            'structured': self.processor.structured_query({'areas': ['Wakad', 'Aundh'], 'metric': 'price',
+                                                           'aggregations': ['mean', 'count']}),
+            'download': self.processor.get_filtered_data('wak').to_dict('records'),
+        }
+    
+    def test_compact_layout_has_no_object_columns(self):
+        """Test that text columns become categoricals and numbers stay numeric"""
+        self.processor.compact_for_sharing()
+        df = self.processor.df
+        
+        assert isinstance(df['area'].dtype, pd.CategoricalDtype)
+        assert isinstance(df['city'].dtype, pd.CategoricalDtype)
+        assert not (df.dtypes == object).any()
+        assert df['price'].to_numpy().flags['C_CONTIGUOUS']
+    
+    def test_compact_layout_gives_identical_results(self):
+        """Test that queries, rankings and downloads do not change after compaction"""
+        before = self._snapshot()
+        version = self.processor.dataset_version
+        
+        self.processor.compact_for_sharing()
+        assert self.processor.dataset_version == version + 1
+        assert self._snapshot() == before
+    
+    @pytest.mark.skipif(not os.path.exists('/proc/self/smaps_rollup'), reason='needs Linux /proc')
+    def test_smaps_report(self):
+        """Test that the memory report splits RSS into shared and private"""
+        report = read_smaps_rollup(os.getpid())
+        assert report['rss'] > 0
+        assert report['shared'] + report['private'] == pytest.approx(report['rss'], abs=1)
@@ -0,0 +1,141 @@
+import pytest
+import numpy as np
+import pandas as pd
+import os
+import sys
+import django
+from django.test import Client
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.data_processor import DataProcessor
+from api.sketches import QuantileSketches
+from api.views import data_processor
+
+def make_frame(rows_per_group=3, seed=5, years=range(2019, 2024)):
+    rng = np.random.default_rng(seed)
+    areas = ['Wakad', 'Aundh', 'Baner']
+    rows = [(year, area) for area in areas for year in years for _ in range(rows_per_group)]
+    return pd.DataFrame({
+        'year': [float(year) for year, _ in rows],
+        'area': [area for _, area in rows],
+        'price': rng.lognormal(9, 0.4, len(rows)).round(2),
+        'demand': rng.uniform(1, 10, len(rows)).round(2),
+    })
+
+def exact(frame, keys, fraction):
+    return frame.groupby(keys)['price'].quantile(fraction)
+
+class TestQuantileSketches:
+
+    def test_small_groups_are_exact(self):
+        """Test that groups within the compression limit reproduce pandas' quantiles"""
+        frame = make_frame(rows_per_group=7)
+        table = QuantileSketches.build(frame, 'price').summarize(group_by='area_year')
+
+        for column, fraction in [('p10', 0.1), ('median', 0.5), ('p90', 0.9)]:
+            np.testing.assert_allclose(table[column], exact(frame, ['area', 'year'], fraction).to_numpy())
+        assert table['count'].tolist() == [7] * 15
+        np.testing.assert_allclose(table['mean'], frame.groupby(['area', 'year'])['price'].mean().to_numpy())
+
+    def test_large_groups_stay_close(self):
+        """Test that compressed sketches keep quantiles within a small relative error"""
+        frame = make_frame(rows_per_group=4000)
+        sketches = QuantileSketches.build(frame, 'price', compression=100)
+        # Compressed to about compression / 2 centroids per group
+        assert sketches.size < 15 * 100
+
+        table = sketches.summarize(['Wakad', 'Baner'], 2020, 2022, group_by='year').set_index('year')
+        window = frame[frame['area'].isin(['Wakad', 'Baner']) & frame['year'].between(2020, 2022)]
+        for column, fraction in [('p10', 0.1), ('median', 0.5), ('p90', 0.9)]:
+            np.testing.assert_allclose(table[column], exact(window, ['year'], fraction), rtol=0.02)
+        assert table['count'].tolist() == [8000] * 3
+        assert table['min'].tolist() == window.groupby('year')['price'].min().tolist()
+
+    def test_append_matches_a_full_build(self):
+        """Test that merging a sketch of new rows gives what building over all rows gives"""
+        first, second = make_frame(rows_per_group=500, seed=1), make_frame(rows_per_group=500, seed=2)
+        appended = QuantileSketches.build(first, 'price').append(second)
+        rebuilt = QuantileSketches.build(pd.concat([first, second]), 'price')
+
+        merged = appended.summarize(group_by='area')
+        expected = rebuilt.summarize(group_by='area')
+        assert merged['count'].tolist() == expected['count'].tolist()
+        np.testing.assert_allclose(merged['median'], expected['median'], rtol=0.01)
+        np.testing.assert_allclose(merged['p90'], expected['p90'], rtol=0.02)
+
+    def test_unknown_selection_is_empty(self):
+        """Test that selecting no groups returns an empty table"""
+        table = QuantileSketches.build(make_frame(), 'price').summarize(['Nowhere'])
+        assert table.empty
+        assert 'median' in table.columns
+
+class TestDistributionQueries:
+
+    def setup_method(self):
+        self.processor = DataProcessor()
+        self.processor.df = make_frame(rows_per_group=5)
+
+    def test_distribution_and_box_plot(self):
+        """Test that distribution answers come back per group with box-plot chart data"""
+        result = self.processor.distribution(['Wakad', 'Aundh'], 2020, 2022)
+        assert len(result['groups']) == 6
+        assert result['chart']['labels'] == ['2020', '2021', '2022']
+        assert [dataset['label'] for dataset in result['chart']['datasets']] == ['Aundh', 'Wakad']
+        box = result['chart']['datasets'][1]['data'][0]
+        wakad = self.processor.df[(self.processor.df['area'] == 'Wakad') & (self.processor.df['year'] == 2020)]
+        assert box['median'] == pytest.approx(wakad['price'].median(), abs=0.01)
+        assert box['min'] <= box['whiskerMin'] <= box['q1'] <= box['median'] <= box['q3'] <= box['whiskerMax'] <= box['max']
+
+        with pytest.raises(ValueError):
+            self.processor.distribution(group_by='decade')
+        with pytest.raises(ValueError):
+            self.processor.distribution(metric='carpet_area')
+
+    def test_median_question_adds_distribution(self):
+        """Test that asking for a median adds the distribution and mentions it in the summary"""
+        assert not self.processor.parse_query('Tell me about Wakad')['distribution']
+        result = self.processor.query_data('median price in Wakad')
+        assert result['distribution']['metric'] == 'price'
+        assert {group['area'] for group in result['distribution']['groups']} == {'Wakad'}
+        assert 'Median price is' in result['summary']
+
+    def test_append_updates_sketches_incrementally(self, tmp_path, monkeypatch):
+        """Test that an appended upload only sketches its own rows"""
+        first_path, second_path = tmp_path / 'first.xlsx', tmp_path / 'second.xlsx'
+        make_frame(years=range(2019, 2022)).to_excel(first_path, index=False)
+        make_frame(seed=9, years=range(2022, 2024)).to_excel(second_path, index=False)
+        assert self.processor.load_excel_file(str(first_path))
+
+        built = []
+        original = QuantileSketches.build.__func__
+        monkeypatch.setattr(QuantileSketches, 'build',
+                            classmethod(lambda cls, frame, *args, **kwargs: built.append(len(frame)) or
+                                        original(cls, frame, *args, **kwargs)))
+        assert self.processor.load_excel_file(str(second_path), append=True)
+
+        assert self.processor.snapshot.row_count == 45
+        assert built == [18]
+        result = self.processor.distribution(['Baner'], group_by='area')
+        assert result['groups'][0]['count'] == 15
+        assert self.processor.get_filtered_data('Baner')['year'].nunique() == 5
+
+    def test_distribution_endpoint(self):
+        """Test the /api/distribution endpoint and its parameter validation"""
+        data_processor.df = make_frame()
+        client = Client()
+        response = client.get('/api/distribution/?areas=wakad,baner&since=2020&group_by=area')
+        assert response.status_code == 200
+        body = response.json()
+        assert [group['area'] for group in body['groups']] == ['Baner', 'Wakad']
+        assert body['groups'][0]['count'] == 12
+
+        assert client.get('/api/distribution/?group_by=decade').status_code == 400
+        assert client.get('/api/distribution/?since=abc').status_code == 400
@@ -0,0 +1,127 @@
+import pytest
+import pandas as pd
+import os
+import sys
+import threading
+import django
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.data_processor import DataProcessor
+
+def make_frame(areas, price):
+    return pd.DataFrame({
+        'year': [2020, 2021, 2022] * len(areas),
+        'area': [area for area in areas for _ in range(3)],
+        'price': [price, price * 1.1, price * 1.2] * len(areas),
+        'demand': [5.0, 5.5, 6.0] * len(areas)
+    })
+
+class TestDatasetSnapshots:
+    
+    def setup_method(self):
+        """Setup a processor with a first published dataset"""
+        self.processor = DataProcessor()
+        self.processor.df = make_frame(['Wakad', 'Aundh'], 100)
+    
+    def test_publish_creates_new_snapshot(self):
+        """Test that assigning a dataset publishes a new version with a fresh cache"""
+        first = self.processor.snapshot
+        self.processor.get_areas()
+        assert 'areas' in first.derived
+        
+        self.processor.df = make_frame(['Baner'], 200)
+        second = self.processor.snapshot
+        
+        assert second is not first
+        assert second.version == first.version + 1
+        assert second.derived == {}
+        assert first.df['area'].unique().tolist() == ['Wakad', 'Aundh']
+        assert self.processor.get_areas() == ['Baner']
+    
+    def test_pinned_reads_ignore_concurrent_publish(self):
+        """Test that a pinned request keeps its snapshot while another thread publishes"""
+        with self.processor.pin() as pinned:
+            thread = threading.Thread(target=setattr, args=(self.processor, 'df', make_frame(['Baner'], 200)))
+            thread.start()
+            thread.join()
+            
+            assert self.processor.snapshot is pinned
+            assert self.processor.get_areas() == ['Aundh', 'Wakad']
+            result = self.processor.query_data('Analyze Wakad')
+            assert 'error' not in result
+        
+        assert self.processor.get_areas() == ['Baner']
+    
+    def test_pin_is_thread_local(self):
+        """Test that a pin on one thread does not affect readers on another"""
+        seen = []
+        with self.processor.pin():
+            self.processor.df = make_frame(['Baner'], 200)
+            thread = threading.Thread(target=lambda: seen.append(self.processor.get_areas()))
+            thread.start()
+            thread.join()
+        
+        assert seen == [['Baner']]
+    
+    def test_readers_do_not_wait_for_publishers(self):
+        """Test that reads go through while a publish holds the writer lock"""
+        with self.processor._publish_lock:
+            areas = []
+            thread = threading.Thread(target=lambda: areas.append(self.processor.get_areas()))
+            thread.start()
+            thread.join(timeout=5)
+            assert areas == [['Aundh', 'Wakad']]
+    
+    def test_area_attributes_keep_dataset_caches(self):
+        """Test that new coordinates only drop the geo index"""
+        self.processor.get_areas()
+        self.processor.find_neighbours('Wakad', mode='nearby')
+        before = self.processor.snapshot
+        assert 'geo_index' in before.derived
+        
+        self.processor.area_attributes = pd.DataFrame({'area': ['Wakad', 'Aundh'], 'lat': [18.59, 18.56],
+                                                       'lon': [73.76, 73.81]})
+        after = self.processor.snapshot
+        
+        assert after.version == before.version + 1
+        assert after.df is before.df
+        assert 'areas' in after.derived
+        assert 'geo_index' not in after.derived
+        assert self.processor.find_neighbours('Wakad', mode='nearby')['neighbours'][0]['area'] == 'Aundh'
+    
+    def test_concurrent_queries_during_uploads(self):
+        """Test that queries stay consistent while datasets are swapped underneath them"""
+        errors = []
+        stop = threading.Event()
+        
+        def publisher():
+            i = 0
+            while not stop.is_set():
+                self.processor.df = make_frame(['Wakad', 'Aundh'], 100 + i % 7)
+                i += 1
+        
+        def reader():
+            for _ in range(20):
+                result = self.processor.query_data('Compare Wakad and Aundh')
+                if 'error' in result or not result['table']:
+                    errors.append(result.get('error'))
+        
+        writer = threading.Thread(target=publisher)
+        readers = [threading.Thread(target=reader) for _ in range(4)]
+        writer.start()
+        for thread in readers:
+            thread.start()
+        for thread in readers:
+            thread.join()
+        stop.set()
+        writer.join()
+        
+        assert errors == []
@@ -0,0 +1,113 @@
+import pytest
+import numpy as np
+import pandas as pd
+import tempfile
+import os
+import sys
+import django
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.data_processor import DataProcessor
+from api.spatial import KDTree
+
+class TestSpatial:
+    
+    def setup_method(self):
+        """Setup four areas, three of them clustered in the west"""
+        self.processor = DataProcessor()
+        self.processor.df = pd.DataFrame({
+            'year': [2020, 2022] * 4,
+            'area': ['Baner', 'Baner', 'Aundh', 'Aundh', 'Wakad', 'Wakad', 'Kharadi', 'Kharadi'],
+            'price': [100, 120, 98, 118, 80, 84, 60, 90],
+            'demand': [6.0, 7.0, 6.0, 7.1, 5.0, 5.0, 4.0, 8.0]
+        })
+        self.attributes = pd.DataFrame({
+            'Locality': ['Baner', 'Aundh', 'Wakad', 'Kharadi'],
+            'Latitude': [18.559, 18.558, 18.599, 18.551],
+            'Longitude': [73.786, 73.807, 73.760, 73.935]
+        })
+    
+    def test_kdtree_matches_brute_force(self):
+        """Test the fallback tree against an exhaustive search"""
+        rng = np.random.default_rng(0)
+        points = rng.random((200, 3))
+        tree = KDTree(points)
+        
+        for query in rng.random((10, 3)):
+            distances, indices = tree.query(query, k=4)
+            expected = np.argsort(np.linalg.norm(points - query, axis=1))[:4]
+            assert list(indices) == list(expected)
+    
+    def test_nearby_uses_coordinates(self):
+        """Test geo lookups once coordinates are uploaded"""
+        with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as tmp:
+            self.attributes.to_excel(tmp.name, index=False)
+            tmp_path = tmp.name
+        
+        try:
+            assert self.processor.load_area_attributes(tmp_path) is True
+        finally:
+            os.unlink(tmp_path)
+        
+        result = self.processor.find_neighbours('Baner', 'nearby', k=2)
+        assert result['mode'] == 'nearby'
+        assert [n['area'] for n in result['neighbours']] == ['Aundh', 'Wakad']
+        assert 2.0 < result['neighbours'][0]['distance_km'] < 2.5
+    
+    def test_nearby_falls_back_to_similar(self):
+        """Test that 'near' without coordinates uses the market-profile index"""
+        result = self.processor.find_neighbours('Baner', 'nearby', k=1)
+        
+        assert result['mode'] == 'similar'
+        assert 'note' in result
+        assert result['neighbours'][0]['area'] == 'Aundh'
+    
+    def test_similar_query_feeds_comparison(self):
+        """Test that 'similar to' queries compare the anchor with its neighbours"""
+        result = self.processor.query_data('Show 2 areas similar to Baner')
+        
+        assert result['neighbours']['area'] == 'Baner'
+        assert len(result['neighbours']['neighbours']) == 2
+        labels = [dataset['label'] for dataset in result['chart']['datasets']]
+        assert 'Baner - Price' in labels and 'Aundh - Price' in labels
+    
+    def test_around_a_year_is_not_a_neighbour_lookup(self):
+        """Test that "around 2020" keeps a named comparison while "around Baner" asks for neighbours"""
+        parsed = self.processor.parse_query('Compare Wakad and Baner prices around 2020')
+        assert parsed['neighbour_mode'] is None
+        assert sorted(parsed['areas']) == ['Baner', 'Wakad']
+        assert 'neighbours' not in self.processor.query_data('Compare Wakad and Baner prices around 2020')
+        assert self.processor.parse_query('areas around Baner')['neighbour_mode'] == 'nearby'
+    
+    def test_trigger_after_the_areas_keeps_the_comparison(self):
+        """Test that "are they comparable?" after the names compares them instead of expanding the first"""
+        query = 'Compare Wakad and Kharadi, are they comparable?'
+        assert self.processor.parse_query(query)['neighbour_mode'] is None
+        result = self.processor.query_data(query)
+        assert 'neighbours' not in result
+        labels = [dataset['label'] for dataset in result['chart']['datasets']]
+        assert 'Wakad - Price' in labels and 'Kharadi - Price' in labels
+    
+    def test_anchor_is_the_area_after_the_trigger(self):
+        """Test that "X and areas near Y" expands Y and keeps X in the comparison"""
+        query = 'Compare Kharadi and 2 areas near Baner'
+        parsed = self.processor.parse_query(query)
+        assert parsed['neighbour_mode'] == 'nearby'
+        assert parsed['neighbour_anchor'] == 'Baner'
+        
+        result = self.processor.query_data(query)
+        assert result['neighbours']['area'] == 'Baner'
+        areas = {dataset['label'].split(' - ')[0] for dataset in result['chart']['datasets']}
+        assert {'Kharadi', 'Baner'} | {n['area'] for n in result['neighbours']['neighbours']} == areas
+        assert len(areas) >= 3
+
+if __name__ == '__main__':
+    pytest.main([__file__])
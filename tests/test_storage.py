@@ -0,0 +1,134 @@
+import pytest
+import io
+import json
+import re
+import numpy as np
+import pandas as pd
+import os
+import sys
+import django
+from django.test import Client
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+pytest.importorskip('duckdb')
+
+from api.data_processor import DataProcessor
+from api.storage import ParquetStore, area_bucket
+from api.views import data_processor
+
+QUERIES = [
+    'Tell me about Wakad',
+    'Compare Wakad and Aundh',
+    'Wakad vs Baner price over last 2 years',
+    'Best areas for investment',
+    'How did 2021 perform in Aundh',
+]
+
+def make_frame():
+    rng = np.random.default_rng(7)
+    areas = ['Wakad', 'Aundh', 'Baner', 'Kothrud', 'Hinjewadi']
+    rows = [(year, area) for area in areas for year in range(2018, 2024) for _ in range(3)]
+    return pd.DataFrame({
+        'year': [float(year) for year, _ in rows],
+        'area': [area for _, area in rows],
+        'price': rng.uniform(50, 150, len(rows)).round(2),
+        'demand': rng.uniform(1, 10, len(rows)).round(2),
+        'city': 'Pune'
+    })
+
+def rounded(value):
+    """Round floats so means summed in a different order compare equal"""
+    if isinstance(value, dict):
+        return {key: rounded(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [rounded(item) for item in value]
+    if isinstance(value, float):
+        return round(value, 9)
+    return value
+
+def run_all(processor):
+    results = [processor.query_data(query) for query in QUERIES]
+    for result in results:
+        result.pop('summary', None)
+        result.pop('result_handle', None)
+    structured = processor.structured_query({'areas': ['Wakad', 'Baner'], 'metric': 'both', 'year_from': 2020,
+                                             'aggregations': ['mean', 'median', 'count', 'std'],
+                                             'include': {'chart': True, 'table': True}})
+    structured.pop('result_handle')
+    return rounded({
+        'queries': results,
+        'areas': processor.get_areas(),
+        'ranking': processor.rank_areas('price_growth', limit=3),
+        'structured': structured,
+        'download': processor.get_filtered_data('wak').to_dict('records'),
+    })
+
+class TestParquetBackend:
+    
+    @pytest.fixture
+    def parquet(self, settings, tmp_path):
+        settings.DATA_BACKEND = 'parquet'
+        settings.PARQUET_DIR = tmp_path / 'datasets'
+        settings.PARQUET_AREA_BUCKETS = 4
+        return settings
+    
+    def test_same_responses_as_memory(self, parquet):
+        """Test that the Parquet backend answers exactly like the in-memory frame"""
+        memory = DataProcessor()
+        memory.df = make_frame()
+        expected = run_all(memory)
+        
+        processor = DataProcessor()
+        processor._publish_dataset(make_frame())
+        assert processor.df is None
+        assert processor.snapshot.row_count == len(make_frame())
+        
+        pd.testing.assert_frame_equal(processor._get_yearly_frame(), memory._get_yearly_frame())
+        actual = run_all(processor)
+        assert actual == expected
+    
+    def test_partitions_are_pruned(self, parquet):
+        """Test that data is laid out by area bucket and year and a one-area query skips other buckets"""
+        processor = DataProcessor()
+        processor._publish_dataset(make_frame())
+        store = processor.snapshot.store
+        
+        buckets = {area_bucket(area, 4) for area in make_frame()['area']}
+        assert sorted(path.name for path in store.path.iterdir() if path.is_dir()) == sorted(
+            f'_area_bucket={bucket}' for bucket in buckets)
+        assert (store.path / f"_area_bucket={area_bucket('Wakad', 4)}" / 'year=2020.0').is_dir()
+        
+        rows = store.select(['Wakad'], 2020, 2021)
+        plan = store.query(f"EXPLAIN ANALYZE SELECT count(*) FROM {store.source} WHERE {rows.where}", rows.params)
+        scanned, total = map(int, re.search(r'Scanning Files: (\d+)/(\d+)', '\n'.join(plan.iloc[:, 1])).groups())
+        assert total == len(list(store.path.glob('**/*.parquet')))
+        # One bucket, two years
+        assert scanned == 2
+        assert rows.count() == 6
+    
+    def test_identical_data_is_written_once(self, parquet):
+        """Test that workers loading the same data reuse one directory"""
+        first = ParquetStore.write(make_frame(), parquet.PARQUET_DIR, 'abc', buckets=4)
+        second = ParquetStore.write(make_frame(), parquet.PARQUET_DIR, 'abc', buckets=4)
+        assert first.path == second.path
+        assert len([p for p in parquet.PARQUET_DIR.iterdir()]) == 1
+    
+    def test_export_and_health(self, parquet):
+        """Test that result exports re-run the scan and health counts on-disk rows"""
+        data_processor._publish_dataset(make_frame())
+        client = Client()
+        
+        assert client.get('/api/health/').json()['total_records'] == len(make_frame())
+        result = client.post('/api/query/', json.dumps({'query': 'Compare Wakad and Aundh'}),
+                             content_type='application/json').json()
+        response = client.get(f"/api/results/{result['result_handle']}/export/?format=csv")
+        exported = pd.read_csv(io.BytesIO(b''.join(response.streaming_content)))
+        assert len(exported) == result['total_rows'] == 36
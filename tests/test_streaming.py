@@ -0,0 +1,157 @@
+import pytest
+import json
+import time
+import pandas as pd
+import os
+import sys
+import django
+from django.test import Client
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'loadtest'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from fake_gemini import SUMMARY, start_fake_gemini
+from api.data_processor import DataProcessor
+from api.views import data_processor
+
+def make_frame():
+    return pd.DataFrame({
+        'year': [2020, 2021, 2022] * 3,
+        'area': ['Wakad'] * 3 + ['Aundh'] * 3 + ['Baner'] * 3,
+        'price': [100.0, 110.0, 120.0, 90.0, 95.0, 99.0, 80.0, 85.0, 92.0],
+        'demand': [5.0, 5.5, 6.0, 4.0, 4.1, 4.3, 3.0, 3.2, 3.5]
+    })
+
+def parse_events(chunks):
+    """Split a text/event-stream body into (event, data) pairs"""
+    body = b''.join(chunks).decode()
+    events = []
+    for block in body.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((fields['event'], json.loads(fields['data'])))
+    return events
+
+@pytest.fixture
+def fake_gemini(settings):
+    server = start_fake_gemini(latency=0.0, chunk_delay=0.01)
+    settings.GOOGLE_API_KEY = 'test-key'
+    settings.GEMINI_API_URL = server.url
+    settings.GEMINI_STREAM_URL = server.stream_url
+    yield server
+    server.shutdown()
+    server.server_close()
+
+class TestStreamQuery:
+    
+    def setup_method(self):
+        """Setup a processor with a small dataset"""
+        self.processor = DataProcessor()
+        self.processor.df = make_frame()
+    
+    def test_mock_summary_streams_line_by_line(self, settings):
+        """Test that the payload comes first and the deterministic summary follows one line per event"""
+        settings.GOOGLE_API_KEY = None
+        events = list(self.processor.stream_query('Compare Wakad and Aundh'))
+        expected = self.processor.query_data('Compare Wakad and Aundh')
+        
+        name, result = events[0]
+        assert name == 'result'
+        assert 'summary' not in result
+        assert result['chart'] == expected['chart']
+        assert result['table'] == expected['table']
+        
+        deltas = [data['delta'] for name, data in events[1:-1]]
+        assert len(deltas) == expected['summary'].count('\n') + 1
+        assert ''.join(deltas) == expected['summary']
+        assert events[-1] == ('done', {'summary': expected['summary']})
+    
+    def test_unknown_area_is_a_failure_event(self):
+        """Test that an unanswerable query ends the stream with its suggestions"""
+        events = list(self.processor.stream_query('Tell me about Nowhere'))
+        assert [name for name, _ in events] == ['failure']
+        assert 'suggestions' in events[0][1]
+    
+    def test_llm_summary_is_relayed_incrementally(self, fake_gemini):
+        """Test that Gemini's streamed pieces are passed on as they arrive and then cached"""
+        events = list(self.processor.stream_query('Compare Wakad and Aundh'))
+        deltas = [data['delta'] for name, data in events if name == 'summary']
+        assert len(deltas) > 1
+        assert ''.join(deltas) == SUMMARY
+        assert events[-1] == ('done', {'summary': SUMMARY})
+        assert fake_gemini.stats['requests'] == 1
+        
+        # Asked again on the same dataset: served from the summary cache in one piece
+        again = list(self.processor.stream_query('Compare Wakad and Aundh'))
+        assert again[-1] == ('done', {'summary': SUMMARY})
+        assert fake_gemini.stats['requests'] == 1
+        assert self.processor.query_data('Compare Wakad and Aundh')['summary'] == SUMMARY
+    
+    def test_data_does_not_wait_for_llm(self, fake_gemini):
+        """Test that chart and table are sent before the LLM has answered"""
+        fake_gemini.latency = 1.0
+        started = time.perf_counter()
+        events = self.processor.stream_query('Compare Wakad and Aundh')
+        name, _ = next(events)
+        assert name == 'result'
+        assert time.perf_counter() - started < 0.5
+        assert list(events)[-1] == ('done', {'summary': SUMMARY})
+        assert time.perf_counter() - started >= 1.0
+    
+    def test_llm_error_falls_back_to_mock(self, fake_gemini):
+        """Test that a failed LLM call streams the deterministic summary instead"""
+        fake_gemini.error_rate = 1.0
+        mock = self.processor._get_mock_summary(
+            self.processor._aggregate_data(self.processor.df[self.processor.df['area'] == 'Wakad'], ['Wakad']),
+            self.processor.parse_query('Tell me about Wakad'))
+        
+        events = list(self.processor.stream_query('Tell me about Wakad'))
+        assert events[-1] == ('done', {'summary': mock})
+        assert fake_gemini.stats['errors'] == 1
+    
+    def test_broken_stream_replaces_partial_text(self, fake_gemini):
+        """Test that an LLM stream failing midway swaps in the whole fallback summary"""
+        def broken(*args):
+            yield 'Prices are '
+            raise ConnectionError('stream reset')
+        
+        self.processor._stream_llm_summary = broken
+        events = list(self.processor.stream_query('Tell me about Wakad'))
+        pieces = [data for name, data in events if name == 'summary']
+        assert pieces[0] == {'delta': 'Prices are '}
+        assert 'replace' in pieces[1]
+        assert events[-1] == ('done', {'summary': pieces[1]['replace']})
+
+class TestQueryStreamEndpoint:
+    
+    def setup_method(self):
+        """Setup a small dataset on the shared processor"""
+        data_processor.df = make_frame()
+        self.client = Client()
+    
+    def test_event_stream_response(self, settings):
+        """Test that EventSource's request gets an uncompressed, unbuffered event stream"""
+        settings.GOOGLE_API_KEY = None
+        response = self.client.get('/api/query/stream/', {'query': 'Compare Wakad and Aundh'},
+                                   HTTP_ACCEPT='text/event-stream', HTTP_ACCEPT_ENCODING='gzip, br')
+        assert response.status_code == 200
+        assert response['Content-Type'] == 'text/event-stream'
+        assert response['Cache-Control'] == 'no-cache'
+        assert not response.has_header('Content-Encoding')
+        
+        events = parse_events(response.streaming_content)
+        assert events[0][0] == 'result'
+        assert events[0][1]['result_handle']
+        assert events[-1][0] == 'done'
+    
+    def test_empty_query_is_rejected(self):
+        """Test that a missing query is a plain 400"""
+        response = self.client.get('/api/query/stream/')
+        assert response.status_code == 400
+        assert response.json()['error'] == 'Query cannot be empty'
@@ -0,0 +1,64 @@
+import pytest
+import pandas as pd
+import os
+import sys
+import django
+from django.test import Client
+
+# Setup Django for testing
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'realestatebot.settings')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+try:
+    django.setup()
+except:
+    pass
+
+from api.telemetry import Telemetry, telemetry
+from api.views import data_processor
+
+class TestTelemetry:
+    
+    def setup_method(self):
+        """Setup a fresh registry and a small dataset on the shared processor"""
+        telemetry.reset()
+        data_processor.df = pd.DataFrame({
+            'year': [2020, 2021, 2022],
+            'area': ['Wakad', 'Wakad', 'Wakad'],
+            'price': [5000000, 5500000, 6000000],
+            'demand': [7.5, 8.0, 8.5]
+        })
+    
+    def test_span_records_histogram(self):
+        """Test that spans land in cumulative histogram buckets"""
+        registry = Telemetry(enabled=True)
+        with registry.span('parse'):
+            pass
+        
+        output = registry.render_prometheus()
+        assert 'realestate_stage_duration_seconds_count{stage="parse"} 1' in output
+        assert 'realestate_stage_duration_seconds_bucket{stage="parse",le="+Inf"} 1' in output
+    
+    def test_disabled_registry_records_nothing(self):
+        """Test that a disabled registry hands out a shared no-op span"""
+        registry = Telemetry(enabled=False)
+        assert registry.span('parse') is registry.span('filter')
+        
+        with registry.span('parse'):
+            registry.inc('llm_fallbacks_total', reason='error')
+        assert 'stage="parse"' not in registry.render_prometheus()
+    
+    def test_metrics_endpoint_reports_query_stages(self):
+        """Test that a query populates stage, fallback and dataset metrics"""
+        client = Client()
+        response = client.post('/api/query/', {'query': 'Analyze Wakad'}, content_type='application/json')
+        assert response.status_code == 200
+        
+        output = client.get('/api/metrics/').content.decode()
+        for stage in ['parse', 'extract_areas', 'filter', 'aggregate', 'summary', 'chart', 'table', 'serialize']:
+            assert f'stage="{stage}"' in output
+        assert 'realestate_request_duration_seconds_count{endpoint="query"} 1' in output
+        assert 'realestate_dataset_rows 3' in output
+
+if __name__ == '__main__':
+    pytest.main([__file__])